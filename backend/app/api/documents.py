@@ -1,18 +1,26 @@
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, status
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, ConfigDict
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
+import asyncio
 import os
+import time
 import uuid
-import shutil
 
 from app.core.database import get_db
 from app.core.config import settings
 from app.models import Document, DocumentType, User
 from app.api.auth import get_current_active_user
 from app.services.document_processor import DocumentProcessor
-from app.services.vector_service import vector_service
+from app.services.vector_service import async_vector_service
+from app.services.document_ingestion import (
+    ALLOWED_EXTENSIONS,
+    ZIP_EXTENSION,
+    UploadTooLargeError,
+    document_ingestion_service,
+)
+from app.services.websocket_manager import websocket_manager
 from loguru import logger
 
 router = APIRouter()
@@ -39,6 +47,23 @@ class DocumentList(BaseModel):
     items: List[DocumentResponse]
 
 
+class BatchUploadItem(BaseModel):
+    file_name: str
+    status: str  # completed: 已入库并向量化 / saved: 已保存但解析失败 / failed: 未保存
+    document_id: Optional[int] = None
+    error: Optional[str] = None
+
+
+class BatchUploadResponse(BaseModel):
+    batch_id: str
+    total: int
+    succeeded: int
+    failed: int
+    elapsed_seconds: float
+    files_per_minute: float
+    items: List[BatchUploadItem]
+
+
 @router.post("/upload", response_model=DocumentResponse, status_code=status.HTTP_201_CREATED)
 async def upload_document(
     file: UploadFile = File(...),
@@ -49,35 +74,27 @@ async def upload_document(
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db),
 ):
-    """上传文档"""
-    # 检查文件大小
-    file.file.seek(0, 2)  # 移到文件末尾
-    file_size = file.file.tell()
-    file.file.seek(0)  # 回到文件开头
-
-    if file_size > settings.MAX_UPLOAD_SIZE:
-        raise HTTPException(
-            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-            detail=f"文件大小超过限制 ({settings.MAX_UPLOAD_SIZE} bytes)",
-        )
+    """上传文档
 
+    文件以异步分块方式流式写入临时文件，同一遍中完成大小校验、SHA-256和类型嗅探，
+    最后原子重命名；文本提取和向量化在入库线程池中执行，不阻塞其他请求。
+    """
     # 检查文件类型
-    allowed_extensions = [".doc", ".docx", ".pdf", ".txt", ".xls", ".xlsx"]
     file_ext = os.path.splitext(file.filename)[1].lower()
-    if file_ext not in allowed_extensions:
+    if file_ext not in ALLOWED_EXTENSIONS:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"不支持的文件类型。支持的类型: {', '.join(allowed_extensions)}",
+            detail=f"不支持的文件类型。支持的类型: {', '.join(ALLOWED_EXTENSIONS)}",
         )
 
-    # 生成唯一文件名
-    unique_filename = f"{uuid.uuid4()}{file_ext}"
-    file_path = os.path.join(settings.UPLOAD_DIR, unique_filename)
-
-    # 保存文件
+    # 保存文件（流式写入过程中检查文件大小）
     try:
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        stored = await document_ingestion_service.save_upload_file(file)
+    except UploadTooLargeError:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"文件大小超过限制 ({settings.MAX_UPLOAD_SIZE} bytes)",
+        )
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"文件保存失败: {str(e)}")
 
@@ -85,10 +102,11 @@ async def upload_document(
     db_document = Document(
         title=title,
         type=doc_type,
-        file_path=file_path,
+        file_path=stored["file_path"],
         file_name=file.filename,
-        file_size=file_size,
-        mime_type=file.content_type,
+        file_size=stored["file_size"],
+        mime_type=stored["mime_type"],
+        doc_metadata={"sha256": stored["sha256"]},
         industry=industry,
         customer_name=customer_name,
         user_id=current_user.id,
@@ -100,22 +118,19 @@ async def upload_document(
 
     # 提取文本并向量化
     try:
-        # 提取文本
-        text_content = DocumentProcessor.extract_text(file_path)
-        db_document.content_text = text_content
-
-        # 向量化
-        vector_id = vector_service.add_document(
-            doc_id=db_document.id,
-            title=title,
-            content=text_content,
-            metadata={
+        text_content, vector_id = await document_ingestion_service.process(
+            db_document.file_path,
+            db_document.id,
+            title,
+            {
                 "type": doc_type.value,
                 "industry": industry,
                 "customer_name": customer_name,
+                "user_id": current_user.id,
             },
         )
 
+        db_document.content_text = text_content
         db_document.vector_id = vector_id
         db_document.is_vectorized = 1
 
@@ -131,6 +146,128 @@ async def upload_document(
     return db_document
 
 
+@router.post("/upload/batch", response_model=BatchUploadResponse, status_code=status.HTTP_201_CREATED)
+async def upload_documents_batch(
+    files: List[UploadFile] = File(...),
+    doc_type: DocumentType = Form(...),
+    industry: Optional[str] = Form(None),
+    customer_name: Optional[str] = Form(None),
+    ws_client_id: Optional[str] = Form(None),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+):
+    """批量上传文档
+
+    支持一次提交多个文件或zip压缩包（zip条目逐个流式落盘）。每个文件落盘后立即进入
+    解析/向量化线程池，与后续文件的落盘并行；传入 ws_client_id 时通过WebSocket推送逐文件进度。
+    """
+    limit = settings.BULK_UPLOAD_MAX_FILES
+    if len(files) > limit:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"文件数量超过限制 ({limit})")
+
+    batch_id = uuid.uuid4().hex
+    started = time.perf_counter()
+    tasks: List[asyncio.Task] = []
+    progress = {"processed": 0}
+    metadata = {
+        "type": doc_type.value,
+        "industry": industry,
+        "customer_name": customer_name,
+        "user_id": current_user.id,
+    }
+
+    async def ingest(saved: Dict) -> Dict:
+        file_name = saved["file_name"]
+        if saved.get("error"):
+            return {"file_name": file_name, "status": "failed", "error": saved["error"]}
+
+        db_document = Document(
+            title=os.path.splitext(file_name)[0],
+            type=doc_type,
+            file_path=saved["file_path"],
+            file_name=file_name,
+            file_size=saved["file_size"],
+            mime_type=saved["mime_type"],
+            doc_metadata={"sha256": saved["sha256"]},
+            industry=industry,
+            customer_name=customer_name,
+            user_id=current_user.id,
+        )
+        db.add(db_document)
+        db.commit()
+        db.refresh(db_document)
+
+        try:
+            text_content, vector_id = await document_ingestion_service.process(
+                db_document.file_path, db_document.id, db_document.title, metadata
+            )
+            db_document.content_text = text_content
+            db_document.vector_id = vector_id
+            db_document.is_vectorized = 1
+            db.commit()
+            return {"file_name": file_name, "status": "completed", "document_id": db_document.id}
+        except Exception as e:
+            logger.error(f"批量上传 {batch_id} 文档 {db_document.id} 处理失败: {e}")
+            # 与单文件上传一致：处理失败时文档记录仍然保存
+            return {"file_name": file_name, "status": "saved", "document_id": db_document.id, "error": str(e)}
+
+    async def ingest_and_report(saved: Dict) -> Dict:
+        item = await ingest(saved)
+        progress["processed"] += 1
+        if ws_client_id:
+            await websocket_manager.send_to_client(
+                ws_client_id,
+                {"type": "document_upload_progress", "batch_id": batch_id, "processed": progress["processed"], **item},
+            )
+        return item
+
+    def enqueue(saved: Dict) -> None:
+        tasks.append(asyncio.create_task(ingest_and_report(saved)))
+
+    for upload in files:
+        file_ext = os.path.splitext(upload.filename or "")[1].lower()
+        if file_ext == ZIP_EXTENSION:
+            try:
+                async for saved in document_ingestion_service.iter_zip_uploads(upload.file, limit - len(tasks)):
+                    enqueue(saved)
+            except ValueError as e:
+                enqueue({"file_name": upload.filename, "error": str(e)})
+        elif file_ext in ALLOWED_EXTENSIONS:
+            try:
+                enqueue(await document_ingestion_service.save_upload_file(upload))
+            except UploadTooLargeError as e:
+                enqueue({"file_name": upload.filename, "error": str(e)})
+            except Exception as e:
+                logger.error(f"批量上传 {batch_id} 保存文件 {upload.filename} 失败: {e}")
+                enqueue({"file_name": upload.filename, "error": f"文件保存失败: {str(e)}"})
+        else:
+            enqueue({"file_name": upload.filename, "error": f"不支持的文件类型: {file_ext or '未知'}"})
+
+    items = await asyncio.gather(*tasks)
+
+    elapsed = time.perf_counter() - started
+    succeeded = sum(1 for item in items if item["status"] == "completed")
+    files_per_minute = len(items) / elapsed * 60 if elapsed > 0 else 0.0
+    logger.info(
+        f"批量上传 {batch_id} 完成: {succeeded}/{len(items)} 成功, 耗时 {elapsed:.2f}s, 吞吐 {files_per_minute:.1f} files/min"
+    )
+
+    result = {
+        "batch_id": batch_id,
+        "total": len(items),
+        "succeeded": succeeded,
+        "failed": sum(1 for item in items if item["status"] == "failed"),
+        "elapsed_seconds": round(elapsed, 3),
+        "files_per_minute": round(files_per_minute, 1),
+        "items": items,
+    }
+    if ws_client_id:
+        await websocket_manager.send_to_client(
+            ws_client_id, {"type": "document_upload_complete", **{k: v for k, v in result.items() if k != "items"}}
+        )
+    return result
+
+
 @router.get("/", response_model=DocumentList)
 async def list_documents(
     skip: int = 0,
@@ -167,6 +304,86 @@ async def get_document(
     return document
 
 
+@router.put("/{document_id}/file", response_model=DocumentResponse)
+async def replace_document_file(
+    document_id: int,
+    file: UploadFile = File(...),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+):
+    """上传文档新版本并增量重建索引
+
+    文件内容哈希未变时直接返回；否则重新提取文本，只对内容变化的分块重新嵌入，
+    删除已不存在的分块，未变分块仅刷新元数据。
+    """
+    document = db.query(Document).filter(Document.id == document_id, Document.user_id == current_user.id).first()
+
+    if not document:
+        raise HTTPException(status_code=404, detail="文档不存在")
+
+    file_ext = os.path.splitext(file.filename)[1].lower()
+    if file_ext not in ALLOWED_EXTENSIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"不支持的文件类型。支持的类型: {', '.join(ALLOWED_EXTENSIONS)}",
+        )
+
+    try:
+        stored = await document_ingestion_service.save_upload_file(file)
+    except UploadTooLargeError:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"文件大小超过限制 ({settings.MAX_UPLOAD_SIZE} bytes)",
+        )
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"文件保存失败: {str(e)}")
+
+    if (document.doc_metadata or {}).get("sha256") == stored["sha256"] and document.is_vectorized:
+        os.remove(stored["file_path"])
+        return document
+
+    try:
+        text_content = await document_ingestion_service.run_in_executor(
+            DocumentProcessor.extract_text, stored["file_path"]
+        )
+        result = await async_vector_service.update_document(
+            document.id,
+            document.title,
+            text_content,
+            {
+                "type": document.type.value,
+                "industry": document.industry,
+                "customer_name": document.customer_name,
+                "user_id": document.user_id,
+            },
+        )
+    except Exception as e:
+        logger.error(f"文档 {document_id} 增量索引失败: {e}")
+        os.remove(stored["file_path"])
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"文档处理失败: {str(e)}")
+
+    old_file_path = document.file_path
+    document.file_path = stored["file_path"]
+    document.file_name = file.filename
+    document.file_size = stored["file_size"]
+    document.mime_type = stored["mime_type"]
+    document.doc_metadata = {**(document.doc_metadata or {}), "sha256": stored["sha256"]}
+    document.content_text = text_content
+    document.vector_id = result["vector_id"]
+    document.is_vectorized = 1
+    db.commit()
+    db.refresh(document)
+
+    try:
+        if old_file_path and os.path.exists(old_file_path):
+            os.remove(old_file_path)
+    except Exception as e:
+        logger.error(f"删除旧文件失败: {e}")
+
+    logger.info(f"文档 {document_id} 已更新，新增 {result['added']} 块，删除 {result['deleted']} 块")
+    return document
+
+
 @router.delete("/{document_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_document(
     document_id: int, current_user: User = Depends(get_current_active_user), db: Session = Depends(get_db)
@@ -180,7 +397,7 @@ async def delete_document(
     # 删除向量数据
     if document.vector_id:
         try:
-            vector_service.delete_document(document.vector_id, doc_id=document.id)
+            await async_vector_service.delete_document(document.vector_id, doc_id=document.id)
         except Exception as e:
             logger.error(f"删除向量数据失败: {e}")
 
@@ -6,7 +6,7 @@ from datetime import datetime
 
 from app.core.database import get_db
 from app.models import KnowledgeBase
-from app.services.vector_service import vector_service
+from app.services.vector_service import async_vector_service
 from app.utils.security_utils import sanitize_for_api
 from loguru import logger
 
@@ -80,7 +80,7 @@ async def create_knowledge(knowledge_data: KnowledgeCreate, db: Session = Depend
 
     # 向量化知识库条目
     try:
-        vector_id = vector_service.add_knowledge(
+        vector_id = await async_vector_service.add_knowledge(
             knowledge_id=db_knowledge.id,
             title=sanitized_data["title"],
             content=sanitized_data["content"],
@@ -154,6 +154,23 @@ async def update_knowledge(knowledge_id: int, knowledge_data: KnowledgeUpdate, d
     db.commit()
     db.refresh(knowledge)
 
+    # 重新向量化：内容未变时只更新向量元数据，不重新嵌入
+    try:
+        vector_id = await async_vector_service.update_knowledge(
+            knowledge_id=knowledge.id,
+            title=knowledge.title,
+            content=knowledge.content,
+            category=knowledge.category,
+            metadata=knowledge_data.metadata if knowledge_data.metadata is not None else (knowledge.kb_metadata or {}),
+            vector_id=knowledge.vector_id,
+        )
+        knowledge.vector_id = vector_id
+        knowledge.is_vectorized = 1
+        db.commit()
+        db.refresh(knowledge)
+    except Exception as e:
+        logger.error(f"知识库条目 {knowledge_id} 重新向量化失败: {e}")
+
     return knowledge
 
 
@@ -168,7 +185,7 @@ async def delete_knowledge(knowledge_id: int, db: Session = Depends(get_db)):
     # 删除向量数据
     if knowledge.vector_id:
         try:
-            vector_service.delete_knowledge(knowledge.vector_id)
+            await async_vector_service.delete_knowledge(knowledge.vector_id)
         except Exception as e:
             logger.error(f"删除知识库向量失败: {e}")
 
@@ -181,17 +198,42 @@ async def delete_knowledge(knowledge_id: int, db: Session = Depends(get_db)):
 
 @router.post("/search")
 async def search_knowledge(query: str, category: Optional[str] = None, limit: int = 10, db: Session = Depends(get_db)):
-    """搜索知识库"""
-    # TODO: 实现语义搜索
-    # 这里先实现简单的关键词搜索
-    search_query = db.query(KnowledgeBase).filter(KnowledgeBase.is_active == 1)
-
-    if category:
-        search_query = search_query.filter(KnowledgeBase.category == category)
+    """搜索知识库
 
-    # 简单的关键词匹配
-    search_query = search_query.filter((KnowledgeBase.title.contains(query)) | (KnowledgeBase.content.contains(query)))
-
-    results = search_query.order_by(KnowledgeBase.weight.desc()).limit(limit).all()
+    走BM25关键词倒排索引（中文按二元组切分），按相关度排序后回表取出仍然有效的条目。向量化失败的条目
+    不在索引中，按标题/内容包含查询词补充在后面（索引不可用时只有这一部分）。
+    """
+    try:
+        hits = await async_vector_service.keyword_search(
+            "knowledge", query, n_results=limit, where={"category": category} if category else None
+        )
+    except Exception as e:
+        logger.error(f"知识库关键词检索失败: {e}")
+        hits = []
+    ranked_ids = []
+    for hit in hits:
+        knowledge_id = hit["metadata"].get("knowledge_id")
+        if knowledge_id is not None and knowledge_id not in ranked_ids:
+            ranked_ids.append(knowledge_id)
+
+    rows = (
+        db.query(KnowledgeBase).filter(KnowledgeBase.id.in_(ranked_ids), KnowledgeBase.is_active == 1).all()
+        if ranked_ids
+        else []
+    )
+    by_id = {row.id: row for row in rows}
+    results = [by_id[knowledge_id] for knowledge_id in ranked_ids if knowledge_id in by_id]
+
+    if len(results) < limit:
+        pending = db.query(KnowledgeBase).filter(
+            KnowledgeBase.is_active == 1,
+            KnowledgeBase.is_vectorized == 0,
+            KnowledgeBase.title.contains(query) | KnowledgeBase.content.contains(query),
+        )
+        if category:
+            pending = pending.filter(KnowledgeBase.category == category)
+        if by_id:
+            pending = pending.filter(KnowledgeBase.id.notin_(list(by_id)))
+        results += pending.order_by(KnowledgeBase.weight.desc()).limit(limit - len(results)).all()
 
     return {"results": results, "total": len(results)}
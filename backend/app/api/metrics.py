@@ -8,6 +8,7 @@ from app.core.metrics import (
     ai_tokens_used,
     vector_search_total,
     counter_total,
+    vector_cache_hit_rate,
 )
 from app.models import Document, Proposal
 from app.services.cache_service import cache_service
@@ -34,5 +35,6 @@ async def get_metrics_summary(
         "ai_calls": int(counter_total(ai_calls_total)),
         "ai_tokens": int(counter_total(ai_tokens_used)),
         "vector_searches": int(counter_total(vector_search_total)),
+        "vector_cache_hit_rate": vector_cache_hit_rate(),
     }
     return summary
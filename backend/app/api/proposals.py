@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, ConfigDict
 from typing import List, Optional
@@ -8,9 +8,10 @@ from loguru import logger
 from app.core.database import get_db
 from app.models import Proposal, ProposalStatus, User
 from app.api.auth import get_current_active_user
-from app.services.proposal_generator import ProposalGenerator
+from app.services.proposal_generator import PROPOSAL_SECTIONS, ProposalGenerator, index_proposal
 from app.services.export_service import export_service
 from app.services.cache_service import cache_service
+from app.services.vector_service import async_vector_service
 from app.utils.security_utils import sanitize_for_api
 from fastapi.responses import FileResponse
 
@@ -104,7 +105,10 @@ async def create_proposal(
 
 @router.post("/{proposal_id}/generate", response_model=ProposalDetail)
 async def generate_proposal(
-    proposal_id: int, current_user: User = Depends(get_current_active_user), db: Session = Depends(get_db)
+    proposal_id: int,
+    background_tasks: BackgroundTasks,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
 ):
     """生成方案内容"""
     # 获取方案
@@ -138,6 +142,20 @@ async def generate_proposal(
         await cache_service.invalidate_user_proposals(current_user.id)
         logger.debug(f"📝 已失效用户 {current_user.id} 的方案列表缓存")
 
+        # 响应返回后按章节向量化，供相似方案检索
+        background_tasks.add_task(
+            index_proposal,
+            proposal.id,
+            proposal.requirements,
+            {name: getattr(proposal, name) for name in PROPOSAL_SECTIONS},
+            {
+                "title": proposal.title,
+                "customer_name": proposal.customer_name,
+                "industry": proposal.customer_industry,
+                "user_id": proposal.user_id,
+            },
+        )
+
         return proposal
 
     except Exception as e:
@@ -163,31 +181,24 @@ async def list_proposals(
 ):
     """获取方案列表 - 带缓存支持"""
 
-    # ✅ 尝试从缓存获取
     filters = {"skip": skip, "limit": limit, "status": status_filter.value if status_filter else None}
 
-    cached_result = await cache_service.get_proposal_list(user_id=current_user.id, filters=filters)
-
-    if cached_result is not None:
-        logger.info(f"✅ 方案列表缓存命中，返回 {len(cached_result.get('items', []))} 条记录")
-        return cached_result
-
-    # 缓存未命中，查询数据库
-    query = db.query(Proposal).filter(Proposal.user_id == current_user.id)
+    async def load():
+        # 缓存未命中或需要刷新，查询数据库
+        query = db.query(Proposal).filter(Proposal.user_id == current_user.id)
 
-    if status_filter:
-        query = query.filter(Proposal.status == status_filter)
+        if status_filter:
+            query = query.filter(Proposal.status == status_filter)
 
-    total = query.count()
-    items = query.order_by(Proposal.created_at.desc()).offset(skip).limit(limit).all()
+        total = query.count()
+        items = query.order_by(Proposal.created_at.desc()).offset(skip).limit(limit).all()
+        logger.debug(f"📝 方案列表已查询并缓存，用户 {current_user.id}")
+        return {"total": total, "items": items}
 
-    result = {"total": total, "items": items}
-
-    # ✅ 缓存查询结果（5分钟）
-    await cache_service.cache_proposal_list(user_id=current_user.id, filters=filters, proposals=result, expire=300)
-    logger.debug(f"📝 方案列表已缓存，用户 {current_user.id}")
-
-    return result
+    # ✅ 读取缓存（5分钟），并发请求只查询一次数据库，过期时一个请求刷新、其余返回旧值
+    return await cache_service.get_or_compute_proposal_list(
+        user_id=current_user.id, filters=filters, compute=load, expire=300
+    )
 
 
 @router.get("/{proposal_id}", response_model=ProposalDetail)
@@ -251,6 +262,12 @@ async def delete_proposal(
     db.delete(proposal)
     db.commit()
 
+    # 删除章节向量，相似方案检索不再返回已删除的方案
+    try:
+        await async_vector_service.delete_proposal(proposal_id)
+    except Exception as e:
+        logger.error(f"删除方案向量失败: {e}")
+
     # ✅ 失效用户的方案列表缓存（方案删除）
     await cache_service.invalidate_user_proposals(current_user.id)
     logger.debug(f"📝 已失效用户 {current_user.id} 的方案列表缓存")
@@ -1,18 +1,29 @@
 """语义搜索API"""
 
-from fastapi import APIRouter, Depends, Query
+import asyncio
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, Field
+from typing import Awaitable, Dict, List, Literal, Optional
 
+from app.core.config import settings
 from app.core.database import get_db
 from app.models import User
 from app.api.auth import get_current_active_user
-from app.services.vector_service import vector_service
+from app.services.vector_service import async_vector_service, metadata_filter
 
 router = APIRouter()
 
 
+async def _await_search(search: Awaitable[List[dict]]) -> List[dict]:
+    """等待向量检索结果，超时转换为504"""
+    try:
+        return await search
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail="向量检索超时，请稍后重试")
+
+
 class SearchResult(BaseModel):
     """搜索结果"""
 
@@ -30,39 +41,77 @@ class SearchResponse(BaseModel):
     results: List[SearchResult]
 
 
+class BatchSearchItem(BaseModel):
+    """批量搜索中的单条查询"""
+
+    id: Optional[str] = Field(None, description="结果键，默认为查询文本；同一文本查询多个集合时需指定")
+    query: str = Field(..., min_length=1, description="搜索查询")
+    collection: Literal["documents", "knowledge"] = "documents"
+    limit: int = Field(5, ge=1, le=20, description="返回结果数量")
+    doc_type: Optional[str] = Field(None, description="文档类型过滤")
+    industry: Optional[str] = Field(None, description="行业过滤")
+    customer_name: Optional[str] = Field(None, description="客户名称过滤")
+    mine: bool = Field(False, description="只搜索当前用户上传的文档")
+    category: Optional[str] = Field(None, description="知识库分类过滤")
+
+
+class BatchSearchRequest(BaseModel):
+    """批量搜索请求"""
+
+    queries: List[BatchSearchItem] = Field(..., min_length=1)
+
+
+class BatchSearchResponse(BaseModel):
+    """批量搜索响应，results 按查询键索引"""
+
+    total: int
+    results: Dict[str, List[SearchResult]]
+
+
+def _relevance(result: dict) -> float:
+    """重排后的结果使用重排分数，否则由向量距离换算"""
+    if result.get("rerank_score") is not None:
+        return result["rerank_score"]
+    return 1.0 - result["distance"] if result["distance"] else 0.0
+
+
+def _to_search_result(result: dict, preview_length: int = 200) -> SearchResult:
+    """检索结果转换为响应条目，文本截取前 preview_length 字；没有文本的结果返回空内容"""
+    document = result.get("document") or ""
+    return SearchResult(
+        id=result["id"],
+        content=document[:preview_length] + "..." if len(document) > preview_length else document,
+        metadata=result.get("metadata") or {},
+        relevance_score=_relevance(result),
+    )
+
+
 @router.post("/documents", response_model=SearchResponse)
 async def search_documents(
     query: str = Query(..., description="搜索查询"),
     limit: int = Query(5, ge=1, le=20, description="返回结果数量"),
     doc_type: Optional[str] = Query(None, description="文档类型过滤"),
     industry: Optional[str] = Query(None, description="行业过滤"),
+    customer_name: Optional[str] = Query(None, description="客户名称过滤"),
+    mine: bool = Query(False, description="只搜索当前用户上传的文档"),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db),
 ):
     """语义搜索文档"""
     # 构建过滤条件
-    filter_metadata = {}
-    if doc_type:
-        filter_metadata["type"] = doc_type
-    if industry:
-        filter_metadata["industry"] = industry
+    filter_metadata = metadata_filter(
+        type=doc_type or None,
+        industry=industry or None,
+        customer_name=customer_name or None,
+        user_id=current_user.id if mine else None,
+    )
 
     # 执行搜索
-    results = vector_service.search_documents(
-        query=query, n_results=limit, filter_metadata=filter_metadata if filter_metadata else None
+    results = await _await_search(
+        async_vector_service.search_documents(query=query, n_results=limit, filter_metadata=filter_metadata)
     )
 
-    # 格式化结果
-    formatted_results = []
-    for result in results:
-        formatted_results.append(
-            SearchResult(
-                id=result["id"],
-                content=result["document"][:200] + "..." if len(result["document"]) > 200 else result["document"],
-                metadata=result["metadata"],
-                relevance_score=1.0 - result["distance"] if result["distance"] else 0.0,
-            )
-        )
+    formatted_results = [_to_search_result(result) for result in results]
 
     return SearchResponse(query=query, total=len(formatted_results), results=formatted_results)
 
@@ -77,23 +126,51 @@ async def search_knowledge(
 ):
     """语义搜索知识库"""
     # 执行搜索
-    results = vector_service.search_knowledge(query=query, n_results=limit, category=category)
-
-    # 格式化结果
-    formatted_results = []
-    for result in results:
-        formatted_results.append(
-            SearchResult(
-                id=result["id"],
-                content=result["document"][:200] + "..." if len(result["document"]) > 200 else result["document"],
-                metadata=result["metadata"],
-                relevance_score=1.0 - result["distance"] if result["distance"] else 0.0,
-            )
-        )
+    results = await _await_search(
+        async_vector_service.search_knowledge(query=query, n_results=limit, category=category)
+    )
+
+    formatted_results = [_to_search_result(result) for result in results]
 
     return SearchResponse(query=query, total=len(formatted_results), results=formatted_results)
 
 
+@router.post("/batch", response_model=BatchSearchResponse)
+async def search_batch(
+    request: BatchSearchRequest,
+    current_user: User = Depends(get_current_active_user),
+):
+    """批量语义搜索：一次请求多条查询，同一集合、同一过滤条件的查询合并为一次向量检索"""
+    if len(request.queries) > settings.SEARCH_BATCH_MAX_QUERIES:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"单次最多 {settings.SEARCH_BATCH_MAX_QUERIES} 条查询",
+        )
+    keys = [item.id or item.query for item in request.queries]
+    if len(set(keys)) != len(keys):
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="查询键重复，请为重复的查询指定id")
+
+    requests = []
+    for key, item in zip(keys, request.queries):
+        search_request = {"id": key, "query": item.query, "collection": item.collection, "n_results": item.limit}
+        if item.collection == "documents":
+            search_request["filter_metadata"] = metadata_filter(
+                type=item.doc_type or None,
+                industry=item.industry or None,
+                customer_name=item.customer_name or None,
+                user_id=current_user.id if item.mine else None,
+            )
+        else:
+            search_request["category"] = item.category
+        requests.append(search_request)
+
+    results = await _await_search(async_vector_service.search_batch(requests))
+    return BatchSearchResponse(
+        total=len(results),
+        results={key: [_to_search_result(result) for result in results.get(key, [])] for key in keys},
+    )
+
+
 @router.post("/proposals/similar")
 async def search_similar_proposals(
     requirements: str = Query(..., description="需求描述"),
@@ -102,19 +179,11 @@ async def search_similar_proposals(
     db: Session = Depends(get_db),
 ):
     """搜索相似的历史方案"""
-    results = vector_service.search_similar_proposals(requirements=requirements, n_results=limit)
-
-    # 格式化结果
-    formatted_results = []
-    for result in results:
-        formatted_results.append(
-            SearchResult(
-                id=result["id"],
-                content=result["document"][:300] + "..." if len(result["document"]) > 300 else result["document"],
-                metadata=result["metadata"],
-                relevance_score=1.0 - result["distance"] if result["distance"] else 0.0,
-            )
-        )
+    results = await _await_search(
+        async_vector_service.search_similar_proposals(requirements=requirements, n_results=limit)
+    )
+
+    formatted_results = [_to_search_result(result, preview_length=300) for result in results]
 
     return SearchResponse(query=requirements, total=len(formatted_results), results=formatted_results)
 
@@ -122,5 +191,5 @@ async def search_similar_proposals(
 @router.get("/stats")
 async def get_search_stats(current_user: User = Depends(get_current_active_user)):
     """获取向量数据库统计信息"""
-    stats = vector_service.get_collection_stats()
+    stats = await async_vector_service.get_collection_stats()
     return {"status": "ok", "collections": stats}
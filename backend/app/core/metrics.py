@@ -20,6 +20,15 @@ vector_search_duration = Histogram(
     "vector_search_duration_seconds", "Vector search duration in seconds", ["collection"]
 )
 
+vector_cache_requests_total = Counter(
+    "vector_cache_requests_total", "Vector search result cache lookups", ["collection", "result"]
+)
+
+# 检索重排指标，result: scored/cached/timeout/error
+rerank_requests_total = Counter("rerank_requests_total", "Search rerank requests", ["reranker", "result"])
+
+rerank_duration = Histogram("rerank_duration_seconds", "Search rerank duration in seconds", ["reranker"])
+
 # Cache 指标
 cache_operations_total = Counter(
     "cache_operations_total", "Total cache operations", ["operation", "cache_type", "status"]
@@ -27,6 +36,15 @@ cache_operations_total = Counter(
 
 cache_hit_rate = Gauge("cache_hit_rate", "Cache hit rate", ["cache_type"])
 
+# 进程内缓存层，reason: lru(超出条目数/字节数上限被淘汰)/expired(过期删除)
+memory_cache_evictions_total = Counter(
+    "memory_cache_evictions_total", "In-process cache entries removed", ["cache", "reason"]
+)
+
+memory_cache_entries = Gauge("memory_cache_entries", "In-process cache entries", ["cache"])
+
+memory_cache_bytes = Gauge("memory_cache_bytes", "In-process cache approximate size in bytes", ["cache"])
+
 # HTTP 请求指标
 http_requests_total = Counter("http_requests_total", "Total HTTP requests", ["method", "endpoint", "status_code"])
 
@@ -120,10 +138,22 @@ def get_metrics():
     return generate_latest()
 
 
-def counter_total(counter: Counter) -> float:
-    """获取Counter的总值"""
+def counter_total(counter: Counter, **labels) -> float:
+    """获取Counter的总值，可按标签过滤（如 result="hit"）"""
     total = 0.0
     for metric in counter.collect():
         for sample in metric.samples:
-            total += float(sample.value)
+            # 跳过 *_created 时间戳样本，只累加计数值
+            if not sample.name.endswith("_total"):
+                continue
+            if all(sample.labels.get(name) == value for name, value in labels.items()):
+                total += float(sample.value)
     return total
+
+
+def vector_cache_hit_rate() -> str:
+    """检索结果缓存命中率，格式与 CacheService.get_stats 的 hit_rate 一致"""
+    hits = counter_total(vector_cache_requests_total, result="hit")
+    total = counter_total(vector_cache_requests_total)
+    rate = hits / total if total else 0.0
+    return f"{rate * 100:.2f}%"
@@ -1,12 +1,17 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from loguru import logger
+import asyncio
 import sys
 from contextlib import asynccontextmanager
 
 from app.core.config import settings
 from app.core.database import init_db
 from app.middleware import MetricsMiddleware
+from app.services.cache_service import cache_service
+from app.services.vector_service import async_vector_service
+from app.services.warmup import run_warmup
 from app.api import auth, documents, proposals, templates, knowledge, search, metrics, websocket, multi_model_proposals, ai_models
 
 # 配置日志
@@ -32,8 +37,31 @@ async def lifespan(app: FastAPI):
         logger.info("数据库初始化完成")
     except Exception as e:
         logger.error(f"数据库初始化失败: {e}")
+    # 订阅缓存失效频道，订阅成功后启用进程内近缓存
+    await cache_service.start_invalidation_listener()
+    # 预热在后台执行，期间 /health 正常响应、/ready 返回 503，完成后才接收流量
+    app.state.ready = not settings.SERVICE_WARMUP
+    app.state.warmup = {}
+    warmup_task = asyncio.create_task(_warm_up(app)) if settings.SERVICE_WARMUP else None
     yield
     logger.info("应用正在关闭...")
+    if warmup_task is not None and not warmup_task.done():
+        warmup_task.cancel()
+    # 写入缓冲的检索记录，下次启动时回放
+    try:
+        await async_vector_service.flush_recent_queries()
+    except Exception as e:
+        logger.warning(f"写入最近检索记录失败: {e}")
+    await cache_service.stop_invalidation_listener()
+
+
+async def _warm_up(app: FastAPI):
+    """执行启动预热，结束后标记就绪（失败的步骤记录在报告中，不阻止就绪）"""
+    try:
+        app.state.warmup = await run_warmup()
+    except Exception as e:
+        logger.error(f"服务预热失败: {e}")
+    app.state.ready = True
 
 
 # 创建FastAPI应用
@@ -74,6 +102,15 @@ async def health_check():
     return {"status": "healthy", "app_name": settings.APP_NAME, "version": settings.APP_VERSION}
 
 
+# 就绪检查
+@app.get("/ready")
+async def readiness_check():
+    """就绪检查接口：启动预热完成前返回 503，负载均衡据此决定是否转发流量"""
+    ready = getattr(app.state, "ready", False)
+    content = {"status": "ready" if ready else "warming_up", "warmup": getattr(app.state, "warmup", {})}
+    return JSONResponse(status_code=200 if ready else 503, content=content)
+
+
 # 根路径
 @app.get("/")
 async def root():
@@ -2,7 +2,6 @@ from typing import Optional, List, Tuple
 import asyncio
 import time
 import httpx
-import numpy as np
 
 try:
     import openai
@@ -22,6 +21,7 @@ except ImportError:
 from app.core.config import settings
 from app.core.metrics import ai_calls_total, ai_calls_duration, ai_tokens_used
 from app.models.ai_model import AIModel
+from app.utils.lazy import LazyService
 import logging
 
 logger = logging.getLogger(__name__)
@@ -423,6 +423,51 @@ class AIService:
         else:
             raise NotImplementedError(f"{self.provider}的向量化待实现")
 
+    async def embed_texts(self, texts: List[str]) -> List[List[float]]:
+        """批量将文本转换为向量，返回顺序与输入一致
+
+        openai 与 zhipu(含kimi模式) 一次请求完成整批，其他提供商并发逐条调用 embed_text。
+        """
+        if not texts:
+            return []
+        if self.provider == "openai":
+            if openai is None:
+                raise RuntimeError("openai package is not installed")
+            try:
+                response = await openai.Embedding.acreate(model="text-embedding-ada-002", input=texts)
+                data_section = response["data"] if isinstance(response, dict) else getattr(response, "data", None)
+                if not data_section or len(data_section) != len(texts):
+                    raise ValueError("OpenAI embedding response size mismatch")
+                return [_embedding_of(entry) for entry in sorted(data_section, key=_embedding_index)]
+            except Exception as e:
+                raise Exception(f"批量文本向量化失败: {str(e)}")
+        elif self.provider in ("zhipu", "kimi"):
+            return await self._zhipu_embed_texts(texts)
+        return list(await asyncio.gather(*(self.embed_text(text) for text in texts)))
+
+    async def _zhipu_embed_texts(self, texts: List[str]) -> List[List[float]]:
+        """使用智谱AI批量向量化（input 传数组）"""
+        if not settings.ZHIPU_API_KEY:
+            raise ValueError("ZHIPU_API_KEY 未配置")
+
+        payload = {"model": settings.ZHIPU_EMBEDDING_MODEL, "input": texts, "encoding_format": "float"}
+        headers = {"Authorization": f"Bearer {settings.ZHIPU_API_KEY}", "Content-Type": "application/json"}
+        try:
+            async with httpx.AsyncClient(timeout=self._http_timeout) as client:
+                response = await client.post("https://open.bigmodel.cn/api/paas/v4/embeddings", json=payload, headers=headers)
+                if response.status_code != 200:
+                    raise Exception(f"智谱AI Embedding API请求失败 (状态码: {response.status_code}): {response.text}")
+                data = response.json()
+        except httpx.TimeoutException:
+            raise Exception("智谱AI Embedding API请求超时")
+        except httpx.NetworkError as e:
+            raise Exception(f"智谱AI Embedding网络连接错误: {str(e)}")
+
+        entries = data.get("data") or []
+        if len(entries) != len(texts):
+            raise Exception("智谱AI Embedding响应格式异常: 返回数量与输入不一致")
+        return [_embedding_of(entry) for entry in sorted(entries, key=_embedding_index)]
+
     async def _zhipu_embed_text(self, text: str) -> List[float]:
         """使用智谱AI进行文本向量化"""
         if not settings.ZHIPU_API_KEY:
@@ -595,6 +640,8 @@ class AIService:
 
     async def semantic_search(self, query: str, documents: List[str], top_k: int = 5) -> List[dict]:
         """语义搜索"""
+        import numpy as np
+
         if not documents:
             return []
 
@@ -638,6 +685,16 @@ class AIService:
         return "unknown"
 
 
+def _embedding_index(entry) -> int:
+    """批量嵌入响应条目的序号（兼容dict与对象）"""
+    return entry.get("index", 0) if isinstance(entry, dict) else getattr(entry, "index", 0)
+
+
+def _embedding_of(entry) -> List[float]:
+    """批量嵌入响应条目的向量（兼容dict与对象）"""
+    return entry["embedding"] if isinstance(entry, dict) else entry.embedding
+
+
 def _extract_usage_tokens(usage_obj: Optional[object]) -> int:
     """从OpenAI usage对象中提取token数量"""
     if usage_obj is None:
@@ -647,5 +704,10 @@ def _extract_usage_tokens(usage_obj: Optional[object]) -> int:
     return int(getattr(usage_obj, "total_tokens", 0) or 0)
 
 
-# 全局实例
-ai_service = AIService()
+def get_ai_service() -> AIService:
+    """全局 AIService 实例，首次调用时按环境变量配置创建模型客户端"""
+    return ai_service.instance()
+
+
+# 全局实例：首次使用或 lifespan 预热时才创建
+ai_service: AIService = LazyService(AIService)
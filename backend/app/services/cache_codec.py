@@ -0,0 +1,131 @@
+"""
+缓存值编解码 - 序列化 + 可选压缩，首字节标明格式
+
+CacheService 写入 Redis（以及近缓存）的值为：
+    1 字节格式头  0x80 | 序列化方式 << 3 | 压缩方式
+    其余          序列化（并压缩）后的数据
+序列化方式  1 json（标准库，始终可用）  2 msgpack（需安装 msgpack）
+压缩方式    0 不压缩  1 zlib（始终可用）  2 zstd（需安装 zstandard）  3 lz4（需安装 lz4）
+序列化后不小于 min_bytes 的值才压缩，压缩后没有变小的按不压缩存储。
+
+之前的版本直接写入 JSON 文本，其首字节总是 ASCII（< 0x80），据此识别为旧格式按 JSON 解码，升级后
+不必清空缓存。读到本进程不支持的格式（例如其他进程用本进程未安装的 msgpack 写入）时抛出 CodecError，
+调用方按未命中处理。
+"""
+
+import json
+import zlib
+from typing import Any, Callable, Dict, Tuple, Union
+
+from loguru import logger
+
+try:
+    import msgpack
+
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+try:
+    import zstandard
+
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+try:
+    import lz4.frame
+
+    LZ4_AVAILABLE = True
+except ImportError:
+    LZ4_AVAILABLE = False
+
+FORMAT_FLAG = 0x80
+ZLIB_LEVEL = 1
+ZSTD_LEVEL = 3
+
+
+class CodecError(ValueError):
+    """缓存值格式无法识别或本进程不支持"""
+
+
+def _json_dumps(value: Any) -> bytes:
+    return json.dumps(value, ensure_ascii=False).encode("utf-8")
+
+
+# 名称 -> (编号, 序列化, 反序列化)
+SERIALIZERS: Dict[str, Tuple[int, Callable[[Any], bytes], Callable[[bytes], Any]]] = {
+    "json": (1, _json_dumps, json.loads),
+}
+if MSGPACK_AVAILABLE:
+    # msgpack 保留非字符串的字典键（JSON 会转成字符串），元组同样解码为列表
+    SERIALIZERS["msgpack"] = (
+        2,
+        lambda value: msgpack.packb(value, use_bin_type=True),
+        lambda data: msgpack.unpackb(data, raw=False, strict_map_key=False),
+    )
+
+# 名称 -> (编号, 压缩, 解压)
+COMPRESSORS: Dict[str, Tuple[int, Callable[[bytes], bytes], Callable[[bytes], bytes]]] = {
+    "none": (0, bytes, bytes),
+    "zlib": (1, lambda data: zlib.compress(data, ZLIB_LEVEL), zlib.decompress),
+}
+if ZSTD_AVAILABLE:
+    _zstd_compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL)
+    _zstd_decompressor = zstandard.ZstdDecompressor()
+    COMPRESSORS["zstd"] = (2, _zstd_compressor.compress, _zstd_decompressor.decompress)
+if LZ4_AVAILABLE:
+    COMPRESSORS["lz4"] = (3, lz4.frame.compress, lz4.frame.decompress)
+
+_SERIALIZERS_BY_ID = {item[0]: (name, item[2]) for name, item in SERIALIZERS.items()}
+_COMPRESSORS_BY_ID = {item[0]: (name, item[2]) for name, item in COMPRESSORS.items()}
+
+
+def _resolve(kind: str, requested: str, available: Dict, preference: Tuple[str, ...]) -> str:
+    if requested == "auto":
+        return next(name for name in preference if name in available)
+    if requested not in available:
+        fallback = next(name for name in preference if name in available)
+        logger.warning(f"缓存{kind} {requested} 不可用（未安装或未知），使用 {fallback}")
+        return fallback
+    return requested
+
+
+class CacheCodec:
+    """缓存值编解码器，serializer / compression 为 "auto" 时选用已安装的最优实现"""
+
+    def __init__(self, serializer: str = "auto", compression: str = "auto", min_bytes: int = 1024):
+        self.serializer = _resolve("序列化方式", serializer, SERIALIZERS, ("msgpack", "json"))
+        self.compression = _resolve("压缩方式", compression, COMPRESSORS, ("zstd", "lz4", "zlib"))
+        self.min_bytes = min_bytes
+        serializer_id, self._dumps, _ = SERIALIZERS[self.serializer]
+        compressor_id, self._compress, _ = COMPRESSORS[self.compression]
+        self._plain_header = bytes([FORMAT_FLAG | serializer_id << 3])
+        self._compressed_header = bytes([FORMAT_FLAG | serializer_id << 3 | compressor_id])
+
+    @property
+    def name(self) -> str:
+        return self.serializer if self.compression == "none" else f"{self.serializer}+{self.compression}"
+
+    def encode(self, value: Any) -> bytes:
+        """序列化，达到 min_bytes 时压缩，返回带格式头的字节串"""
+        data = self._dumps(value)
+        if self.compression != "none" and len(data) >= self.min_bytes:
+            compressed = self._compress(data)
+            if len(compressed) < len(data):
+                return self._compressed_header + compressed
+        return self._plain_header + data
+
+    @staticmethod
+    def decode(data: Union[bytes, str]) -> Any:
+        """按格式头解码（与写入时的配置无关），无格式头的按旧版 JSON 文本解码"""
+        if isinstance(data, str):
+            return json.loads(data)
+        if not data or not data[0] & FORMAT_FLAG:
+            return json.loads(data)
+        header = data[0]
+        serializer = _SERIALIZERS_BY_ID.get(header >> 3 & 0x0F)
+        compressor = _COMPRESSORS_BY_ID.get(header & 0x07)
+        if serializer is None or compressor is None:
+            raise CodecError(f"不支持的缓存值格式: 0x{header:02x}")
+        return serializer[1](compressor[1](data[1:]))
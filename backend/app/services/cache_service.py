@@ -2,11 +2,33 @@
 缓存服务 - Redis + 内存回退
 
 提供统一的缓存接口，支持Redis和内存两种缓存方式
+
+使用 Redis 时每个进程在 Redis 前还有一层近缓存（L1，CACHE_L1_TTL 秒的短 TTL），热点键不必每次
+往返 Redis。写入、删除时本进程直接更新 L1，并通过 Redis pub/sub 频道广播失效消息，其他进程收到后
+删除各自 L1 中的键。只有订阅正常时才从 L1 读取，订阅断开期间可能错过失效消息，重新订阅时清空 L1；
+收到失效消息之前的短暂窗口内其他进程最多读到 CACHE_L1_TTL 秒的旧值。Redis 不可用时读取回退到
+L1 中的值（即使已过期）和进程内缓存。
+
+写入 Redis 和 L1 的值由 CacheCodec 编码（序列化 + 超过 CACHE_COMPRESS_MIN_BYTES 时压缩，首字节标明
+格式，见 app.services.cache_codec），旧版本写入的 JSON 文本仍能读取。进程内缓存直接保存对象。
+
+热点的方案列表和检索结果通过 get_or_compute 读取，避免过期瞬间的并发请求同时回源（缓存击穿）：
+    合并计算  同一个键同时只有一个调用方计算，本进程内用按键的 asyncio 锁，进程之间用 Redis 锁
+    旧值可用  条目过期后还保留 CACHE_STALE_TTL 秒，期间一个调用方刷新，其余直接返回旧值
+    提前过期  按上次计算耗时随机提前刷新（XFetch），热点键通常在过期之前就已刷新
 """
 
+import asyncio
+import contextlib
+import fnmatch
 import json
 import hashlib
-from typing import Any, Optional, Dict, Set
+import math
+import random
+import time
+import uuid
+from collections import deque
+from typing import Any, Awaitable, Callable, Optional, Dict, List, Set, Union
 from loguru import logger
 
 try:
@@ -18,6 +40,24 @@ except ImportError:
     logger.warning("redis-asyncio未安装，将使用内存缓存")
 
 from app.core.config import settings
+from app.core.metrics import cache_operations_total
+from app.services.cache_codec import CacheCodec, CodecError
+from app.services.memory_cache import MemoryCache
+
+# 读取失败（订阅断开）后重新订阅失效频道的间隔（秒）
+INVALIDATION_RETRY_SECONDS = 5
+
+# get_or_compute 写入的条目：{ENTRY_MARKER: 1, "value": 值, "expires_at": 过期时间戳, "delta": 计算耗时（秒）}
+ENTRY_MARKER = "__entry__"
+# 其他进程持有计算锁时，轮询缓存等待结果的间隔（秒）
+LOCK_POLL_SECONDS = 0.05
+# 只删除自己持有的锁
+_RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
 
 
 class CacheService:
@@ -26,11 +66,29 @@ class CacheService:
     def __init__(self):
         """初始化缓存服务"""
         self._redis_client = None
-        self._memory_cache = {}
+        # 有界的进程内缓存（TTL + LRU），Redis 不可用时使用
+        self._memory_cache = MemoryCache(settings.MEMORY_CACHE_MAX_ENTRIES, settings.MEMORY_CACHE_MAX_BYTES)
         self._cache_type = "memory"
         self._hits = 0
         self._misses = 0
+        # 内存缓存模式下每个用户的方案列表缓存键（标签集合），失效时直接删除释放内存
         self._user_proposal_index: Dict[int, Set[str]] = {}
+        # 版本号（代数）计数器的本地副本：版本号键 -> 版本号
+        self._versions: Dict[str, int] = {}
+        self._recent_queries: deque = deque()
+        self._codec = CacheCodec(
+            settings.CACHE_SERIALIZER, settings.CACHE_COMPRESSION, settings.CACHE_COMPRESS_MIN_BYTES
+        )
+        # Redis 前的近缓存，保存编码后的字节串，每次命中解码出新对象
+        # 过期条目保留到被覆盖或淘汰，Redis 不可用时兜底
+        self._near_cache = MemoryCache(
+            settings.CACHE_L1_MAX_ENTRIES, settings.CACHE_L1_MAX_BYTES, name="l1", keep_stale=True
+        )
+        self._instance_id = uuid.uuid4().hex
+        self._near_cache_active = False
+        self._listener_task: Optional[asyncio.Task] = None
+        # get_or_compute 按键的计算锁：键 -> [锁, 持有和等待的调用方数]
+        self._compute_locks: Dict[str, List] = {}
 
         if REDIS_AVAILABLE:
             try:
@@ -46,7 +104,8 @@ class CacheService:
                 port=settings.REDIS_PORT,
                 db=settings.REDIS_DB,
                 password=settings.REDIS_PASSWORD or None,
-                decode_responses=True,
+                # 缓存值是二进制编码，读取时不解码为字符串
+                decode_responses=False,
                 socket_connect_timeout=2,
                 socket_timeout=2,
             )
@@ -68,22 +127,107 @@ class CacheService:
 
         return full_key
 
+    # ==================== 近缓存（L1）与失效广播 ====================
+
+    def _near_cache_store(self, key: str, data: Union[bytes, str], ttl: Optional[int] = None) -> None:
+        """从 Redis 读到或写入 Redis 的值放入 L1，有效期不超过 CACHE_L1_TTL"""
+        if self._near_cache_active:
+            self._near_cache.set(key, data, min(ttl or settings.CACHE_L1_TTL, settings.CACHE_L1_TTL))
+
+    def _near_cache_drop(self, keys: Optional[List[str]] = None, pattern: Optional[str] = None) -> None:
+        for key in keys or []:
+            self._near_cache.delete(key)
+        if pattern is not None:
+            for key in self._near_cache.keys():
+                if fnmatch.fnmatchcase(key, pattern):
+                    self._near_cache.delete(key)
+
+    async def _publish_invalidation(
+        self, keys: Optional[List[str]] = None, pattern: Optional[str] = None, everything: bool = False
+    ) -> None:
+        """广播失效消息，其他进程删除各自 L1 中的对应键"""
+        if not settings.CACHE_L1_ENABLED:
+            return
+        message = {"origin": self._instance_id, "keys": keys or [], "pattern": pattern, "all": everything}
+        try:
+            await self._redis_client.publish(settings.CACHE_INVALIDATION_CHANNEL, json.dumps(message))
+        except Exception as e:
+            logger.warning(f"发布缓存失效消息失败: {e}")
+
+    def _apply_invalidation(self, data: str) -> None:
+        """处理其他进程广播的失效消息，本进程发出的消息已在写入时处理"""
+        try:
+            message = json.loads(data)
+        except (TypeError, ValueError):
+            return
+        if message.get("origin") == self._instance_id:
+            return
+        cache_operations_total.labels(operation="invalidate", cache_type="l1", status="received").inc()
+        if message.get("all"):
+            self._near_cache.clear()
+        else:
+            self._near_cache_drop(message.get("keys"), message.get("pattern"))
+
+    async def start_invalidation_listener(self) -> None:
+        """订阅失效频道（应用启动时调用），订阅成功后才启用 L1"""
+        if not (settings.CACHE_L1_ENABLED and self._cache_type == "redis" and self._redis_client):
+            return
+        if self._listener_task is None or self._listener_task.done():
+            self._listener_task = asyncio.create_task(self._listen_invalidations())
+
+    async def stop_invalidation_listener(self) -> None:
+        self._near_cache_active = False
+        if self._listener_task is not None:
+            self._listener_task.cancel()
+            try:
+                await self._listener_task
+            except asyncio.CancelledError:
+                pass
+            self._listener_task = None
+
+    async def _listen_invalidations(self) -> None:
+        while True:
+            pubsub = self._redis_client.pubsub()
+            try:
+                await pubsub.subscribe(settings.CACHE_INVALIDATION_CHANNEL)
+                # 断开期间可能错过失效消息，重新订阅后从空的 L1 开始
+                self._near_cache.clear()
+                self._near_cache_active = True
+                logger.info("缓存失效频道订阅成功，启用进程内近缓存")
+                while True:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message is not None and message.get("type") == "message":
+                        self._apply_invalidation(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if self._near_cache_active:
+                    logger.warning(f"缓存失效频道订阅中断: {e}，暂停近缓存")
+                self._near_cache_active = False
+                await asyncio.sleep(INVALIDATION_RETRY_SECONDS)
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+
+    # ==================== 基本操作 ====================
+
     async def set(self, key: str, value: Any, ttl: int = 3600) -> bool:
         """设置缓存"""
         try:
-            value_str = json.dumps(value, ensure_ascii=False)
-
             if self._cache_type == "redis" and self._redis_client:
+                data = self._codec.encode(value)
                 try:
-                    await self._redis_client.setex(key, ttl, value_str)
+                    await self._redis_client.setex(key, ttl, data)
+                    self._near_cache_store(key, data, ttl)
+                    await self._publish_invalidation(keys=[key])
                     return True
                 except Exception as e:
                     logger.warning(f"Redis set失败: {e}，降级到内存缓存")
-                    self._memory_cache[key] = value
-                    return True
-            else:
-                self._memory_cache[key] = value
-                return True
+            value_str = json.dumps(value, ensure_ascii=False)
+            self._memory_cache.set(key, value, ttl, size=len(value_str))
+            return True
 
         except Exception as e:
             logger.error(f"缓存set失败: {e}")
@@ -93,22 +237,37 @@ class CacheService:
         """获取缓存"""
         try:
             if self._cache_type == "redis" and self._redis_client:
-                try:
-                    value_str = await self._redis_client.get(key)
-                    if value_str:
+                if self._near_cache_active:
+                    data = self._near_cache.get(key)
+                    if data is not None:
+                        cache_operations_total.labels(operation="get", cache_type="l1", status="hit").inc()
                         self._hits += 1
-                        return json.loads(value_str)
-                    else:
-                        self._misses += 1
-                        return None
+                        return self._codec.decode(data)
+                    cache_operations_total.labels(operation="get", cache_type="l1", status="miss").inc()
+                try:
+                    data = await self._redis_client.get(key)
                 except Exception as e:
-                    logger.warning(f"Redis get失败: {e}，尝试内存缓存")
-                    value = self._memory_cache.get(key)
+                    logger.warning(f"Redis get失败: {e}，尝试近缓存和内存缓存")
+                    # Redis 不可用时 L1 中过期的值也比没有好
+                    data = self._near_cache.get_stale(key)
+                    value = self._codec.decode(data) if data is not None else self._memory_cache.get(key)
                     if value:
                         self._hits += 1
                     else:
                         self._misses += 1
                     return value
+                if not data:
+                    self._misses += 1
+                    return None
+                try:
+                    value = self._codec.decode(data)
+                except CodecError as e:
+                    logger.warning(f"缓存值无法解码 {key}: {e}，按未命中处理")
+                    self._misses += 1
+                    return None
+                self._hits += 1
+                self._near_cache_store(key, data)
+                return value
             else:
                 value = self._memory_cache.get(key)
                 if value:
@@ -142,11 +301,12 @@ class CacheService:
             if self._cache_type == "redis" and self._redis_client:
                 try:
                     await self._redis_client.delete(key)
+                    await self._publish_invalidation(keys=[key])
                 except Exception:
                     pass
 
-            if key in self._memory_cache:
-                del self._memory_cache[key]
+            self._near_cache.delete(key)
+            self._memory_cache.delete(key)
 
             return True
         except Exception as e:
@@ -159,9 +319,11 @@ class CacheService:
             if self._cache_type == "redis" and self._redis_client:
                 try:
                     await self._redis_client.flushdb()
+                    await self._publish_invalidation(everything=True)
                 except Exception as e:
                     logger.warning(f"Redis flushdb失败: {e}")
 
+            self._near_cache.clear()
             self._memory_cache.clear()
             self._user_proposal_index.clear()
             self._hits = 0
@@ -186,8 +348,10 @@ class CacheService:
                             deleted_count += await self._redis_client.delete(*keys)
                         if cursor == 0:
                             break
+                    await self._publish_invalidation(pattern=pattern)
                 except Exception as e:
                     logger.warning(f"Redis clear_pattern失败: {e}")
+                self._near_cache_drop(pattern=pattern)
 
             # 清理内存缓存
             if pattern == "*":
@@ -232,9 +396,13 @@ class CacheService:
                     stats["memory_used"] = self._format_bytes(memory_bytes)
                 except Exception as e:
                     logger.warning(f"获取Redis统计失败: {e}")
+                stats["near_cache"] = {"active": self._near_cache_active, **self._near_cache.stats()}
+                stats["codec"] = self._codec.name
             else:
+                self._memory_cache.purge_expired()
                 stats["keys"] = len(self._memory_cache)
-                stats["memory_used"] = "内存缓存"
+                stats["memory_used"] = self._format_bytes(self._memory_cache.size_bytes)
+                stats["memory_cache"] = self._memory_cache.stats()
 
             # 计算命中率
             total = self._hits + self._misses
@@ -255,6 +423,148 @@ class CacheService:
             bytes_value /= 1024
         return f"{bytes_value:.2f}T"
 
+    # ==================== 防击穿：合并计算、旧值可用与提前过期 ====================
+
+    async def _get_entry(self, key: str) -> Optional[Dict]:
+        value = await self.get(key)
+        if value is None:
+            return None
+        if isinstance(value, dict) and ENTRY_MARKER in value:
+            return value
+        # set() 直接写入的值（包括升级前写入的）没有过期时间和计算耗时，视为未过期
+        return {ENTRY_MARKER: 1, "value": value, "expires_at": math.inf, "delta": 0.0}
+
+    async def _set_entry(
+        self, key: str, value: Any, ttl: int, stale_ttl: Optional[int] = None, delta: float = 0.0
+    ) -> bool:
+        """写入条目，过期后再保留 stale_ttl 秒供 get_or_compute 返回旧值"""
+        stale_ttl = settings.CACHE_STALE_TTL if stale_ttl is None else stale_ttl
+        entry = {ENTRY_MARKER: 1, "value": value, "expires_at": time.time() + ttl, "delta": delta}
+        return await self.set(key, entry, ttl=ttl + max(stale_ttl, 0))
+
+    async def _get_fresh(self, key: str) -> Optional[Any]:
+        """读取未过期的值，已过期（只能作为旧值）的视为未命中"""
+        entry = await self._get_entry(key)
+        if entry is None or entry["expires_at"] <= time.time():
+            return None
+        return entry["value"]
+
+    @staticmethod
+    def _should_refresh(entry: Dict, beta: float) -> bool:
+        """已过期，或按 XFetch 提前过期：now - delta * beta * ln(rand) >= expires_at"""
+        now = time.time()
+        if beta > 0 and entry["delta"] > 0:
+            now -= entry["delta"] * beta * math.log(1.0 - random.random())
+        return now >= entry["expires_at"]
+
+    @contextlib.asynccontextmanager
+    async def _key_lock(self, key: str):
+        holder = self._compute_locks.get(key)
+        if holder is None:
+            holder = self._compute_locks[key] = [asyncio.Lock(), 0]
+        holder[1] += 1
+        try:
+            async with holder[0]:
+                yield
+        finally:
+            holder[1] -= 1
+            if holder[1] == 0:
+                del self._compute_locks[key]
+
+    async def _acquire_compute_lock(self, key: str) -> Optional[str]:
+        """获取跨进程的计算锁，返回锁令牌；其他进程持有时返回 None，内存缓存或 Redis 不可用时总是成功"""
+        token = uuid.uuid4().hex
+        if self._cache_type == "redis" and self._redis_client:
+            try:
+                acquired = await self._redis_client.set(
+                    f"lock:{key}", token, nx=True, px=int(settings.CACHE_LOCK_TIMEOUT * 1000)
+                )
+                return token if acquired else None
+            except Exception as e:
+                logger.warning(f"Redis获取计算锁失败: {e}，只在本进程内合并计算")
+        return token
+
+    async def _release_compute_lock(self, key: str, token: str) -> None:
+        if self._cache_type == "redis" and self._redis_client:
+            try:
+                await self._redis_client.eval(_RELEASE_LOCK_SCRIPT, 1, f"lock:{key}", token)
+            except Exception as e:
+                logger.warning(f"Redis释放计算锁失败: {e}")
+
+    async def _compute_entry(self, key: str, compute: Callable[[], Awaitable[Any]], ttl: int, stale_ttl: int) -> Any:
+        started = time.perf_counter()
+        value = await compute()
+        await self._set_entry(key, value, ttl, stale_ttl, delta=time.perf_counter() - started)
+        return value
+
+    async def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        ttl: int = 3600,
+        stale_ttl: Optional[int] = None,
+        beta: Optional[float] = None,
+    ) -> Any:
+        """读取缓存，未命中时调用 compute() 计算并写回，并发请求只计算一次
+
+        - 未命中：同一个键同时只有一个调用方计算，其余等待后读取它写入的结果。
+          其他进程正在计算时轮询等待，最多 CACHE_LOCK_TIMEOUT 秒，超时后自行计算
+        - 已过期但在 stale_ttl（默认 CACHE_STALE_TTL）秒内：一个调用方刷新，其余直接返回旧值
+        - 未过期：以 beta（默认 CACHE_EARLY_EXPIRY_BETA，0 表示关闭）和上次计算耗时为参数随机提前刷新
+        compute() 抛出的异常原样抛出，不写入缓存。
+        """
+        stale_ttl = settings.CACHE_STALE_TTL if stale_ttl is None else stale_ttl
+        beta = settings.CACHE_EARLY_EXPIRY_BETA if beta is None else beta
+        entry = await self._get_entry(key)
+        if entry is not None:
+            if not self._should_refresh(entry, beta):
+                self._count_compute("hit")
+                return entry["value"]
+            # 已经有调用方在刷新（本进程或其他进程），返回旧值
+            if key in self._compute_locks:
+                self._count_compute("stale")
+                return entry["value"]
+            async with self._key_lock(key):
+                # 等锁期间其他调用方可能已经刷新（过期时间比读到的旧值晚）
+                current = await self._get_entry(key)
+                if current is not None and current["expires_at"] > entry["expires_at"]:
+                    self._count_compute("coalesced")
+                    return current["value"]
+                token = await self._acquire_compute_lock(key)
+                if token is None:
+                    self._count_compute("stale")
+                    return entry["value"]
+                try:
+                    self._count_compute("refresh")
+                    return await self._compute_entry(key, compute, ttl, stale_ttl)
+                finally:
+                    await self._release_compute_lock(key, token)
+
+        async with self._key_lock(key):
+            # 等锁期间其他调用方可能已经写入
+            entry = await self._get_entry(key)
+            if entry is not None:
+                self._count_compute("coalesced")
+                return entry["value"]
+            token = await self._acquire_compute_lock(key)
+            deadline = time.monotonic() + settings.CACHE_LOCK_TIMEOUT
+            while token is None and time.monotonic() < deadline:
+                await asyncio.sleep(LOCK_POLL_SECONDS)
+                entry = await self._get_entry(key)
+                if entry is not None:
+                    self._count_compute("coalesced")
+                    return entry["value"]
+                token = await self._acquire_compute_lock(key)
+            try:
+                self._count_compute("miss")
+                return await self._compute_entry(key, compute, ttl, stale_ttl)
+            finally:
+                if token is not None:
+                    await self._release_compute_lock(key, token)
+
+    def _count_compute(self, status: str) -> None:
+        cache_operations_total.labels(operation="get_or_compute", cache_type=self._cache_type, status=status).inc()
+
     # ==================== 业务专用方法 ====================
 
     async def cache_ai_response(self, prompt: str, response: str, expire: int = 3600) -> bool:
@@ -267,6 +577,94 @@ class CacheService:
         key = self._generate_key(prompt, "ai_response")
         return await self.get(key)
 
+    async def ping(self) -> bool:
+        """检查 Redis 连接（同时建立连接池中的首个连接），内存缓存时返回 False"""
+        if self._cache_type == "redis" and self._redis_client:
+            return bool(await self._redis_client.ping())
+        return False
+
+    async def record_recent_queries(self, entries: List[Dict], limit: int = 200) -> None:
+        """按发生顺序批量记录检索请求（最新的在前，最多保留 limit 条），供启动预热时回放"""
+        if not entries:
+            return
+        values = [json.dumps(entry, sort_keys=True, ensure_ascii=False) for entry in entries]
+        if self._cache_type == "redis" and self._redis_client:
+            try:
+                async with self._redis_client.pipeline(transaction=False) as pipe:
+                    pipe.lpush("recent_queries", *values).ltrim("recent_queries", 0, limit - 1)
+                    await pipe.execute()
+                return
+            except Exception as e:
+                logger.warning(f"Redis记录最近检索失败: {e}，使用内存记录")
+        self._recent_queries.extendleft(values)
+        while len(self._recent_queries) > limit:
+            self._recent_queries.pop()
+
+    async def get_recent_queries(self, limit: int) -> List[Dict]:
+        """最近的 limit 条不重复的检索请求，最新的在前"""
+        values: List[str] = []
+        if self._cache_type == "redis" and self._redis_client:
+            try:
+                values = await self._redis_client.lrange("recent_queries", 0, -1)
+            except Exception as e:
+                logger.warning(f"Redis读取最近检索失败: {e}，使用内存记录")
+        if not values:
+            values = list(self._recent_queries)
+        return [json.loads(value) for value in dict.fromkeys(values)][:limit]
+
+    # ==================== 版本号（代数）失效 ====================
+    # 一组缓存（一个集合的检索结果、一个用户的方案列表）共用一个版本号，版本号写在缓存键的前缀中，
+    # 哈希后的长键也保留前缀。失效时只递增版本号（一次 INCR），不用 SCAN 查找和删除键，
+    # 旧版本的缓存不再被读取，随 TTL 自然过期。
+
+    async def _get_version(self, key: str) -> int:
+        if self._cache_type == "redis" and self._redis_client:
+            if self._near_cache_active:
+                cached = self._near_cache.get(key)
+                if cached is not None:
+                    return int(cached)
+            try:
+                version = int(await self._redis_client.get(key) or 0)
+                self._near_cache_store(key, str(version))
+                return version
+            except Exception as e:
+                logger.warning(f"Redis读取版本号 {key} 失败: {e}，使用本地版本号")
+        return self._versions.get(key, 0)
+
+    async def _bump_version(self, key: str) -> int:
+        # 本地版本号同时递增，Redis不可用时降级到内存缓存也能正确失效
+        self._versions[key] = self._versions.get(key, 0) + 1
+        if self._cache_type == "redis" and self._redis_client:
+            try:
+                version = await self._redis_client.incr(key)
+                self._near_cache_store(key, str(version))
+                await self._publish_invalidation(keys=[key])
+                return version
+            except Exception as e:
+                logger.warning(f"Redis递增版本号 {key} 失败: {e}")
+        return self._versions[key]
+
+    async def get_collection_version(self, collection: str) -> int:
+        """获取集合的版本号，向量搜索缓存键包含版本号"""
+        return await self._get_version(f"collection_version:{collection}")
+
+    async def bump_collection_version(self, collection: str) -> int:
+        """集合写入后递增版本号，旧版本的缓存不再被读取，随TTL自然过期"""
+        return await self._bump_version(f"collection_version:{collection}")
+
+    async def get_user_proposal_version(self, user_id: int) -> int:
+        """获取用户方案列表的版本号，方案列表缓存键包含版本号"""
+        return await self._get_version(f"proposal_version:{user_id}")
+
+    async def _vector_search_key(
+        self, query: str, collection: str, n_results: int, filter_metadata: Optional[Dict], version: Optional[int]
+    ) -> str:
+        if version is None:
+            version = await self.get_collection_version(collection)
+        key_data = {"query": query, "collection": collection, "n_results": n_results, "filter": filter_metadata}
+        key_str = json.dumps(key_data, sort_keys=True, ensure_ascii=False)
+        return self._generate_key(key_str, f"vector_search:{collection}:v{version}")
+
     async def cache_vector_search(
         self,
         query: str,
@@ -275,52 +673,80 @@ class CacheService:
         n_results: int = 5,
         filter_metadata: Optional[Dict] = None,
         expire: int = 1800,
+        version: Optional[int] = None,
     ) -> bool:
-        """缓存向量搜索结果"""
-        # 生成唯一键
-        key_data = {"query": query, "collection": collection, "n_results": n_results, "filter": filter_metadata}
-        key_str = json.dumps(key_data, sort_keys=True, ensure_ascii=False)
-        key = self._generate_key(key_str, f"vector_search:{collection}")
-        return await self.set(key, results, ttl=expire)
+        """缓存向量搜索结果
+
+        version 应取检索开始前读到的集合版本号，避免检索期间发生的写入被缓存掩盖。
+        """
+        key = await self._vector_search_key(query, collection, n_results, filter_metadata, version)
+        return await self._set_entry(key, results, ttl=expire)
 
     async def get_vector_search(
-        self, query: str, collection: str, n_results: int = 5, filter_metadata: Optional[Dict] = None
+        self,
+        query: str,
+        collection: str,
+        n_results: int = 5,
+        filter_metadata: Optional[Dict] = None,
+        version: Optional[int] = None,
     ) -> Optional[list]:
         """获取缓存的向量搜索结果"""
-        key_data = {"query": query, "collection": collection, "n_results": n_results, "filter": filter_metadata}
-        key_str = json.dumps(key_data, sort_keys=True, ensure_ascii=False)
-        key = self._generate_key(key_str, f"vector_search:{collection}")
-        return await self.get(key)
+        key = await self._vector_search_key(query, collection, n_results, filter_metadata, version)
+        return await self._get_fresh(key)
+
+    async def get_or_compute_vector_search(
+        self,
+        query: str,
+        collection: str,
+        compute: Callable[[], Awaitable[list]],
+        n_results: int = 5,
+        filter_metadata: Optional[Dict] = None,
+        expire: int = 1800,
+        version: Optional[int] = None,
+    ) -> list:
+        """读取向量搜索结果，未命中或需要刷新时执行 compute()（见 get_or_compute）"""
+        key = await self._vector_search_key(query, collection, n_results, filter_metadata, version)
+        return await self.get_or_compute(key, compute, ttl=expire)
 
     async def invalidate_vector_cache(self, collection: str) -> int:
-        """失效指定集合的所有向量搜索缓存"""
-        pattern = f"vector_search:{collection}:*"
-        return await self.clear_pattern(pattern)
+        """失效指定集合的所有向量搜索缓存（递增版本号，不扫描删除），返回新版本号"""
+        return await self.bump_collection_version(collection)
 
-    async def cache_proposal_list(self, user_id: int, filters: Dict, proposals: Any, expire: int = 300) -> bool:
-        """缓存方案列表"""
+    async def cache_query_embedding(self, model: str, query: str, embedding: list, expire: int = 86400) -> bool:
+        """缓存查询文本的向量"""
+        key = self._generate_key(f"{model}:{query}", "query_embedding")
+        return await self.set(key, embedding, ttl=expire)
+
+    async def get_query_embedding(self, model: str, query: str) -> Optional[list]:
+        """获取缓存的查询向量"""
+        key = self._generate_key(f"{model}:{query}", "query_embedding")
+        return await self.get(key)
+
+    async def cache_rerank_scores(
+        self, reranker: str, query: str, scores: Dict[str, float], expire: int = 86400
+    ) -> bool:
+        """缓存查询下各候选文本（按文本哈希）的重排分数"""
+        key = self._generate_key(f"{reranker}:{query}", "rerank_scores")
+        return await self.set(key, scores, ttl=expire)
+
+    async def get_rerank_scores(self, reranker: str, query: str) -> Optional[Dict[str, float]]:
+        """获取缓存的重排分数"""
+        key = self._generate_key(f"{reranker}:{query}", "rerank_scores")
+        return await self.get(key)
+
+    async def _proposal_list_key(self, user_id: int, filters: Dict) -> str:
+        version = await self.get_user_proposal_version(user_id)
         key_data = {"user_id": user_id, "filters": filters}
         key_str = json.dumps(key_data, sort_keys=True, ensure_ascii=False)
-        key = self._generate_key(key_str, "proposal_list")
+        return self._generate_key(key_str, f"proposal_list:u{user_id}:v{version}")
 
-        # 如果proposals包含模型对象，尝试转换
-        try:
-            if hasattr(proposals, "__dict__"):
-                # 单个对象
-                proposals_data = self._model_to_dict(proposals)
-            elif isinstance(proposals, dict):
-                # 字典（可能包含items列表）
-                proposals_data = proposals.copy()
-                if "items" in proposals_data:
-                    proposals_data["items"] = [
-                        self._model_to_dict(item) if hasattr(item, "__dict__") else item
-                        for item in proposals_data["items"]
-                    ]
-            else:
-                proposals_data = proposals
+    async def cache_proposal_list(self, user_id: int, filters: Dict, proposals: Any, expire: int = 300) -> bool:
+        """缓存方案列表"""
+        key = await self._proposal_list_key(user_id, filters)
 
-            result = await self.set(key, proposals_data, ttl=expire)
-            if result:
+        try:
+            result = await self._set_entry(key, self._proposals_to_data(proposals), ttl=expire)
+            if result and self._cache_type == "memory":
                 self._index_user_proposal_key(user_id, key)
             return result
         except Exception as e:
@@ -329,28 +755,48 @@ class CacheService:
 
     async def get_proposal_list(self, user_id: int, filters: Dict) -> Optional[Any]:
         """获取缓存的方案列表"""
-        key_data = {"user_id": user_id, "filters": filters}
-        key_str = json.dumps(key_data, sort_keys=True, ensure_ascii=False)
-        key = self._generate_key(key_str, "proposal_list")
-        return await self.get(key)
+        return await self._get_fresh(await self._proposal_list_key(user_id, filters))
 
-    async def invalidate_user_proposals(self, user_id: int) -> int:
-        """失效用户的所有方案列表缓存"""
+    async def get_or_compute_proposal_list(
+        self, user_id: int, filters: Dict, compute: Callable[[], Awaitable[Any]], expire: int = 300
+    ) -> Any:
+        """读取方案列表，未命中或需要刷新时执行 compute() 查询数据库（见 get_or_compute）
+
+        compute() 返回的模型对象转换为字典后缓存，命中与否返回的都是转换后的数据。
+        """
+        key = await self._proposal_list_key(user_id, filters)
+
+        async def load():
+            return self._proposals_to_data(await compute())
+
+        result = await self.get_or_compute(key, load, ttl=expire)
         if self._cache_type == "memory":
-            keys = self._user_proposal_index.get(user_id, set())
-            deleted = 0
-            for key in list(keys):
-                if key in self._memory_cache:
-                    del self._memory_cache[key]
-                    deleted += 1
-            self._user_proposal_index[user_id] = set()
-            return deleted
+            self._index_user_proposal_key(user_id, key)
+        return result
+
+    def _proposals_to_data(self, proposals: Any) -> Any:
+        """方案列表中的模型对象转换为字典"""
+        if hasattr(proposals, "__dict__"):
+            # 单个对象
+            return self._model_to_dict(proposals)
+        if isinstance(proposals, dict):
+            # 字典（可能包含items列表）
+            proposals_data = proposals.copy()
+            if "items" in proposals_data:
+                proposals_data["items"] = [
+                    self._model_to_dict(item) if hasattr(item, "__dict__") else item for item in proposals_data["items"]
+                ]
+            return proposals_data
+        return proposals
+
+    async def invalidate_user_proposals(self, user_id: int) -> int:
+        """失效用户的所有方案列表缓存（递增用户的版本号，不扫描删除），返回新版本号
 
-        pattern = f"proposal_list:*user_id*{user_id}*"
-        deleted = await self.clear_pattern(pattern)
-        if user_id in self._user_proposal_index:
-            self._user_proposal_index[user_id].clear()
-        return deleted
+        内存缓存模式下同时删除该用户已缓存的键，不必等 TTL 过期才释放内存。
+        """
+        for key in self._user_proposal_index.pop(user_id, set()):
+            self._memory_cache.delete(key)
+        return await self._bump_version(f"proposal_version:{user_id}")
 
     def _model_to_dict(self, model) -> dict:
         """将SQLAlchemy模型转换为字典"""
@@ -369,7 +815,7 @@ class CacheService:
         return model
 
     def _index_user_proposal_key(self, user_id: int, key: str) -> None:
-        """记录用户方案缓存的键，便于内存缓存场景下精准失效"""
+        """记录用户方案缓存的键，内存缓存模式下失效时直接删除"""
         if user_id not in self._user_proposal_index:
             self._user_proposal_index[user_id] = set()
         self._user_proposal_index[user_id].add(key)
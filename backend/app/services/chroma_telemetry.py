@@ -0,0 +1,19 @@
+"""ChromaDB 遥测客户端替换
+
+单独成模块，只在创建 Chroma 客户端时由 chromadb 按路径加载，导入向量服务时不需要导入 chromadb。
+"""
+
+from chromadb.telemetry.product import ProductTelemetryClient, ProductTelemetryEvent
+from overrides import override
+
+
+class NoopTelemetry(ProductTelemetryClient):
+    """丢弃所有事件的遥测客户端
+
+    chromadb 自带的 Posthog 客户端即使关闭了遥测，也会在 capture 中合并批量事件，这段逻辑
+    不是线程安全的，线程池中并发检索时会抛出 KeyError。
+    """
+
+    @override
+    def capture(self, event: ProductTelemetryEvent) -> None:
+        pass
@@ -0,0 +1,238 @@
+"""文档入库服务 - 上传落盘、文本提取与向量化的并行流水线"""
+
+import asyncio
+import codecs
+import hashlib
+import os
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, BinaryIO, Callable, Dict, Iterator, Optional, Tuple
+
+from fastapi import UploadFile
+from loguru import logger
+
+from app.core.config import settings
+from app.services.document_processor import DocumentProcessor
+from app.services.vector_service import async_vector_service, vector_service
+
+ALLOWED_EXTENSIONS = [".doc", ".docx", ".pdf", ".txt", ".xls", ".xlsx"]
+ZIP_EXTENSION = ".zip"
+COPY_CHUNK_SIZE = 1024 * 1024
+SNIFF_BYTES = 512
+
+# zip容器(docx/xlsx)与OLE容器(doc/xls)的魔数相同，再按扩展名细分
+_OOXML_MIME_TYPES = {
+    ".docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    ".xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+_OLE_MIME_TYPES = {".doc": "application/msword", ".xls": "application/vnd.ms-excel"}
+
+
+class UploadTooLargeError(ValueError):
+    """上传内容超过大小限制"""
+
+
+def build_storage_path(file_name: str) -> str:
+    """为上传文件生成唯一的存储路径"""
+    file_ext = os.path.splitext(file_name)[1].lower()
+    return os.path.join(settings.UPLOAD_DIR, f"{uuid.uuid4()}{file_ext}")
+
+
+def sniff_mime_type(head: bytes, file_ext: str) -> str:
+    """根据文件头字节判断实际类型，不信任客户端声明的 Content-Type"""
+    if head.startswith(b"%PDF-"):
+        return "application/pdf"
+    if head.startswith(b"PK\x03\x04"):
+        return _OOXML_MIME_TYPES.get(file_ext, "application/zip")
+    if head.startswith(b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"):
+        return _OLE_MIME_TYPES.get(file_ext, "application/x-ole-storage")
+    if head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)) or b"\x00" not in head:
+        return "text/plain"
+    return "application/octet-stream"
+
+
+class UploadWriter:
+    """单次遍历完成落盘、大小校验、SHA-256计算和类型嗅探
+
+    数据先写入同目录下的 .part 临时文件，commit 时 os.replace 原子重命名，
+    读者不会看到写了一半的文件；超过 max_size 时立即中止。
+    """
+
+    def __init__(self, file_name: str, max_size: int, file_path: Optional[str] = None):
+        self.file_name = file_name
+        self.file_path = file_path or build_storage_path(file_name)
+        self.size = 0
+        self._temp_path = f"{self.file_path}.part"
+        self._file_ext = os.path.splitext(file_name)[1].lower()
+        self._max_size = max_size
+        self._hasher = hashlib.sha256()
+        self._head = b""
+        self._buffer = open(self._temp_path, "wb")
+
+    def write(self, chunk: bytes) -> None:
+        self.size += len(chunk)
+        if self.size > self._max_size:
+            raise UploadTooLargeError(f"文件大小超过限制 ({self._max_size} bytes)")
+        if len(self._head) < SNIFF_BYTES:
+            self._head += chunk[: SNIFF_BYTES - len(self._head)]
+        self._hasher.update(chunk)
+        self._buffer.write(chunk)
+
+    def commit(self) -> Dict:
+        """关闭临时文件并重命名到最终路径，返回文件信息"""
+        self._buffer.close()
+        os.replace(self._temp_path, self.file_path)
+        return {
+            "file_name": self.file_name,
+            "file_path": self.file_path,
+            "file_size": self.size,
+            "sha256": self._hasher.hexdigest(),
+            "mime_type": sniff_mime_type(self._head, self._file_ext),
+        }
+
+    def discard(self) -> None:
+        """放弃写入并删除临时文件"""
+        self._buffer.close()
+        if os.path.exists(self._temp_path):
+            os.remove(self._temp_path)
+
+
+def save_stream(
+    source: BinaryIO,
+    file_name: str,
+    max_size: int,
+    chunk_size: int = COPY_CHUNK_SIZE,
+    file_path: Optional[str] = None,
+) -> Dict:
+    """分块复制同步数据流到磁盘（zip条目等），返回 UploadWriter.commit 的文件信息"""
+    writer = UploadWriter(file_name, max_size, file_path=file_path)
+    try:
+        while True:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                break
+            writer.write(chunk)
+        return writer.commit()
+    except BaseException:
+        writer.discard()
+        raise
+
+
+def iter_zip_entries(archive: zipfile.ZipFile) -> Iterator[zipfile.ZipInfo]:
+    """遍历zip中可入库的文件条目，跳过目录、隐藏文件和不支持的类型"""
+    for info in archive.infolist():
+        if info.is_dir():
+            continue
+        base_name = os.path.basename(info.filename)
+        if not base_name or base_name.startswith(".") or info.filename.startswith("__MACOSX/"):
+            continue
+        if os.path.splitext(base_name)[1].lower() not in ALLOWED_EXTENSIONS:
+            continue
+        yield info
+
+
+def extract_and_vectorize(file_path: str, doc_id: int, title: str, metadata: Optional[Dict] = None) -> Tuple[str, str]:
+    """提取文本并写入向量库（同步，在工作线程中执行）"""
+    text_content = DocumentProcessor.extract_text(file_path)
+    vector_id = vector_service.add_document(doc_id=doc_id, title=title, content=text_content, metadata=metadata)
+    return text_content, vector_id
+
+
+class DocumentIngestionService:
+    """文档入库流水线
+
+    文件落盘在默认线程池中顺序执行（zip条目需顺序读取），解析和向量化在专用线程池中
+    最多 INGEST_WORKERS 个并行，事件循环只负责调度和数据库写入。
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self._max_workers = max_workers or settings.INGEST_WORKERS
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix="ingest")
+        return self._executor
+
+    async def run_in_executor(self, func: Callable, *args):
+        """在入库线程池中执行同步函数"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, func, *args)
+
+    async def save_upload(self, source: BinaryIO, file_name: str, max_size: Optional[int] = None) -> Dict:
+        """在线程中将同步数据流保存到存储目录，返回文件信息"""
+        return await asyncio.to_thread(save_stream, source, file_name, max_size or settings.MAX_UPLOAD_SIZE)
+
+    async def save_upload_file(
+        self, upload: UploadFile, max_size: Optional[int] = None, chunk_size: int = COPY_CHUNK_SIZE
+    ) -> Dict:
+        """异步分块读取 UploadFile 并流式落盘
+
+        读取走 UploadFile 的异步接口，写盘和哈希计算放到线程中，整个过程不阻塞事件循环；
+        大小在流式写入过程中校验，超限时立即中止并清理临时文件。
+        """
+        writer = await asyncio.to_thread(UploadWriter, upload.filename, max_size or settings.MAX_UPLOAD_SIZE)
+        try:
+            while True:
+                chunk = await upload.read(chunk_size)
+                if not chunk:
+                    break
+                await asyncio.to_thread(writer.write, chunk)
+            return await asyncio.to_thread(writer.commit)
+        except BaseException:
+            writer.discard()
+            raise
+
+    async def iter_zip_uploads(self, source: BinaryIO, limit: int) -> AsyncIterator[Dict]:
+        """逐条流式解压zip到存储目录，每保存一个条目就产出一次，不会把整个压缩包解压进内存
+
+        产出项为 save_upload 返回的文件信息，失败时为 file_name / error；
+        调用方可以在后续条目落盘的同时处理已产出的文件。
+        """
+        try:
+            archive = zipfile.ZipFile(source)
+        except zipfile.BadZipFile as e:
+            raise ValueError(f"无效的zip文件: {str(e)}")
+
+        count = 0
+        with archive:
+            for info in iter_zip_entries(archive):
+                count += 1
+                if count > limit:
+                    raise ValueError(f"文件数量超过限制 ({limit})")
+                file_name = os.path.basename(info.filename)
+                if info.file_size > settings.MAX_UPLOAD_SIZE:
+                    yield {"file_name": file_name, "error": f"文件大小超过限制 ({settings.MAX_UPLOAD_SIZE} bytes)"}
+                    continue
+                try:
+                    with archive.open(info) as entry:
+                        # 以实际解压字节数校验大小，防止伪造头部的压缩炸弹
+                        stored = await self.save_upload(entry, file_name)
+                except Exception as e:
+                    logger.warning(f"zip条目 {info.filename} 保存失败: {e}")
+                    yield {"file_name": file_name, "error": str(e)}
+                    continue
+                yield stored
+
+    async def process(
+        self, file_path: str, doc_id: int, title: str, metadata: Optional[Dict] = None
+    ) -> Tuple[str, str]:
+        """在线程池中提取文本并向量化，返回 (文本, vector_id)
+
+        VECTOR_EMBEDDING_SOURCE=ai_service 时分块向量由 AIService 批量计算后写入。
+        """
+        if settings.VECTOR_EMBEDDING_SOURCE != "ai_service":
+            result = await self.run_in_executor(extract_and_vectorize, file_path, doc_id, title, metadata)
+            await async_vector_service.invalidate("documents")
+            return result
+        text_content = await self.run_in_executor(DocumentProcessor.extract_text, file_path)
+        vector_ids = await async_vector_service.ingest_documents(
+            [{"doc_id": doc_id, "title": title, "content": text_content, "metadata": metadata}]
+        )
+        return text_content, vector_ids[doc_id]
+
+
+# 全局实例
+document_ingestion_service = DocumentIngestionService()
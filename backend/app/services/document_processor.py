@@ -1,9 +1,28 @@
-"""文档处理服务"""
+"""文档处理服务
 
+python-docx、pypdf、openpyxl 在解析对应格式时才导入，导入本模块时不加载。
+"""
+
+import codecs
 import os
-import docx
-from pypdf import PdfReader
-import openpyxl
+from typing import Iterator, Optional, Tuple
+
+# BOM与编码的对应关系（UTF-32需在UTF-16之前检测，二者前缀相同）
+_TEXT_BOMS: Tuple[Tuple[bytes, str], ...] = (
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+# 无BOM时依次尝试的编码：GBK 解码器比 GB18030 快，GB18030 覆盖 GBK 之外的字符；latin-1 可解码任意字节，作为最后兜底
+_TEXT_ENCODINGS: Tuple[str, ...] = ("utf-8", "gbk", "gb18030")
+_TEXT_LAST_RESORT_ENCODING = "latin-1"
+
+# 超过该大小的文本文件走流式解码，避免同时持有完整的bytes和str
+TXT_STREAM_THRESHOLD = 16 * 1024 * 1024
+# 流式解码时每次读取的块大小，同时作为编码探测的采样长度
+TXT_CHUNK_SIZE = 1024 * 1024
 
 
 class DocumentProcessor:
@@ -12,6 +31,8 @@ class DocumentProcessor:
     @staticmethod
     def extract_text_from_docx(file_path: str) -> str:
         """从Word文档提取文本"""
+        import docx
+
         try:
             doc = docx.Document(file_path)
             text = []
@@ -25,6 +46,8 @@ class DocumentProcessor:
     @staticmethod
     def extract_text_from_pdf(file_path: str) -> str:
         """从PDF文档提取文本"""
+        from pypdf import PdfReader
+
         try:
             text = []
             with open(file_path, "rb") as file:
@@ -40,6 +63,8 @@ class DocumentProcessor:
     @staticmethod
     def extract_text_from_xlsx(file_path: str) -> str:
         """从Excel文档提取文本"""
+        import openpyxl
+
         try:
             workbook = openpyxl.load_workbook(file_path, data_only=True)
             text = []
@@ -55,23 +80,76 @@ class DocumentProcessor:
             raise Exception(f"读取Excel文档失败: {str(e)}")
 
     @staticmethod
-    def extract_text_from_txt(file_path: str) -> str:
-        """从文本文件提取文本"""
-        # 尝试多种编码
-        encodings = ["utf-8", "gbk", "gb2312", "latin-1", "iso-8859-1"]
+    def detect_text_encoding(sample: bytes, final: bool = True) -> str:
+        """在内存中探测文本编码：BOM -> UTF-8校验 -> GB18030 -> latin-1
+
+        final=False 表示 sample 只是文件开头的一部分，末尾被截断的多字节序列不视为错误。
+        """
+        for bom, encoding in _TEXT_BOMS:
+            if sample.startswith(bom):
+                return encoding
+
+        for encoding in _TEXT_ENCODINGS:
+            try:
+                codecs.getincrementaldecoder(encoding)().decode(sample, final=final)
+                return encoding
+            except UnicodeDecodeError:
+                continue
+        return _TEXT_LAST_RESORT_ENCODING
+
+    @staticmethod
+    def decode_text_bytes(data: bytes) -> str:
+        """按与 detect_text_encoding 相同的顺序解码完整内容，成功的那次解码即为结果"""
+        for bom, encoding in _TEXT_BOMS:
+            if data.startswith(bom):
+                return data.decode(encoding)
 
-        for encoding in encodings:
+        for encoding in _TEXT_ENCODINGS:
             try:
-                with open(file_path, "r", encoding=encoding) as file:
-                    return file.read()
-            except (UnicodeDecodeError, LookupError):
+                return data.decode(encoding)
+            except UnicodeDecodeError:
                 continue
+        return data.decode(_TEXT_LAST_RESORT_ENCODING)
+
+    @staticmethod
+    def iter_text_from_txt(file_path: str, chunk_size: int = TXT_CHUNK_SIZE) -> Iterator[str]:
+        """流式解码文本文件，按块产出字符串
+
+        编码根据第一个块探测，后续块使用增量解码器处理跨块的多字节字符，
+        采样之后出现的非法字节以替换字符输出。
+        """
+        with open(file_path, "rb") as file:
+            head = file.read(chunk_size)
+            if not head:
+                return
+            final = len(head) < chunk_size
+            encoding = DocumentProcessor.detect_text_encoding(head, final=final)
+            decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+            yield decoder.decode(head, final=final)
+            while not final:
+                chunk = file.read(chunk_size)
+                final = not chunk
+                text = decoder.decode(chunk, final=final)
+                if text:
+                    yield text
+
+    @staticmethod
+    def extract_text_from_txt(file_path: str, stream_threshold: Optional[int] = None) -> str:
+        """从文本文件提取文本
+
+        文件只读取一次：小文件整体读入后在内存中探测编码并解码，
+        超过 stream_threshold 的大文件按块流式解码。
+        """
+        threshold = TXT_STREAM_THRESHOLD if stream_threshold is None else stream_threshold
+        if os.path.getsize(file_path) > threshold:
+            return "".join(DocumentProcessor.iter_text_from_txt(file_path))
+
+        with open(file_path, "rb") as file:
+            data = file.read()
 
-        # 如果所有编码都失败，尝试二进制模式并忽略错误
         try:
-            with open(file_path, "r", encoding="utf-8", errors="ignore") as file:
-                return file.read()
-        except Exception as e:
+            return DocumentProcessor.decode_text_bytes(data)
+        except UnicodeDecodeError as e:
             raise Exception(f"读取文本文件失败: {str(e)}")
 
     @classmethod
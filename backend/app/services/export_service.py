@@ -1,32 +1,63 @@
-""" 文档导出服务"""
+""" 文档导出服务
+
+python-docx、openpyxl、reportlab 只在对应的导出方法中导入，导入本模块（以及启动应用）时不加载。
+"""
 
 import os
 from datetime import datetime
-import docx
-from docx.shared import Inches, Pt
-from docx.enum.text import WD_ALIGN_PARAGRAPH
-from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import mm
-from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_JUSTIFY
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
 from loguru import logger
 
 from app.core.config import settings
 from app.models import Proposal
 
+# PDF 导出时依次尝试注册的中文字体
+CHINESE_FONT_PATHS = [
+    '/System/Library/Fonts/PingFang.ttc',
+    '/System/Library/Fonts/STSong.ttc',
+    '/System/Library/Fonts/Hiragino Sans GB.ttc',
+    '/System/Library/Fonts/Hiragino Sans GB W3.ttc'
+]
+
 
 class ExportService:
     """文档导出服务"""
 
+    _chinese_font = None
+    _fonts_registered = False
+
+    @classmethod
+    def register_fonts(cls):
+        """注册 PDF 导出使用的中文字体，返回字体名（没有可用字体时为 None）
+
+        解析 TTC 字体文件较慢，进程内只注册一次，之后的导出直接复用。
+        """
+        if cls._fonts_registered:
+            return cls._chinese_font
+        from reportlab.pdfbase import pdfmetrics
+        from reportlab.pdfbase.ttfonts import TTFont
+
+        try:
+            for font_path in CHINESE_FONT_PATHS:
+                if os.path.exists(font_path):
+                    try:
+                        pdfmetrics.registerFont(TTFont('ChineseFont', font_path))
+                        cls._chinese_font = 'ChineseFont'
+                        logger.info(f"成功注册中文字体: {font_path}")
+                        break
+                    except Exception as font_error:
+                        logger.warning(f"字体注册失败 {font_path}: {font_error}")
+                        continue
+        except Exception as e:
+            logger.warning(f"中文字体注册过程出错: {e}")
+        cls._fonts_registered = True
+        return cls._chinese_font
+
     @staticmethod
     def export_proposal_to_word(proposal: Proposal) -> str:
         """导出方案为Word文档"""
+        import docx
+        from docx.enum.text import WD_ALIGN_PARAGRAPH
+
         try:
             # 创建Word文档
             doc = docx.Document()
@@ -90,6 +121,11 @@ class ExportService:
     @staticmethod
     def export_proposal_to_pdf(proposal: Proposal) -> str:
         """导出方案为PDF文档"""
+        from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY
+        from reportlab.lib.pagesizes import A4
+        from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+        from reportlab.platypus import PageBreak, Paragraph, SimpleDocTemplate, Spacer
+
         try:
             # 设置PDF文件路径
             filename = f"proposal_{proposal.id}_{datetime.now().strftime('%Y%m%d%H%M%S')}.pdf"
@@ -101,29 +137,8 @@ class ExportService:
             # 获取样式
             styles = getSampleStyleSheet()
 
-            # 尝试注册中文字体
-            try:
-                # 尝试注册常见的中文字体
-                font_paths = [
-                    '/System/Library/Fonts/PingFang.ttc',
-                    '/System/Library/Fonts/STSong.ttc',
-                    '/System/Library/Fonts/Hiragino Sans GB.ttc',
-                    '/System/Library/Fonts/Hiragino Sans GB W3.ttc'
-                ]
-
-                chinese_font = None
-                for font_path in font_paths:
-                    if os.path.exists(font_path):
-                        try:
-                            pdfmetrics.registerFont(TTFont('ChineseFont', font_path))
-                            chinese_font = 'ChineseFont'
-                            logger.info(f"成功注册中文字体: {font_path}")
-                            break
-                        except Exception as font_error:
-                            logger.warning(f"字体注册失败 {font_path}: {font_error}")
-                            continue
-            except Exception as e:
-                logger.warning(f"中文字体注册过程出错: {e}")
+            # 中文字体（进程内只注册一次，启动预热时已注册）
+            chinese_font = ExportService.register_fonts()
 
             # 创建自定义样式
             title_style = ParagraphStyle(
@@ -222,6 +237,9 @@ class ExportService:
     @staticmethod
     def export_pricing_to_excel(proposal: Proposal) -> str:
         """导出报价单为Excel"""
+        from openpyxl import Workbook
+        from openpyxl.styles import Alignment, Border, Font, PatternFill, Side
+
         try:
             # 创建工作簿
             wb = Workbook()
@@ -330,6 +348,8 @@ class ExportService:
     @staticmethod
     def _set_word_styles(doc):
         """设置Word文档样式"""
+        from docx.shared import Pt
+
         # 设置正文样式
         style = doc.styles["Normal"]
         style.font.name = "宋体"
@@ -338,6 +358,8 @@ class ExportService:
     @staticmethod
     def _add_paragraph_with_indent(doc, text: str, indent: float = 0.5):
         """添加带缩进的段落"""
+        from docx.shared import Inches
+
         paragraph = doc.add_paragraph(text)
         paragraph.paragraph_format.first_line_indent = Inches(indent)
         paragraph.paragraph_format.line_spacing = 1.5
@@ -0,0 +1,277 @@
+"""关键词倒排索引 - 基于SQLite的本地BM25检索"""
+
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+_CJK_RUN = re.compile(r"[\u3400-\u9fff\uf900-\ufaff]+")
+# 字母数字串，保留内部的 . - / _ 连接符，使 "JR/T 0171-2020"、"gpt-4" 等编号作为整体检索
+_WORD = re.compile(r"[a-z0-9]+(?:[./_-][a-z0-9]+)*")
+_FIELD_NAME = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+COMMON_TERM_RATIO = 0.5
+
+
+def tokenize(text: str) -> List[str]:
+    """中文按字二元组切分（单字成段时保留单字），英文和编号按整串切分并小写"""
+    text = text.lower()
+    tokens = []
+    for run in _CJK_RUN.findall(text):
+        if len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i : i + 2] for i in range(len(run) - 1))
+    for word in _WORD.findall(text):
+        tokens.append(word)
+        # 带连接符的编号同时索引各段，部分匹配也能命中
+        if not word.isalnum():
+            tokens.extend(part for part in re.split(r"[./_-]", word) if part)
+    return tokens
+
+
+class KeywordIndex:
+    """持久化的BM25倒排索引
+
+    每个条目按 (collection, doc_key) 存储词频和长度，文档频率与集合统计随增删增量维护；查询时在SQLite中
+    完成BM25打分与元数据过滤，只返回前 limit 个结果。多个线程共享一个连接，用锁串行化。
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS docs (
+                collection TEXT NOT NULL,
+                doc_key TEXT NOT NULL,
+                length INTEGER NOT NULL,
+                metadata TEXT,
+                PRIMARY KEY (collection, doc_key)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS postings (
+                collection TEXT NOT NULL,
+                term TEXT NOT NULL,
+                doc_key TEXT NOT NULL,
+                tf INTEGER NOT NULL,
+                length INTEGER NOT NULL,
+                PRIMARY KEY (collection, term, doc_key)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_postings_doc ON postings (collection, doc_key);
+            CREATE TABLE IF NOT EXISTS terms (
+                collection TEXT NOT NULL,
+                term TEXT NOT NULL,
+                df INTEGER NOT NULL,
+                PRIMARY KEY (collection, term)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS stats (
+                collection TEXT PRIMARY KEY,
+                doc_count INTEGER NOT NULL,
+                total_length INTEGER NOT NULL
+            );
+            """
+        )
+
+    def add(self, collection: str, items: Iterable[Tuple[str, str, Optional[Dict]]]) -> int:
+        """写入或覆盖条目，items 为 (doc_key, 文本, 元数据)，返回写入条数"""
+        count = 0
+        with self._lock, self._conn:
+            for doc_key, text, metadata in items:
+                self._delete_keys(collection, [doc_key])
+                terms = Counter(tokenize(text or ""))
+                length = sum(terms.values())
+                self._conn.execute(
+                    "INSERT INTO docs (collection, doc_key, length, metadata) VALUES (?, ?, ?, ?)",
+                    (collection, doc_key, length, json.dumps(metadata or {}, ensure_ascii=False)),
+                )
+                self._conn.executemany(
+                    "INSERT INTO postings (collection, term, doc_key, tf, length) VALUES (?, ?, ?, ?, ?)",
+                    [(collection, term, doc_key, tf, length) for term, tf in terms.items()],
+                )
+                self._conn.executemany(
+                    "INSERT INTO terms (collection, term, df) VALUES (?, ?, 1) "
+                    "ON CONFLICT (collection, term) DO UPDATE SET df = df + 1",
+                    [(collection, term) for term in terms],
+                )
+                self._adjust_stats(collection, 1, length)
+                count += 1
+        return count
+
+    def update_metadata(self, collection: str, items: Iterable[Tuple[str, Optional[Dict]]]) -> None:
+        """只更新条目的元数据（文本未变时无需重建词频）"""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE docs SET metadata = ? WHERE collection = ? AND doc_key = ?",
+                [(json.dumps(metadata or {}, ensure_ascii=False), collection, doc_key) for doc_key, metadata in items],
+            )
+
+    def remove(self, collection: str, doc_keys: List[str]) -> None:
+        """按 doc_key 删除条目"""
+        if not doc_keys:
+            return
+        with self._lock, self._conn:
+            self._delete_keys(collection, doc_keys)
+
+    def remove_where(self, collection: str, field: str, value) -> int:
+        """删除元数据字段等于 value 的全部条目（如某个文档的所有分块），返回删除条数"""
+        with self._lock, self._conn:
+            rows = self._conn.execute(
+                "SELECT doc_key FROM docs WHERE collection = ? AND json_extract(metadata, ?) = ?",
+                (collection, self._json_path(field), value),
+            ).fetchall()
+            self._delete_keys(collection, [row[0] for row in rows])
+        return len(rows)
+
+    def clear(self, collection: str) -> None:
+        """清空集合的全部条目和统计（从快照恢复集合后重建前）"""
+        with self._lock, self._conn:
+            for table in ("postings", "docs", "terms", "stats"):
+                self._conn.execute(f"DELETE FROM {table} WHERE collection = ?", (collection,))
+
+    def count(self, collection: str) -> int:
+        with self._lock:
+            return self._stats(collection)[0]
+
+    def search(self, collection: str, query: str, limit: int = 10, where: Optional[Dict] = None) -> List[Dict]:
+        """BM25检索，where 支持字段相等、{"$in": [...]} 和 $and，返回 [{"id", "score", "metadata"}]"""
+        terms = sorted(set(tokenize(query)))
+        if not terms or limit <= 0:
+            return []
+
+        with self._lock:
+            doc_count, total_length = self._stats(collection)
+            if not doc_count:
+                return []
+            placeholders = ",".join("?" * len(terms))
+            frequencies = dict(
+                self._conn.execute(
+                    f"SELECT term, df FROM terms WHERE collection = ? AND term IN ({placeholders}) AND df > 0",
+                    (collection, *terms),
+                ).fetchall()
+            )
+            # 超过半数条目都含有的词区分度很低，却要扫描最长的倒排链；有更少见的词时忽略它们
+            rare = {term: df for term, df in frequencies.items() if df <= doc_count * COMMON_TERM_RATIO}
+            weights = [
+                (term, math.log(1 + (doc_count - df + 0.5) / (df + 0.5))) for term, df in (rare or frequencies).items()
+            ]
+            if not weights:
+                return []
+
+            # 文档长度冗余存在倒排表中，打分只扫描命中的倒排项；有过滤条件时才关联 docs 表，
+            # 否则只为前 limit 个结果取元数据
+            filter_sql, filter_params = self._where_sql(where)
+            filter_join = "JOIN docs d ON d.collection = p.collection AND d.doc_key = p.doc_key" if filter_sql else ""
+            values = ",".join(["(?, ?)"] * len(weights))
+            sql = f"""
+                WITH q(term, idf) AS (VALUES {values}),
+                scored AS (
+                    SELECT p.doc_key,
+                           SUM(q.idf * p.tf * ({BM25_K1} + 1)
+                               / (p.tf + {BM25_K1} * (1 - {BM25_B} + {BM25_B} * p.length / ?))) AS score
+                    FROM q
+                    JOIN postings p ON p.collection = ? AND p.term = q.term
+                    {filter_join}
+                    {filter_sql}
+                    GROUP BY p.doc_key
+                    ORDER BY score DESC
+                    LIMIT ?
+                )
+                SELECT s.doc_key, s.score, d.metadata
+                FROM scored s
+                JOIN docs d ON d.collection = ? AND d.doc_key = s.doc_key
+                ORDER BY s.score DESC
+            """
+            params = [value for weight in weights for value in weight]
+            rows = self._conn.execute(
+                sql, (*params, total_length / doc_count or 1, collection, *filter_params, limit, collection)
+            ).fetchall()
+
+        return [{"id": doc_key, "score": score, "metadata": json.loads(metadata)} for doc_key, score, metadata in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _stats(self, collection: str) -> Tuple[int, int]:
+        row = self._conn.execute(
+            "SELECT doc_count, total_length FROM stats WHERE collection = ?", (collection,)
+        ).fetchone()
+        return row if row else (0, 0)
+
+    def _adjust_stats(self, collection: str, doc_delta: int, length_delta: int) -> None:
+        self._conn.execute(
+            "INSERT INTO stats (collection, doc_count, total_length) VALUES (?, ?, ?) "
+            "ON CONFLICT (collection) DO UPDATE SET doc_count = doc_count + excluded.doc_count, "
+            "total_length = total_length + excluded.total_length",
+            (collection, doc_delta, length_delta),
+        )
+
+    def _delete_keys(self, collection: str, doc_keys: List[str]) -> None:
+        """删除条目并同步文档频率与集合统计，调用方需持有锁并处于事务中"""
+        for doc_key in doc_keys:
+            row = self._conn.execute(
+                "SELECT length FROM docs WHERE collection = ? AND doc_key = ?", (collection, doc_key)
+            ).fetchone()
+            if row is None:
+                continue
+            self._conn.execute(
+                "UPDATE terms SET df = df - 1 WHERE collection = ? AND term IN "
+                "(SELECT term FROM postings WHERE collection = ? AND doc_key = ?)",
+                (collection, collection, doc_key),
+            )
+            self._conn.execute("DELETE FROM postings WHERE collection = ? AND doc_key = ?", (collection, doc_key))
+            self._conn.execute("DELETE FROM docs WHERE collection = ? AND doc_key = ?", (collection, doc_key))
+            self._adjust_stats(collection, -1, -row[0])
+
+    @staticmethod
+    def _json_path(field: str) -> str:
+        if not _FIELD_NAME.match(field):
+            raise ValueError(f"不支持的过滤字段: {field}")
+        return f"$.{field}"
+
+    def _where_sql(self, where: Optional[Dict]) -> Tuple[str, List]:
+        """把 Chroma 风格的简单过滤条件（等值、$eq、$in 及其 $and 组合）转换成SQL
+
+        其他运算符（$ne、$gt、$or 等）抛出 ValueError：忽略它们会放宽过滤条件，返回不该返回的条目。
+        """
+        if not where:
+            return "", []
+        clauses = []
+        params: List = []
+        for field, condition in where.items():
+            if field == "$and":
+                for part in condition:
+                    part_sql, part_params = self._where_sql(part)
+                    if part_sql:
+                        clauses.append(part_sql[len("WHERE ") :])
+                        params.extend(part_params)
+                continue
+            if field.startswith("$"):
+                raise ValueError(f"关键词索引不支持的过滤运算符: {field}")
+            path = self._json_path(field)
+            if isinstance(condition, dict) and list(condition) == ["$eq"]:
+                condition = condition["$eq"]
+            if isinstance(condition, dict):
+                values = condition.get("$in")
+                if values is None or len(condition) != 1:
+                    raise ValueError(f"关键词索引不支持的过滤条件: {field}={condition}")
+                if not values:
+                    clauses.append("0")
+                    continue
+                clauses.append(f"json_extract(d.metadata, ?) IN ({','.join('?' * len(values))})")
+                params.extend([path, *values])
+            else:
+                clauses.append("json_extract(d.metadata, ?) = ?")
+                params.extend([path, condition])
+        return ("WHERE " + " AND ".join(clauses), params) if clauses else ("", [])
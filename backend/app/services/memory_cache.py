@@ -0,0 +1,212 @@
+"""
+进程内缓存 - TTL 过期 + LRU 淘汰，按条目数和近似字节数限制
+
+CacheService 在 Redis 不可用（或未配置）时使用。条目按最近访问顺序保存在 OrderedDict 中，
+读取、写入、删除和淘汰都是 O(1)：
+    过期  读取时检查过期时间；每次写入顺带检查最久未访问的几条，已过期的直接删除
+    淘汰  条目数超过 max_entries 或近似字节数超过 max_bytes 时，从最久未访问的一端淘汰
+已过期但还没被访问到的条目同样计入上限，随 LRU 淘汰，内存占用始终有界。
+
+近似字节数为键长加值的 JSON 序列化长度（CacheService.set 已经序列化过，直接传入），
+不是对象在进程中的实际内存占用，用于按比例限制缓存大小。
+"""
+
+import json
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.metrics import memory_cache_bytes, memory_cache_entries, memory_cache_evictions_total
+
+# 每次写入时检查的最久未访问条目数
+EXPIRE_SAMPLE = 3
+
+_MISSING = object()
+
+
+def estimate_size(value: Any) -> int:
+    """值的近似字节数：字符串和字节串取长度，其他取 JSON 序列化长度"""
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    try:
+        return len(json.dumps(value, ensure_ascii=False, default=str))
+    except (TypeError, ValueError):
+        return 64
+
+
+class MemoryCache:
+    """有界的 LRU + TTL 进程内缓存，线程安全
+
+    同时实现 dict 的常用接口（in、[]、del、len、keys、clear），可以直接替换原来的字典。
+    """
+
+    def __init__(
+        self, max_entries: int = 10000, max_bytes: int = 64 * 2**20, name: str = "memory", keep_stale: bool = False
+    ):
+        """keep_stale 为真时读到过期条目不删除（只返回 default），留给 get_stale 兜底，直到被覆盖或淘汰"""
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.name = name
+        self.keep_stale = keep_stale
+        # key -> (值, 过期时间(monotonic，不过期为 inf), 近似字节数)
+        self._data: "OrderedDict[str, Tuple[Any, float, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+        self._evicted_metric = memory_cache_evictions_total.labels(cache=name, reason="lru")
+        self._expired_metric = memory_cache_evictions_total.labels(cache=name, reason="expired")
+        self._entries_metric = memory_cache_entries.labels(cache=name)
+        self._bytes_metric = memory_cache_bytes.labels(cache=name)
+
+    # ==================== 读写 ====================
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """读取未过期的值并标记为最近使用，不存在或已过期时返回 default"""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            if item[1] <= time.monotonic():
+                if not self.keep_stale:
+                    self._remove(key, expired=True)
+                    self._update_gauges()
+                return default
+            self._data.move_to_end(key)
+            return item[0]
+
+    def get_stale(self, key: str, default: Any = None) -> Any:
+        """读取值，已过期但还未被清理的也返回（后端不可用时兜底），不改变访问顺序"""
+        item = self._data.get(key)
+        return default if item is None else item[0]
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None, size: Optional[int] = None) -> bool:
+        """写入，ttl 为空或不大于 0 时不过期；size 为值的近似字节数，为空时估算
+
+        单个值超过 max_bytes 时不缓存，返回 False。
+        """
+        size = len(key) + (estimate_size(value) if size is None else size)
+        now = time.monotonic()
+        expires_at = now + ttl if ttl and ttl > 0 else math.inf
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            stored = size <= self.max_bytes
+            if stored:
+                self._data[key] = (value, expires_at, size)
+                self._bytes += size
+            self._expire_oldest(now)
+            while len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._data)), expired=False)
+            self._update_gauges()
+        return stored
+
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            item = self._data.pop(key, None)
+            if item is None:
+                return False
+            self._bytes -= item[2]
+            self._update_gauges()
+            return True
+
+    def pop(self, key: str, default: Any = _MISSING) -> Any:
+        with self._lock:
+            item = self._data.pop(key, None)
+            if item is not None:
+                self._bytes -= item[2]
+                self._update_gauges()
+                if item[1] > time.monotonic():
+                    return item[0]
+        if default is _MISSING:
+            raise KeyError(key)
+        return default
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+            self._update_gauges()
+
+    def purge_expired(self) -> int:
+        """删除全部已过期的条目（O(n)），返回删除条数"""
+        now = time.monotonic()
+        with self._lock:
+            expired = [key for key, item in self._data.items() if item[1] <= now]
+            for key in expired:
+                self._remove(key, expired=True)
+            self._update_gauges()
+        return len(expired)
+
+    # ==================== 统计 ====================
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._data),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+    # ==================== dict 接口 ====================
+
+    def __contains__(self, key: str) -> bool:
+        item = self._data.get(key)
+        return item is not None and item[1] > time.monotonic()
+
+    def __getitem__(self, key: str) -> Any:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self.set(key, value)
+
+    def __delitem__(self, key: str) -> None:
+        if not self.delete(key):
+            raise KeyError(key)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def keys(self) -> List[str]:
+        """当前全部键的快照（可能含已过期未清理的键）"""
+        with self._lock:
+            return list(self._data)
+
+    # ==================== 内部 ====================
+
+    def _remove(self, key: str, expired: bool) -> None:
+        _, _, size = self._data.pop(key)
+        self._bytes -= size
+        if expired:
+            self.expirations += 1
+            self._expired_metric.inc()
+        else:
+            self.evictions += 1
+            self._evicted_metric.inc()
+
+    def _expire_oldest(self, now: float) -> None:
+        if self.keep_stale:
+            return
+        for _ in range(EXPIRE_SAMPLE):
+            if not self._data:
+                return
+            key, item = next(iter(self._data.items()))
+            if item[1] > now:
+                return
+            self._remove(key, expired=True)
+
+    def _update_gauges(self) -> None:
+        self._entries_metric.set(len(self._data))
+        self._bytes_metric.set(self._bytes)
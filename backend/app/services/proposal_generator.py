@@ -2,13 +2,35 @@
 
 import asyncio
 import json
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional
 from sqlalchemy.orm import Session
 from loguru import logger
 
 from app.models import Proposal, AIModel
 from app.services.ai_service import AIService
-from app.services.vector_service import vector_service
+from app.services.vector_service import async_vector_service
+
+# 按章节向量化到方案集合的字段
+PROPOSAL_SECTIONS = ("executive_summary", "solution_overview", "technical_details", "implementation_plan", "pricing")
+# 章节生成失败或超时时写入的占位文本，不参与向量化
+FAILED_SECTION_TEXTS = ("生成失败，请重试", "生成超时，请重试")
+
+
+def _section_text(value) -> Optional[str]:
+    """章节内容转换为向量化用的文本：报价（JSON 列）取模型原始回复，没有时序列化解析结果"""
+    if isinstance(value, dict):
+        return value.get("raw") or (json.dumps(value.get("data"), ensure_ascii=False) if value.get("data") else None)
+    return value
+
+
+async def index_proposal(proposal_id: int, requirements: str, sections: Dict[str, Any], metadata: Dict) -> None:
+    """把已完成的方案按章节写入方案集合，供相似方案检索；作为后台任务执行，失败只记录日志"""
+    sections = {name: _section_text(value) for name, value in sections.items()}
+    sections = {name: text for name, text in sections.items() if text not in FAILED_SECTION_TEXTS}
+    try:
+        await async_vector_service.vectorize_proposal(proposal_id, requirements, metadata=metadata, sections=sections)
+    except Exception as e:
+        logger.error(f"方案 {proposal_id} 向量化失败: {e}")
 
 
 class ProposalGenerator:
@@ -22,11 +44,10 @@ class ProposalGenerator:
         """生成方案内容"""
         logger.info(f"开始生成方案: {proposal.title}")
 
-        # 1. 使用向量搜索获取相关文档
-        similar_docs = self._search_similar_documents(proposal)
-
-        # 2. 获取相关知识库内容
-        relevant_knowledge = self._search_relevant_knowledge(proposal)
+        # 1-2. 并发检索相似文档和相关知识库内容
+        similar_docs, relevant_knowledge = await asyncio.gather(
+            self._search_similar_documents(proposal), self._search_relevant_knowledge(proposal)
+        )
 
         # 3. 构建增强上下文
         context = self._build_enhanced_context(proposal, similar_docs, relevant_knowledge)
@@ -91,13 +112,15 @@ class ProposalGenerator:
             "full_content": full_content,
         }
 
-    def _search_similar_documents(self, proposal: Proposal) -> List[Dict]:
+    async def _search_similar_documents(self, proposal: Proposal) -> List[Dict]:
         """搜索相似的历史文档"""
         try:
-            results = vector_service.search_documents(
+            results = await async_vector_service.search_documents(
                 query=proposal.requirements,
                 n_results=3,
                 filter_metadata={"industry": proposal.customer_industry} if proposal.customer_industry else None,
+                # 同一文档的多个分块、几乎相同的多个版本只占一个上下文槽位
+                diversify=True,
             )
             logger.info(f"找到 {len(results)} 个相似文档")
             return results
@@ -105,10 +128,12 @@ class ProposalGenerator:
             logger.error(f"搜索相似文档失败: {e}")
             return []
 
-    def _search_relevant_knowledge(self, proposal: Proposal) -> List[Dict]:
+    async def _search_relevant_knowledge(self, proposal: Proposal) -> List[Dict]:
         """搜索相关知识库内容"""
         try:
-            results = vector_service.search_knowledge(query=proposal.requirements, n_results=5)
+            results = await async_vector_service.search_knowledge(
+                query=proposal.requirements, n_results=5, diversify=True
+            )
             logger.info(f"找到 {len(results)} 个相关知识")
             return results
         except Exception as e:
@@ -0,0 +1,217 @@
+"""检索结果重排服务
+
+向量检索按 k×RERANK_OVERFETCH 多取候选，由可插拔的重排器给出与候选池无关的相关度（0-1），
+再与检索排名融合后截取前 k 条：
+
+    lexical  本地词项覆盖率打分（默认），与BM25索引使用相同的切词，耗时为微秒级
+    llm      调用 AIService 一次性给所有候选打分，分数按 (重排器, 查询, 文本哈希) 缓存
+
+整个重排受 RERANK_BUDGET_MS 约束：超出预算时放弃等待，改用词项打分（或保持检索顺序）返回，
+LLM 打分在后台继续完成并写入缓存，同一查询下次直接命中。
+"""
+
+import abc
+import asyncio
+import hashlib
+import json
+import re
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from loguru import logger
+
+from app.core.config import settings
+from app.core.metrics import rerank_duration, rerank_requests_total
+from app.services.ai_service import AIService, ai_service
+from app.services.cache_service import CacheService, cache_service
+from app.services.keyword_index import tokenize
+
+
+def candidate_key(candidate: Dict) -> str:
+    """候选的缓存键：相关度只取决于查询和文本，按文本哈希而非向量ID，重建索引后仍可复用"""
+    return hashlib.sha256((candidate.get("document") or "").encode()).hexdigest()[:32]
+
+
+class Reranker(abc.ABC):
+    """重排器基类，score 返回每个候选与查询的相关度（0-1），与候选顺序和候选池无关"""
+
+    name = "base"
+    # 打分较贵时缓存分数；本地打分比一次缓存往返还快，不缓存
+    cache_scores = False
+
+    @abc.abstractmethod
+    async def score(self, query: str, candidates: List[Dict]) -> List[float]:
+        """按候选顺序返回相关度"""
+
+
+class LexicalReranker(Reranker):
+    """词项覆盖率：查询词项（中文二元组、英文与编号）在候选文本中出现的加权比例
+
+    英文单词和编号（如标准号、产品型号）命中比中文二元组更有区分度，权重加倍。
+    """
+
+    name = "lexical"
+
+    @staticmethod
+    def _weight(term: str) -> float:
+        return 2.0 if term.isascii() else 1.0
+
+    async def score(self, query: str, candidates: List[Dict]) -> List[float]:
+        terms = set(tokenize(query))
+        total = sum(self._weight(term) for term in terms)
+        if not total:
+            return [0.0] * len(candidates)
+        scores = []
+        for candidate in candidates:
+            text = f"{(candidate.get('metadata') or {}).get('title', '')}\n{candidate.get('document') or ''}"
+            present = terms & set(tokenize(text))
+            scores.append(sum(self._weight(term) for term in present) / total)
+        return scores
+
+
+class LLMReranker(Reranker):
+    """让大模型一次为所有候选打 0-10 分"""
+
+    name = "llm"
+    cache_scores = True
+    # 每个候选送入提示词的最大字数
+    PREVIEW_CHARS = 300
+
+    def __init__(self, ai: Optional[AIService] = None):
+        self.ai = ai or ai_service
+
+    async def score(self, query: str, candidates: List[Dict]) -> List[float]:
+        passages = "\n".join(
+            f"[{i}] {(candidate.get('document') or '')[: self.PREVIEW_CHARS]}" for i, candidate in enumerate(candidates)
+        )
+        prompt = f"""请评估以下每段文本与查询的相关程度，按0-10打分（10为完全相关）。
+
+【查询】
+{query}
+
+【候选文本】
+{passages}
+
+只输出一个包含 {len(candidates)} 个数字的JSON数组，按候选编号顺序，不要输出其他内容："""
+        response = await self.ai.generate_text(prompt, temperature=0.0)
+        match = re.search(r"\[[^\[\]]*\]", response or "")
+        if not match:
+            raise ValueError(f"无法解析重排打分: {response!r:.200}")
+        scores = json.loads(match.group(0))
+        if len(scores) != len(candidates):
+            raise ValueError(f"重排打分数量({len(scores)})与候选数量({len(candidates)})不一致")
+        return [min(max(float(score), 0.0), 10.0) / 10 for score in scores]
+
+
+def create_reranker(provider: str) -> Reranker:
+    """按 RERANK_PROVIDER 创建重排器"""
+    if provider == "llm":
+        return LLMReranker()
+    if provider != "lexical":
+        logger.warning(f"未知的重排器 {provider}，使用 lexical")
+    return LexicalReranker()
+
+
+class RerankService:
+    """带时间预算和分数缓存的重排
+
+    最终分数 = (1 - RERANK_WEIGHT) × 检索排名先验 + RERANK_WEIGHT × 重排相关度，
+    检索排名先验为 1 - rank / 候选数，保留向量 / 混合检索的排序信息。
+    """
+
+    def __init__(
+        self,
+        reranker: Reranker,
+        cache: Optional[CacheService] = None,
+        budget_ms: Optional[float] = None,
+        fallback: Optional[Reranker] = None,
+    ):
+        self.reranker = reranker
+        self._cache = cache
+        self._budget_ms = budget_ms
+        self._fallback = fallback or (LexicalReranker() if not isinstance(reranker, LexicalReranker) else None)
+        # 超出预算后仍在后台完成并写缓存的打分任务，保留引用避免被回收
+        self._background: Set[asyncio.Task] = set()
+
+    @property
+    def budget(self) -> float:
+        return (self._budget_ms if self._budget_ms is not None else settings.RERANK_BUDGET_MS) / 1000
+
+    async def rerank(self, query: str, candidates: List[Dict], top_k: int) -> List[Dict]:
+        """重排候选并返回前 top_k 条，每条附带 rerank_score"""
+        if len(candidates) <= 1:
+            return candidates[:top_k]
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        deadline = loop.time() + self.budget
+        name = self.reranker.name
+        keys = [candidate_key(candidate) for candidate in candidates]
+
+        scores: Optional[Dict[str, float]] = None
+        try:
+            scores, cached = await asyncio.wait_for(
+                self._scores(query, candidates, keys), max(deadline - loop.time(), 0)
+            )
+            result = "cached" if cached else "scored"
+        except asyncio.TimeoutError:
+            result = "timeout"
+            logger.warning(f"重排超出预算 {self.budget * 1000:.0f}ms，降级处理")
+        except Exception as e:
+            result = "error"
+            logger.error(f"重排失败: {e}")
+
+        if scores is None and self._fallback is not None:
+            # 降级时全部候选改用本地打分，避免不同重排器的分数混在一起比较
+            fallback_scores = await self._fallback.score(query, candidates)
+            scores = dict(zip(keys, fallback_scores))
+
+        rerank_requests_total.labels(reranker=name, result=result).inc()
+        rerank_duration.labels(reranker=name).observe(time.perf_counter() - started)
+        if scores is None:
+            return candidates[:top_k]
+
+        weight = settings.RERANK_WEIGHT
+        count = len(candidates)
+        final = [(1 - weight) * (1 - rank / count) + weight * scores.get(key, 0.0) for rank, key in enumerate(keys)]
+        order = sorted(range(count), key=lambda i: final[i], reverse=True)[:top_k]
+        return [{**candidates[i], "rerank_score": round(final[i], 6)} for i in order]
+
+    async def _scores(self, query: str, candidates: List[Dict], keys: List[str]) -> Tuple[Dict[str, float], bool]:
+        """取缓存的分数，只为未缓存的候选打分，返回 (分数, 是否全部命中缓存)
+
+        打分任务不随超时取消，完成后写回缓存。
+        """
+        use_cache = self.reranker.cache_scores and self._cache is not None
+        scores: Dict[str, float] = {}
+        if use_cache:
+            scores = await self._cache.get_rerank_scores(self.reranker.name, query) or {}
+        missing = [i for i, key in enumerate(keys) if key not in scores]
+        if not missing:
+            return scores, True
+
+        task = asyncio.ensure_future(
+            self._score_missing(query, [candidates[i] for i in missing], [keys[i] for i in missing], use_cache)
+        )
+        self._background.add(task)
+        task.add_done_callback(self._forget)
+        scores.update(await asyncio.shield(task))
+        return scores, False
+
+    def _forget(self, task: asyncio.Task) -> None:
+        self._background.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"后台重排打分失败: {task.exception()}")
+
+    async def _score_missing(
+        self, query: str, candidates: List[Dict], keys: List[str], use_cache: bool
+    ) -> Dict[str, float]:
+        scores = dict(zip(keys, await self.reranker.score(query, candidates)))
+        if use_cache:
+            cached = await self._cache.get_rerank_scores(self.reranker.name, query) or {}
+            cached.update(scores)
+            await self._cache.cache_rerank_scores(self.reranker.name, query, cached, expire=settings.RERANK_CACHE_TTL)
+        return scores
+
+
+# 全局重排服务实例
+rerank_service = RerankService(create_reranker(settings.RERANK_PROVIDER), cache=cache_service)
@@ -0,0 +1,1128 @@
+"""
+内置向量索引 - 基于NumPy内存映射文件的 flat / IVF 检索
+
+作为 ChromaDB 之外的可选后端（VECTOR_BACKEND=numpy），对 VectorService 暴露与 Chroma 相同的
+客户端与集合接口：
+
+    client.get_or_create_collection(name, metadata) / client.delete_collection(name)
+    collection.add / upsert / update / delete / get / query / count
+
+每个集合一个目录：
+    vectors.bin     float32/float16 向量，按行号存放的内存映射文件，容量按倍数增长
+    records.sqlite3 行号、id、文本和元数据，是记录的权威来源
+    ivf_*.npy/.bin  IVF 粗量化器的质心和每行所属的倒排表（训练后才有）
+    sq_* / pq_*     int8 标量量化或乘积量化的编码（精度为 int8 / pq 时才有）
+    meta.json       维度、精度、距离类型和IVF状态
+
+集合精度（按集合配置）：
+    float32 / float16  直接扫描原始向量
+    int8 / pq          扫描常驻内存的紧凑编码粗排，前 k×rerank_factor 个候选再读取磁盘上的
+                       float32 原始向量重排，原始向量只有少量页会被访问
+
+删除只打墓碑，行号不复用，大量删除后用 compact() 重写文件回收空间。元数据过滤在内存中的
+列式副本上执行，indexed_fields 中的字段另有倒排表（PostingIndex），过滤检索先按倒排表求交
+得到候选行；文本和完整元数据只为最终返回的结果从 SQLite 读取。
+"""
+
+import json
+import math
+import os
+import shutil
+import sqlite3
+import threading
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from loguru import logger
+
+# 精确检索时每次参与矩阵乘法的行数
+SEARCH_BLOCK_ROWS = 65536
+# 过滤后剩余行数不超过该值时直接在这些行上精确检索，不再走IVF
+FILTERED_EXACT_MAX_ROWS = 65536
+# 各精度下 vectors.bin 的存储类型；int8 / pq 保留 float32 原始向量用于重排
+_STORAGE_DTYPES = {"float32": np.float32, "float16": np.float16, "int8": np.float32, "pq": np.float32}
+# 乘积量化码本训练所需的最少行数，不足时按原始向量精确检索
+PQ_TRAIN_MIN_ROWS = 4096
+PQ_CENTROIDS = 256
+# int8 编码每次转换为 float32 参与计算的行数
+SQ_CONVERT_ROWS = 4096
+_SUPPORTED_SPACES = ("cosine", "ip", "l2")
+# 建立倒排表的元数据取值类型（与 Chroma 元数据允许的类型一致）
+_INDEXABLE_TYPES = (str, int, float, bool)
+
+
+def _open_memmap(path: str, dtype, shape: Tuple[int, ...]) -> np.memmap:
+    """打开（必要时创建或扩展）给定形状的内存映射文件"""
+    size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+    with open(path, "ab") as handle:
+        if handle.tell() < size:
+            handle.truncate(size)
+    return np.memmap(path, dtype=dtype, mode="r+", shape=shape)
+
+
+def _as_list(value):
+    if value is None:
+        return None
+    return value if isinstance(value, list) else [value]
+
+
+def where_mask(columns: Dict[str, np.ndarray], where: Dict, size: int) -> np.ndarray:
+    """把 Chroma 风格的 where 条件求值为长度 size 的布尔掩码
+
+    支持字段相等、$eq/$ne/$gt/$gte/$lt/$lte/$in/$nin 以及 $and/$or 组合；字段缺失的行不匹配
+    （$ne/$nin 也不匹配，与 Chroma 一致）。
+    """
+    mask = np.ones(size, dtype=bool)
+    for field, condition in where.items():
+        if field in ("$and", "$or"):
+            parts = [where_mask(columns, part, size) for part in condition]
+            combined = np.logical_and.reduce(parts) if field == "$and" else np.logical_or.reduce(parts)
+            mask &= combined
+            continue
+
+        column = columns.get(field)
+        if column is None:
+            return np.zeros(size, dtype=bool)
+        column = column[:size]
+        present = np.not_equal(column, None)
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        for operator, operand in condition.items():
+            if operator == "$eq":
+                matched = column == operand
+            elif operator == "$ne":
+                matched = column != operand
+            elif operator in ("$in", "$nin"):
+                values = set(operand)
+                matched = np.fromiter((value in values for value in column), dtype=bool, count=size)
+                if operator == "$nin":
+                    matched = ~matched
+            elif operator in ("$gt", "$gte", "$lt", "$lte"):
+                compare = {
+                    "$gt": lambda value: value > operand,
+                    "$gte": lambda value: value >= operand,
+                    "$lt": lambda value: value < operand,
+                    "$lte": lambda value: value <= operand,
+                }[operator]
+                matched = np.fromiter(
+                    (isinstance(value, (int, float)) and compare(value) for value in column), dtype=bool, count=size
+                )
+            else:
+                raise ValueError(f"不支持的过滤运算符: {operator}")
+            mask &= np.asarray(matched, dtype=bool) & present
+    return mask
+
+
+def _where_fields(where: Dict) -> Set[str]:
+    """where 条件中引用的元数据字段"""
+    fields = set()
+    for field, condition in where.items():
+        if field in ("$and", "$or"):
+            for part in condition:
+                fields |= _where_fields(part)
+        else:
+            fields.add(field)
+    return fields
+
+
+class PostingIndex:
+    """元数据倒排表：索引字段的每个取值对应一组行号
+
+    过滤检索时先对索引字段上的相等 / $in 条件求交得到候选行，其余条件只在候选行上求值，
+    距离也只对候选行计算：过滤越严格，检索越快。
+    """
+
+    def __init__(self, fields: Iterable[str]):
+        self.fields = tuple(fields)
+        self._postings: Dict[str, Dict] = {field: {} for field in self.fields}
+        # 排好序的行号数组，倒排表变更时失效
+        self._arrays: Dict[Tuple[str, object], np.ndarray] = {}
+
+    def add(self, row: int, metadata: Dict) -> None:
+        for field in self.fields:
+            value = metadata.get(field)
+            if isinstance(value, _INDEXABLE_TYPES):
+                self._postings[field].setdefault(value, set()).add(row)
+                self._arrays.pop((field, value), None)
+
+    def discard(self, row: int, metadata: Dict) -> None:
+        for field in self.fields:
+            value = metadata.get(field)
+            rows = self._postings[field].get(value) if isinstance(value, _INDEXABLE_TYPES) else None
+            if rows is None:
+                continue
+            rows.discard(row)
+            if not rows:
+                del self._postings[field][value]
+            self._arrays.pop((field, value), None)
+
+    def rows(self, field: str, value) -> np.ndarray:
+        key = (field, value)
+        array = self._arrays.get(key)
+        if array is None:
+            array = np.array(sorted(self._postings[field].get(value, ())), dtype=np.int64)
+            self._arrays[key] = array
+        return array
+
+    def candidates(self, where: Dict) -> Tuple[Optional[np.ndarray], bool]:
+        """返回 (候选行号, 是否精确)
+
+        候选行是 where 命中行的超集（升序）；where 只包含索引字段上的相等 / $in 条件时是精确结果，
+        无需再逐行求值。没有可用的索引条件时候选为 None。
+        """
+        parts = []
+        exact = True
+        for field, condition in where.items():
+            if field in ("$and", "$or"):
+                resolved = [self.candidates(part) for part in condition]
+                if field == "$and":
+                    parts.extend(rows for rows, _ in resolved if rows is not None)
+                    exact = exact and all(rows is not None and part_exact for rows, part_exact in resolved)
+                elif resolved and all(rows is not None for rows, _ in resolved):
+                    union = resolved[0][0]
+                    for rows, _ in resolved[1:]:
+                        union = np.union1d(union, rows)
+                    parts.append(union)
+                    exact = exact and all(part_exact for _, part_exact in resolved)
+                else:
+                    exact = False
+                continue
+            if field not in self._postings:
+                exact = False
+                continue
+            if not isinstance(condition, dict):
+                condition = {"$eq": condition}
+            for operator, operand in condition.items():
+                try:
+                    if operator == "$eq":
+                        parts.append(self.rows(field, operand))
+                        continue
+                    if operator == "$in":
+                        lists = [self.rows(field, value) for value in set(operand)]
+                        parts.append(np.unique(np.concatenate(lists)) if lists else np.zeros(0, dtype=np.int64))
+                        continue
+                except TypeError:
+                    # 不可哈希的取值（如列表）交给逐行求值
+                    pass
+                exact = False
+        if not parts:
+            return None, False
+        parts.sort(key=len)
+        result = parts[0]
+        for rows in parts[1:]:
+            if not len(result):
+                break
+            result = np.intersect1d(result, rows, assume_unique=True)
+        return result, exact
+
+
+def _kmeans(data: np.ndarray, k: int, iterations: int, spherical: bool, seed: int = 0) -> np.ndarray:
+    """简单的 k-means（spherical=True 时质心归一化，用于余弦/内积空间）"""
+    rng = np.random.default_rng(seed)
+    centroids = data[rng.choice(len(data), size=k, replace=False)].copy()
+    for _ in range(iterations):
+        assign = _nearest_centroid(data, centroids, spherical)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, data)
+        counts = np.bincount(assign, minlength=k).astype(np.float32)
+        empty = counts == 0
+        # 空簇重新随机取点，避免质心退化
+        if empty.any():
+            sums[empty] = data[rng.choice(len(data), size=int(empty.sum()), replace=False)]
+            counts[empty] = 1
+        centroids = sums / counts[:, None]
+        if spherical:
+            centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+    return centroids.astype(np.float32)
+
+
+def _nearest_centroid(data: np.ndarray, centroids: np.ndarray, spherical: bool) -> np.ndarray:
+    scores = data @ centroids.T
+    if not spherical:
+        scores = scores - 0.5 * np.einsum("ij,ij->i", centroids, centroids)[None, :]
+    return np.argmax(scores, axis=1).astype(np.int32)
+
+
+class ScalarQuantizer:
+    """int8 标量量化：每行按最大绝对值对称缩放，编码大小为 float32 的 1/4，无需训练"""
+
+    trained = True
+
+    def __init__(self, path: str, dim: int, capacity: int):
+        self.path = path
+        self.dim = dim
+        self.resize(capacity)
+
+    def resize(self, capacity: int) -> None:
+        self.codes = _open_memmap(os.path.join(self.path, "sq_codes.bin"), np.int8, (capacity, self.dim))
+        self.scales = _open_memmap(os.path.join(self.path, "sq_scales.bin"), np.float32, (capacity,))
+
+    def row_bytes(self) -> int:
+        return self.dim + 4
+
+    def encode(self, rows, vectors: np.ndarray) -> None:
+        scales = np.maximum(np.abs(vectors).max(axis=1), 1e-12) / 127
+        self.codes[rows] = np.round(vectors / scales[:, None]).astype(np.int8)
+        self.scales[rows] = scales
+
+    def dots(self, index, queries: np.ndarray) -> np.ndarray:
+        """近似内积，返回 (行数, 查询数)"""
+        codes = self.codes[index]
+        result = np.empty((len(codes), len(queries)), dtype=np.float32)
+        # 分小块转换为 float32，转换结果留在CPU缓存中，比整块转换快2-3倍
+        for start in range(0, len(codes), SQ_CONVERT_ROWS):
+            part = codes[start : start + SQ_CONVERT_ROWS]
+            result[start : start + len(part)] = part.astype(np.float32) @ queries.T
+        return result * np.asarray(self.scales[index])[:, None]
+
+    def flush(self) -> None:
+        self.codes.flush()
+        self.scales.flush()
+
+
+class ProductQuantizer:
+    """乘积量化：向量切成 m 段，每段用256个质心之一的编号表示，每行 m 字节
+
+    检索时先算查询每段与各质心的内积表，再按编号查表求和（ADC）。码本需要用已有数据训练。
+    """
+
+    def __init__(self, path: str, dim: int, capacity: int, subvectors: int = 0):
+        self.path = path
+        self.dim = dim
+        self.subvectors = subvectors if subvectors and dim % subvectors == 0 else self.default_subvectors(dim)
+        self.codebook: Optional[np.ndarray] = None
+        codebook_path = os.path.join(path, "pq_codebook.npy")
+        if os.path.exists(codebook_path):
+            self.codebook = np.load(codebook_path)
+            self.subvectors = self.codebook.shape[0]
+        self.resize(capacity)
+
+    @staticmethod
+    def default_subvectors(dim: int) -> int:
+        """默认每段4维；维度不能整除时取不超过 dim/4 的最大约数"""
+        for subvectors in range(max(dim // 4, 1), 0, -1):
+            if dim % subvectors == 0:
+                return subvectors
+        return 1
+
+    @property
+    def trained(self) -> bool:
+        return self.codebook is not None
+
+    def resize(self, capacity: int) -> None:
+        self.codes = _open_memmap(os.path.join(self.path, "pq_codes.bin"), np.uint8, (capacity, self.subvectors))
+
+    def row_bytes(self) -> int:
+        return self.subvectors
+
+    def _split(self, vectors: np.ndarray) -> np.ndarray:
+        return vectors.reshape(len(vectors), self.subvectors, self.dim // self.subvectors)
+
+    def train(self, sample: np.ndarray, iterations: int = 10) -> None:
+        parts = self._split(sample)
+        centroids = min(PQ_CENTROIDS, len(sample))
+        codebook = np.zeros((self.subvectors, PQ_CENTROIDS, parts.shape[2]), dtype=np.float32)
+        for j in range(self.subvectors):
+            codebook[j, :centroids] = _kmeans(np.ascontiguousarray(parts[:, j]), centroids, iterations, spherical=False)
+            # 样本不足256行时多余的质心复制第一个，编码时不会被选中
+            codebook[j, centroids:] = codebook[j, 0]
+        self.codebook = codebook
+        np.save(os.path.join(self.path, "pq_codebook.npy"), codebook)
+
+    def encode(self, rows, vectors: np.ndarray) -> None:
+        parts = self._split(vectors)
+        codes = np.empty((len(vectors), self.subvectors), dtype=np.uint8)
+        for j in range(self.subvectors):
+            codes[:, j] = _nearest_centroid(np.ascontiguousarray(parts[:, j]), self.codebook[j], spherical=False)
+        self.codes[rows] = codes
+
+    def dots(self, index, queries: np.ndarray) -> np.ndarray:
+        """近似内积（查表求和），返回 (行数, 查询数)"""
+        tables = np.einsum("mkd,qmd->qmk", self.codebook, self._split(queries)).reshape(len(queries), -1)
+        offsets = np.asarray(self.codes[index], dtype=np.intp) + np.arange(self.subvectors) * PQ_CENTROIDS
+        return np.stack([table[offsets].sum(axis=1) for table in tables], axis=1)
+
+    def flush(self) -> None:
+        self.codes.flush()
+
+
+class NumpyCollection:
+    """单个集合的 flat / IVF 向量索引，接口与 chromadb Collection 的常用子集一致
+
+    读写由一把锁保护结构变更；检索时在锁内取得数组引用，矩阵运算在锁外执行，多个线程可以
+    并发检索。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        path: str,
+        metadata: Optional[Dict] = None,
+        dtype: Optional[str] = None,
+        embedding_function: Optional[Callable[[List[str]], List[List[float]]]] = None,
+        ivf_min_rows: int = 50000,
+        ivf_nprobe: int = 16,
+        pq_subvectors: int = 0,
+        rerank_factor: int = 10,
+        indexed_fields: Iterable[str] = (),
+    ):
+        """dtype 为集合精度 float32/float16/int8/pq，为 None 时沿用已有集合的精度（新集合为 float32）；
+        indexed_fields 为建立倒排表的元数据字段"""
+        self.name = name
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._lock = threading.RLock()
+        # compact() 重新编号行时加一，检索据此发现行号在计算距离期间失效
+        self._generation = 0
+        self._embedding_function = embedding_function
+        self.ivf_min_rows = ivf_min_rows
+        self.ivf_nprobe = ivf_nprobe
+        self.pq_subvectors = pq_subvectors
+        self.rerank_factor = max(rerank_factor, 1)
+        self._indexed_fields = tuple(indexed_fields)
+        if dtype is not None and dtype not in _STORAGE_DTYPES:
+            raise ValueError(f"不支持的向量精度: {dtype}")
+
+        meta_path = os.path.join(path, "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path, encoding="utf-8") as handle:
+                self._meta = json.load(handle)
+        else:
+            space = (metadata or {}).get("hnsw:space", "l2")
+            if space not in _SUPPORTED_SPACES:
+                raise ValueError(f"不支持的距离类型: {space}")
+            self._meta = {
+                "dim": None,
+                "dtype": dtype or "float32",
+                "space": space,
+                "capacity": 0,
+                "metadata": metadata or {},
+                "ivf_trained_rows": 0,
+            }
+            self._save_meta()
+        self.metadata = self._meta["metadata"]
+        converted = dtype is not None and dtype != self._meta["dtype"] and self._convert_precision(dtype)
+        self._dtype = _STORAGE_DTYPES[self._meta["dtype"]]
+
+        self._db = sqlite3.connect(os.path.join(path, "records.sqlite3"), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS records ("
+            "row INTEGER PRIMARY KEY, id TEXT NOT NULL UNIQUE, document TEXT, metadata TEXT)"
+        )
+        self._load()
+        if converted:
+            self._encode_all()
+            self._maybe_train_pq()
+
+    # ==================== 加载与持久化 ====================
+
+    @property
+    def precision(self) -> str:
+        return self._meta["dtype"]
+
+    def _convert_precision(self, dtype: str) -> bool:
+        """切换已有集合的精度：float32/int8/pq 共用 float32 原始向量，只需重建编码；
+        与 float16 之间切换需要原始向量，只记录警告，重建集合后生效"""
+        if _STORAGE_DTYPES[dtype] != _STORAGE_DTYPES[self._meta["dtype"]]:
+            logger.warning(f"集合 {self.name} 的精度为 {self._meta['dtype']}，切换为 {dtype} 需重建集合")
+            return False
+        logger.info(f"集合 {self.name} 精度由 {self._meta['dtype']} 切换为 {dtype}，重建量化编码")
+        for filename in ("sq_codes.bin", "sq_scales.bin", "pq_codes.bin", "pq_codebook.npy"):
+            path = os.path.join(self.path, filename)
+            if os.path.exists(path):
+                os.remove(path)
+        self._meta["dtype"] = dtype
+        self._save_meta()
+        return True
+
+    def _create_quantizer(self, capacity: int):
+        if self._meta["dtype"] == "int8":
+            return ScalarQuantizer(self.path, self._meta["dim"], capacity)
+        if self._meta["dtype"] == "pq":
+            return ProductQuantizer(self.path, self._meta["dim"], capacity, self.pq_subvectors)
+        return None
+
+    def _save_meta(self) -> None:
+        meta_path = os.path.join(self.path, "meta.json")
+        with open(meta_path + ".tmp", "w", encoding="utf-8") as handle:
+            json.dump(self._meta, handle, ensure_ascii=False)
+        os.replace(meta_path + ".tmp", meta_path)
+
+    def _load(self) -> None:
+        """从 SQLite 重建行号映射、墓碑和列式元数据，映射向量与IVF文件"""
+        rows = self._db.execute("SELECT row, id, metadata FROM records ORDER BY row").fetchall()
+        self._size = rows[-1][0] + 1 if rows else 0
+        capacity = max(self._meta["capacity"], self._size)
+        self._ids: List[Optional[str]] = [None] * capacity
+        self._alive = np.zeros(capacity, dtype=bool)
+        self._row_of: Dict[str, int] = {}
+        self._columns: Dict[str, np.ndarray] = {}
+        self._postings = PostingIndex(self._indexed_fields)
+        for row, item_id, metadata in rows:
+            self._ids[row] = item_id
+            self._alive[row] = True
+            self._row_of[item_id] = row
+            self._set_columns(row, json.loads(metadata) if metadata else {}, capacity)
+
+        self._vectors = None
+        self._norms = None
+        self._quantizer = None
+        if self._meta["dim"]:
+            self._vectors = _open_memmap(
+                os.path.join(self.path, "vectors.bin"), self._dtype, (self._meta["capacity"], self._meta["dim"])
+            )
+            self._quantizer = self._create_quantizer(self._meta["capacity"])
+            if self._meta["space"] == "l2":
+                self._norms = np.zeros(self._meta["capacity"], dtype=np.float32)
+                for start in range(0, self._size, SEARCH_BLOCK_ROWS):
+                    block = np.asarray(self._vectors[start : start + SEARCH_BLOCK_ROWS], dtype=np.float32)
+                    self._norms[start : start + len(block)] = np.einsum("ij,ij->i", block, block)
+
+        self._centroids = None
+        self._assign = None
+        self._ivf_lists: List[np.ndarray] = []
+        self._ivf_pending: Dict[int, List[int]] = {}
+        if self._meta["ivf_trained_rows"]:
+            self._centroids = np.load(os.path.join(self.path, "ivf_centroids.npy"))
+            self._assign = _open_memmap(os.path.join(self.path, "ivf_assign.bin"), np.int32, (self._meta["capacity"],))
+            self._rebuild_ivf_lists()
+
+    def _set_columns(self, row: int, metadata: Dict, capacity: int) -> None:
+        for field, value in metadata.items():
+            column = self._columns.get(field)
+            if column is None:
+                column = self._columns[field] = np.full(capacity, None, dtype=object)
+            column[row] = value
+        self._postings.add(row, metadata)
+
+    def _clear_columns(self, row: int) -> None:
+        self._postings.discard(
+            row, {field: self._columns[field][row] for field in self._postings.fields if field in self._columns}
+        )
+        for column in self._columns.values():
+            column[row] = None
+
+    def _ensure_capacity(self, needed: int, dim: int) -> None:
+        """按需扩容向量、墓碑、列、IVF分配和量化编码数组"""
+        if self._meta["dim"] is None:
+            self._meta["dim"] = dim
+        elif dim != self._meta["dim"]:
+            raise ValueError(f"向量维度({dim})与集合维度({self._meta['dim']})不一致")
+        capacity = self._meta["capacity"]
+        if needed <= capacity and self._vectors is not None:
+            return
+        new_capacity = max(needed, capacity * 2, 1024)
+        if self._vectors is not None:
+            self._vectors.flush()
+        self._vectors = _open_memmap(os.path.join(self.path, "vectors.bin"), self._dtype, (new_capacity, dim))
+        self._alive = np.concatenate([self._alive, np.zeros(new_capacity - len(self._alive), dtype=bool)])
+        self._ids.extend([None] * (new_capacity - len(self._ids)))
+        for field, column in self._columns.items():
+            self._columns[field] = np.concatenate([column, np.full(new_capacity - len(column), None, dtype=object)])
+        if self._norms is not None or self._meta["space"] == "l2":
+            norms = np.zeros(new_capacity, dtype=np.float32)
+            if self._norms is not None:
+                norms[: len(self._norms)] = self._norms
+            self._norms = norms
+        if self._assign is not None:
+            self._assign.flush()
+            self._assign = _open_memmap(os.path.join(self.path, "ivf_assign.bin"), np.int32, (new_capacity,))
+        if self._quantizer is None:
+            self._quantizer = self._create_quantizer(new_capacity)
+        else:
+            self._quantizer.flush()
+            self._quantizer.resize(new_capacity)
+        self._meta["capacity"] = new_capacity
+        self._save_meta()
+
+    # ==================== 写入 ====================
+
+    def _prepare_embeddings(self, embeddings, documents, count: int) -> np.ndarray:
+        if embeddings is None:
+            if documents is None:
+                raise ValueError("必须提供 embeddings 或 documents")
+            if self._embedding_function is None:
+                raise ValueError(f"集合 {self.name} 未配置嵌入函数，写入时必须提供 embeddings")
+            embeddings = self._embedding_function(documents)
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        if vectors.ndim != 2 or len(vectors) != count:
+            raise ValueError(f"向量数量({len(vectors)})与id数量({count})不一致")
+        if self._meta["space"] == "cosine":
+            vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        return vectors
+
+    def add(self, ids, embeddings=None, metadatas=None, documents=None) -> None:
+        """写入新记录，已存在的id被忽略（与 Chroma 一致）"""
+        ids = _as_list(ids)
+        with self._lock:
+            keep = [i for i, item_id in enumerate(ids) if item_id not in self._row_of]
+            if len(keep) < len(ids):
+                logger.warning(f"集合 {self.name} 中已存在 {len(ids) - len(keep)} 个id，已跳过")
+            if not keep:
+                return
+            self._write(ids, embeddings, metadatas, documents, keep, merge_metadata=False)
+
+    def upsert(self, ids, embeddings=None, metadatas=None, documents=None) -> None:
+        """写入或覆盖记录"""
+        ids = _as_list(ids)
+        with self._lock:
+            self._write(ids, embeddings, metadatas, documents, list(range(len(ids))), merge_metadata=False)
+
+    def update(self, ids, embeddings=None, metadatas=None, documents=None) -> None:
+        """更新已存在的记录：元数据按键合并（值为None的键删除），提供文本或向量时重新写入向量"""
+        ids = _as_list(ids)
+        with self._lock:
+            missing = [item_id for item_id in ids if item_id not in self._row_of]
+            if missing:
+                logger.warning(f"集合 {self.name} 中不存在 {len(missing)} 个待更新的id，已跳过")
+            keep = [i for i, item_id in enumerate(ids) if item_id in self._row_of]
+            if keep:
+                self._write(ids, embeddings, metadatas, documents, keep, merge_metadata=True)
+
+    def _write(self, ids, embeddings, metadatas, documents, positions, merge_metadata: bool) -> None:
+        """写入 positions 指定的记录，调用方持有锁；同一批中的id重复时抛出 ValueError（与 Chroma 一致）"""
+        repeated = sorted(item_id for item_id, n in Counter(ids[i] for i in positions).items() if n > 1)
+        if repeated:
+            raise ValueError(f"写入集合 {self.name} 的id重复: {', '.join(repeated[:5])}")
+        metadatas = _as_list(metadatas)
+        documents = _as_list(documents)
+        if embeddings is not None and len(embeddings) and not isinstance(embeddings[0], (list, tuple, np.ndarray)):
+            embeddings = [embeddings]
+        pick = lambda values: [values[i] for i in positions] if values is not None else None  # noqa: E731
+        vectors = None
+        if embeddings is not None or documents is not None or not merge_metadata:
+            vectors = self._prepare_embeddings(pick(embeddings), pick(documents), len(positions))
+
+        rows = []
+        next_row = self._size
+        for i in positions:
+            row = self._row_of.get(ids[i])
+            if row is None:
+                row = next_row
+                next_row += 1
+            rows.append(row)
+        if vectors is not None:
+            self._ensure_capacity(next_row, vectors.shape[1])
+            row_index = np.asarray(rows)
+            self._vectors[row_index] = vectors.astype(self._dtype)
+            self._vectors.flush()
+            if self._norms is not None:
+                self._norms[row_index] = np.einsum("ij,ij->i", vectors, vectors)
+            if self._centroids is not None:
+                self._assign_rows(row_index, vectors)
+            if self._quantizer is not None and self._quantizer.trained:
+                self._quantizer.encode(row_index, vectors)
+                self._quantizer.flush()
+
+        records = []
+        for offset, i in enumerate(positions):
+            row, item_id = rows[offset], ids[i]
+            existing = None
+            if merge_metadata:
+                existing = self._db.execute("SELECT document, metadata FROM records WHERE row = ?", (row,)).fetchone()
+            metadata = metadatas[i] if metadatas is not None else None
+            document = documents[i] if documents is not None else None
+            if merge_metadata and existing:
+                merged = json.loads(existing[1]) if existing[1] else {}
+                if metadata:
+                    merged.update(metadata)
+                metadata = {key: value for key, value in merged.items() if value is not None}
+                document = document if document is not None else existing[0]
+            metadata = metadata or {}
+            records.append((row, item_id, document, json.dumps(metadata, ensure_ascii=False)))
+
+            self._clear_columns(row)
+            self._set_columns(row, metadata, self._meta["capacity"])
+            self._ids[row] = item_id
+            self._alive[row] = True
+            self._row_of[item_id] = row
+
+        with self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO records (row, id, document, metadata) VALUES (?, ?, ?, ?)", records
+            )
+        self._size = max(self._size, next_row)
+        self._maybe_train_pq()
+        self._maybe_train_ivf()
+
+    def delete(self, ids=None, where=None) -> None:
+        """删除记录（打墓碑，行号不复用）"""
+        with self._lock:
+            rows = self._select_rows(_as_list(ids), where)
+            if not len(rows):
+                return
+            for row in rows:
+                del self._row_of[self._ids[row]]
+                self._ids[row] = None
+                self._clear_columns(row)
+            self._alive[rows] = False
+            with self._db:
+                self._db.executemany("DELETE FROM records WHERE row = ?", [(int(row),) for row in rows])
+
+    def compact(self) -> Dict[str, int]:
+        """去掉墓碑行占用的空间：存活行按原顺序重新连续编号，重写向量和IVF分配文件，
+        量化编码按原始向量重新生成。期间持有锁，写入会等待；检索只在取行号和回表时持锁，
+        计算距离期间发生压缩的检索会重新执行。返回 {"rows", "removed"}"""
+        with self._lock:
+            rows = np.flatnonzero(self._alive[: self._size])
+            removed = self._size - len(rows)
+            if not removed:
+                return {"rows": len(rows), "removed": 0}
+            capacity = max(len(rows), 1024)
+            self._rewrite_rows("vectors.bin", self._vectors, rows, capacity)
+            if self._assign is not None:
+                self._rewrite_rows("ivf_assign.bin", self._assign, rows, capacity)
+            for filename in ("sq_codes.bin", "sq_scales.bin", "pq_codes.bin"):
+                path = os.path.join(self.path, filename)
+                if os.path.exists(path):
+                    os.remove(path)
+            # 行号升序改写：新行号不大于旧行号，且比它小的行号都已腾出，主键不会冲突
+            with self._db:
+                self._db.executemany(
+                    "UPDATE records SET row = ? WHERE row = ?",
+                    [(new_row, int(row)) for new_row, row in enumerate(rows) if new_row != row],
+                )
+            self._db.execute("VACUUM")
+            self._meta["capacity"] = capacity
+            self._save_meta()
+            self._vectors = self._assign = self._quantizer = None
+            self._generation += 1
+            self._load()
+            self._encode_all()
+            logger.info(f"集合 {self.name} 压缩完成: 保留 {len(rows)} 行, 移除 {removed} 个墓碑")
+            return {"rows": len(rows), "removed": int(removed)}
+
+    def _rewrite_rows(self, filename: str, source: np.memmap, rows: np.ndarray, capacity: int) -> None:
+        """把 source 中 rows 指定的行依次写入新文件，再替换原文件"""
+        path = os.path.join(self.path, filename)
+        if os.path.exists(path + ".compact"):
+            os.remove(path + ".compact")
+        target = _open_memmap(path + ".compact", source.dtype, (capacity, *source.shape[1:]))
+        for start in range(0, len(rows), SEARCH_BLOCK_ROWS):
+            part = rows[start : start + SEARCH_BLOCK_ROWS]
+            target[start : start + len(part)] = source[part]
+        target.flush()
+        del target
+        os.replace(path + ".compact", path)
+
+    # ==================== 读取 ====================
+
+    def count(self) -> int:
+        return len(self._row_of)
+
+    def _select_rows(self, ids: Optional[List[str]], where: Optional[Dict]) -> np.ndarray:
+        """按 id 和/或 where 选出存活行号（按行号升序）"""
+        rows = None
+        if ids is not None:
+            rows = np.array(
+                sorted({self._row_of[item_id] for item_id in ids if item_id in self._row_of}), dtype=np.int64
+            )
+        return self._match_rows(where, rows)
+
+    def _match_rows(self, where: Optional[Dict], rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """where 命中的存活行号（升序），rows 为已知的候选行
+
+        没有给定候选时先用倒排表求出索引字段上的候选，只在候选行上求值其余条件；
+        都不可用时才对整列求值。
+        """
+        exact = False
+        if rows is None and where:
+            rows, exact = self._postings.candidates(where)
+        if rows is None:
+            mask = self._alive[: self._size].copy()
+            if where:
+                mask &= where_mask(self._columns, where, self._size)
+            return np.flatnonzero(mask)
+        if where and not exact and len(rows):
+            columns = {field: self._columns[field][rows] for field in _where_fields(where) if field in self._columns}
+            rows = rows[where_mask(columns, where, len(rows))]
+        return rows
+
+    def _fetch(self, rows: Sequence[int], include: Iterable[str]) -> Tuple[List, List]:
+        """从 SQLite 读取行的文本和元数据，保持 rows 的顺序"""
+        need_documents = "documents" in include
+        need_metadatas = "metadatas" in include
+        if not (need_documents or need_metadatas) or not len(rows):
+            return [], []
+        found = {}
+        row_list = [int(row) for row in rows]
+        for start in range(0, len(row_list), 900):
+            part = row_list[start : start + 900]
+            placeholders = ",".join("?" * len(part))
+            for row, document, metadata in self._db.execute(
+                f"SELECT row, document, metadata FROM records WHERE row IN ({placeholders})", part
+            ):
+                found[row] = (document, json.loads(metadata) if metadata else {})
+        documents = [found.get(row, (None, {}))[0] for row in row_list]
+        metadatas = [found.get(row, (None, {}))[1] for row in row_list]
+        return documents, metadatas
+
+    def get(self, ids=None, where=None, limit=None, offset=None, include=("metadatas", "documents"), **kwargs) -> Dict:
+        """按 id / where 读取记录，返回结构与 Chroma 的 GetResult 一致"""
+        with self._lock:
+            ids = _as_list(ids)
+            rows = self._select_rows(ids, where)
+            if ids is not None:
+                # 与 Chroma 一样按请求的 id 顺序返回
+                order = {item_id: index for index, item_id in enumerate(ids)}
+                rows = np.asarray(sorted(rows, key=lambda row: order[self._ids[row]]), dtype=np.int64)
+            rows = rows[offset or 0 :]
+            if limit is not None:
+                rows = rows[:limit]
+            result_ids = [self._ids[row] for row in rows]
+            documents, metadatas = self._fetch(rows, include)
+            embeddings = (
+                np.asarray(self._vectors[rows], dtype=np.float32).tolist()
+                if "embeddings" in include and len(rows)
+                else None
+            )
+        return {
+            "ids": result_ids,
+            "embeddings": embeddings if "embeddings" in include else None,
+            "documents": documents if "documents" in include else None,
+            "metadatas": metadatas if "metadatas" in include else None,
+        }
+
+    def query(
+        self,
+        query_embeddings=None,
+        query_texts=None,
+        n_results: int = 10,
+        where=None,
+        include=("metadatas", "documents", "distances"),
+        **kwargs,
+    ) -> Dict:
+        """最近邻检索，返回结构与 Chroma 的 QueryResult 一致（每条查询一组结果）"""
+        if query_embeddings is None:
+            texts = _as_list(query_texts)
+            if texts is None:
+                raise ValueError("必须提供 query_embeddings 或 query_texts")
+            if self._embedding_function is None:
+                raise ValueError(f"集合 {self.name} 未配置嵌入函数，检索时必须提供 query_embeddings")
+            query_embeddings = self._embedding_function(texts)
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        if queries.ndim == 1:
+            queries = queries[None, :]
+        while True:
+            result = self._search(queries, n_results, where, include)
+            if result is not None:
+                return result
+
+    def _search(self, queries: np.ndarray, n_results: int, where, include) -> Optional[Dict]:
+        """执行一次检索；期间集合被压缩（行号已重新编号）时返回 None，由调用方重试"""
+        with self._lock:
+            generation = self._generation
+            size = self._size
+            vectors = self._vectors
+            norms = self._norms
+            if where:
+                # 倒排表先缩小候选，距离只对命中行计算
+                rows = self._match_rows(where)
+                mask = np.zeros(size, dtype=bool)
+                mask[rows] = True
+            else:
+                mask = self._alive[:size].copy()
+                rows = np.flatnonzero(mask)
+            quantizer = self._quantizer if self._quantizer is not None and self._quantizer.trained else None
+            candidates = None
+            if self._centroids is not None and len(rows) > FILTERED_EXACT_MAX_ROWS:
+                candidates = [self._ivf_candidates(query) for query in self._normalize_queries(queries)]
+
+        empty = {key: [[] for _ in range(len(queries))] for key in ("ids", "distances", "documents", "metadatas")}
+        if vectors is None or size == 0 or n_results <= 0:
+            return self._query_result(empty, include)
+
+        queries = self._normalize_queries(queries)
+        source = (vectors, norms, quantizer)
+        # 量化编码只用于粗排，多取 rerank_factor 倍候选再用原始向量重排
+        depth = n_results * self.rerank_factor if quantizer is not None else n_results
+        if candidates is None:
+            if len(rows) <= FILTERED_EXACT_MAX_ROWS and len(rows) < size:
+                top_rows, top_distances = self._search_rows(source, rows, queries, depth)
+            else:
+                top_rows, top_distances = self._search_blocked(source, mask, queries, depth)
+        else:
+            top_rows, top_distances = [], []
+            for query, rows in zip(queries, candidates):
+                rows = rows[mask[rows]]
+                found_rows, found_distances = self._search_rows(source, rows, query[None, :], depth)
+                if len(found_rows[0]) < n_results:
+                    # 过滤条件使探查的倒排表中候选不足时退回精确检索
+                    found_rows, found_distances = self._search_blocked(source, mask, query[None, :], depth)
+                top_rows.append(found_rows[0])
+                top_distances.append(found_distances[0])
+        if quantizer is not None:
+            reranked = [
+                self._search_rows((vectors, norms, None), rows, query[None, :], n_results)
+                for rows, query in zip(top_rows, queries)
+            ]
+            top_rows = [found_rows[0] for found_rows, _ in reranked]
+            top_distances = [found_distances[0] for _, found_distances in reranked]
+
+        result = {"ids": [], "distances": [], "documents": [], "metadatas": []}
+        with self._lock:
+            if self._generation != generation:
+                return None
+            for rows, distances in zip(top_rows, top_distances):
+                # 检索期间被删除的行不返回
+                keep = [i for i, row in enumerate(rows) if self._alive[row]]
+                rows = [int(rows[i]) for i in keep]
+                documents, metadatas = self._fetch(rows, include)
+                result["ids"].append([self._ids[row] for row in rows])
+                result["distances"].append([float(distances[i]) for i in keep])
+                result["documents"].append(documents)
+                result["metadatas"].append(metadatas)
+        return self._query_result(result, include)
+
+    @staticmethod
+    def _query_result(result: Dict, include) -> Dict:
+        return {
+            "ids": result["ids"],
+            "embeddings": None,
+            "distances": result["distances"] if "distances" in include else None,
+            "documents": result["documents"] if "documents" in include else None,
+            "metadatas": result["metadatas"] if "metadatas" in include else None,
+        }
+
+    def _normalize_queries(self, queries: np.ndarray) -> np.ndarray:
+        if self._meta["space"] == "cosine":
+            return queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+        return queries
+
+    def _distances(self, source, index, queries: np.ndarray) -> np.ndarray:
+        """返回 index 所指行与查询的 (行数, 查询数) 距离矩阵，与 Chroma(hnswlib) 的定义一致
+
+        source 为 (原始向量, 范数, 量化器)，量化器不为空时用编码计算近似距离。
+        """
+        vectors, norms, quantizer = source
+        if quantizer is not None:
+            dots = quantizer.dots(index, queries)
+        else:
+            dots = np.asarray(vectors[index], dtype=np.float32) @ queries.T
+        if self._meta["space"] == "l2":
+            query_norms = np.einsum("ij,ij->i", queries, queries)
+            return np.maximum(norms[index][:, None] - 2 * dots + query_norms[None, :], 0)
+        return 1.0 - dots
+
+    def _search_blocked(self, source, mask: np.ndarray, queries: np.ndarray, k: int):
+        """分块扫描检索，每块只保留每条查询的前k个"""
+        size = len(mask)
+        best_distances = np.full((len(queries), 0), np.inf, dtype=np.float32)
+        best_rows = np.zeros((len(queries), 0), dtype=np.int64)
+        for start in range(0, size, SEARCH_BLOCK_ROWS):
+            end = min(start + SEARCH_BLOCK_ROWS, size)
+            block_mask = mask[start:end]
+            if not block_mask.any():
+                continue
+            distances = self._distances(source, slice(start, end), queries).T
+            distances[:, ~block_mask] = np.inf
+            rows = np.broadcast_to(np.arange(start, end), distances.shape)
+            best_distances, best_rows = self._merge_topk(
+                np.concatenate([best_distances, distances], axis=1), np.concatenate([best_rows, rows], axis=1), k
+            )
+        return self._finalize(best_rows, best_distances)
+
+    def _search_rows(self, source, rows: np.ndarray, queries: np.ndarray, k: int):
+        """在给定行上检索（过滤后行数较少、IVF候选或重排）"""
+        if not len(rows):
+            return [np.zeros(0, dtype=np.int64)] * len(queries), [np.zeros(0, dtype=np.float32)] * len(queries)
+        rows = np.sort(rows)
+        distances = self._distances(source, rows, queries).T
+        best_distances, best_rows = self._merge_topk(distances, np.broadcast_to(rows, distances.shape), k)
+        return self._finalize(best_rows, best_distances)
+
+    @staticmethod
+    def _merge_topk(distances: np.ndarray, rows: np.ndarray, k: int):
+        if distances.shape[1] > k:
+            index = np.argpartition(distances, k - 1, axis=1)[:, :k]
+            distances = np.take_along_axis(distances, index, axis=1)
+            rows = np.take_along_axis(rows, index, axis=1)
+        return distances, rows
+
+    @staticmethod
+    def _finalize(rows: np.ndarray, distances: np.ndarray):
+        order = np.argsort(distances, axis=1, kind="stable")
+        rows = np.take_along_axis(rows, order, axis=1)
+        distances = np.take_along_axis(distances, order, axis=1)
+        finite = np.isfinite(distances)
+        return [r[f] for r, f in zip(rows, finite)], [d[f] for d, f in zip(distances, finite)]
+
+    # ==================== 量化 ====================
+
+    def _encode_all(self) -> None:
+        """用原始向量重新编码所有行（切换精度或训练码本后）"""
+        if self._quantizer is None or not self._quantizer.trained:
+            return
+        for start in range(0, self._size, SEARCH_BLOCK_ROWS):
+            end = min(start + SEARCH_BLOCK_ROWS, self._size)
+            self._quantizer.encode(slice(start, end), np.asarray(self._vectors[start:end], dtype=np.float32))
+        self._quantizer.flush()
+
+    def _maybe_train_pq(self) -> None:
+        """pq 精度的集合达到 PQ_TRAIN_MIN_ROWS 行时训练码本，此前按原始向量精确检索"""
+        if isinstance(self._quantizer, ProductQuantizer) and not self._quantizer.trained:
+            if len(self._row_of) >= PQ_TRAIN_MIN_ROWS:
+                self.build_pq()
+
+    def build_pq(self, sample_size: int = 65536, iterations: int = 10) -> None:
+        """（重新）训练乘积量化码本并编码所有行"""
+        with self._lock:
+            if not isinstance(self._quantizer, ProductQuantizer):
+                raise ValueError(f"集合 {self.name} 的精度为 {self.precision}，不使用乘积量化")
+            rows = np.flatnonzero(self._alive[: self._size])
+            rng = np.random.default_rng(0)
+            sample_rows = np.sort(rng.choice(rows, size=min(len(rows), sample_size), replace=False))
+            sample = np.asarray(self._vectors[sample_rows], dtype=np.float32)
+            logger.info(f"集合 {self.name} 训练PQ码本: {self._quantizer.subvectors} 段, 样本 {len(sample)}")
+            self._quantizer.train(sample, iterations)
+            self._encode_all()
+
+    def memory_usage(self) -> Dict[str, int]:
+        """检索时扫描的常驻数据字节数（scan）与原始向量字节数（vectors）"""
+        rows = self._size
+        vector_bytes = rows * (self._meta["dim"] or 0) * np.dtype(self._dtype).itemsize
+        if self._quantizer is not None and self._quantizer.trained:
+            scan_bytes = rows * self._quantizer.row_bytes()
+        else:
+            scan_bytes = vector_bytes
+        return {"scan": scan_bytes, "vectors": vector_bytes}
+
+    # ==================== IVF ====================
+
+    def _maybe_train_ivf(self) -> None:
+        """存活行数达到 ivf_min_rows 且自上次训练增长到4倍以上时（重新）训练粗量化器"""
+        alive = len(self._row_of)
+        trained = self._meta["ivf_trained_rows"]
+        if self.ivf_min_rows and alive >= self.ivf_min_rows and (not trained or alive >= 4 * trained):
+            self.build_ivf()
+
+    def build_ivf(self, nlist: Optional[int] = None, iterations: int = 10, sample_per_list: int = 64) -> int:
+        """训练IVF粗量化器并为所有行分配倒排表，返回倒排表数量"""
+        with self._lock:
+            rows = np.flatnonzero(self._alive[: self._size])
+            if not len(rows):
+                return 0
+            nlist = nlist or max(1, int(math.sqrt(len(rows))))
+            nlist = min(nlist, len(rows))
+            rng = np.random.default_rng(0)
+            sample_rows = np.sort(rng.choice(rows, size=min(len(rows), nlist * sample_per_list), replace=False))
+            sample = np.asarray(self._vectors[sample_rows], dtype=np.float32)
+            spherical = self._meta["space"] != "l2"
+            logger.info(f"集合 {self.name} 训练IVF: {len(rows)} 行, {nlist} 个倒排表, 样本 {len(sample)}")
+            self._centroids = _kmeans(sample, nlist, iterations, spherical)
+            np.save(os.path.join(self.path, "ivf_centroids.npy"), self._centroids)
+
+            self._assign = _open_memmap(os.path.join(self.path, "ivf_assign.bin"), np.int32, (self._meta["capacity"],))
+            for start in range(0, self._size, SEARCH_BLOCK_ROWS):
+                block = np.asarray(self._vectors[start : start + SEARCH_BLOCK_ROWS], dtype=np.float32)
+                self._assign[start : start + len(block)] = _nearest_centroid(block, self._centroids, spherical)
+            self._assign.flush()
+            self._rebuild_ivf_lists()
+            self._meta["ivf_trained_rows"] = len(rows)
+            self._save_meta()
+            return nlist
+
+    def _rebuild_ivf_lists(self) -> None:
+        assign = np.asarray(self._assign[: self._size])
+        order = np.argsort(assign, kind="stable")
+        bounds = np.searchsorted(assign[order], np.arange(len(self._centroids) + 1))
+        self._ivf_lists = [order[bounds[i] : bounds[i + 1]] for i in range(len(self._centroids))]
+        self._ivf_pending = {}
+
+    def _assign_rows(self, rows: np.ndarray, vectors: np.ndarray) -> None:
+        """训练后新写入的行分配到最近的倒排表（覆盖写入的行会在旧表中残留，检索时按分配过滤）"""
+        assign = _nearest_centroid(vectors, self._centroids, self._meta["space"] != "l2")
+        self._assign[rows] = assign
+        for row, list_id in zip(rows, assign):
+            self._ivf_pending.setdefault(int(list_id), []).append(int(row))
+
+    def _ivf_candidates(self, query: np.ndarray) -> np.ndarray:
+        """取离查询最近的 nprobe 个倒排表中的行，调用方持有锁"""
+        scores = self._centroids @ query
+        if self._meta["space"] == "l2":
+            scores = scores - 0.5 * np.einsum("ij,ij->i", self._centroids, self._centroids)
+        nprobe = min(self.ivf_nprobe, len(self._centroids))
+        probes = np.argpartition(-scores, nprobe - 1)[:nprobe]
+        parts = []
+        for list_id in probes:
+            if list_id in self._ivf_pending:
+                pending = np.asarray(self._ivf_pending.pop(list_id), dtype=np.int64)
+                self._ivf_lists[list_id] = np.concatenate([self._ivf_lists[list_id], pending])
+            rows = self._ivf_lists[list_id]
+            parts.append(rows[np.asarray(self._assign[rows]) == list_id])
+        return np.unique(np.concatenate(parts)) if parts else np.zeros(0, dtype=np.int64)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._vectors is not None:
+                self._vectors.flush()
+            if self._quantizer is not None:
+                self._quantizer.flush()
+            self._db.close()
+
+
+class NumpyVectorStore:
+    """NumpyCollection 的客户端，接口与 chromadb PersistentClient 的常用子集一致"""
+
+    def __init__(
+        self,
+        path: str,
+        dtype: Optional[str] = None,
+        ivf_min_rows: int = 50000,
+        ivf_nprobe: int = 16,
+        embedding_function: Optional[Callable[[List[str]], List[List[float]]]] = None,
+        precision: Optional[Dict[str, str]] = None,
+        pq_subvectors: int = 0,
+        rerank_factor: int = 10,
+        indexed_fields: Iterable[str] = (),
+    ):
+        """dtype 为默认集合精度，precision 按集合名覆盖，如 {"documents": "int8", "proposals": "pq"}"""
+        self.path = path
+        self.dtype = dtype
+        self.precision = precision or {}
+        self.ivf_min_rows = ivf_min_rows
+        self.ivf_nprobe = ivf_nprobe
+        self.pq_subvectors = pq_subvectors
+        self.rerank_factor = rerank_factor
+        self.indexed_fields = tuple(indexed_fields)
+        self.embedding_function = embedding_function
+        self._collections: Dict[str, NumpyCollection] = {}
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+
+    def get_or_create_collection(self, name: str, metadata: Optional[Dict] = None, embedding_function=None):
+        with self._lock:
+            if name not in self._collections:
+                self._collections[name] = NumpyCollection(
+                    name,
+                    os.path.join(self.path, name),
+                    metadata=metadata,
+                    dtype=self.precision.get(name, self.dtype),
+                    embedding_function=embedding_function or self.embedding_function,
+                    ivf_min_rows=self.ivf_min_rows,
+                    ivf_nprobe=self.ivf_nprobe,
+                    pq_subvectors=self.pq_subvectors,
+                    rerank_factor=self.rerank_factor,
+                    indexed_fields=self.indexed_fields,
+                )
+            return self._collections[name]
+
+    def get_collection(self, name: str, embedding_function=None):
+        if name not in self._collections and not os.path.exists(os.path.join(self.path, name, "meta.json")):
+            raise ValueError(f"集合 {name} 不存在")
+        return self.get_or_create_collection(name, embedding_function=embedding_function)
+
+    def delete_collection(self, name: str) -> None:
+        with self._lock:
+            collection = self._collections.pop(name, None)
+            if collection is not None:
+                collection.close()
+            shutil.rmtree(os.path.join(self.path, name), ignore_errors=True)
+
+    def list_collections(self) -> List[NumpyCollection]:
+        names = [
+            entry for entry in os.listdir(self.path) if os.path.exists(os.path.join(self.path, entry, "meta.json"))
+        ]
+        return [self.get_or_create_collection(name) for name in sorted(names)]
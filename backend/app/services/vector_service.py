@@ -1,24 +1,59 @@
-"""向量化服务 - ChromaDB集成"""
+"""向量化服务 - ChromaDB / 内置NumPy索引集成"""
 
+import asyncio
+import functools
 import hashlib
-from typing import List, Dict, Optional
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, Union
 
-import chromadb
-import numpy as np
-from chromadb.config import Settings
 from loguru import logger
 
 from app.core.config import settings
-from app.models import DocumentType
+from app.core.metrics import track_vector_search_metrics, vector_cache_requests_total
+from app.services.ai_service import ai_service
+from app.services.cache_service import CacheService, cache_service
+from app.services.keyword_index import KeywordIndex
+from app.services.reranker import RerankService, rerank_service
+from app.utils.lazy import LazyService
+from app.utils.text_chunker import TextChunker
+
+# 同步维护BM25关键词索引的集合
+KEYWORD_INDEXED_COLLECTIONS = ("documents", "knowledge")
+
+# 配置了 VECTOR_SHARD_KEY 时按该字段分片的集合
+SHARDED_COLLECTIONS = ("documents",)
+
+# 相似方案检索时每个返回条数多取的章节数，折叠后每个方案保留一条
+PROPOSAL_SECTION_FANOUT = 5
+
+
+def proposal_sections(content: Optional[str], sections: Optional[Dict[str, str]]) -> Dict[str, str]:
+    """方案需要向量化的章节 {章节名: 文本}，跳过空章节；没有章节时整篇作为 full_content"""
+    parts = sections if sections is not None else {"full_content": content}
+    return {name: text for name, text in parts.items() if text and text.strip()}
+
+
+def metadata_filter(**conditions) -> Optional[Dict]:
+    """由字段条件构造 where，忽略值为 None 的字段；Chroma 的 where 只允许一个键，多个条件用 $and 组合"""
+    clauses = [{field: condition} for field, condition in conditions.items() if condition is not None]
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
 
 
 class VectorService:
     """向量数据库服务"""
 
     def __init__(self):
-        """初始化ChromaDB客户端"""
-        self.client = chromadb.PersistentClient(
-            path=settings.CHROMA_PERSIST_DIRECTORY, settings=Settings(anonymized_telemetry=False, allow_reset=True)
+        """初始化向量库客户端"""
+        self.client = self._create_client()
+        self._shard_executor = (
+            ThreadPoolExecutor(max_workers=settings.VECTOR_SHARD_WORKERS, thread_name_prefix="vector-shard")
+            if settings.VECTOR_SHARD_KEY
+            else None
         )
 
         # 创建或获取集合
@@ -26,13 +61,81 @@ class VectorService:
         self.knowledge_collection = self._get_or_create_collection("knowledge")
         self.proposals_collection = self._get_or_create_collection("proposals")
 
-    def _get_or_create_collection(self, name: str):
-        """获取或创建集合"""
+        # BM25关键词索引，与 documents / knowledge 集合同步增删
+        self.keyword_index = KeywordIndex(
+            settings.KEYWORD_INDEX_PATH or os.path.join(settings.CHROMA_PERSIST_DIRECTORY, "keyword_index.sqlite3")
+        )
+        self._keyword_index_checked = set()
+
+    @staticmethod
+    def _create_client():
+        """按 VECTOR_BACKEND 创建向量库客户端：chroma(默认) 或内置的 numpy flat/IVF 索引"""
+        from chromadb.utils import embedding_functions
+
+        if settings.VECTOR_BACKEND == "numpy":
+            from app.services.vector_index import NumpyVectorStore
+
+            return NumpyVectorStore(
+                settings.VECTOR_INDEX_DIR,
+                dtype=settings.VECTOR_INDEX_DTYPE,
+                ivf_min_rows=settings.VECTOR_IVF_MIN_ROWS,
+                ivf_nprobe=settings.VECTOR_IVF_NPROBE,
+                precision=settings.VECTOR_COLLECTION_PRECISION,
+                pq_subvectors=settings.VECTOR_PQ_SUBVECTORS,
+                rerank_factor=settings.VECTOR_RERANK_FACTOR,
+                indexed_fields=settings.VECTOR_INDEXED_FIELDS,
+                # 与 Chroma 集合相同的默认嵌入模型，首次按文本写入或检索时才加载
+                embedding_function=embedding_functions.DefaultEmbeddingFunction(),
+            )
+        if settings.VECTOR_BACKEND != "chroma":
+            raise ValueError(f"不支持的向量库后端: {settings.VECTOR_BACKEND}")
+        import chromadb
+        from chromadb.config import Settings
+
+        return chromadb.PersistentClient(
+            path=settings.CHROMA_PERSIST_DIRECTORY,
+            settings=Settings(
+                anonymized_telemetry=False,
+                allow_reset=True,
+                chroma_product_telemetry_impl="app.services.chroma_telemetry.NoopTelemetry",
+            ),
+        )
+
+    def _get_or_create_collection(self, name: str, metadata: Optional[Dict] = None):
+        """获取或创建集合，配置了分片字段时 documents 集合包装为分片集合"""
         try:
-            return self.client.get_or_create_collection(name=name, metadata={"hnsw:space": "cosine"})
+            collection = self.client.get_or_create_collection(name=name, metadata=metadata or {"hnsw:space": "cosine"})
         except Exception as e:
             logger.error(f"创建集合 {name} 失败: {e}")
             raise
+        if settings.VECTOR_SHARD_KEY and name in SHARDED_COLLECTIONS:
+            from chromadb.utils import embedding_functions
+
+            from app.services.vector_shards import ShardedCollection
+
+            return ShardedCollection(
+                self.client,
+                collection,
+                settings.VECTOR_SHARD_KEY,
+                mode=settings.VECTOR_SHARD_MODE,
+                shard_count=settings.VECTOR_SHARD_COUNT,
+                executor=self._shard_executor,
+                embedding_function=embedding_functions.DefaultEmbeddingFunction(),
+            )
+        return collection
+
+    def reset_collection(self, name: str, metadata: Optional[Dict] = None):
+        """删除并重建集合（含全部分片，从快照恢复前），metadata 为空时使用默认的 cosine 配置，返回新集合"""
+        from app.services.vector_shards import ShardedCollection
+
+        current = self._collection(name)
+        if isinstance(current, ShardedCollection):
+            current.drop_shards()
+        self.client.delete_collection(name)
+        collection = self._get_or_create_collection(name, metadata)
+        setattr(self, f"{name}_collection", collection)
+        self._keyword_index_checked.discard(name)
+        return collection
 
     def _generate_id(self, content: str, prefix: str = "") -> str:
         """生成唯一ID，使用SHA-256哈希（更安全的哈希算法）"""
@@ -41,6 +144,130 @@ class VectorService:
         hash_obj = hashlib.sha256(content.encode())
         return f"{prefix}_{hash_obj.hexdigest()}"
 
+    def _build_chunk_records(
+        self, doc_id: int, title: str, content: str, metadata: Optional[Dict] = None
+    ) -> Tuple[str, List[str], List[str], List[Dict]]:
+        """将文档分块并生成 (vector_id, 分块ID, 分块文本, 分块元数据)
+
+        分块ID由 doc_id 和分块内容哈希组成，与分块位置无关：编辑文档后内容未变的分块ID不变，
+        增量更新时只需嵌入新增分块；同一文档内的重复分块追加出现序号。
+        """
+        vector_id = self._generate_id(content, f"doc_{doc_id}")
+        chunks = self._split_text(content)
+        ids = []
+        metadatas = []
+        occurrences: Dict[str, int] = {}
+        for i, chunk in enumerate(chunks):
+            content_hash = hashlib.sha256(chunk.encode()).hexdigest()[:32]
+            occurrence = occurrences.get(content_hash, 0)
+            occurrences[content_hash] = occurrence + 1
+            ids.append(f"doc_{doc_id}_chunk_{content_hash}" + (f"_{occurrence}" if occurrence else ""))
+            metadatas.append(
+                {
+                    "doc_id": doc_id,
+                    "title": title,
+                    "chunk_index": i,
+                    "total_chunks": len(chunks),
+                    "vector_group_id": vector_id,
+                    "content_hash": content_hash,
+                    # Chroma 元数据不接受 None 值
+                    **{key: value for key, value in (metadata or {}).items() if value is not None},
+                }
+            )
+        return vector_id, ids, chunks, metadatas
+
+    def diff_document_chunks(self, doc_id: int, title: str, content: str, metadata: Optional[Dict] = None) -> Dict:
+        """对比文档新旧分块集合
+
+        返回 vector_id、需要嵌入写入的新分块 (add_*)、只需刷新元数据的保留分块 (keep_*)
+        以及需要删除的旧分块 (delete_ids)。
+        """
+        vector_id, ids, chunks, metadatas = self._build_chunk_records(doc_id, title, content, metadata)
+        existing_ids = set(self.documents_collection.get(where={"doc_id": doc_id}, include=[])["ids"])
+        new_ids = set(ids)
+        diff = {
+            "vector_id": vector_id,
+            "add_ids": [],
+            "add_chunks": [],
+            "add_metadatas": [],
+            "keep_ids": [],
+            "keep_metadatas": [],
+            "delete_ids": sorted(existing_ids - new_ids),
+        }
+        for chunk_id, chunk, chunk_metadata in zip(ids, chunks, metadatas):
+            if chunk_id in existing_ids:
+                diff["keep_ids"].append(chunk_id)
+                diff["keep_metadatas"].append(chunk_metadata)
+            else:
+                diff["add_ids"].append(chunk_id)
+                diff["add_chunks"].append(chunk)
+                diff["add_metadatas"].append(chunk_metadata)
+        return diff
+
+    def apply_document_diff(self, diff: Dict, embeddings: Optional[List[List[float]]] = None) -> Dict:
+        """应用分块差异：删除旧分块、刷新保留分块的元数据（不重新嵌入）、写入新分块"""
+        if diff["delete_ids"]:
+            self.documents_collection.delete(ids=diff["delete_ids"])
+            self.keyword_index.remove("documents", diff["delete_ids"])
+        if diff["keep_ids"]:
+            self.documents_collection.update(ids=diff["keep_ids"], metadatas=diff["keep_metadatas"])
+            self.keyword_index.update_metadata("documents", zip(diff["keep_ids"], diff["keep_metadatas"]))
+        self.add_chunk_batch(diff["add_ids"], diff["add_chunks"], diff["add_metadatas"], embeddings)
+        return {
+            "vector_id": diff["vector_id"],
+            "added": len(diff["add_ids"]),
+            "kept": len(diff["keep_ids"]),
+            "deleted": len(diff["delete_ids"]),
+        }
+
+    def update_document(self, doc_id: int, title: str, content: str, metadata: Optional[Dict] = None) -> Dict:
+        """增量更新文档向量，只嵌入内容发生变化的分块
+
+        返回 vector_id 以及新增/保留/删除的分块数。
+        """
+        try:
+            result = self.apply_document_diff(self.diff_document_chunks(doc_id, title, content, metadata))
+            logger.info(f"文档 {doc_id} 增量更新：新增 {result['added']} 块，保留 {result['kept']} 块，删除 {result['deleted']} 块")
+            return result
+        except Exception as e:
+            logger.error(f"增量更新文档向量失败: {e}")
+            raise
+
+    @staticmethod
+    def _resolve_chunk_embeddings(
+        chunk_count: int, embedding: Optional[List[float]], embeddings: Optional[List[List[float]]]
+    ) -> Optional[List[List[float]]]:
+        """确定每个分块的向量
+
+        embeddings 按分块一一对应；单个 embedding 只能用于单块文档，多块文档复用同一向量会让
+        所有分块在检索时无法区分，直接报错。
+        """
+        if embeddings is not None:
+            if len(embeddings) != chunk_count:
+                raise ValueError(f"向量数量({len(embeddings)})与分块数量({chunk_count})不一致")
+            return embeddings
+        if embedding:
+            if chunk_count != 1:
+                raise ValueError(f"文档被分为 {chunk_count} 块，单个 embedding 无法对应，请按分块提供 embeddings")
+            return [embedding]
+        return None
+
+    def add_chunk_batch(
+        self,
+        ids: List[str],
+        documents: List[str],
+        metadatas: List[Dict],
+        embeddings: Optional[List[List[float]]] = None,
+    ) -> None:
+        """一次 upsert 写入一批分块（预先计算好的向量可选）"""
+        if not ids:
+            return
+        if embeddings is not None:
+            self.documents_collection.upsert(ids=ids, documents=documents, metadatas=metadatas, embeddings=embeddings)
+        else:
+            self.documents_collection.upsert(ids=ids, documents=documents, metadatas=metadatas)
+        self.keyword_index.add("documents", zip(ids, documents, metadatas))
+
     def add_document(
         self,
         doc_id: int,
@@ -48,41 +275,24 @@ class VectorService:
         content: str,
         metadata: Optional[Dict] = None,
         embedding: Optional[List[float]] = None,
+        embeddings: Optional[List[List[float]]] = None,
     ) -> str:
-        """添加文档到向量数据库"""
-        try:
-            vector_id = self._generate_id(content, f"doc_{doc_id}")
+        """添加文档到向量数据库
 
+        未提供向量时由 Chroma 默认嵌入模型计算；embeddings 为按分块预先计算的向量。
+        """
+        try:
             # 将文档分块（如果太长）
-            chunks = self._split_text(content, max_length=1000)
-
-            # 添加所有块到集合
-            ids = []
-            documents = []
-            metadatas = []
-            embeddings = []
+            vector_id, ids, chunks, metadatas = self._build_chunk_records(doc_id, title, content, metadata)
+            chunk_embeddings = self._resolve_chunk_embeddings(len(chunks), embedding, embeddings)
 
-            for i, chunk in enumerate(chunks):
-                chunk_id = f"{vector_id}_chunk_{i}"
-                ids.append(chunk_id)
-                documents.append(chunk)
-
-                chunk_metadata = {
-                    "doc_id": doc_id,
-                    "title": title,
-                    "chunk_index": i,
-                    "total_chunks": len(chunks),
-                    "vector_group_id": vector_id,
-                    **(metadata or {}),
-                }
-                metadatas.append(chunk_metadata)
-                if embedding:
-                    embeddings.append(embedding)
-
-            if embeddings:
-                self.documents_collection.add(ids=ids, documents=documents, metadatas=metadatas, embeddings=embeddings)
+            if chunk_embeddings:
+                self.documents_collection.add(
+                    ids=ids, documents=chunks, metadatas=metadatas, embeddings=chunk_embeddings
+                )
             else:
-                self.documents_collection.add(ids=ids, documents=documents, metadatas=metadatas)
+                self.documents_collection.add(ids=ids, documents=chunks, metadatas=metadatas)
+            self.keyword_index.add("documents", zip(ids, chunks, metadatas))
 
             logger.info(f"文档 {doc_id} 已添加到向量数据库，共 {len(chunks)} 个块")
             return vector_id
@@ -92,7 +302,10 @@ class VectorService:
             raise
 
     def batch_add_documents(self, documents: List[Dict]):
-        """批量添加文档"""
+        """批量添加文档
+
+        每个文档可带 embeddings（按分块）或 embedding（仅单块文档）；要么全部带向量，要么全部不带。
+        """
         if not documents:
             return
 
@@ -102,36 +315,23 @@ class VectorService:
         embeddings = []
 
         for doc in documents:
-            doc_id = doc.get("doc_id")
-            title = doc.get("title")
-            content = doc.get("content")
-            metadata = doc.get("metadata")
-            embedding = doc.get("embedding")
-
-            vector_id = self._generate_id(content, f"doc_{doc_id}")
-            chunks = self._split_text(content, max_length=1000)
-
-            for i, chunk in enumerate(chunks):
-                chunk_id = f"{vector_id}_chunk_{i}"
-                ids.append(chunk_id)
-                docs.append(chunk)
-
-                chunk_metadata = {
-                    "doc_id": doc_id,
-                    "title": title,
-                    "chunk_index": i,
-                    "total_chunks": len(chunks),
-                    "vector_group_id": vector_id,
-                    **(metadata or {}),
-                }
-                metadatas.append(chunk_metadata)
-                if embedding:
-                    embeddings.append(embedding)
-
+            _, chunk_ids, chunks, chunk_metadatas = self._build_chunk_records(
+                doc.get("doc_id"), doc.get("title"), doc.get("content"), doc.get("metadata")
+            )
+            chunk_embeddings = self._resolve_chunk_embeddings(len(chunks), doc.get("embedding"), doc.get("embeddings"))
+            ids.extend(chunk_ids)
+            docs.extend(chunks)
+            metadatas.extend(chunk_metadatas)
+            if chunk_embeddings:
+                embeddings.extend(chunk_embeddings)
+
+        if embeddings and len(embeddings) != len(ids):
+            raise ValueError("批量添加时部分文档缺少向量")
         if embeddings:
             self.documents_collection.add(ids=ids, documents=docs, metadatas=metadatas, embeddings=embeddings)
         else:
             self.documents_collection.add(ids=ids, documents=docs, metadatas=metadatas)
+        self.keyword_index.add("documents", zip(ids, docs, metadatas))
 
     def add_knowledge(
         self, knowledge_id: int, title: str, content: str, category: str, metadata: Optional[Dict] = None
@@ -139,12 +339,10 @@ class VectorService:
         """添加知识库条目到向量数据库"""
         try:
             vector_id = self._generate_id(content, f"kb_{knowledge_id}")
+            entry_metadata = {"knowledge_id": knowledge_id, "title": title, "category": category, **(metadata or {})}
 
-            self.knowledge_collection.add(
-                ids=[vector_id],
-                documents=[content],
-                metadatas=[{"knowledge_id": knowledge_id, "title": title, "category": category, **(metadata or {})}],
-            )
+            self.knowledge_collection.add(ids=[vector_id], documents=[content], metadatas=[entry_metadata])
+            self.keyword_index.add("knowledge", [(vector_id, f"{title}\n{content}", entry_metadata)])
 
             logger.info(f"知识库条目 {knowledge_id} 已添加到向量数据库")
             return vector_id
@@ -153,17 +351,48 @@ class VectorService:
             logger.error(f"添加知识库到向量数据库失败: {e}")
             raise
 
+    def update_knowledge(
+        self,
+        knowledge_id: int,
+        title: str,
+        content: str,
+        category: str,
+        metadata: Optional[Dict] = None,
+        vector_id: Optional[str] = None,
+    ) -> str:
+        """更新知识库条目向量
+
+        内容未变（向量ID相同且已存在）时只更新元数据，不重新嵌入；内容变化时写入新向量并删除旧向量。
+        """
+        try:
+            new_vector_id = self._generate_id(content, f"kb_{knowledge_id}")
+            entry_metadata = {"knowledge_id": knowledge_id, "title": title, "category": category, **(metadata or {})}
+            if new_vector_id == vector_id and self.knowledge_collection.get(ids=[vector_id], include=[])["ids"]:
+                self.knowledge_collection.update(ids=[vector_id], metadatas=[entry_metadata])
+                self.keyword_index.update_metadata("knowledge", [(vector_id, entry_metadata)])
+                logger.info(f"知识库条目 {knowledge_id} 内容未变，仅更新元数据")
+                return vector_id
+
+            self.knowledge_collection.upsert(ids=[new_vector_id], documents=[content], metadatas=[entry_metadata])
+            self.keyword_index.add("knowledge", [(new_vector_id, f"{title}\n{content}", entry_metadata)])
+            if vector_id and vector_id != new_vector_id:
+                self.knowledge_collection.delete(ids=[vector_id])
+                self.keyword_index.remove("knowledge", [vector_id])
+            logger.info(f"知识库条目 {knowledge_id} 已重新向量化")
+            return new_vector_id
+        except Exception as e:
+            logger.error(f"更新知识库向量失败: {e}")
+            raise
+
     def upsert_knowledge(
         self, id: str, content: str, category: str, title: str, metadata: Optional[Dict] = None
     ) -> str:
         """更新或插入知识库条目"""
         try:
             vector_id = self._generate_id(content, f"kb_{id}")
-            self.knowledge_collection.upsert(
-                ids=[vector_id],
-                documents=[content],
-                metadatas=[{"knowledge_id": id, "title": title, "category": category, **(metadata or {})}],
-            )
+            entry_metadata = {"knowledge_id": id, "title": title, "category": category, **(metadata or {})}
+            self.knowledge_collection.upsert(ids=[vector_id], documents=[content], metadatas=[entry_metadata])
+            self.keyword_index.add("knowledge", [(vector_id, f"{title}\n{content}", entry_metadata)])
             logger.info(f"知识库条目 {id} 已更新/插入")
             return vector_id
         except Exception as e:
@@ -171,28 +400,62 @@ class VectorService:
             raise
 
     def vectorize_proposal(
-        self, proposal_id: str, requirements: str, content: str, metadata: Optional[Dict] = None
+        self,
+        proposal_id: Union[int, str],
+        requirements: str,
+        content: Optional[str] = None,
+        metadata: Optional[Dict] = None,
+        sections: Optional[Dict[str, str]] = None,
+        embeddings: Optional[List[List[float]]] = None,
     ) -> str:
-        """向量化方案"""
+        """向量化方案：每个章节一条记录（未提供 sections 时整篇为一条），返回方案的向量组ID
+
+        各章节共享 vector_group_id，检索时每个方案只保留最相关的章节；重新生成的方案先删除旧记录。
+        """
         try:
-            vector_id = self._generate_id(content, f"proposal_{proposal_id}")
-            self.proposals_collection.add(
-                ids=[vector_id],
-                documents=[content],
-                metadatas=[{"proposal_id": proposal_id, "requirements": requirements, **(metadata or {})}],
+            parts = proposal_sections(content, sections)
+            if not parts:
+                raise ValueError(f"方案 {proposal_id} 没有可向量化的内容")
+            group_id = f"proposal_{proposal_id}"
+            extra = {key: value for key, value in (metadata or {}).items() if value is not None}
+            self.proposals_collection.delete(where={"proposal_id": proposal_id})
+            self.proposals_collection.upsert(
+                ids=[f"{group_id}_{name}" for name in parts],
+                documents=list(parts.values()),
+                metadatas=[
+                    {
+                        "proposal_id": proposal_id,
+                        "requirements": requirements,
+                        "section": name,
+                        "vector_group_id": group_id,
+                        **extra,
+                    }
+                    for name in parts
+                ],
+                **({"embeddings": embeddings} if embeddings is not None else {}),
             )
-            logger.info(f"方案 {proposal_id} 已向量化")
-            return vector_id
+            logger.info(f"方案 {proposal_id} 已向量化，共 {len(parts)} 个章节")
+            return group_id
         except Exception as e:
             logger.error(f"向量化方案失败: {e}")
             raise
 
-    def search_documents(self, query: str, n_results: int = 5, filter_metadata: Optional[Dict] = None) -> List[Dict]:
-        """搜索相似文档"""
+    def search_documents(
+        self,
+        query: str,
+        n_results: int = 5,
+        filter_metadata: Optional[Dict] = None,
+        query_embedding: Optional[List[float]] = None,
+    ) -> List[Dict]:
+        """搜索相似文档，提供 query_embedding 时直接按向量检索；启用混合检索时融合BM25结果"""
         try:
-            results = self.documents_collection.query(query_texts=[query], n_results=n_results, where=filter_metadata)
-
-            return self._format_results(results)
+            return self.search_batch(
+                "documents",
+                [query],
+                n_results=n_results,
+                where=filter_metadata,
+                query_embeddings=[query_embedding] if query_embedding is not None else None,
+            )[0]
 
         except Exception as e:
             logger.error(f"搜索文档失败: {e}")
@@ -202,29 +465,176 @@ class VectorService:
         """搜索知识库"""
         try:
             where_filter = {"category": category} if category else None
-
-            results = self.knowledge_collection.query(query_texts=[query], n_results=n_results, where=where_filter)
-
-            return self._format_results(results)
+            return self.search_batch("knowledge", [query], n_results=n_results, where=where_filter)[0]
 
         except Exception as e:
             logger.error(f"搜索知识库失败: {e}")
             raise
 
-    def search_similar_proposals(self, requirements: str, n_results: int = 3) -> List[Dict]:
-        """搜索相似的历史方案"""
-        try:
-            proposal_types = [
-                DocumentType.TECHNICAL_PROPOSAL.value,
-                DocumentType.BUSINESS_PROPOSAL.value,
-                DocumentType.BID_DOCUMENT.value,
-            ]
+    def search_batch(
+        self,
+        collection_name: str,
+        queries: List[str],
+        n_results: int = 5,
+        where: Optional[Dict] = None,
+        query_embeddings: Optional[List[List[float]]] = None,
+    ) -> List[List[Dict]]:
+        """同一集合、同一过滤条件下的多条查询合并为一次 collection.query，按查询顺序返回结果列表
+
+        Chroma 对 query_texts 一次批量计算向量、一次遍历索引；启用混合检索时每条查询再分别与
+        BM25结果融合。提供 query_embeddings 时按向量检索，数量须与 queries 一致。
+        """
+        if not queries:
+            return []
+        if query_embeddings is not None and len(query_embeddings) != len(queries):
+            raise ValueError(f"查询向量数量({len(query_embeddings)})与查询数量({len(queries)})不一致")
+
+        collection = self._collection(collection_name)
+        depth = self._candidate_depth(n_results)
+        if query_embeddings is not None:
+            results = collection.query(query_embeddings=query_embeddings, n_results=depth, where=where)
+        else:
+            results = collection.query(query_texts=queries, n_results=depth, where=where)
+
+        vector_results = [self._format_results(results, index) for index in range(len(queries))]
+        return self._hybrid_rank(collection_name, collection, queries, vector_results, n_results, where)
+
+    def diversify(
+        self, collection_name: str, results: List[Dict], n_results: int, lambda_mult: Optional[float] = None
+    ) -> List[Dict]:
+        """按来源折叠检索结果，剩余候选多于 n_results 时取出候选向量做 MMR 选择"""
+        from app.utils.mmr import collapse_results, diversify_results
+
+        collapsed = collapse_results(results)
+        if len(collapsed) <= n_results:
+            return collapsed
+        stored = self._collection(collection_name).get(
+            ids=[result["id"] for result in collapsed], include=["embeddings"]
+        )
+        vectors = dict(zip(stored["ids"], stored.get("embeddings") or []))
+        return diversify_results(
+            collapsed,
+            [vectors.get(result["id"]) for result in collapsed],
+            n_results,
+            lambda_mult=settings.MMR_LAMBDA if lambda_mult is None else lambda_mult,
+        )
 
-            doc_results = self.search_documents(
-                query=requirements, n_results=n_results, filter_metadata={"type": {"$in": proposal_types}}
-            )
+    def _collection(self, collection_name: str):
+        collections = {
+            "documents": self.documents_collection,
+            "knowledge": self.knowledge_collection,
+            "proposals": self.proposals_collection,
+        }
+        if collection_name not in collections:
+            raise ValueError(f"未知的集合: {collection_name}")
+        return collections[collection_name]
+
+    def keyword_search(
+        self, collection_name: str, query: str, n_results: int = 10, where: Optional[Dict] = None
+    ) -> List[Dict]:
+        """仅用BM25关键词索引检索，返回 [{"id", "score", "metadata"}]"""
+        self._ensure_keyword_index(collection_name)
+        return self.keyword_index.search(collection_name, query, limit=n_results, where=where)
+
+    def _candidate_depth(self, n_results: int) -> int:
+        """混合检索时每一路多召回一些候选，融合后再截断"""
+        if settings.HYBRID_SEARCH_ENABLED and n_results > 0:
+            return max(n_results, settings.HYBRID_CANDIDATES)
+        return n_results
+
+    def _hybrid_rank(
+        self,
+        collection_name: str,
+        collection,
+        queries: List[str],
+        vector_results: List[List[Dict]],
+        n_results: int,
+        where: Optional[Dict] = None,
+    ) -> List[List[Dict]]:
+        """对一批查询分别用倒数排名融合(RRF)合并向量结果与BM25结果
+
+        每路按排名贡献 1/(RRF_K + rank)，两路都命中的条目分数相加；只在BM25命中的条目整批
+        一次从集合补取文本，distance 为 None。结果带 score 字段，按融合分数降序截取 n_results 条。
+        """
+        if not settings.HYBRID_SEARCH_ENABLED or collection_name not in KEYWORD_INDEXED_COLLECTIONS:
+            return [results[:n_results] for results in vector_results]
+
+        depth = self._candidate_depth(n_results)
+        keyword_hits = [self.keyword_search(collection_name, query, depth, where) if query else [] for query in queries]
+
+        vector_ids = {item["id"] for results in vector_results for item in results}
+        missing = list(dict.fromkeys(hit["id"] for hits in keyword_hits for hit in hits if hit["id"] not in vector_ids))
+        fetched_by_id = {}
+        if missing:
+            fetched = collection.get(ids=missing, include=["documents", "metadatas"])
+            for i, item_id in enumerate(fetched["ids"]):
+                fetched_by_id[item_id] = {
+                    "id": item_id,
+                    "document": fetched["documents"][i] if fetched["documents"] else None,
+                    "metadata": fetched["metadatas"][i] if fetched["metadatas"] else {},
+                    "distance": None,
+                }
 
-            return doc_results
+        fused_results = []
+        for results, hits in zip(vector_results, keyword_hits):
+            scores: Dict[str, float] = {}
+            for ranked in (results, hits):
+                for rank, item in enumerate(ranked, start=1):
+                    scores[item["id"]] = scores.get(item["id"], 0.0) + 1.0 / (settings.RRF_K + rank)
+
+            by_id = {item["id"]: item for item in results}
+            for hit in hits:
+                if hit["id"] not in by_id and hit["id"] in fetched_by_id:
+                    by_id[hit["id"]] = dict(fetched_by_id[hit["id"]])
+
+            fused = sorted(by_id.values(), key=lambda item: scores[item["id"]], reverse=True)[:n_results]
+            for item in fused:
+                item["score"] = scores[item["id"]]
+            fused_results.append(fused)
+        return fused_results
+
+    def _ensure_keyword_index(self, collection_name: str) -> None:
+        """关键词索引为空而集合已有数据时（升级前写入的数据），从集合回填一次"""
+        if collection_name in self._keyword_index_checked:
+            return
+        self._keyword_index_checked.add(collection_name)
+        collection = self._collection(collection_name)
+        if self.keyword_index.count(collection_name) or not collection.count():
+            return
+        self.rebuild_keyword_index(collection_name)
+
+    def rebuild_keyword_index(self, collection_name: str, page_size: int = 1000) -> int:
+        """从Chroma集合全量重建关键词索引，返回写入条数"""
+        collection = self._collection(collection_name)
+        total = 0
+        offset = 0
+        while True:
+            page = collection.get(include=["documents", "metadatas"], limit=page_size, offset=offset)
+            if not page["ids"]:
+                break
+            texts = page["documents"]
+            if collection_name == "knowledge":
+                # 知识库条目的标题只在元数据中，与写入时一样拼到正文前
+                texts = [f"{(meta or {}).get('title', '')}\n{text}" for text, meta in zip(texts, page["metadatas"])]
+            total += self.keyword_index.add(collection_name, zip(page["ids"], texts, page["metadatas"]))
+            offset += len(page["ids"])
+        logger.info(f"关键词索引 {collection_name} 已重建，共 {total} 条")
+        return total
+
+    def search_similar_proposals(
+        self, requirements: str, n_results: int = 3, query_embedding: Optional[List[float]] = None
+    ) -> List[Dict]:
+        """在方案集合中搜索相似的历史方案，每个方案只返回最相关的章节"""
+        from app.utils.mmr import collapse_results
+
+        try:
+            results = self.search_batch(
+                "proposals",
+                [requirements],
+                n_results=n_results * PROPOSAL_SECTION_FANOUT,
+                query_embeddings=[query_embedding] if query_embedding is not None else None,
+            )[0]
+            return collapse_results(results)[:n_results]
 
         except Exception as e:
             logger.error(f"搜索相似方案失败: {e}")
@@ -237,11 +647,13 @@ class VectorService:
 
             if target_doc_id is not None:
                 self.documents_collection.delete(where={"doc_id": target_doc_id})
+                self.keyword_index.remove_where("documents", "doc_id", target_doc_id)
                 logger.info(f"文档 {target_doc_id} 的向量已删除")
                 return True
 
             if vector_id:
                 self.documents_collection.delete(where={"vector_group_id": vector_id})
+                self.keyword_index.remove_where("documents", "vector_group_id", vector_id)
                 logger.info(f"文档向量组 {vector_id} 已删除")
                 return True
 
@@ -268,6 +680,7 @@ class VectorService:
         """删除知识库向量"""
         try:
             self.knowledge_collection.delete(ids=[vector_id])
+            self.keyword_index.remove("knowledge", [vector_id])
             logger.info(f"知识库向量 {vector_id} 已删除")
             return True
 
@@ -275,42 +688,42 @@ class VectorService:
             logger.error(f"删除知识库向量失败: {e}")
             return False
 
-    def _split_text(self, text: str, max_length: int = 1000) -> List[str]:
-        """将长文本分割成小块"""
-        if len(text) <= max_length:
-            return [text]
-
-        chunks = []
-        sentences = text.split("。")  # 按句子分割
-        current_chunk = ""
+    def delete_proposal(self, proposal_id: Union[int, str]) -> bool:
+        """删除方案全部章节的向量"""
+        try:
+            self.proposals_collection.delete(where={"proposal_id": proposal_id})
+            logger.info(f"方案 {proposal_id} 的向量已删除")
+            return True
 
-        for sentence in sentences:
-            if len(current_chunk) + len(sentence) <= max_length:
-                current_chunk += sentence + "。"
-            else:
-                if current_chunk:
-                    chunks.append(current_chunk)
-                current_chunk = sentence + "。"
+        except Exception as e:
+            logger.error(f"删除方案向量失败: {e}")
+            return False
 
-        if current_chunk:
-            chunks.append(current_chunk)
+    def _split_text(self, text: str, max_length: Optional[int] = None) -> List[str]:
+        """将长文本分割成小块
 
-        return chunks
+        max_length 为每块的token上限（默认 CHUNK_MAX_TOKENS），按标题/段落/表格结构切分并带重叠，
+        见 app.utils.text_chunker。
+        """
+        chunker = TextChunker(
+            max_tokens=max_length or settings.CHUNK_MAX_TOKENS, overlap_tokens=settings.CHUNK_OVERLAP_TOKENS
+        )
+        return chunker.split(text) or [text]
 
-    def _format_results(self, results: Dict) -> List[Dict]:
-        """格式化搜索结果"""
+    def _format_results(self, results: Dict, index: int = 0) -> List[Dict]:
+        """格式化搜索结果，index 为批量查询中第几条查询"""
         formatted = []
 
-        if not results["ids"] or not results["ids"][0]:
+        if not results["ids"] or len(results["ids"]) <= index or not results["ids"][index]:
             return formatted
 
-        for i, doc_id in enumerate(results["ids"][0]):
+        for i, doc_id in enumerate(results["ids"][index]):
             formatted.append(
                 {
                     "id": doc_id,
-                    "document": results["documents"][0][i] if results["documents"] else None,
-                    "metadata": results["metadatas"][0][i] if results["metadatas"] else {},
-                    "distance": results["distances"][0][i] if results["distances"] else None,
+                    "document": results["documents"][index][i] if results["documents"] else None,
+                    "metadata": results["metadatas"][index][i] if results["metadatas"] else {},
+                    "distance": results["distances"][index][i] if results["distances"] else None,
                 }
             )
 
@@ -324,23 +737,634 @@ class VectorService:
             "proposals": self.proposals_collection.count(),
         }
 
+    def warm_up(self) -> Dict[str, int]:
+        """启动预热：每个集合（含分片）取一条已存向量检索一次，把 HNSW 索引 / 向量文件读入内存，
+        并完成关键词索引的回填检查，返回 {集合名: 记录数}"""
+        import numpy as np
+
+        from app.services.vector_shards import ShardedCollection
+
+        counts = {}
+        for name in ("documents", "knowledge", "proposals"):
+            collection = self._collection(name)
+            for shard in collection.shards() if isinstance(collection, ShardedCollection) else [collection]:
+                count = counts[shard.name] = shard.count()
+                if not count:
+                    continue
+                sample = shard.get(limit=1, include=["embeddings"])["embeddings"]
+                shard.query(
+                    query_embeddings=[np.asarray(sample[0], dtype=float).tolist()],
+                    n_results=min(count, 10),
+                    include=["distances"],
+                )
+        for name in KEYWORD_INDEXED_COLLECTIONS:
+            self._ensure_keyword_index(name)
+        return counts
+
     def _cosine_similarity(self, vec1: List[float], vec2: List[float]) -> float:
         """计算余弦相似度"""
+        import numpy as np
+
         vec1 = np.array(vec1)
         vec2 = np.array(vec2)
         return np.dot(vec1, vec2) / (np.linalg.norm(vec1) * np.linalg.norm(vec2))
 
     def _euclidean_distance(self, vec1: List[float], vec2: List[float]) -> float:
         """计算欧几里得距离"""
+        import numpy as np
+
         return np.linalg.norm(np.array(vec1) - np.array(vec2))
 
     def _normalize_vector(self, vec: List[float]) -> List[float]:
         """归一化向量"""
+        import numpy as np
+
         norm = np.linalg.norm(vec)
         if norm == 0:
             return vec
         return (np.array(vec) / norm).tolist()
 
 
-# 全局实例
-vector_service = VectorService()
+class AsyncVectorService:
+    """VectorService 的异步门面
+
+    ChromaDB 的接口都是同步的，直接在 async 端点中调用会阻塞事件循环。这里把每个操作
+    提交到专用线程池执行，检索与写入分别有独立的超时，检索同时上报 Prometheus 指标。
+    超时只会让调用方停止等待，已提交到线程池的操作仍会执行完。
+
+    VECTOR_EMBEDDING_SOURCE=ai_service 时，文档集合的入库和检索向量都由 AIService 计算，
+    避免与 Chroma 默认模型的向量混用。
+
+    提供 cache 时检索结果走读穿缓存：缓存键包含集合版本号，经由本门面的写入在完成后递增
+    版本号，旧结果不再命中，无需按模式扫描删除。查询向量按文本单独缓存。
+
+    提供 reranker 且启用重排（RERANK_ENABLED 或调用时 rerank=True）时，检索多取
+    RERANK_OVERFETCH 倍候选（缓存的是未重排的候选），重排后截取 n_results 条。
+    启用多样化（MMR_ENABLED 或调用时 diversify=True）时多取 MMR_CANDIDATES 倍候选，
+    按 doc_id / vector_group_id 折叠后用 MMR 选出 n_results 条。
+    """
+
+    def __init__(
+        self,
+        service: VectorService,
+        max_workers: Optional[int] = None,
+        search_timeout: Optional[float] = None,
+        write_timeout: Optional[float] = None,
+        embed_func: Optional[Callable[[List[str]], Awaitable[List[List[float]]]]] = None,
+        cache: Optional[CacheService] = None,
+        reranker: Optional[RerankService] = None,
+    ):
+        self.service = service
+        self._max_workers = max_workers or settings.VECTOR_WORKERS
+        self._search_timeout = search_timeout or settings.VECTOR_SEARCH_TIMEOUT
+        self._write_timeout = write_timeout or settings.VECTOR_WRITE_TIMEOUT
+        self._embed_func = embed_func
+        self._cache = cache
+        self._reranker = reranker
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._recent_queries: List[Dict] = []
+        self._recent_flushed_at = time.monotonic()
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix="vector")
+        return self._executor
+
+    async def _run(self, func: Callable, *args, timeout: Optional[float] = None, **kwargs):
+        """在向量线程池中执行同步操作，超时抛出 asyncio.TimeoutError"""
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+        return await asyncio.wait_for(future, timeout)
+
+    async def _embed(self, texts: List[str]) -> List[List[float]]:
+        """批量计算向量，默认使用 AIService.embed_texts"""
+        if self._embed_func is not None:
+            return await self._embed_func(texts)
+        return await ai_service.embed_texts(texts)
+
+    async def _query_kwargs(self, query: str) -> Dict:
+        """ai_service 模式下先计算查询向量，保证与入库向量来自同一模型"""
+        if settings.VECTOR_EMBEDDING_SOURCE != "ai_service":
+            return {}
+        return {"query_embedding": (await self._embed_queries([query]))[0]}
+
+    async def _embed_queries(self, queries: List[str]) -> List[List[float]]:
+        """计算查询向量，缓存中没有的查询合并为一次嵌入请求"""
+        if not self._cache_enabled:
+            return await self._embed(queries)
+
+        namespace = "custom" if self._embed_func is not None else ai_service.provider
+        embeddings = {}
+        for query in dict.fromkeys(queries):
+            embedding = await self._cache.get_query_embedding(namespace, query)
+            if embedding is not None:
+                embeddings[query] = embedding
+        missing = [query for query in dict.fromkeys(queries) if query not in embeddings]
+        if missing:
+            for query, embedding in zip(missing, await self._embed(missing)):
+                embeddings[query] = embedding
+                await self._cache.cache_query_embedding(
+                    namespace, query, embedding, expire=settings.QUERY_EMBEDDING_CACHE_TTL
+                )
+        return [embeddings[query] for query in queries]
+
+    @property
+    def _cache_enabled(self) -> bool:
+        return self._cache is not None and settings.VECTOR_CACHE_ENABLED
+
+    async def _cached_search(
+        self, collection: str, cache_name: str, query: str, n_results: int, params: Optional[Dict], search
+    ) -> List[Dict]:
+        """读穿缓存：命中直接返回，未命中执行 search() 并以检索前的版本号写回
+
+        collection 是检索实际读取的集合（决定版本号），cache_name 区分同一集合上的不同检索。
+        经 CacheService.get_or_compute 读取，并发的相同检索只执行一次，过期时一个请求刷新、其余返回旧值。
+        """
+        if not self._cache_enabled:
+            return await search()
+        version = await self._cache.get_collection_version(collection)
+        searched = False
+
+        async def compute():
+            nonlocal searched
+            searched = True
+            return await search()
+
+        results = await self._cache.get_or_compute_vector_search(
+            query, cache_name, compute, n_results, params, expire=settings.VECTOR_CACHE_TTL, version=version
+        )
+        vector_cache_requests_total.labels(collection=cache_name, result="miss" if searched else "hit").inc()
+        return results
+
+    def _plan(self, rerank: Optional[bool], diversify: Optional[bool]) -> Dict:
+        """检索后处理计划：是否重排、是否做 MMR 多样化，以及候选数的倍数（都未启用时为1）"""
+        rerank = (settings.RERANK_ENABLED if rerank is None else rerank) and self._reranker is not None
+        diversify = settings.MMR_ENABLED if diversify is None else diversify
+        overfetch = max(
+            max(settings.RERANK_OVERFETCH, 1) if rerank else 1, max(settings.MMR_CANDIDATES, 1) if diversify else 1
+        )
+        return {"rerank": rerank, "diversify": diversify, "overfetch": overfetch}
+
+    async def _finish(
+        self, collection: str, query: str, results: List[Dict], n_results: int, plan: Dict, timeout: Optional[float]
+    ) -> List[Dict]:
+        """对多取的候选依次重排、折叠并做 MMR 选择，截取 n_results 条
+
+        多样化时重排保留全部候选，MMR 以重排分数作为相关度在整个候选池中选择。
+        """
+        if plan["rerank"]:
+            results = await self._reranker.rerank(query, results, len(results) if plan["diversify"] else n_results)
+        if plan["diversify"]:
+            results = await self._run(
+                self.service.diversify, collection, results, n_results, timeout=timeout or self._search_timeout
+            )
+        return results[:n_results]
+
+    async def _remember(self, collection: str, query: str, n_results: int, params: Optional[Dict] = None) -> None:
+        """记录检索请求，启动预热时回放（见 app.services.warmup）
+
+        先缓冲在进程内，攒满 WARMUP_RECENT_QUERIES 条或距上次写入超过 WARMUP_RECORD_INTERVAL 秒时
+        批量写入缓存，避免每次检索都多一次 Redis 往返；关闭时由 flush_recent_queries() 写入剩余的记录。
+        """
+        if self._cache is None or settings.WARMUP_RECENT_QUERIES <= 0:
+            return
+        entry = {"collection": collection, "query": query, "n_results": n_results, "params": params or {}}
+        self._recent_queries.append(entry)
+        if (
+            len(self._recent_queries) >= settings.WARMUP_RECENT_QUERIES
+            or time.monotonic() - self._recent_flushed_at >= settings.WARMUP_RECORD_INTERVAL
+        ):
+            await self.flush_recent_queries()
+
+    async def flush_recent_queries(self) -> int:
+        """把缓冲的检索请求一次写入缓存，返回写入的条数"""
+        entries, self._recent_queries = self._recent_queries, []
+        self._recent_flushed_at = time.monotonic()
+        if not entries or self._cache is None:
+            return 0
+        await self._cache.record_recent_queries(entries, settings.WARMUP_RECENT_QUERIES)
+        return len(entries)
+
+    async def replay(self, entry: Dict) -> List[Dict]:
+        """按 _remember 记录的内容重新执行一次检索"""
+        search = {
+            "documents": self.search_documents,
+            "knowledge": self.search_knowledge,
+            "proposals": self.search_similar_proposals,
+        }[entry["collection"]]
+        return await search(entry["query"], n_results=entry["n_results"], **entry["params"])
+
+    async def invalidate(self, *collections: str) -> None:
+        """集合写入后递增版本号，使该集合上的检索缓存失效"""
+        if self._cache is None:
+            return
+        for collection in collections:
+            await self._cache.bump_collection_version(collection)
+
+    # ==================== 检索 ====================
+
+    @track_vector_search_metrics("documents")
+    async def search_documents(
+        self,
+        query: str,
+        n_results: int = 5,
+        filter_metadata: Optional[Dict] = None,
+        timeout: Optional[float] = None,
+        rerank: Optional[bool] = None,
+        diversify: Optional[bool] = None,
+    ) -> List[Dict]:
+        """异步搜索相似文档"""
+        plan = self._plan(rerank, diversify)
+        fetch = n_results * plan["overfetch"]
+
+        async def search():
+            return await self._run(
+                self.service.search_documents,
+                query,
+                n_results=fetch,
+                filter_metadata=filter_metadata,
+                timeout=timeout or self._search_timeout,
+                **(await self._query_kwargs(query)),
+            )
+
+        results = await self._cached_search("documents", "documents", query, fetch, filter_metadata, search)
+        results = await self._finish("documents", query, results, n_results, plan, timeout)
+        await self._remember(
+            "documents", query, n_results, {"filter_metadata": filter_metadata} if filter_metadata else None
+        )
+        return results
+
+    @track_vector_search_metrics("knowledge")
+    async def search_knowledge(
+        self,
+        query: str,
+        n_results: int = 5,
+        category: Optional[str] = None,
+        timeout: Optional[float] = None,
+        rerank: Optional[bool] = None,
+        diversify: Optional[bool] = None,
+    ) -> List[Dict]:
+        """异步搜索知识库"""
+        plan = self._plan(rerank, diversify)
+        fetch = n_results * plan["overfetch"]
+
+        async def search():
+            return await self._run(
+                self.service.search_knowledge,
+                query,
+                n_results=fetch,
+                category=category,
+                timeout=timeout or self._search_timeout,
+            )
+
+        results = await self._cached_search("knowledge", "knowledge", query, fetch, {"category": category}, search)
+        results = await self._finish("knowledge", query, results, n_results, plan, timeout)
+        await self._remember("knowledge", query, n_results, {"category": category} if category else None)
+        return results
+
+    @track_vector_search_metrics("proposals")
+    async def search_similar_proposals(
+        self,
+        requirements: str,
+        n_results: int = 3,
+        timeout: Optional[float] = None,
+        rerank: Optional[bool] = None,
+        diversify: Optional[bool] = None,
+    ) -> List[Dict]:
+        """异步搜索相似的历史方案（方案集合中已向量化的方案）"""
+        plan = self._plan(rerank, diversify)
+        fetch = n_results * plan["overfetch"]
+
+        async def search():
+            return await self._run(
+                self.service.search_similar_proposals,
+                requirements,
+                n_results=fetch,
+                timeout=timeout or self._search_timeout,
+                **(await self._query_kwargs(requirements)),
+            )
+
+        results = await self._cached_search("proposals", "similar_proposals", requirements, fetch, None, search)
+        results = await self._finish("proposals", requirements, results, n_results, plan, timeout)
+        await self._remember("proposals", requirements, n_results)
+        return results
+
+    @track_vector_search_metrics("batch")
+    async def search_batch(
+        self,
+        requests: List[Dict],
+        timeout: Optional[float] = None,
+        rerank: Optional[bool] = None,
+        diversify: Optional[bool] = None,
+    ) -> Dict[str, List[Dict]]:
+        """批量检索，返回 {键: 结果列表}
+
+        requests 每项包含 query，可选 id（结果键，默认为查询文本，不可重复）、collection
+        （documents / knowledge，默认 documents）、n_results、filter_metadata（文档）或 category
+        （知识库）。先逐条查缓存（与单条检索共用缓存键）；未命中的按 (集合, 过滤条件, n_results)
+        分组，ai_service 模式下文档查询的向量合并为一次嵌入请求，每组一次 collection.query，
+        各组在线程池中并行执行。启用重排 / 多样化时各条结果并发后处理。
+        """
+        timeout = timeout or self._search_timeout
+        plan = self._plan(rerank, diversify)
+        targets: Dict[str, Tuple[str, str, int]] = {}
+        results: Dict[str, List[Dict]] = {}
+        groups: Dict[Tuple, List[Tuple[str, str, Optional[int]]]] = {}
+        group_filters: Dict[Tuple, Tuple[Optional[Dict], Optional[Dict]]] = {}
+        keys = set()
+
+        for request in requests:
+            query = request["query"]
+            key = request.get("id") or query
+            if key in keys:
+                raise ValueError(f"批量检索的键重复: {key}")
+            keys.add(key)
+            collection = request.get("collection", "documents")
+            targets[key] = (collection, query, request.get("n_results", 5))
+            n_results = targets[key][2] * plan["overfetch"]
+            if collection == "documents":
+                where = request.get("filter_metadata")
+                cache_params = where
+            elif collection == "knowledge":
+                category = request.get("category")
+                where = {"category": category} if category else None
+                cache_params = {"category": category}
+            else:
+                raise ValueError(f"不支持批量检索的集合: {collection}")
+
+            version = None
+            if self._cache_enabled:
+                version = await self._cache.get_collection_version(collection)
+                cached = await self._cache.get_vector_search(
+                    query, collection, n_results, cache_params, version=version
+                )
+                if cached is not None:
+                    vector_cache_requests_total.labels(collection=collection, result="hit").inc()
+                    results[key] = cached
+                    continue
+                vector_cache_requests_total.labels(collection=collection, result="miss").inc()
+
+            group_key = (collection, json.dumps(where, sort_keys=True, ensure_ascii=False), n_results)
+            group_filters[group_key] = (where, cache_params)
+            groups.setdefault(group_key, []).append((key, query, version))
+
+        # ai_service 模式下文档集合的查询向量由 AIService 计算，所有分组合并为一次请求
+        embed_documents = settings.VECTOR_EMBEDDING_SOURCE == "ai_service"
+        embeddings: Dict[str, List[float]] = {}
+        if embed_documents:
+            texts = [
+                query
+                for (collection, _, _), members in groups.items()
+                if collection == "documents"
+                for _, query, _ in members
+            ]
+            if texts:
+                embeddings = dict(zip(texts, await self._embed_queries(texts)))
+
+        async def run_group(group_key: Tuple, members: List[Tuple[str, str, Optional[int]]]):
+            collection, _, n_results = group_key
+            where, cache_params = group_filters[group_key]
+            queries = [query for _, query, _ in members]
+            query_embeddings = (
+                [embeddings[query] for query in queries] if embed_documents and collection == "documents" else None
+            )
+            group_results = await self._run(
+                self.service.search_batch,
+                collection,
+                queries,
+                n_results=n_results,
+                where=where,
+                query_embeddings=query_embeddings,
+                timeout=timeout,
+            )
+            for (key, query, version), items in zip(members, group_results):
+                results[key] = items
+                if self._cache_enabled:
+                    await self._cache.cache_vector_search(
+                        query,
+                        collection,
+                        items,
+                        n_results,
+                        cache_params,
+                        expire=settings.VECTOR_CACHE_TTL,
+                        version=version,
+                    )
+
+        await asyncio.gather(*(run_group(group_key, members) for group_key, members in groups.items()))
+        if not plan["rerank"] and not plan["diversify"]:
+            return results
+        finished = await asyncio.gather(
+            *(
+                self._finish(collection, query, results[key], n_results, plan, timeout)
+                for key, (collection, query, n_results) in targets.items()
+            )
+        )
+        return dict(zip(targets, finished))
+
+    async def keyword_search(
+        self,
+        collection_name: str,
+        query: str,
+        n_results: int = 10,
+        where: Optional[Dict] = None,
+        timeout: Optional[float] = None,
+    ) -> List[Dict]:
+        """异步BM25关键词检索，参数同 VectorService.keyword_search"""
+        return await self._run(
+            self.service.keyword_search,
+            collection_name,
+            query,
+            n_results=n_results,
+            where=where,
+            timeout=timeout or self._search_timeout,
+        )
+
+    async def get_collection_stats(self, timeout: Optional[float] = None) -> Dict:
+        """异步获取集合统计信息"""
+        return await self._run(self.service.get_collection_stats, timeout=timeout or self._search_timeout)
+
+    # ==================== 写入 ====================
+
+    async def add_document(self, *args, timeout: Optional[float] = None, **kwargs) -> str:
+        """异步添加文档，参数同 VectorService.add_document"""
+        vector_id = await self._run(self.service.add_document, *args, timeout=timeout or self._write_timeout, **kwargs)
+        await self.invalidate("documents")
+        return vector_id
+
+    async def batch_add_documents(self, documents: List[Dict], timeout: Optional[float] = None):
+        """异步批量添加文档"""
+        result = await self._run(self.service.batch_add_documents, documents, timeout=timeout or self._write_timeout)
+        await self.invalidate("documents")
+        return result
+
+    async def ingest_documents(self, documents: List[Dict], batch_size: Optional[int] = None) -> Dict:
+        """用 AIService 批量嵌入并写入文档分块，返回 {doc_id: vector_id}
+
+        documents 中每项包含 doc_id / title / content / metadata。所有文档先统一分块再按
+        batch_size 切批，每批一次嵌入请求、一次 upsert；第 i 批在线程池写入 Chroma 时，
+        第 i+1 批的嵌入请求已经发出，嵌入与写入重叠执行。
+        """
+        batch_size = batch_size or settings.EMBEDDING_BATCH_SIZE
+        vector_ids = {}
+        ids, chunks, metadatas = [], [], []
+        for doc in documents:
+            vector_id, chunk_ids, doc_chunks, chunk_metadatas = await asyncio.to_thread(
+                self.service._build_chunk_records, doc["doc_id"], doc["title"], doc["content"], doc.get("metadata")
+            )
+            vector_ids[doc["doc_id"]] = vector_id
+            ids.extend(chunk_ids)
+            chunks.extend(doc_chunks)
+            metadatas.extend(chunk_metadatas)
+
+        starts = range(0, len(ids), batch_size)
+        if not starts:
+            return vector_ids
+
+        pending_embed = asyncio.ensure_future(self._embed(chunks[0:batch_size]))
+        pending_write = None
+        try:
+            for start in starts:
+                end = start + batch_size
+                embeddings = await pending_embed
+                if len(embeddings) != len(ids[start:end]):
+                    raise ValueError(f"嵌入结果数量({len(embeddings)})与分块数量({len(ids[start:end])})不一致")
+                if end < len(ids):
+                    pending_embed = asyncio.ensure_future(self._embed(chunks[end : end + batch_size]))
+                if pending_write is not None:
+                    await pending_write
+                pending_write = asyncio.ensure_future(
+                    self._run(
+                        self.service.add_chunk_batch,
+                        ids[start:end],
+                        chunks[start:end],
+                        metadatas[start:end],
+                        embeddings,
+                        timeout=self._write_timeout,
+                    )
+                )
+            await pending_write
+        except BaseException:
+            if not pending_embed.done():
+                pending_embed.cancel()
+            elif not pending_embed.cancelled():
+                pending_embed.exception()
+            # 已提交的写入在线程中无法取消：等它结束（并取回其异常）后再失效缓存
+            if pending_write is not None:
+                try:
+                    await pending_write
+                except Exception as e:
+                    logger.warning(f"批量写入向量数据库失败: {e}")
+            raise
+        finally:
+            # 部分批次可能已经写入，无论成功与否都失效检索缓存
+            await self.invalidate("documents")
+
+        logger.info(f"{len(documents)} 个文档已批量嵌入写入向量数据库，共 {len(ids)} 个块")
+        return vector_ids
+
+    async def update_document(
+        self,
+        doc_id: int,
+        title: str,
+        content: str,
+        metadata: Optional[Dict] = None,
+        timeout: Optional[float] = None,
+    ) -> Dict:
+        """异步增量更新文档向量，只嵌入新增分块，参数与返回值同 VectorService.update_document"""
+        timeout = timeout or self._write_timeout
+        if settings.VECTOR_EMBEDDING_SOURCE != "ai_service":
+            result = await self._run(self.service.update_document, doc_id, title, content, metadata, timeout=timeout)
+        else:
+            diff = await self._run(self.service.diff_document_chunks, doc_id, title, content, metadata, timeout=timeout)
+            batch_size = settings.EMBEDDING_BATCH_SIZE
+            embeddings: List[List[float]] = []
+            for start in range(0, len(diff["add_chunks"]), batch_size):
+                embeddings.extend(await self._embed(diff["add_chunks"][start : start + batch_size]))
+            result = await self._run(self.service.apply_document_diff, diff, embeddings or None, timeout=timeout)
+        await self.invalidate("documents")
+        return result
+
+    async def add_knowledge(self, *args, timeout: Optional[float] = None, **kwargs) -> str:
+        """异步添加知识库条目，参数同 VectorService.add_knowledge"""
+        vector_id = await self._run(self.service.add_knowledge, *args, timeout=timeout or self._write_timeout, **kwargs)
+        await self.invalidate("knowledge")
+        return vector_id
+
+    async def update_knowledge(self, *args, timeout: Optional[float] = None, **kwargs) -> str:
+        """异步更新知识库条目向量，参数同 VectorService.update_knowledge"""
+        vector_id = await self._run(
+            self.service.update_knowledge, *args, timeout=timeout or self._write_timeout, **kwargs
+        )
+        await self.invalidate("knowledge")
+        return vector_id
+
+    async def upsert_knowledge(self, *args, timeout: Optional[float] = None, **kwargs) -> str:
+        """异步更新或插入知识库条目，参数同 VectorService.upsert_knowledge"""
+        vector_id = await self._run(
+            self.service.upsert_knowledge, *args, timeout=timeout or self._write_timeout, **kwargs
+        )
+        await self.invalidate("knowledge")
+        return vector_id
+
+    async def vectorize_proposal(
+        self,
+        proposal_id: Union[int, str],
+        requirements: str,
+        content: Optional[str] = None,
+        metadata: Optional[Dict] = None,
+        sections: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = None,
+    ) -> str:
+        """异步向量化方案，参数同 VectorService.vectorize_proposal
+
+        ai_service 模式下章节向量由 AIService 计算，与相似方案检索的查询向量来自同一模型。
+        """
+        embeddings = None
+        texts = list(proposal_sections(content, sections).values())
+        if settings.VECTOR_EMBEDDING_SOURCE == "ai_service" and texts:
+            embeddings = await self._embed(texts)
+        vector_id = await self._run(
+            self.service.vectorize_proposal,
+            proposal_id,
+            requirements,
+            content,
+            metadata,
+            sections=sections,
+            embeddings=embeddings,
+            timeout=timeout or self._write_timeout,
+        )
+        await self.invalidate("proposals")
+        return vector_id
+
+    async def delete_document(
+        self, vector_id: Optional[str], doc_id: Optional[int] = None, timeout: Optional[float] = None
+    ) -> bool:
+        """异步删除文档向量"""
+        deleted = await self._run(
+            self.service.delete_document, vector_id, doc_id=doc_id, timeout=timeout or self._write_timeout
+        )
+        await self.invalidate("documents")
+        return deleted
+
+    async def delete_knowledge(self, vector_id: str, timeout: Optional[float] = None) -> bool:
+        """异步删除知识库向量"""
+        deleted = await self._run(self.service.delete_knowledge, vector_id, timeout=timeout or self._write_timeout)
+        await self.invalidate("knowledge")
+        return deleted
+
+    async def delete_proposal(self, proposal_id: Union[int, str], timeout: Optional[float] = None) -> bool:
+        """异步删除方案向量"""
+        deleted = await self._run(self.service.delete_proposal, proposal_id, timeout=timeout or self._write_timeout)
+        await self.invalidate("proposals")
+        return deleted
+
+
+def get_vector_service() -> VectorService:
+    """全局 VectorService 实例，首次调用时打开向量库并创建集合"""
+    return vector_service.instance()
+
+
+# 全局实例：导入时不打开向量库，首次使用或 lifespan 预热时才初始化
+vector_service: VectorService = LazyService(VectorService)
+async_vector_service = AsyncVectorService(vector_service, cache=cache_service, reranker=rerank_service)
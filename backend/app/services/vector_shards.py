@@ -0,0 +1,298 @@
+"""
+向量集合分片 - 按租户字段或哈希把一个逻辑集合拆成多个物理集合
+
+ShardedCollection 对 VectorService 暴露与 chromadb Collection 相同的接口，写入按元数据中的分片字段
+路由到物理集合 {集合名}_{字段}_{标记}：
+    value 模式  每个取值一个分片（如每个 user_id / industry 一个集合）
+    hash  模式  取值的稳定哈希对 shard_count 取模，分片数固定
+没有分片字段的记录和启用分片前写入的数据留在原集合中，作为默认分片。
+
+检索时 where 条件固定了分片字段（等值或 $in，含 $and 中的子条件）就只查询对应分片和默认分片（其中
+可能有启用分片前写入的同一租户的记录），每次检索的开销与分片大小相关，不随租户数增长；否则在线程池
+中并发查询全部分片，按距离合并前 n_results 条。按 id 的读取、更新和删除先在各分片中定位记录。
+upsert 把默认分片中的记录写入分片时会删除默认分片中的旧记录；除此之外记录写入后分片字段的取值不应
+改变，upsert 改变取值会在新旧分片各留一份。
+"""
+
+import hashlib
+import re
+import threading
+from concurrent.futures import Executor
+from typing import Callable, Dict, Iterable, List, Optional
+
+SHARD_MODES = ("value", "hash")
+# value 模式下可直接用作集合名一部分的取值，其他取值（如中文行业名）用哈希表示
+_NAME_TOKEN = re.compile(r"^[A-Za-z0-9]{1,24}$")
+_QUERY_FIELDS = ("ids", "distances", "documents", "metadatas", "embeddings")
+_GET_FIELDS = ("ids", "embeddings", "documents", "metadatas")
+
+
+def shard_token(value, mode: str = "value", shard_count: int = 16) -> str:
+    """分片字段取值对应的集合名标记"""
+    digest = hashlib.sha256(str(value).encode()).hexdigest()
+    if mode == "hash":
+        return f"h{int(digest, 16) % shard_count}"
+    text = str(value)
+    return text if _NAME_TOKEN.match(text) else f"x{digest[:16]}"
+
+
+def pinned_values(where: Optional[Dict], field: str) -> Optional[List]:
+    """where 条件限定的分片字段取值（等值、$eq 或 $in，含 $and 中的子条件），未限定时返回 None"""
+    if not where:
+        return None
+    if field in where:
+        condition = where[field]
+        if not isinstance(condition, dict):
+            return [condition]
+        if "$eq" in condition:
+            return [condition["$eq"]]
+        if "$in" in condition:
+            return list(condition["$in"])
+        return None
+    for clause in where.get("$and", []):
+        values = pinned_values(clause, field)
+        if values is not None:
+            return values
+    return None
+
+
+def _pick(values, positions: List[int]):
+    return [values[i] for i in positions] if values is not None else None
+
+
+class ShardedCollection:
+    """按元数据字段分片的逻辑集合，接口与 chromadb Collection 的常用子集一致"""
+
+    def __init__(
+        self,
+        client,
+        base,
+        field: str,
+        mode: str = "value",
+        shard_count: int = 16,
+        executor: Optional[Executor] = None,
+        embedding_function: Optional[Callable[[List[str]], List[List[float]]]] = None,
+    ):
+        """base 为原集合（默认分片），executor 用于跨分片并发检索，embedding_function 用于
+        按文本检索多个分片时只计算一次查询向量"""
+        if mode not in SHARD_MODES:
+            raise ValueError(f"不支持的分片方式: {mode}")
+        self._client = client
+        self._base = base
+        self.name = base.name
+        self.metadata = base.metadata
+        self.field = field
+        self.mode = mode
+        self.shard_count = shard_count
+        self._executor = executor
+        self._embedding_function = embedding_function
+        self._prefix = f"{base.name}_{field}_"
+        self._lock = threading.Lock()
+        self._shards: Dict[str, object] = {}
+        for collection in client.list_collections():
+            if collection.name.startswith(self._prefix):
+                self._shards[collection.name] = client.get_or_create_collection(
+                    name=collection.name, metadata=self.metadata
+                )
+
+    # ==================== 路由 ====================
+
+    def shard_name(self, value) -> str:
+        return self._prefix + shard_token(value, self.mode, self.shard_count)
+
+    def shards(self) -> List:
+        """默认分片和全部已创建的分片"""
+        with self._lock:
+            return [self._base] + [self._shards[name] for name in sorted(self._shards)]
+
+    def _shard(self, name: str, create: bool = False):
+        if name == self.name:
+            return self._base
+        with self._lock:
+            shard = self._shards.get(name)
+            if shard is None and create:
+                shard = self._shards[name] = self._client.get_or_create_collection(name=name, metadata=self.metadata)
+            return shard
+
+    def _targets(self, where: Optional[Dict]) -> List:
+        """where 限定了分片字段时返回默认分片和对应的已有分片，否则返回全部分片"""
+        values = pinned_values(where, self.field)
+        if values is None:
+            return self.shards()
+        names = dict.fromkeys(self.shard_name(value) for value in values)
+        return [self._base] + [shard for shard in (self._shard(name) for name in names) if shard is not None]
+
+    def _group(self, count: int, metadatas) -> Dict[str, List[int]]:
+        """按元数据中的分片字段把写入的记录分组 {分片名: 位置}"""
+        groups: Dict[str, List[int]] = {}
+        for i in range(count):
+            value = (metadatas[i] or {}).get(self.field) if metadatas is not None else None
+            groups.setdefault(self.name if value is None else self.shard_name(value), []).append(i)
+        return groups
+
+    def _locate(self, ids: List[str], targets: Optional[Iterable] = None) -> List:
+        """返回 [(分片, 其中存在的id)]"""
+        located = []
+        for shard in targets if targets is not None else self.shards():
+            found = shard.get(ids=ids, include=[])["ids"]
+            if found:
+                located.append((shard, found))
+        return located
+
+    def _map(self, function, shards: List) -> List:
+        if self._executor is None or len(shards) < 2:
+            return [function(shard) for shard in shards]
+        return list(self._executor.map(function, shards))
+
+    # ==================== 写入 ====================
+
+    def _write(self, method: str, ids, embeddings, metadatas, documents) -> None:
+        ids = ids if isinstance(ids, list) else [ids]
+        groups = self._group(len(ids), metadatas)
+        stale = []
+        if method == "upsert" and self._base.count():
+            # 启用分片前写入默认分片的记录移到其所属分片，写入成功后删除默认分片中旧的一份
+            moved = [ids[i] for name, positions in groups.items() if name != self.name for i in positions]
+            stale = self._base.get(ids=moved, include=[])["ids"] if moved else []
+        for name, positions in groups.items():
+            kwargs = {"ids": _pick(ids, positions), "metadatas": _pick(metadatas, positions)}
+            if embeddings is not None:
+                kwargs["embeddings"] = _pick(embeddings, positions)
+            if documents is not None:
+                kwargs["documents"] = _pick(documents, positions)
+            getattr(self._shard(name, create=True), method)(**kwargs)
+        if stale:
+            self._base.delete(ids=stale)
+
+    def add(self, ids, embeddings=None, metadatas=None, documents=None) -> None:
+        self._write("add", ids, embeddings, metadatas, documents)
+
+    def upsert(self, ids, embeddings=None, metadatas=None, documents=None) -> None:
+        self._write("upsert", ids, embeddings, metadatas, documents)
+
+    def update(self, ids, embeddings=None, metadatas=None, documents=None) -> None:
+        """更新已存在的记录，在记录所在的分片上执行"""
+        ids = ids if isinstance(ids, list) else [ids]
+        position = {item_id: i for i, item_id in enumerate(ids)}
+        for shard, found in self._locate(ids):
+            positions = [position[item_id] for item_id in found]
+            kwargs = {"ids": found}
+            for key, values in (("embeddings", embeddings), ("metadatas", metadatas), ("documents", documents)):
+                if values is not None:
+                    kwargs[key] = _pick(values, positions)
+            shard.update(**kwargs)
+
+    def delete(self, ids=None, where=None) -> None:
+        targets = self._targets(where)
+        if ids is None:
+            for shard in targets:
+                shard.delete(where=where)
+            return
+        for shard, found in self._locate(ids if isinstance(ids, list) else [ids], targets):
+            shard.delete(ids=found, where=where)
+
+    # ==================== 读取 ====================
+
+    def count(self) -> int:
+        return sum(shard.count() for shard in self.shards())
+
+    def get(self, ids=None, where=None, limit=None, offset=None, include=("metadatas", "documents"), **kwargs) -> Dict:
+        """按 id / where 读取记录；分页时按分片顺序依次读取，offset 跨过整个分片时只计数"""
+        include = list(include)
+        fields = [field for field in _GET_FIELDS if field == "ids" or field in include]
+        pages = []
+        if ids is not None:
+            ids = ids if isinstance(ids, list) else [ids]
+            pages = [shard.get(ids=ids, where=where, include=include) for shard in self._targets(where)]
+        else:
+            skip, remaining = offset or 0, limit
+            for shard in self._targets(where):
+                if remaining is not None and remaining <= 0:
+                    break
+                if skip:
+                    size = shard.count() if where is None else len(shard.get(where=where, include=[])["ids"])
+                    if skip >= size:
+                        skip -= size
+                        continue
+                page = shard.get(where=where, limit=remaining, offset=skip, include=include)
+                skip = 0
+                if remaining is not None:
+                    remaining -= len(page["ids"])
+                pages.append(page)
+        merged = {field: [value for page in pages for value in page[field] or []] for field in fields}
+        if ids is not None:
+            # 与 Chroma 一样按请求的 id 顺序返回
+            order = {item_id: index for index, item_id in enumerate(ids)}
+            ranked = sorted(range(len(merged["ids"])), key=lambda i: order[merged["ids"][i]])[offset or 0 :]
+            if limit is not None:
+                ranked = ranked[:limit]
+            merged = {field: [values[i] for i in ranked] for field, values in merged.items()}
+        return {field: merged.get(field) for field in _GET_FIELDS}
+
+    def query(
+        self,
+        query_embeddings=None,
+        query_texts=None,
+        n_results: int = 10,
+        where: Optional[Dict] = None,
+        include=("metadatas", "documents", "distances"),
+        **kwargs,
+    ) -> Dict:
+        """在相关分片上检索，多个分片时并发检索并按距离合并每条查询的前 n_results 条
+
+        多个分片时各分片只返回距离，合并后再从入选结果所在的分片读取文本和元数据，不为落选的
+        候选读取。
+        """
+        targets = self._targets(where)
+        query_count = len(query_embeddings if query_embeddings is not None else query_texts)
+        if query_embeddings is None and len(targets) > 1 and self._embedding_function is not None:
+            query_embeddings = self._embedding_function(list(query_texts))
+        include = list(dict.fromkeys([*include, "distances"]))
+        deferred = [field for field in ("documents", "metadatas") if field in include] if len(targets) > 1 else []
+        shard_include = [field for field in include if field not in deferred]
+
+        def search(shard):
+            if not shard.count():
+                return None
+            if query_embeddings is not None:
+                return shard.query(
+                    query_embeddings=query_embeddings, n_results=n_results, where=where, include=shard_include
+                )
+            return shard.query(query_texts=query_texts, n_results=n_results, where=where, include=shard_include)
+
+        found = [(shard, result) for shard, result in zip(targets, self._map(search, targets)) if result is not None]
+        merged = {field: [] for field in _QUERY_FIELDS}
+        selected = []
+        for q in range(query_count):
+            candidates = sorted(
+                (distance, s, j)
+                for s, (_, result) in enumerate(found)
+                for j, distance in enumerate(result["distances"][q])
+            )[:n_results]
+            selected.append([(s, found[s][1]["ids"][q][j]) for _, s, j in candidates])
+            for field in _QUERY_FIELDS:
+                if field == "ids" or field in shard_include:
+                    merged[field].append([found[s][1][field][q][j] for _, s, j in candidates])
+
+        if deferred:
+            wanted: Dict[int, List[str]] = {}
+            for pairs in selected:
+                for s, item_id in pairs:
+                    wanted.setdefault(s, []).append(item_id)
+            stored = {}
+            for s, ids in wanted.items():
+                page = found[s][0].get(ids=list(dict.fromkeys(ids)), include=deferred)
+                for i, item_id in enumerate(page["ids"]):
+                    stored[(s, item_id)] = {field: page[field][i] for field in deferred}
+            for field in deferred:
+                merged[field] = [[stored[pair][field] for pair in pairs] for pairs in selected]
+        return {field: merged[field] if field == "ids" or field in include else None for field in _QUERY_FIELDS}
+
+    # ==================== 管理 ====================
+
+    def drop_shards(self) -> None:
+        """删除全部分片集合（不含默认分片）"""
+        with self._lock:
+            for name in list(self._shards):
+                self._client.delete_collection(name)
+            self._shards.clear()
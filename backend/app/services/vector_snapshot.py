@@ -0,0 +1,197 @@
+"""
+向量库快照、导出、恢复与压缩
+
+快照是一个目录，按集合分子目录、按列存放，恢复时无需重新调用嵌入模型：
+    manifest.json            格式版本、创建时间、来源后端，以及各集合的行数、维度、向量精度和集合元数据
+    <集合>/embeddings.bin    行优先的向量矩阵（float32 或 float16），恢复时直接内存映射分块读取
+    <集合>/ids.jsonl         每行一个 id
+    <集合>/documents.jsonl   每行一个文本（JSON 字符串或 null）
+    <集合>/metadatas.jsonl   每行一个元数据对象
+
+快照与后端无关：Chroma 的快照可以恢复到内置 numpy 后端，反之亦然。导出按 offset 分页读取，
+恢复会删除并重建集合，两者都应在服务停止写入时执行（见 scripts/vector_snapshot.py）。
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from loguru import logger
+
+from app.core.config import settings
+from app.services.vector_index import NumpyCollection
+from app.services.vector_service import KEYWORD_INDEXED_COLLECTIONS, VectorService
+from app.services.vector_shards import ShardedCollection
+
+SNAPSHOT_FORMAT = 1
+SNAPSHOT_COLLECTIONS = ("documents", "knowledge", "proposals")
+SNAPSHOT_DTYPES = ("float32", "float16")
+# 导出时每页读取的行数与恢复时每批写入的行数
+EXPORT_PAGE_SIZE = 5000
+RESTORE_BATCH_SIZE = 5000
+
+_COLUMN_FILES = ("ids.jsonl", "documents.jsonl", "metadatas.jsonl")
+
+
+def export_collection(collection, path: str, dtype: str = "float32", page_size: int = EXPORT_PAGE_SIZE) -> Dict:
+    """把集合的 id、向量、文本和元数据按列导出到 path 目录，返回该集合的清单条目"""
+    if dtype not in SNAPSHOT_DTYPES:
+        raise ValueError(f"不支持的快照向量精度: {dtype}")
+    os.makedirs(path, exist_ok=True)
+    count, dim = 0, None
+    handles = [open(os.path.join(path, filename), "w", encoding="utf-8") for filename in _COLUMN_FILES]
+    try:
+        with open(os.path.join(path, "embeddings.bin"), "wb") as vectors:
+            while True:
+                page = collection.get(include=["embeddings", "documents", "metadatas"], limit=page_size, offset=count)
+                if not page["ids"]:
+                    break
+                embeddings = np.asarray(page["embeddings"], dtype=np.float32)
+                if dim is None:
+                    dim = embeddings.shape[1]
+                elif embeddings.shape[1] != dim:
+                    raise ValueError(f"集合 {collection.name} 的向量维度不一致: {embeddings.shape[1]} != {dim}")
+                vectors.write(embeddings.astype(dtype).tobytes())
+                documents = page["documents"] or [None] * len(page["ids"])
+                metadatas = page["metadatas"] or [None] * len(page["ids"])
+                for handle, values in zip(handles, (page["ids"], documents, metadatas)):
+                    handle.writelines(json.dumps(value, ensure_ascii=False) + "\n" for value in values)
+                count += len(page["ids"])
+    finally:
+        for handle in handles:
+            handle.close()
+    return {"count": count, "dim": dim, "dtype": dtype, "metadata": collection.metadata or {}}
+
+
+def create_snapshot(
+    service: VectorService,
+    path: str,
+    collections: Sequence[str] = SNAPSHOT_COLLECTIONS,
+    dtype: str = "float32",
+) -> Dict:
+    """导出多个集合到快照目录并写入 manifest.json（最后写入，清单存在即快照完整），返回清单"""
+    manifest_path = os.path.join(path, "manifest.json")
+    if os.path.exists(manifest_path):
+        raise FileExistsError(f"快照已存在: {path}")
+    manifest = {
+        "format": SNAPSHOT_FORMAT,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "backend": settings.VECTOR_BACKEND,
+        "collections": {},
+    }
+    for name in collections:
+        started = time.perf_counter()
+        entry = export_collection(service._collection(name), os.path.join(path, name), dtype)
+        manifest["collections"][name] = entry
+        logger.info(f"集合 {name} 已导出 {entry['count']} 条，耗时 {time.perf_counter() - started:.1f}s")
+    with open(manifest_path, "w", encoding="utf-8") as handle:
+        json.dump(manifest, handle, ensure_ascii=False, indent=2)
+    return manifest
+
+
+def load_manifest(path: str) -> Dict:
+    """读取快照清单，校验格式版本"""
+    manifest_path = os.path.join(path, "manifest.json")
+    if not os.path.exists(manifest_path):
+        raise FileNotFoundError(f"快照不存在或不完整: {path}")
+    with open(manifest_path, encoding="utf-8") as handle:
+        manifest = json.load(handle)
+    if manifest.get("format") != SNAPSHOT_FORMAT:
+        raise ValueError(f"不支持的快照格式版本: {manifest.get('format')}")
+    return manifest
+
+
+def read_collection(
+    path: str, entry: Dict, batch_size: int = RESTORE_BATCH_SIZE
+) -> Iterator[Tuple[List[str], np.ndarray, List, List]]:
+    """分批读取导出的集合，逐批产出 (ids, float32 向量, 文本, 元数据)"""
+    count = entry["count"]
+    if not count:
+        return
+    vectors = np.memmap(
+        os.path.join(path, "embeddings.bin"), dtype=entry["dtype"], mode="r", shape=(count, entry["dim"])
+    )
+    handles = [open(os.path.join(path, filename), encoding="utf-8") for filename in _COLUMN_FILES]
+    try:
+        for start in range(0, count, batch_size):
+            size = min(batch_size, count - start)
+            ids, documents, metadatas = ([json.loads(next(handle)) for _ in range(size)] for handle in handles)
+            yield ids, np.asarray(vectors[start : start + size], dtype=np.float32), documents, metadatas
+    finally:
+        for handle in handles:
+            handle.close()
+
+
+def restore_collection(collection, path: str, entry: Dict, batch_size: int = RESTORE_BATCH_SIZE) -> int:
+    """把导出的集合按批写入（空）集合，直接使用快照中的向量，返回写入条数"""
+    total = 0
+    for ids, embeddings, documents, metadatas in read_collection(path, entry, batch_size):
+        collection.add(
+            ids=ids,
+            # 内置索引直接接收数组；Chroma 只接受列表，且不允许空元数据
+            embeddings=embeddings if isinstance(collection, NumpyCollection) else embeddings.tolist(),
+            documents=documents if any(document is not None for document in documents) else None,
+            metadatas=[metadata or None for metadata in metadatas],
+        )
+        total += len(ids)
+    return total
+
+
+def restore_snapshot(
+    service: VectorService,
+    path: str,
+    collections: Optional[Sequence[str]] = None,
+    batch_size: int = RESTORE_BATCH_SIZE,
+) -> Dict[str, int]:
+    """用快照替换集合内容：删除并重建集合、批量写入向量，再从集合重建关键词索引；返回各集合条数"""
+    manifest = load_manifest(path)
+    names = list(collections) if collections else list(manifest["collections"])
+    missing = [name for name in names if name not in manifest["collections"]]
+    if missing:
+        raise ValueError(f"快照中没有集合: {', '.join(missing)}")
+    restored = {}
+    for name in names:
+        started = time.perf_counter()
+        entry = manifest["collections"][name]
+        collection = service.reset_collection(name, metadata=entry["metadata"])
+        restored[name] = restore_collection(collection, os.path.join(path, name), entry, batch_size)
+        if name in KEYWORD_INDEXED_COLLECTIONS:
+            service.keyword_index.clear(name)
+            service.rebuild_keyword_index(name)
+        logger.info(f"集合 {name} 已恢复 {restored[name]} 条，耗时 {time.perf_counter() - started:.1f}s")
+    return restored
+
+
+def compact_collection(service: VectorService, name: str) -> Dict[str, Optional[int]]:
+    """回收集合中已删除记录占用的空间，返回 {"rows": 保留行数, "removed": 移除行数}
+
+    内置索引（分片集合逐个分片）原地重写文件；Chroma 的 HNSW 索引删除时只做标记，通过一次导出再恢复重建集合，
+    快照放在向量库目录旁边，避免跨文件系统复制。恢复会先删除集合，快照是此时唯一完整的副本，因此只在恢复
+    成功后删除；恢复失败时保留快照并抛出异常，可用 scripts/vector_snapshot.py restore 从该目录重试。
+    """
+    collection = service._collection(name)
+    shards = collection.shards() if isinstance(collection, ShardedCollection) else [collection]
+    if all(isinstance(shard, NumpyCollection) for shard in shards):
+        results = [shard.compact() for shard in shards]
+        return {field: sum(result[field] for result in results) for field in ("rows", "removed")}
+    parent = os.path.dirname(os.path.abspath(settings.CHROMA_PERSIST_DIRECTORY))
+    directory = tempfile.mkdtemp(prefix=f"compact_{name}_", dir=parent)
+    try:
+        create_snapshot(service, directory, [name])
+    except Exception:
+        # 导出失败时集合未被改动
+        shutil.rmtree(directory, ignore_errors=True)
+        raise
+    try:
+        rows = restore_snapshot(service, directory, [name])[name]
+    except Exception as e:
+        logger.error(f"压缩集合 {name} 时恢复失败，数据保留在快照 {directory} 中，请从该快照恢复: {e}")
+        raise
+    shutil.rmtree(directory, ignore_errors=True)
+    # Chroma 不暴露标记删除的数量
+    return {"rows": rows, "removed": None}
@@ -0,0 +1,110 @@
+"""
+服务预热 - 应用启动时按步骤预先完成首个请求才会做的初始化
+
+导入 app.main 时向量库、AI 客户端等都不会创建（见 app.utils.lazy），发布后的第一批请求会碰上冷的
+向量索引、未注册的字体、空的连接池和缓存。lifespan 在后台执行 run_warmup()，按 WARMUP_STEPS 依次：
+    database        预先建立 WARMUP_DB_CONNECTIONS 个数据库连接放回连接池
+    redis           连接 Redis
+    ai_models       读取启用的 AIModel 配置（完成 ORM 映射配置和首次查询）
+    vector_index    打开各集合（含分片），每个集合检索一次把索引读入内存，回填关键词索引
+    ai_client       创建默认 AIService 客户端
+    fonts           注册 PDF 导出的中文字体
+    recent_queries  回放最近 WARMUP_REPLAY_QUERIES 条检索，填充查询向量和检索结果缓存
+单个步骤失败只记录日志，不影响其余步骤，对应的资源在首次使用时再初始化。全部步骤结束后 /ready 返回就绪。
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
+
+from loguru import logger
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.core.database import SessionLocal, engine
+from app.models.ai_model import AIModel
+from app.services.ai_service import get_ai_service
+from app.services.cache_service import cache_service
+from app.services.export_service import ExportService
+from app.services.vector_service import async_vector_service, get_vector_service
+
+
+def _connect_database() -> int:
+    connections = []
+    try:
+        for _ in range(max(settings.WARMUP_DB_CONNECTIONS, 1)):
+            connection = engine.connect()
+            connections.append(connection)
+            connection.execute(text("SELECT 1"))
+    finally:
+        # 归还后连接留在连接池中
+        for connection in connections:
+            connection.close()
+    return len(connections)
+
+
+async def _connect_redis() -> bool:
+    return await cache_service.ping()
+
+
+def _prefetch_ai_models() -> int:
+    db = SessionLocal()
+    try:
+        return len(db.query(AIModel).filter(AIModel.is_enabled == True).all())  # noqa: E712
+    finally:
+        db.close()
+
+
+def _open_vector_index() -> Dict[str, int]:
+    return get_vector_service().warm_up()
+
+
+def _create_ai_client() -> str:
+    return get_ai_service().provider
+
+
+async def _replay_recent_queries() -> int:
+    replayed = 0
+    for entry in await cache_service.get_recent_queries(settings.WARMUP_REPLAY_QUERIES):
+        try:
+            await async_vector_service.replay(entry)
+            replayed += 1
+        except Exception as e:
+            logger.warning(f"回放检索失败 {entry.get('query', '')[:50]}: {e}")
+    return replayed
+
+
+# 步骤名 -> 执行函数；同步函数在线程中执行，不阻塞事件循环
+WARMUP_STEPS: Dict[str, Callable[[], Union[Any, Awaitable[Any]]]] = {
+    "database": _connect_database,
+    "redis": _connect_redis,
+    "ai_models": _prefetch_ai_models,
+    "vector_index": _open_vector_index,
+    "ai_client": _create_ai_client,
+    "fonts": ExportService.register_fonts,
+    "recent_queries": _replay_recent_queries,
+}
+
+
+async def run_warmup(steps: Optional[List[str]] = None) -> Dict[str, Dict]:
+    """按顺序执行预热步骤（默认 settings.WARMUP_STEPS），返回 {步骤名: {"status", "seconds", "result"/"error"}}"""
+    report: Dict[str, Dict] = {}
+    for name in steps if steps is not None else settings.WARMUP_STEPS:
+        step = WARMUP_STEPS.get(name)
+        if step is None:
+            logger.warning(f"未知的预热步骤: {name}")
+            continue
+        started = time.perf_counter()
+        try:
+            if asyncio.iscoroutinefunction(step):
+                result = await step()
+            else:
+                result = await asyncio.to_thread(step)
+        except Exception as e:
+            logger.error(f"预热步骤 {name} 失败: {e}")
+            report[name] = {"status": "failed", "seconds": round(time.perf_counter() - started, 3), "error": str(e)}
+            continue
+        report[name] = {"status": "ok", "seconds": round(time.perf_counter() - started, 3), "result": result}
+    summary = ", ".join(f"{name} {item['status']} {item['seconds']:.2f}s" for name, item in report.items())
+    logger.info(f"服务预热完成: {summary}")
+    return report
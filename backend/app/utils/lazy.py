@@ -0,0 +1,58 @@
+"""
+延迟初始化的服务单例
+
+模块级全局实例（vector_service、ai_service 等）改为 LazyService 后，导入模块时不再打开向量库、
+创建集合或初始化模型客户端，首次访问属性时才创建真实实例。属性读写和删除都转发给真实实例，
+`from ... import vector_service` 的调用方以及测试中的 monkeypatch / patch.object 无需改动；
+需要真实对象的地方（类型检查、传给其他组件保存）用 instance() 取得。
+"""
+
+import threading
+import time
+from typing import Callable, Generic, Optional, TypeVar
+
+from loguru import logger
+
+T = TypeVar("T")
+
+
+class LazyService(Generic[T]):
+    """首次使用时调用 factory 创建实例的线程安全代理"""
+
+    def __init__(self, factory: Callable[[], T], name: Optional[str] = None):
+        # 代理自身的属性直接写入 __dict__，不经过转发给实例的 __setattr__
+        object.__setattr__(self, "_factory", factory)
+        object.__setattr__(self, "_name", name or getattr(factory, "__name__", "service"))
+        object.__setattr__(self, "_instance", None)
+        object.__setattr__(self, "_lock", threading.Lock())
+
+    @property
+    def initialized(self) -> bool:
+        """真实实例是否已创建"""
+        return self._instance is not None
+
+    def instance(self) -> T:
+        """返回真实实例，首次调用时创建；并发调用只创建一次"""
+        instance = self._instance
+        if instance is None:
+            with self._lock:
+                instance = self._instance
+                if instance is None:
+                    started = time.perf_counter()
+                    instance = self._factory()
+                    object.__setattr__(self, "_instance", instance)
+                    logger.info(f"{self._name} 初始化完成，耗时 {time.perf_counter() - started:.2f}s")
+        return instance
+
+    def __getattr__(self, name: str):
+        return getattr(self.instance(), name)
+
+    def __setattr__(self, name: str, value) -> None:
+        setattr(self.instance(), name, value)
+
+    def __delattr__(self, name: str) -> None:
+        delattr(self.instance(), name)
+
+    def __repr__(self) -> str:
+        state = repr(self._instance) if self._instance is not None else "未初始化"
+        return f"<LazyService {self._name}: {state}>"
@@ -0,0 +1,92 @@
+"""
+检索结果多样化工具
+
+最大边际相关（MMR）选择与按来源折叠，避免同一文档的多个分块或几乎相同的多个文档版本
+占满有限的上下文槽位。
+"""
+
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+# 折叠结果时依次尝试的元数据字段：同一文档的分块共享 doc_id / vector_group_id
+COLLAPSE_FIELDS = ("doc_id", "vector_group_id")
+
+
+def collapse_results(results: List[Dict], fields: Sequence[str] = COLLAPSE_FIELDS) -> List[Dict]:
+    """每个来源只保留排名最靠前的一条，来源取 fields 中第一个存在的元数据字段
+
+    没有这些字段的结果各自成组，全部保留。
+    """
+    seen = set()
+    collapsed = []
+    for result in results:
+        metadata = result.get("metadata") or {}
+        group = next(((field, metadata[field]) for field in fields if metadata.get(field) is not None), None)
+        if group is not None:
+            if group in seen:
+                continue
+            seen.add(group)
+        collapsed.append(result)
+    return collapsed
+
+
+def result_relevance(results: List[Dict]) -> np.ndarray:
+    """结果与查询的相关度：优先用重排分数，其次向量距离，混合检索中缺少距离时按排名换算"""
+    if results and all(result.get("rerank_score") is not None for result in results):
+        return np.array([result["rerank_score"] for result in results], dtype=np.float32)
+    if results and all(result.get("distance") is not None for result in results):
+        return 1.0 - np.array([result["distance"] for result in results], dtype=np.float32)
+    return 1.0 - np.arange(len(results), dtype=np.float32) / max(len(results), 1)
+
+
+def mmr_select(relevance: np.ndarray, embeddings: np.ndarray, k: int, lambda_mult: float = 0.5) -> List[int]:
+    """最大边际相关选择，返回选中候选的下标（按选中顺序）
+
+    每一步选 λ·相关度 − (1−λ)·与已选结果的最大余弦相似度 最大的候选；λ=1 退化为按相关度排序。
+    候选间相似度矩阵一次算出，每步只做一次向量化的 maximum 更新。
+    """
+    count = len(relevance)
+    if count == 0 or k <= 0:
+        return []
+    vectors = np.asarray(embeddings, dtype=np.float32)
+    vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    similarity = vectors @ vectors.T
+    relevance = np.asarray(relevance, dtype=np.float32)
+
+    selected = [int(np.argmax(relevance))]
+    max_similarity = similarity[selected[0]].copy()
+    available = np.ones(count, dtype=bool)
+    available[selected[0]] = False
+    while len(selected) < min(k, count):
+        scores = lambda_mult * relevance - (1 - lambda_mult) * max_similarity
+        scores[~available] = -np.inf
+        chosen = int(np.argmax(scores))
+        selected.append(chosen)
+        available[chosen] = False
+        np.maximum(max_similarity, similarity[chosen], out=max_similarity)
+    return selected
+
+
+def diversify_results(
+    results: List[Dict],
+    embeddings: Sequence[Optional[Sequence[float]]],
+    k: int,
+    lambda_mult: float = 0.5,
+    fields: Sequence[str] = COLLAPSE_FIELDS,
+) -> List[Dict]:
+    """先按来源折叠，再用 MMR 选出 k 条；embeddings 与 results 一一对应，缺失的向量视为与其他结果无关"""
+    collapsed = collapse_results(results, fields)
+    if len(collapsed) <= 1:
+        return collapsed[:k]
+    index = {id(result): i for i, result in enumerate(results)}
+    rows = [embeddings[index[id(result)]] for result in collapsed]
+    dim = next((len(row) for row in rows if row is not None), 0)
+    if not dim:
+        return collapsed[:k]
+    matrix = np.zeros((len(rows), dim), dtype=np.float32)
+    for i, row in enumerate(rows):
+        if row is not None:
+            matrix[i] = row
+    order = mmr_select(result_relevance(collapsed), matrix, k, lambda_mult)
+    return [collapsed[i] for i in order]
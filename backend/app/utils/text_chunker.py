@@ -0,0 +1,247 @@
+"""
+文本分块工具
+
+按token预算把长文本切成检索用的分块：识别标题、段落、列表和表格，优先在结构边界处切分，
+超长段落退化为按句切分，超长句子（包括没有空格的长 URL、base64、十六进制串）再按token硬切；
+相邻分块之间保留可配置的重叠。
+整个过程是单遍的流式生成器，输入可以是字符串，也可以是逐段产出文本的迭代器。
+"""
+
+import re
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+
+# 连续的字母数字每 WORD_CHARS_PER_TOKEN 个字符计一个token（不足按一个计）
+WORD_CHARS_PER_TOKEN = 4
+# 中日韩字符各计一个token，字母数字按上面的规则，其余非空白符号各计一个token
+_TOKEN_PATTERN = re.compile(
+    rf"[\u3400-\u9fff\uf900-\ufaff]|[A-Za-z0-9_]{{1,{WORD_CHARS_PER_TOKEN}}}|[^\sA-Za-z0-9_\u3400-\u9fff\uf900-\ufaff]"
+)
+_WORD_PATTERN = re.compile(r"[A-Za-z0-9_]+")
+_SENTENCE_END = re.compile(r"(?<=[。！？!?；;])|(?<=[.])(?=\s)")
+# 编号标题（如 "1.2 项目背景"）要求每级不超过两位数且后接空白，"2.5亿元"、"2024.01.15" 之类的金额日期不算标题
+_HEADING_PATTERN = re.compile(r"^(#{1,6}\s+\S|第[一二三四五六七八九十百零〇0-9]+[章节部分篇条]|[一二三四五六七八九十]+、|\d{1,2}(\.\d{1,2})+\.?\s+\D)")
+# markdown 表格表头下的分隔行，如 "| --- | :---: |"
+_TABLE_SEPARATOR = re.compile(r"^\s*\|?\s*:?-{3,}:?\s*(\|\s*:?-{3,}:?\s*)*\|?\s*$")
+HEADING_MAX_CHARS = 60
+
+
+def estimate_tokens(text: str) -> int:
+    """估算文本的token数（不依赖具体模型的分词器）
+
+    与 _TOKEN_PATTERN 的计数规则一致：字母数字串按长度折算，其余按非空白字符数统计，比逐个匹配token快。
+    """
+    words = sum(-(-len(word) // WORD_CHARS_PER_TOKEN) for word in _WORD_PATTERN.findall(text))
+    return words + len("".join(_WORD_PATTERN.sub("", text).split()))
+
+
+def _iter_lines(source: Union[str, Iterable[str]]) -> Iterator[str]:
+    """把字符串或文本片段流切成行，片段可以在行中间断开"""
+    if isinstance(source, str):
+        yield from source.split("\n")
+        return
+    pending: List[str] = []
+    for piece in source:
+        if "\n" not in piece:
+            pending.append(piece)
+            continue
+        lines = piece.split("\n")
+        pending.append(lines[0])
+        yield "".join(pending)
+        yield from lines[1:-1]
+        pending = [lines[-1]]
+    if pending:
+        yield "".join(pending)
+
+
+def _classify(line: str) -> str:
+    """判断一行的结构类型：blank / heading / table / tabbed / text（列表项与段落一样以整行为最小单元）
+
+    tabbed 为含制表符的行，连续多行时才作为表格处理，单独一行按普通文本处理。
+    """
+    stripped = line.strip()
+    if not stripped:
+        return "blank"
+    if stripped.count("|") >= 2:
+        return "table"
+    if "\t" in stripped:
+        return "tabbed"
+    if len(stripped) <= HEADING_MAX_CHARS and not stripped.endswith(("。", "；", ";", "，", ",")):
+        if _HEADING_PATTERN.match(stripped):
+            return "heading"
+    return "text"
+
+
+class TextChunker:
+    """结构感知的滑动窗口分块器
+
+    实例只保存配置，每次 iter_chunks 使用独立的状态，可在多个线程间共享。
+    """
+
+    def __init__(self, max_tokens: int = 500, overlap_tokens: int = 50):
+        if max_tokens <= 0:
+            raise ValueError("max_tokens 必须大于0")
+        self.max_tokens = max_tokens
+        # 重叠不超过预算的一半，保证每个分块都有新内容
+        self.overlap_tokens = max(0, min(overlap_tokens, max_tokens // 2))
+
+    def split(self, text: str) -> List[str]:
+        """一次性返回全部分块"""
+        return list(self.iter_chunks(text))
+
+    def iter_chunks(self, source: Union[str, Iterable[str]]) -> Iterator[str]:
+        """流式产出分块
+
+        标题会结束当前分块并作为本节后续分块的前缀；表格尽量整体放入一个分块，放不下时按行
+        拆分并在每块重复表头（含 markdown 分隔行）；普通行放不下时整行移到下一块，只有单行超过预算
+        才按句切分。
+        """
+        return _ChunkBuilder(self.max_tokens, self.overlap_tokens).run(source)
+
+
+class _ChunkBuilder:
+    """单次分块的状态，单元为 (分隔符, 文本, token数)"""
+
+    def __init__(self, max_tokens: int, overlap_tokens: int):
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self._heading: Optional[Tuple[str, str, int]] = None
+        self._units: List[Tuple[str, str, int]] = []
+        self._tokens = 0
+        self._has_content = False
+
+    def run(self, source: Union[str, Iterable[str]]) -> Iterator[str]:
+        table: List[str] = []
+        separator = ""
+
+        for line in _iter_lines(source):
+            line = line.rstrip("\r")
+            kind = _classify(line)
+            if kind in ("table", "tabbed"):
+                table.append(line)
+                continue
+            if table:
+                yield from self._end_table(table, separator)
+                table = []
+                separator = "\n"
+            if kind == "blank":
+                if self._units:
+                    separator = "\n\n"
+                continue
+            if kind == "heading":
+                yield from self._flush(carry_overlap=False)
+                heading = line.strip()
+                self._heading = ("", heading, estimate_tokens(heading))
+                self._start_chunk([])
+            else:
+                yield from self._add_line(line, separator)
+            separator = "\n"
+
+        if table:
+            yield from self._end_table(table, separator)
+        yield from self._flush(carry_overlap=False)
+
+    def _start_chunk(self, overlap: List[Tuple[str, str, int]]) -> None:
+        self._units = [self._heading] if self._heading else []
+        self._units.extend(overlap)
+        self._tokens = sum(unit[2] for unit in self._units)
+        self._has_content = False
+
+    def _flush(self, carry_overlap: bool = True) -> Iterator[str]:
+        """产出当前分块，并以末尾不超过 overlap_tokens 的单元开始下一块"""
+        if self._has_content:
+            body_units = self._units[1:] if self._heading else self._units
+            chunk = "".join(
+                (separator if index else "") + text for index, (separator, text, _) in enumerate(body_units)
+            )
+            yield f"{self._heading[1]}\n{chunk.strip()}" if self._heading else chunk.strip()
+        overlap: List[Tuple[str, str, int]] = []
+        if carry_overlap and self._has_content and self.overlap_tokens:
+            budget = self.overlap_tokens
+            start = 1 if self._heading else 0
+            for unit in reversed(self._units[start:]):
+                if unit[2] > budget:
+                    break
+                overlap.append(unit)
+                budget -= unit[2]
+            overlap.reverse()
+        self._start_chunk(overlap)
+
+    def _append(self, unit: Tuple[str, str, int]) -> Iterator[str]:
+        """追加一个不超过预算的单元，放不下时先产出当前分块"""
+        if self._tokens + unit[2] > self.max_tokens and self._has_content:
+            yield from self._flush()
+        # 重叠部分加上新单元仍超预算时，从最早的重叠单元开始丢弃
+        start = 1 if self._heading else 0
+        while self._tokens + unit[2] > self.max_tokens and len(self._units) > start:
+            self._tokens -= self._units.pop(start)[2]
+        self._units.append(unit)
+        self._tokens += unit[2]
+        self._has_content = True
+
+    def _budget(self) -> int:
+        """标题前缀之外，单个分块可用于正文的token数"""
+        return max(1, self.max_tokens - (self._heading[2] if self._heading else 0))
+
+    def _add_line(self, line: str, separator: str) -> Iterator[str]:
+        tokens = estimate_tokens(line)
+        if tokens <= self._budget():
+            yield from self._append((separator, line, tokens))
+            return
+        for index, piece in enumerate(self._split_long(line)):
+            yield from self._append((separator if index == 0 else "", piece, estimate_tokens(piece)))
+
+    def _end_table(self, rows: List[str], separator: str) -> Iterator[str]:
+        """单独一行含制表符的文本不是表格，按普通行处理"""
+        if len(rows) == 1 and _classify(rows[0]) == "tabbed":
+            return self._add_line(rows[0], separator)
+        return self._add_table(rows, separator)
+
+    def _add_table(self, rows: List[str], separator: str) -> Iterator[str]:
+        table = "\n".join(rows)
+        tokens = estimate_tokens(table)
+        if tokens <= self._budget():
+            if self._tokens + tokens > self.max_tokens and self._has_content:
+                yield from self._flush(carry_overlap=False)
+            yield from self._append((separator, table, tokens))
+            return
+
+        # 表格放不下一个分块：按行拆分，每块重复表头，不与前后正文重叠
+        yield from self._flush(carry_overlap=False)
+        header_rows = 2 if len(rows) > 1 and _TABLE_SEPARATOR.match(rows[1]) else 1
+        header = "\n".join(rows[:header_rows])
+        header_tokens = estimate_tokens(header)
+        group: List[str] = [header]
+        group_tokens = header_tokens
+        for row in rows[header_rows:]:
+            row_tokens = estimate_tokens(row)
+            if group_tokens + row_tokens > self._budget() and len(group) > 1:
+                yield from self._append((separator, "\n".join(group), group_tokens))
+                yield from self._flush(carry_overlap=False)
+                group, group_tokens = [header], header_tokens
+            if header_tokens + row_tokens > self._budget():
+                # 单行超预算，退化为硬切
+                for piece in self._split_long(row):
+                    yield from self._append(("\n", piece, estimate_tokens(piece)))
+                continue
+            group.append(row)
+            group_tokens += row_tokens
+        if len(group) > 1:
+            yield from self._append((separator, "\n".join(group), group_tokens))
+        yield from self._flush(carry_overlap=False)
+
+    def _split_long(self, text: str) -> Iterator[str]:
+        """超预算文本先按句切分，单句仍超预算再按token窗口硬切"""
+        budget = self._budget()
+        for sentence in _SENTENCE_END.split(text):
+            if not sentence:
+                continue
+            if estimate_tokens(sentence) <= budget:
+                yield sentence
+                continue
+            spans = [match.end() for match in _TOKEN_PATTERN.finditer(sentence)]
+            start = 0
+            for index in range(budget - 1, len(spans), budget):
+                yield sentence[start : spans[index]]
+                start = spans[index]
+            if start < len(sentence) and sentence[start:].strip():
+                yield sentence[start:]
@@ -0,0 +1,131 @@
+"""Cache value codec benchmark: stored size and (de)serialization cost.
+
+Encodes representative cached values with every codec available in this
+interpreter (json / msgpack x none / zlib / zstd / lz4, whichever are
+installed) and with the legacy format, the UTF-8 JSON text that
+CacheService.set wrote before the codec layer:
+
+  ai_response     a ~--ai-chars character Chinese markdown answer
+  proposal_list   one page of --page-size proposal rows
+  vector_search   --hits search hits with content and metadata
+  query_embedding a --dim dimensional float vector
+
+For each value it reports the stored bytes (saving vs legacy) and the
+mean encode / decode time over --repeat runs. Values below
+--min-bytes are stored uncompressed, as CacheService does.
+
+Usage:
+    python scripts/bench_cache_codec.py --repeat 2000 --min-bytes 1024
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.services.cache_codec import COMPRESSORS, SERIALIZERS, CacheCodec  # noqa: E402
+
+TOPICS = ["核心系统", "支付清算", "信贷管理", "数据中台", "移动银行", "风险控制", "客户关系", "反洗钱"]
+
+
+def make_values(args) -> dict:
+    rng = np.random.default_rng(0)
+    paragraphs = []
+    while sum(map(len, paragraphs)) < args.ai_chars:
+        topic = TOPICS[int(rng.integers(len(TOPICS)))]
+        paragraphs.append(
+            f"## {topic}建设方案\n\n本方案围绕{topic}的现状与目标，提出分阶段实施路径，"
+            f"第{len(paragraphs) + 1}阶段重点完成架构升级、数据治理与运维体系建设，预计投入{int(rng.integers(50, 500))}万元。\n"
+        )
+    proposals = {
+        "items": [
+            {
+                "id": i,
+                "title": f"{TOPICS[i % len(TOPICS)]}建设方案（{2024 + i % 3}年度）",
+                "status": ["draft", "review", "published"][i % 3],
+                "user_id": 7,
+                "created_at": f"2024-0{1 + i % 9}-1{i % 10}T09:30:00",
+                "updated_at": f"2024-0{1 + i % 9}-2{i % 10}T18:05:00",
+                "tags": [TOPICS[(i + 1) % len(TOPICS)], TOPICS[(i + 3) % len(TOPICS)]],
+            }
+            for i in range(args.page_size)
+        ],
+        "total": 500,
+        "page": 1,
+        "page_size": args.page_size,
+    }
+    hits = [
+        {
+            "id": f"doc_{i}_chunk_{i * 3}",
+            "content": "".join(paragraphs)[i * 40 : i * 40 + 500],
+            "metadata": {"doc_id": i, "title": f"文档{i}", "chunk_index": i * 3, "file_type": "pdf"},
+            "distance": float(rng.random()),
+            "score": float(rng.random()),
+        }
+        for i in range(args.hits)
+    ]
+    embedding = rng.standard_normal(args.dim).astype(np.float32).tolist()
+    return {
+        "ai_response": "".join(paragraphs),
+        "proposal_list": proposals,
+        "vector_search": hits,
+        "query_embedding": embedding,
+    }
+
+
+def timed(function, argument, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function(argument)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def legacy_encode(value) -> bytes:
+    return json.dumps(value, ensure_ascii=False).encode("utf-8")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=2000)
+    parser.add_argument("--min-bytes", type=int, default=1024)
+    parser.add_argument("--ai-chars", type=int, default=6000)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--hits", type=int, default=10)
+    parser.add_argument("--dim", type=int, default=384)
+    args = parser.parse_args()
+
+    codecs = [
+        CacheCodec(serializer, compression, args.min_bytes) for serializer in SERIALIZERS for compression in COMPRESSORS
+    ]
+    print(f"serializers: {', '.join(SERIALIZERS)}; compressors: {', '.join(COMPRESSORS)}; min bytes {args.min_bytes}")
+    totals = {"legacy": [0, 0.0, 0.0], **{codec.name: [0, 0.0, 0.0] for codec in codecs}}
+    for label, value in make_values(args).items():
+        legacy = legacy_encode(value)
+        print(f"\n{label} (legacy JSON {len(legacy):,} B)")
+        print(f"{'codec':<16}{'bytes':>10}{'saved':>8}{'encode us':>12}{'decode us':>12}")
+        rows = [("legacy", legacy, legacy_encode, json.loads)]
+        rows += [(codec.name, codec.encode(value), codec.encode, codec.decode) for codec in codecs]
+        for name, data, encode, decode in rows:
+            assert decode(data) == json.loads(legacy)
+            encode_us = timed(encode, value, args.repeat)
+            decode_us = timed(decode, data, args.repeat)
+            totals[name][0] += len(data)
+            totals[name][1] += encode_us
+            totals[name][2] += decode_us
+            print(f"{name:<16}{len(data):>10,}{1 - len(data) / len(legacy):>8.1%}{encode_us:>12.1f}{decode_us:>12.1f}")
+
+    legacy_total = totals["legacy"][0]
+    print(f"\nall values\n{'codec':<16}{'bytes':>10}{'saved':>8}{'encode us':>12}{'decode us':>12}")
+    for name, (size, encode_us, decode_us) in totals.items():
+        print(f"{name:<16}{size:>10,}{1 - size / legacy_total:>8.1%}{encode_us:>12.1f}{decode_us:>12.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
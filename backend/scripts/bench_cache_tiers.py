@@ -0,0 +1,123 @@
+"""Hot-key read benchmark for CacheService with and without the L1 near-cache.
+
+Writes --keys values of ~--value-bytes through CacheService, then replays
+--reads gets over a skewed keyspace (--hot-ratio of the reads go to the
+first 1% of the keys) against a real Redis server:
+
+  redis_only  every get is a Redis round-trip (what CacheService did before)
+  l1          the invalidation listener is running, hot keys come from L1
+
+Redis load is the delta of total_commands_processed from INFO stats, so it
+includes the writes and the invalidation messages. Needs a reachable Redis
+(REDIS_HOST / REDIS_PORT / REDIS_DB from the settings); the keys are
+written under a bench_l1: prefix and deleted afterwards.
+
+Usage:
+    python scripts/bench_cache_tiers.py --keys 1000 --reads 50000
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.core.config import settings  # noqa: E402
+from app.services.cache_service import CacheService  # noqa: E402
+
+PREFIX = "bench_l1"
+
+
+async def commands_processed(service: CacheService) -> int:
+    return int((await service._redis_client.info("stats"))["total_commands_processed"])
+
+
+async def run_variant(name: str, keys: list[str], reads: np.ndarray, value: dict) -> dict:
+    service = CacheService()
+    if name == "l1":
+        await service.start_invalidation_listener()
+        for _ in range(100):
+            if service._near_cache_active:
+                break
+            await asyncio.sleep(0.01)
+    try:
+        before = await commands_processed(service)
+        for key in keys:
+            await service.set(key, value, ttl=600)
+        latencies = []
+        start = time.perf_counter()
+        for index in reads:
+            began = time.perf_counter()
+            await service.get(keys[index])
+            latencies.append((time.perf_counter() - began) * 1e6)
+        elapsed = time.perf_counter() - start
+        commands = await commands_processed(service) - before - 1  # 不计第二次 INFO
+        quantiles = statistics.quantiles(latencies, n=100)
+        return {
+            "variant": name,
+            "p50_us": statistics.median(latencies),
+            "p99_us": quantiles[98],
+            "reads_per_s": len(reads) / elapsed,
+            "redis_commands": commands,
+            "redis_ops_per_s": commands / elapsed,
+        }
+    finally:
+        await service.stop_invalidation_listener()
+        await service.clear_pattern(f"{PREFIX}:*")
+        await service._redis_client.aclose()
+
+
+async def run(args) -> int:
+    probe = CacheService()
+    try:
+        reachable = await probe.ping()
+    except Exception as e:
+        reachable = False
+        print(e, file=sys.stderr)
+    if not reachable:
+        print(f"Redis is not reachable at {settings.REDIS_HOST}:{settings.REDIS_PORT}", file=sys.stderr)
+        return 1
+    await probe._redis_client.aclose()
+
+    rng = np.random.default_rng(0)
+    keys = [f"{PREFIX}:proposal_list:{i}" for i in range(args.keys)]
+    hot = max(args.keys // 100, 1)
+    reads = np.where(
+        rng.random(args.reads) < args.hot_ratio,
+        rng.integers(0, hot, args.reads),
+        rng.integers(0, args.keys, args.reads),
+    )
+    value = {"items": [{"id": i, "title": "x" * 32} for i in range(args.value_bytes // 48)], "total": 0}
+
+    print(
+        f"{args.reads:,} reads over {args.keys:,} keys, {args.hot_ratio:.0%} to the hottest 1%, "
+        f"L1 ttl {settings.CACHE_L1_TTL}s"
+    )
+    print(f"{'variant':<12}{'p50 us':>10}{'p99 us':>10}{'reads/s':>11}{'redis cmds':>12}{'redis ops/s':>13}")
+    for name in ("redis_only", "l1"):
+        result = await run_variant(name, keys, reads, value)
+        print(
+            f"{name:<12}{result['p50_us']:>10.1f}{result['p99_us']:>10.1f}{result['reads_per_s']:>11,.0f}"
+            f"{result['redis_commands']:>12,}{result['redis_ops_per_s']:>13,.0f}"
+        )
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--keys", type=int, default=1000)
+    parser.add_argument("--reads", type=int, default=50000)
+    parser.add_argument("--hot-ratio", type=float, default=0.9)
+    parser.add_argument("--value-bytes", type=int, default=2048)
+    args = parser.parse_args()
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+"""Throughput benchmark for precomputed-embedding ingestion into Chroma.
+
+Builds a synthetic corpus (~10k chunks by default) and writes it to a
+throw-away Chroma collection three ways:
+
+  per-document  embed each document's chunks, then one collection.add per
+                document (what a caller of add_document(embeddings=...) does)
+  batched       fixed-size chunk batches, embed then upsert, strictly serial
+  pipelined     AsyncVectorService.ingest_documents: same batches, but the
+                next batch's embedding request overlaps the current write
+
+The embedding provider is simulated with a fixed per-request latency plus a
+per-text cost, so the numbers reflect request batching and overlap rather
+than a particular vendor.
+
+Usage:
+    python scripts/bench_embedding_ingestion.py --chunks 10000 --batch-size 64 --request-ms 40
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.core.config import settings  # noqa: E402
+
+SENTENCE = "银行核心系统改造方案覆盖存款、贷款、账户管理与支付清算等业务模块"
+
+
+def build_corpus(chunks: int, chunks_per_doc: int) -> list[dict]:
+    # 每句按字计token，凑满 CHUNK_MAX_TOKENS 即约一个分块（重叠会让分块数略多）
+    sentences_per_chunk = max(1, (settings.CHUNK_MAX_TOKENS - settings.CHUNK_OVERLAP_TOKENS) // (len(SENTENCE) + 1))
+    body = "。".join([SENTENCE] * sentences_per_chunk * chunks_per_doc) + "。"
+    return [
+        {"doc_id": i, "title": f"文档{i}", "content": f"{i}{body}", "metadata": {"industry": "金融"}}
+        for i in range(max(1, chunks // chunks_per_doc))
+    ]
+
+
+def make_embedder(request_ms: float, per_text_ms: float, dim: int):
+    rng = np.random.default_rng(0)
+
+    async def embed(texts):
+        await asyncio.sleep((request_ms + per_text_ms * len(texts)) / 1000)
+        return rng.standard_normal((len(texts), dim), dtype=np.float32).tolist()
+
+    return embed
+
+
+async def per_document(service, embed, documents) -> int:
+    total = 0
+    for doc in documents:
+        _, ids, chunks, metadatas = service._build_chunk_records(
+            doc["doc_id"], doc["title"], doc["content"], doc["metadata"]
+        )
+        embeddings = await embed(chunks)
+        await asyncio.to_thread(
+            service.documents_collection.add, ids=ids, documents=chunks, metadatas=metadatas, embeddings=embeddings
+        )
+        total += len(ids)
+    return total
+
+
+async def batched(service, embed, documents, batch_size: int) -> int:
+    ids, chunks, metadatas = [], [], []
+    for doc in documents:
+        _, chunk_ids, doc_chunks, chunk_metadatas = service._build_chunk_records(
+            doc["doc_id"], doc["title"], doc["content"], doc["metadata"]
+        )
+        ids += chunk_ids
+        chunks += doc_chunks
+        metadatas += chunk_metadatas
+    for start in range(0, len(ids), batch_size):
+        end = start + batch_size
+        embeddings = await embed(chunks[start:end])
+        await asyncio.to_thread(
+            service.add_chunk_batch, ids[start:end], chunks[start:end], metadatas[start:end], embeddings
+        )
+    return len(ids)
+
+
+async def pipelined(facade, documents, batch_size: int) -> int:
+    await facade.ingest_documents(documents, batch_size=batch_size)
+    return facade.service.documents_collection.count()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=10000)
+    parser.add_argument("--chunks-per-doc", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--request-ms", type=float, default=40.0, help="simulated latency per embedding request")
+    parser.add_argument("--per-text-ms", type=float, default=0.5, help="simulated cost per embedded text")
+    parser.add_argument("--dim", type=int, default=384)
+    args = parser.parse_args()
+
+    documents = build_corpus(args.chunks, args.chunks_per_doc)
+    embed = make_embedder(args.request_ms, args.per_text_ms, args.dim)
+
+    with tempfile.TemporaryDirectory() as directory:
+        settings.CHROMA_PERSIST_DIRECTORY = directory
+        from app.services.vector_service import AsyncVectorService, VectorService
+
+        print(f"{len(documents)} documents, batch {args.batch_size}, request {args.request_ms:.0f} ms")
+        print(f"{'mode':<14}{'chunks':>8}{'wall(s)':>10}{'chunks/s':>12}")
+        modes = (
+            ("per-document", lambda service: per_document(service, embed, documents)),
+            ("batched", lambda service: batched(service, embed, documents, args.batch_size)),
+            (
+                "pipelined",
+                lambda service: pipelined(AsyncVectorService(service, embed_func=embed), documents, args.batch_size),
+            ),
+        )
+        for name, runner in modes:
+            service = VectorService()
+            service.client.delete_collection("documents")
+            service.documents_collection = service._get_or_create_collection("documents")
+            start = time.perf_counter()
+            chunks = asyncio.run(runner(service))
+            elapsed = time.perf_counter() - start
+            print(f"{name:<14}{chunks:>8}{elapsed:>10.2f}{chunks / elapsed:>12.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+"""Import-time benchmark for app.main with a regression budget.
+
+Runs `python -X importtime -c "import <module>"` in fresh interpreters and
+reports the median cumulative import time of the module, the slowest imported
+packages, and whether any of the heavy optional dependencies that should only
+load on first use (chromadb, numpy, reportlab, openpyxl, docx, pypdf) were
+imported.
+
+Exits with status 1 when the median exceeds --budget-ms or a heavy module was
+imported, so it can be used as a CI gate.
+
+Usage:
+    python scripts/bench_import_time.py --runs 5 --budget-ms 3000
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+HEAVY_MODULES = ("chromadb", "numpy", "reportlab", "openpyxl", "docx", "pypdf")
+LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def run_once(module: str) -> dict[str, int]:
+    """Cumulative import time in microseconds of every top-level package and of the module itself."""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    timings: dict[str, int] = {}
+    for line in completed.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            name = match.group(4)
+            top = name if name == module else name.split(".")[0]
+            timings[top] = max(timings.get(top, 0), int(match.group(2)))
+    return timings
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="number of slowest packages to list")
+    parser.add_argument("--budget-ms", type=float, default=None, help="fail when the median exceeds this")
+    args = parser.parse_args()
+
+    runs = [run_once(args.module) for _ in range(args.runs)]
+    totals = [run[args.module] / 1000 for run in runs]
+    median = statistics.median(totals)
+    print(
+        f"{args.module}: median {median:.0f} ms, min {min(totals):.0f} ms, max {max(totals):.0f} ms ({args.runs} runs)"
+    )
+
+    packages = {name for run in runs for name in run if name != args.module}
+    slowest = sorted(packages, key=lambda name: -statistics.median(run.get(name, 0) for run in runs))
+    print(f"\n{'package':<32}{'median ms':>10}")
+    for name in slowest[: args.top]:
+        print(f"{name:<32}{statistics.median(run.get(name, 0) for run in runs) / 1000:>10.0f}")
+
+    status = 0
+    heavy = [name for name in HEAVY_MODULES if name in packages]
+    if heavy:
+        print(f"\nFAIL: heavy modules imported eagerly: {', '.join(heavy)}")
+        status = 1
+    if args.budget_ms is not None and median > args.budget_ms:
+        print(f"\nFAIL: median {median:.0f} ms exceeds budget {args.budget_ms:.0f} ms")
+        status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+"""Keyword search benchmark: LIKE '%query%' full scan vs the BM25 inverted index.
+
+Builds a synthetic knowledge base (20k entries by default) in a throw-away
+SQLite file and answers the same queries two ways:
+
+  like-scan  title/content LIKE '%query%' ordered by weight, i.e. what the
+             old /knowledge/search did through SQLAlchemy contains()
+  bm25       KeywordIndex.search over bigram/term postings
+
+A fraction of entries carry an exact term (a standard number or product code)
+that also appears elsewhere in different word order; recall@10 is measured
+against the entries that really contain every query term.
+
+Usage:
+    python scripts/bench_keyword_search.py --entries 20000 --queries 200
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.services.keyword_index import KeywordIndex  # noqa: E402
+
+TOPICS = ["核心系统", "支付清算", "信贷管理", "数据中台", "移动银行", "风险控制", "客户关系", "反洗钱"]
+FILLER = "本方案围绕业务连续性、系统高可用与监管合规要求展开设计，兼顾建设成本与后续运维。"
+
+
+def build_entries(count: int, codes: list[str], rng: random.Random) -> list[tuple[int, str, str, str]]:
+    entries = []
+    for i in range(count):
+        topic = rng.choice(TOPICS)
+        code = rng.choice(codes) if rng.random() < 0.05 else ""
+        # 一半条目把编号写在主题前，用户按“主题 编号”查询时 LIKE 整串匹配会漏掉
+        body = f"{code} {topic}建设" if rng.random() < 0.5 else f"{topic}建设，参照 {code}"
+        entries.append((i, f"{topic}方案{i}", f"{body}。{FILLER * 3}", code))
+    return entries
+
+
+def like_scan(conn: sqlite3.Connection, query: str, limit: int) -> list[int]:
+    pattern = f"%{query}%"
+    rows = conn.execute(
+        "SELECT id FROM knowledge WHERE title LIKE ? OR content LIKE ? ORDER BY weight DESC LIMIT ?",
+        (pattern, pattern, limit),
+    ).fetchall()
+    return [row[0] for row in rows]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    codes = [f"JR/T {rng.randint(100, 999):04d}-20{rng.randint(10, 24)}" for _ in range(50)]
+    entries = build_entries(args.entries, codes, rng)
+    queries = []
+    for _ in range(args.queries):
+        code, topic = rng.choice(codes), rng.choice(TOPICS)
+        relevant = {i for i, _, content, entry_code in entries if entry_code == code and topic in content}
+        queries.append((f"{topic} {code}", relevant))
+
+    with tempfile.TemporaryDirectory() as directory:
+        conn = sqlite3.connect(str(Path(directory) / "knowledge.db"))
+        conn.execute("CREATE TABLE knowledge (id INTEGER PRIMARY KEY, title TEXT, content TEXT, weight INTEGER)")
+        conn.executemany("INSERT INTO knowledge VALUES (?, ?, ?, 1)", [entry[:3] for entry in entries])
+        conn.commit()
+
+        index = KeywordIndex(str(Path(directory) / "keyword.sqlite3"))
+        start = time.perf_counter()
+        index.add(
+            "knowledge", ((str(i), f"{title}\n{content}", {"knowledge_id": i}) for i, title, content, _ in entries)
+        )
+        print(f"{len(entries)} entries, index build {time.perf_counter() - start:.1f}s, {len(queries)} queries")
+        print(f"{'method':<11}{'p50(ms)':>10}{'p95(ms)':>10}{'recall@' + str(args.limit):>12}")
+
+        methods = (
+            ("like-scan", lambda query: like_scan(conn, query, args.limit)),
+            ("bm25", lambda query: [int(hit["id"]) for hit in index.search("knowledge", query, args.limit)]),
+        )
+        for name, search in methods:
+            latencies, recalls = [], []
+            for query, relevant in queries:
+                start = time.perf_counter()
+                found = search(query)
+                latencies.append((time.perf_counter() - start) * 1000)
+                if relevant:
+                    recalls.append(len(relevant & set(found)) / min(len(relevant), args.limit))
+            p95 = statistics.quantiles(latencies, n=20)[-1]
+            recall = statistics.mean(recalls) if recalls else 0.0
+            print(f"{name:<11}{statistics.median(latencies):>10.2f}{p95:>10.2f}{recall:>12.2f}")
+        index.close()
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+"""In-process cache tier benchmark: plain dict vs bounded MemoryCache.
+
+Replays --ops cache operations (--set-ratio writes, the rest reads) over a
+skewed keyspace: --hot-ratio of the traffic goes to 1% of the --keys keys.
+Each write stores a fresh ~--value-bytes JSON-serialisable value with
+--ttl seconds, serialising it first like CacheService.set does. Time is
+virtual, 1 ms per operation, so TTLs expire during the run.
+
+  dict          what CacheService used before: ignores ttl, never evicts
+  memory_cache  MemoryCache capped at --max-entries / --max-bytes
+
+Each variant runs in a fresh interpreter; the RSS growth is read from
+/proc/self/statm.
+
+Usage:
+    python scripts/bench_memory_cache.py --ops 1000000 --max-bytes 33554432
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.services import memory_cache as memory_cache_module  # noqa: E402
+from app.services.memory_cache import MemoryCache  # noqa: E402
+
+VARIANTS = ("dict", "memory_cache")
+
+
+def rss_bytes() -> int:
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def workload(args) -> tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(0)
+    hot = max(args.keys // 100, 1)
+    keys = np.where(
+        rng.random(args.ops) < args.hot_ratio, rng.integers(0, hot, args.ops), rng.integers(0, args.keys, args.ops)
+    )
+    return keys, rng.random(args.ops) < args.set_ratio
+
+
+def run_variant(args) -> None:
+    keys, writes = workload(args)
+    clock = [0.0]
+    memory_cache_module.time.monotonic = lambda: clock[0]
+    cache = MemoryCache(args.max_entries, args.max_bytes, name="bench") if args.variant == "memory_cache" else {}
+    payload = "x" * args.value_bytes
+    hits = 0
+    gc.collect()
+    rss_before = rss_bytes()
+    start = time.perf_counter()
+    for i in range(args.ops):
+        clock[0] += 0.001
+        key = f"proposal_list:{keys[i]}"
+        if writes[i]:
+            value = {"id": int(keys[i]), "payload": payload + str(i)}
+            value_str = json.dumps(value, ensure_ascii=False)
+            if args.variant == "dict":
+                cache[key] = value
+            else:
+                cache.set(key, value, args.ttl, size=len(value_str))
+        elif cache.get(key) is not None:
+            hits += 1
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    growth = rss_bytes() - rss_before
+    stats = cache.stats() if args.variant == "memory_cache" else {"entries": len(cache)}
+    print(
+        json.dumps(
+            {
+                "variant": args.variant,
+                "ops_per_s": args.ops / elapsed,
+                "hit_rate": hits / max(int((~writes).sum()), 1),
+                "entries": stats["entries"],
+                "approx_mib": stats.get("bytes", 0) / 2**20,
+                "rss_growth_mib": growth / 2**20,
+                "evictions": stats.get("evictions", 0),
+                "expirations": stats.get("expirations", 0),
+            }
+        )
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ops", type=int, default=1000000)
+    parser.add_argument("--keys", type=int, default=2000000)
+    parser.add_argument("--hot-ratio", type=float, default=0.5)
+    parser.add_argument("--set-ratio", type=float, default=0.2)
+    parser.add_argument("--value-bytes", type=int, default=1024)
+    parser.add_argument("--ttl", type=float, default=3600.0)
+    parser.add_argument("--max-entries", type=int, default=100000)
+    parser.add_argument("--max-bytes", type=int, default=32 * 2**20)
+    parser.add_argument("--variant", choices=VARIANTS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.variant:
+        run_variant(args)
+        return 0
+
+    print(
+        f"{args.ops:,} ops, {args.keys:,} keys, {args.set_ratio:.0%} writes, "
+        f"{args.value_bytes} B values, ttl {args.ttl:g}s"
+    )
+    print(f"memory_cache cap: {args.max_entries:,} entries / {args.max_bytes / 2**20:.0f} MiB")
+    print(
+        f"{'variant':<14}{'ops/s':>11}{'hit rate':>10}{'entries':>10}"
+        f"{'approx MiB':>12}{'RSS +MiB':>10}{'evicted':>10}{'expired':>10}"
+    )
+    for variant in VARIANTS:
+        completed = subprocess.run(
+            [sys.executable, __file__, *sys.argv[1:], "--variant", variant], capture_output=True, text=True, check=True
+        )
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        print(
+            f"{variant:<14}{result['ops_per_s']:>11,.0f}{result['hit_rate']:>10.1%}{result['entries']:>10,}"
+            f"{result['approx_mib']:>12.1f}{result['rss_growth_mib']:>10.1f}"
+            f"{result['evictions']:>10,}{result['expirations']:>10,}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+"""Filtered vector search benchmark: metadata posting lists vs full-column filters.
+
+Loads --vectors random embeddings with industry / type metadata and runs the
+same filtered queries at three selectivities:
+
+  1%     {"industry": "industry7"}
+  10%    {"industry": {"$in": [ten industries]}}
+  100%   {"type": "proposal"} (every row matches)
+
+against:
+
+  chroma          chromadb PersistentClient (metadata filter in its SQLite
+                  layer, then the HNSW index)
+  numpy-scan      NumpyCollection without posting lists: the filter is
+                  evaluated over the whole metadata column on every query
+  numpy-postings  NumpyCollection with posting lists on industry / type: the
+                  candidate rows come straight from the lists and only those
+                  rows are scored
+
+Recall@k is measured against exact filtered brute force.
+
+Usage:
+    python scripts/bench_prefilter.py --vectors 100000 --dim 384 --queries 200
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.services.vector_index import NumpyCollection  # noqa: E402
+
+ADD_BATCH = 5000
+INDUSTRIES = 100
+SELECTIVITIES = (
+    ("1%", {"industry": "industry7"}, lambda rows: rows % INDUSTRIES == 7),
+    (
+        "10%",
+        {"industry": {"$in": [f"industry{i}" for i in range(10)]}},
+        lambda rows: rows % INDUSTRIES < 10,
+    ),
+    ("100%", {"type": "proposal"}, lambda rows: np.ones(len(rows), dtype=bool)),
+)
+
+
+def metadata(row: int) -> dict:
+    return {"industry": f"industry{row % INDUSTRIES}", "type": "proposal", "doc_id": row}
+
+
+def load(collection, data: np.ndarray) -> float:
+    start = time.perf_counter()
+    for offset in range(0, len(data), ADD_BATCH):
+        part = data[offset : offset + ADD_BATCH]
+        collection.add(
+            ids=[f"v{offset + i}" for i in range(len(part))],
+            embeddings=part.tolist(),
+            metadatas=[metadata(offset + i) for i in range(len(part))],
+        )
+    return time.perf_counter() - start
+
+
+def ground_truth(data: np.ndarray, queries: np.ndarray, k: int, mask: np.ndarray) -> list[set[str]]:
+    scores = queries @ data.T
+    scores[:, ~mask] = -np.inf
+    top = np.argsort(-scores, axis=1)[:, :k]
+    return [{f"v{row}" for row in rows} for rows in top]
+
+
+def run(collection, queries: np.ndarray, truth: list[set[str]], k: int, where) -> tuple[float, float, float]:
+    latencies, recalls = [], []
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        result = collection.query(query_embeddings=[query.tolist()], n_results=k, where=where, include=["distances"])
+        latencies.append((time.perf_counter() - start) * 1000)
+        recalls.append(len(expected & set(result["ids"][0])) / k)
+    return statistics.median(latencies), statistics.quantiles(latencies, n=20)[-1], statistics.mean(recalls)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--skip-chroma", action="store_true", help="only benchmark the numpy backends")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    data = rng.standard_normal((args.vectors, args.dim), dtype=np.float32)
+    data /= np.linalg.norm(data, axis=1, keepdims=True)
+    queries = rng.standard_normal((args.queries, args.dim), dtype=np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    rows = np.arange(args.vectors)
+    truths = {label: ground_truth(data, queries, args.k, select(rows)) for label, _, select in SELECTIVITIES}
+
+    with tempfile.TemporaryDirectory() as directory:
+        root = Path(directory)
+        backends = []
+        if not args.skip_chroma:
+            import chromadb
+            from chromadb.config import Settings
+
+            client = chromadb.PersistentClient(
+                path=str(root / "chroma"),
+                settings=Settings(
+                    anonymized_telemetry=False,
+                    chroma_product_telemetry_impl="app.services.chroma_telemetry.NoopTelemetry",
+                ),
+            )
+            backends.append(("chroma", client.create_collection("bench", metadata={"hnsw:space": "cosine"})))
+        for name, fields in (("numpy-scan", ()), ("numpy-postings", ("industry", "type"))):
+            collection = NumpyCollection(
+                "bench", str(root / name), {"hnsw:space": "cosine"}, ivf_min_rows=0, indexed_fields=fields
+            )
+            backends.append((name, collection))
+
+        print(f"{args.vectors} vectors x {args.dim}d, {args.queries} queries, k={args.k}")
+        print(f"{'backend':<16}{'select':>8}{'p50(ms)':>10}{'p95(ms)':>10}{'recall':>8}")
+        for name, collection in backends:
+            build = load(collection, data)
+            for label, where, _ in SELECTIVITIES:
+                p50, p95, recall = run(collection, queries, truths[label], args.k, where)
+                print(f"{name:<16}{label:>8}{p50:>10.2f}{p95:>10.2f}{recall:>8.3f}")
+            print(f"{name:<16}{'build':>8}{build:>10.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
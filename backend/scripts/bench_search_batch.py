@@ -0,0 +1,101 @@
+"""Batch search benchmark: one 10-query batch vs 10 separate searches.
+
+Loads a synthetic corpus into a throw-away Chroma collection and answers
+rounds of --batch queries two ways, without the result cache:
+
+  separate  asyncio.gather of AsyncVectorService.search_documents, i.e. one
+            embedding request and one collection.query per query
+  batch     AsyncVectorService.search_batch: one embedding request and one
+            collection.query(query_embeddings=[...]) for the whole round
+
+Query embeddings come from a simulated provider with a fixed per-request
+latency (ai_service mode); --request-ms 0 isolates the Chroma side.
+
+Usage:
+    python scripts/bench_search_batch.py --chunks 5000 --rounds 50 --batch 10 --request-ms 40
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.core.config import settings  # noqa: E402
+
+TOPICS = ["核心系统", "支付清算", "信贷管理", "数据中台", "移动银行", "风险控制", "客户关系", "反洗钱"]
+
+
+def make_embedder(request_ms: float, dim: int):
+    rng = np.random.default_rng(0)
+
+    async def embed(texts):
+        await asyncio.sleep(request_ms / 1000)
+        return rng.standard_normal((len(texts), dim), dtype=np.float32).tolist()
+
+    return embed
+
+
+async def separate(facade, queries: list[str]) -> None:
+    await asyncio.gather(*(facade.search_documents(query, n_results=5) for query in queries))
+
+
+async def batch(facade, queries: list[str]) -> None:
+    await facade.search_batch([{"query": query, "n_results": 5} for query in queries])
+
+
+async def run_rounds(runner, facade, rounds: list[list[str]]) -> list[float]:
+    latencies = []
+    for queries in rounds:
+        start = time.perf_counter()
+        await runner(facade, queries)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=5000)
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--batch", type=int, default=10, help="queries per round")
+    parser.add_argument("--request-ms", type=float, default=40.0, help="simulated latency per embedding request")
+    parser.add_argument("--workers", type=int, default=4, help="vector thread pool size")
+    parser.add_argument("--dim", type=int, default=384)
+    args = parser.parse_args()
+
+    documents = [
+        {"doc_id": i, "title": f"文档{i}", "content": f"{TOPICS[i % len(TOPICS)]}建设方案第{i}部分"} for i in range(args.chunks)
+    ]
+    rounds = [[f"{TOPICS[(r + q) % len(TOPICS)]}建设方案 {r}-{q}" for q in range(args.batch)] for r in range(args.rounds)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        settings.CHROMA_PERSIST_DIRECTORY = directory
+        settings.KEYWORD_INDEX_PATH = str(Path(directory) / "keyword.sqlite3")
+        settings.VECTOR_EMBEDDING_SOURCE = "ai_service"
+        from app.services.vector_service import AsyncVectorService, VectorService
+
+        service = VectorService()
+        asyncio.run(AsyncVectorService(service, embed_func=make_embedder(0, args.dim)).ingest_documents(documents))
+        print(f"{service.documents_collection.count()} chunks, {args.rounds} rounds x {args.batch} queries")
+        print(f"{'mode':<10}{'p50(ms)':>10}{'p95(ms)':>10}{'queries/s':>12}")
+
+        for name, runner in (("separate", separate), ("batch", batch)):
+            facade = AsyncVectorService(
+                service, max_workers=args.workers, embed_func=make_embedder(args.request_ms, args.dim)
+            )
+            latencies = asyncio.run(run_rounds(runner, facade, rounds))
+            p95 = statistics.quantiles(latencies, n=20)[-1]
+            throughput = args.batch * len(latencies) / (sum(latencies) / 1000)
+            print(f"{name:<10}{statistics.median(latencies):>10.2f}{p95:>10.2f}{throughput:>12.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
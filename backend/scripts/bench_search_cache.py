@@ -0,0 +1,107 @@
+"""Search latency benchmark for the versioned read-through result cache.
+
+Loads a synthetic corpus into a throw-away Chroma collection, then replays a
+skewed query stream (a few popular queries, a long tail) through
+AsyncVectorService with and without a cache. Query embeddings come from a
+simulated provider with a fixed per-request latency, as in ai_service mode,
+so a miss pays for one embedding request plus the HNSW + BM25 search.
+A write is issued every --write-every queries to show version invalidation.
+
+Usage:
+    python scripts/bench_search_cache.py --chunks 5000 --queries 2000 --request-ms 40
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.core.config import settings  # noqa: E402
+from app.core.metrics import counter_total, vector_cache_requests_total  # noqa: E402
+
+TOPICS = ["核心系统", "支付清算", "信贷管理", "数据中台", "移动银行", "风险控制", "客户关系", "反洗钱"]
+
+
+def make_embedder(request_ms: float, dim: int):
+    async def embed(texts):
+        await asyncio.sleep(request_ms / 1000)
+        # 同一文本得到同一向量，便于重复查询
+        return [
+            np.random.default_rng(abs(hash(text)) % (1 << 32)).standard_normal(dim, dtype=np.float32).tolist()
+            for text in texts
+        ]
+
+    return embed
+
+
+def make_queries(count: int, distinct: int, rng: np.random.Generator) -> list[str]:
+    ranks = np.minimum(rng.zipf(1.3, size=count), distinct)
+    return [f"{TOPICS[rank % len(TOPICS)]}建设方案 {rank}" for rank in ranks]
+
+
+async def replay(facade, queries: list[str], write_every: int) -> list[float]:
+    latencies = []
+    for i, query in enumerate(queries, start=1):
+        start = time.perf_counter()
+        await facade.search_documents(query, n_results=5)
+        latencies.append((time.perf_counter() - start) * 1000)
+        if write_every and i % write_every == 0:
+            await facade.ingest_documents([{"doc_id": 100000 + i, "title": "新文档", "content": f"{query}的补充说明"}])
+    return latencies
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--distinct", type=int, default=500, help="size of the query vocabulary")
+    parser.add_argument("--write-every", type=int, default=200, help="ingest one document every N queries (0: never)")
+    parser.add_argument("--request-ms", type=float, default=40.0, help="simulated latency per embedding request")
+    parser.add_argument("--dim", type=int, default=384)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    queries = make_queries(args.queries, args.distinct, rng)
+    documents = [
+        {"doc_id": i, "title": f"文档{i}", "content": f"{TOPICS[i % len(TOPICS)]}建设方案第{i}部分"} for i in range(args.chunks)
+    ]
+    embed = make_embedder(args.request_ms, args.dim)
+
+    with tempfile.TemporaryDirectory() as directory:
+        settings.CHROMA_PERSIST_DIRECTORY = directory
+        settings.KEYWORD_INDEX_PATH = str(Path(directory) / "keyword.sqlite3")
+        settings.VECTOR_EMBEDDING_SOURCE = "ai_service"
+        from app.services.cache_service import CacheService
+        from app.services.vector_service import AsyncVectorService, VectorService
+
+        service = VectorService()
+        asyncio.run(AsyncVectorService(service, embed_func=make_embedder(0, args.dim)).ingest_documents(documents))
+        print(f"{service.documents_collection.count()} chunks, {len(queries)} queries, write every {args.write_every}")
+        print(f"{'mode':<10}{'p50(ms)':>10}{'p95(ms)':>10}{'mean(ms)':>10}{'hit rate':>10}")
+
+        for name, cache in (("no-cache", None), ("cache", CacheService())):
+            if cache is not None:
+                cache._cache_type = "memory"
+            facade = AsyncVectorService(service, embed_func=embed, cache=cache)
+            hits = counter_total(vector_cache_requests_total, result="hit")
+            latencies = asyncio.run(replay(facade, queries, args.write_every))
+            hits = counter_total(vector_cache_requests_total, result="hit") - hits
+            hit_rate = f"{hits / len(queries):.2f}" if cache else "-"
+            p95 = statistics.quantiles(latencies, n=20)[-1]
+            print(
+                f"{name:<10}{statistics.median(latencies):>10.2f}{p95:>10.2f}"
+                f"{statistics.mean(latencies):>10.2f}{hit_rate:>10}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
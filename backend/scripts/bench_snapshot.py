@@ -0,0 +1,129 @@
+"""Vector store snapshot benchmark: export, bulk restore and compaction.
+
+Builds a NumpyCollection with --vectors random embeddings (short documents and
+industry / doc_id metadata), then measures:
+
+  export    collection -> snapshot directory (embeddings.bin + JSONL columns)
+  restore   snapshot -> empty collection, reusing the stored embeddings
+            (no embedding model calls); checked against the source collection
+            with --queries exact queries
+  compact   delete --delete-ratio of the restored rows, then rewrite the
+            collection files without the tombstones
+
+With --chroma-vectors N the first N snapshot rows are also restored into a
+chromadb collection (Chroma inserts are much slower, so keep N small).
+
+Usage:
+    python scripts/bench_snapshot.py --vectors 1000000 --dim 384 --chroma-vectors 50000
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.services.vector_index import NumpyCollection  # noqa: E402
+from app.services.vector_snapshot import export_collection, restore_collection  # noqa: E402
+
+ADD_BATCH = 5000
+
+
+def batches(vectors: int, dim: int):
+    rng = np.random.default_rng(0)
+    for offset in range(0, vectors, ADD_BATCH):
+        size = min(ADD_BATCH, vectors - offset)
+        rows = range(offset, offset + size)
+        yield (
+            [f"v{row}" for row in rows],
+            rng.standard_normal((size, dim), dtype=np.float32),
+            [f"document chunk {row}" for row in rows],
+            [{"industry": f"industry{row % 100}", "doc_id": row // 10} for row in rows],
+        )
+
+
+def directory_size(path: Path) -> int:
+    return sum(item.stat().st_size for item in path.rglob("*") if item.is_file())
+
+
+def report(label: str, seconds: float, rows: int, extra: str = "") -> None:
+    print(f"{label:<14}{seconds:>9.1f}s{rows / max(seconds, 1e-9):>12,.0f} rows/s  {extra}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=1000000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--delete-ratio", type=float, default=0.3)
+    parser.add_argument("--chroma-vectors", type=int, default=0, help="also restore this many rows into chromadb")
+    parser.add_argument("--dir", default=None, help="working directory (default: a temporary directory)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as directory:
+        root = Path(directory)
+        print(f"{args.vectors} vectors x {args.dim}d")
+        source = NumpyCollection("bench", str(root / "source"), {"hnsw:space": "cosine"}, indexed_fields=("industry",))
+        start = time.perf_counter()
+        for ids, embeddings, documents, metadatas in batches(args.vectors, args.dim):
+            source.add(ids=ids, embeddings=embeddings, documents=documents, metadatas=metadatas)
+        report("ingest", time.perf_counter() - start, args.vectors, "(add with precomputed embeddings)")
+
+        start = time.perf_counter()
+        entry = export_collection(source, str(root / "snapshot"))
+        size = directory_size(root / "snapshot") / 2**20
+        report("export", time.perf_counter() - start, entry["count"], f"snapshot {size:,.0f} MiB")
+
+        restored = NumpyCollection("bench", str(root / "restored"), entry["metadata"], indexed_fields=("industry",))
+        start = time.perf_counter()
+        restore_collection(restored, str(root / "snapshot"), entry)
+        report("restore", time.perf_counter() - start, entry["count"])
+
+        queries = np.random.default_rng(1).standard_normal((args.queries, args.dim), dtype=np.float32).tolist()
+        for where in (None, {"industry": "industry7"}):
+            expected = source.query(query_embeddings=queries, n_results=10, where=where)["ids"]
+            actual = restored.query(query_embeddings=queries, n_results=10, where=where)["ids"]
+            print(f"{'check':<14}{'where=' + str(where):<40}match={expected == actual}")
+        source.close()
+
+        deleted = [f"v{row}" for row in range(0, args.vectors) if row % 10 < args.delete_ratio * 10]
+        for offset in range(0, len(deleted), ADD_BATCH):
+            restored.delete(ids=deleted[offset : offset + ADD_BATCH])
+        before = directory_size(root / "restored") / 2**20
+        start = time.perf_counter()
+        result = restored.compact()
+        after = directory_size(root / "restored") / 2**20
+        report(
+            "compact",
+            time.perf_counter() - start,
+            result["rows"],
+            f"removed {result['removed']:,}, {before:,.0f} -> {after:,.0f} MiB",
+        )
+        restored.close()
+
+        if args.chroma_vectors:
+            import chromadb
+            from chromadb.config import Settings
+
+            client = chromadb.PersistentClient(
+                path=str(root / "chroma"),
+                settings=Settings(
+                    anonymized_telemetry=False,
+                    chroma_product_telemetry_impl="app.services.chroma_telemetry.NoopTelemetry",
+                ),
+            )
+            collection = client.create_collection("bench", metadata={"hnsw:space": "cosine"})
+            count = min(args.chroma_vectors, entry["count"])
+            start = time.perf_counter()
+            restore_collection(collection, str(root / "snapshot"), dict(entry, count=count))
+            report("restore-chroma", time.perf_counter() - start, count)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,169 @@
+"""Vector index benchmark: Chroma HNSW vs the built-in NumPy flat / IVF index.
+
+Generates clustered synthetic embeddings (--vectors x --dim), loads them into
+throw-away collections and answers the same queries with each backend:
+
+  chroma        chromadb PersistentClient, hnsw cosine (the default backend)
+  numpy-flat    NumpyCollection, exact blocked matmul over the float32 memmap
+  numpy-f16     same, vectors stored as float16 (half the memory)
+  numpy-ivf     NumpyCollection with an IVF coarse quantizer, --nprobe lists
+  numpy-ivf16   IVF over float16 vectors: only probed rows are converted
+  numpy-int8    int8 scalar codes scanned, top k x --rerank-factor reranked
+                against the float32 vectors
+  numpy-pq      product quantization (--pq-subvectors bytes per vector),
+                reranked the same way
+  numpy-ivf-pq  IVF candidates scored with PQ codes, then reranked
+
+float16 halves the memmap but every scanned row has to be converted to
+float32 first, so exact scans over float16 are slower; pair it with IVF.
+
+"scan(MB)" is what a search keeps resident: the vectors for float32/float16,
+only the codes for int8/pq (the float32 file is touched for reranking only).
+
+Recall@k is measured against exact brute force. A filtered run repeats the
+queries with a metadata filter matching about 10% of the rows.
+
+Usage:
+    python scripts/bench_vector_index.py --vectors 100000 --dim 384 --queries 200
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.services.vector_index import NumpyCollection  # noqa: E402
+
+ADD_BATCH = 5000
+
+
+def make_data(count: int, dim: int, clusters: int, rng: np.random.Generator) -> np.ndarray:
+    centers = rng.standard_normal((clusters, dim), dtype=np.float32)
+    data = centers[rng.integers(0, clusters, count)] + 0.5 * rng.standard_normal((count, dim), dtype=np.float32)
+    return data / np.linalg.norm(data, axis=1, keepdims=True)
+
+
+def ground_truth(data: np.ndarray, queries: np.ndarray, k: int, mask: np.ndarray | None) -> list[set[str]]:
+    scores = queries @ data.T
+    if mask is not None:
+        scores[:, ~mask] = -np.inf
+    top = np.argsort(-scores, axis=1)[:, :k]
+    return [{f"v{row}" for row in rows} for rows in top]
+
+
+def load(collection, data: np.ndarray) -> float:
+    start = time.perf_counter()
+    for offset in range(0, len(data), ADD_BATCH):
+        part = data[offset : offset + ADD_BATCH]
+        collection.add(
+            ids=[f"v{offset + i}" for i in range(len(part))],
+            embeddings=part.tolist(),
+            metadatas=[{"bucket": (offset + i) % 10} for i in range(len(part))],
+        )
+    return time.perf_counter() - start
+
+
+def directory_size(path: Path) -> int:
+    return sum(item.stat().st_size for item in path.rglob("*") if item.is_file())
+
+
+def run(collection, queries: np.ndarray, truth: list[set[str]], k: int, where) -> tuple[float, float, float]:
+    latencies, recalls = [], []
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        result = collection.query(query_embeddings=[query.tolist()], n_results=k, where=where, include=["distances"])
+        latencies.append((time.perf_counter() - start) * 1000)
+        recalls.append(len(expected & set(result["ids"][0])) / k)
+    return statistics.median(latencies), statistics.quantiles(latencies, n=20)[-1], statistics.mean(recalls)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--nprobe", type=int, default=16)
+    parser.add_argument("--pq-subvectors", type=int, default=0, help="0: one byte per 4 dims")
+    parser.add_argument("--rerank-factor", type=int, default=10)
+    parser.add_argument("--skip-chroma", action="store_true", help="only benchmark the numpy backends")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    data = make_data(args.vectors, args.dim, args.clusters, rng)
+    queries = data[rng.choice(args.vectors, args.queries, replace=False)]
+    queries = queries + 0.1 * rng.standard_normal(queries.shape, dtype=np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    filter_mask = np.arange(args.vectors) % 10 == 3
+    truth = ground_truth(data, queries, args.k, None)
+    filtered_truth = ground_truth(data, queries, args.k, filter_mask)
+
+    with tempfile.TemporaryDirectory() as directory:
+        root = Path(directory)
+        backends = []
+        if not args.skip_chroma:
+            import chromadb
+            from chromadb.config import Settings
+
+            client = chromadb.PersistentClient(
+                path=str(root / "chroma"),
+                settings=Settings(
+                    anonymized_telemetry=False,
+                    chroma_product_telemetry_impl="app.services.chroma_telemetry.NoopTelemetry",
+                ),
+            )
+            collection = client.create_collection("bench", metadata={"hnsw:space": "cosine"})
+            backends.append(("chroma", root / "chroma", collection, False))
+        for name, dtype, ivf in (
+            ("numpy-flat", "float32", False),
+            ("numpy-f16", "float16", False),
+            ("numpy-ivf", "float32", True),
+            ("numpy-ivf16", "float16", True),
+            ("numpy-int8", "int8", False),
+            ("numpy-pq", "pq", False),
+            ("numpy-ivf-pq", "pq", True),
+        ):
+            collection = NumpyCollection(
+                "bench",
+                str(root / name),
+                {"hnsw:space": "cosine"},
+                dtype=dtype,
+                ivf_min_rows=0,
+                ivf_nprobe=args.nprobe,
+                pq_subvectors=args.pq_subvectors,
+                rerank_factor=args.rerank_factor,
+            )
+            backends.append((name, root / name, collection, ivf))
+
+        print(f"{args.vectors} vectors x {args.dim}d, {args.queries} queries, k={args.k}")
+        print(
+            f"{'backend':<13}{'build(s)':>10}{'disk(MB)':>10}{'scan(MB)':>10}{'p50(ms)':>10}{'p95(ms)':>10}{'recall':>8}"
+            f"{'filt p50':>10}{'filt rec':>10}"
+        )
+        for name, path, collection, ivf in backends:
+            build = load(collection, data)
+            if ivf:
+                start = time.perf_counter()
+                collection.build_ivf()
+                build += time.perf_counter() - start
+            p50, p95, recall = run(collection, queries, truth, args.k, None)
+            filtered_p50, _, filtered_recall = run(collection, queries, filtered_truth, args.k, {"bucket": 3})
+            size = directory_size(path) / 1024 / 1024
+            scan = collection.memory_usage()["scan"] / 1024 / 1024 if name != "chroma" else size
+            print(
+                f"{name:<13}{build:>10.1f}{size:>10.1f}{scan:>10.1f}{p50:>10.2f}{p95:>10.2f}{recall:>8.3f}"
+                f"{filtered_p50:>10.2f}{filtered_recall:>10.3f}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+"""Vector store snapshot / restore / compaction.
+
+Operates on the store configured by the backend settings (VECTOR_BACKEND,
+CHROMA_PERSIST_DIRECTORY / VECTOR_INDEX_DIR). Stop the API server (or at least
+stop writes) first: restore and compaction recreate collections in place, and a
+running server would keep serving its old collection handles.
+
+  snapshot DIR   export collections (ids, embeddings, documents, metadata) to DIR
+  restore DIR    replace collections with the snapshot content, without
+                 re-embedding; rebuilds the BM25 keyword index
+  compact        reclaim the space of deleted records (rewrite the numpy index
+                 files, or round-trip a Chroma collection through a snapshot)
+
+Restore and compaction bump the search-cache version of the touched collections.
+
+Usage:
+    python scripts/vector_snapshot.py snapshot /backups/vectors-2024-06-01
+    python scripts/vector_snapshot.py restore /backups/vectors-2024-06-01 --collections documents
+    python scripts/vector_snapshot.py compact
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.services.vector_service import async_vector_service, vector_service  # noqa: E402
+from app.services.vector_snapshot import (  # noqa: E402
+    SNAPSHOT_COLLECTIONS,
+    SNAPSHOT_DTYPES,
+    compact_collection,
+    create_snapshot,
+    restore_snapshot,
+)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=("snapshot", "restore", "compact"))
+    parser.add_argument("path", nargs="?", help="snapshot directory (snapshot / restore)")
+    parser.add_argument("--collections", nargs="+", choices=SNAPSHOT_COLLECTIONS, default=None)
+    parser.add_argument("--dtype", choices=SNAPSHOT_DTYPES, default="float32", help="snapshot embedding precision")
+    args = parser.parse_args()
+    if args.command != "compact" and not args.path:
+        parser.error(f"{args.command} requires a snapshot directory")
+
+    start = time.perf_counter()
+    if args.command == "snapshot":
+        manifest = create_snapshot(vector_service, args.path, args.collections or SNAPSHOT_COLLECTIONS, args.dtype)
+        for name, entry in manifest["collections"].items():
+            print(f"{name:<12}{entry['count']:>10} rows  dim={entry['dim']}  {entry['dtype']}")
+        touched = []
+    elif args.command == "restore":
+        restored = restore_snapshot(vector_service, args.path, args.collections)
+        for name, count in restored.items():
+            print(f"{name:<12}{count:>10} rows restored")
+        touched = list(restored)
+    else:
+        touched = list(args.collections or SNAPSHOT_COLLECTIONS)
+        for name in touched:
+            result = compact_collection(vector_service, name)
+            removed = "?" if result["removed"] is None else result["removed"]
+            print(f"{name:<12}{result['rows']:>10} rows kept  {removed} removed")
+    if touched:
+        asyncio.run(async_vector_service.invalidate(*touched))
+    print(f"done in {time.perf_counter() - start:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -56,6 +56,8 @@ def test_db(request):
 
     Base.metadata.create_all(bind=engine)
     db = TestingSessionLocal()
+    # 其他测试模块在导入时注册了自己的依赖覆盖，结束后需恢复
+    previous_overrides = dict(app.dependency_overrides)
 
     def override_get_db():
         try:
@@ -70,6 +72,7 @@ def test_db(request):
         db.close()
         Base.metadata.drop_all(bind=engine)
         app.dependency_overrides.clear()
+        app.dependency_overrides.update(previous_overrides)
 
 
 @pytest.fixture(scope="function")
@@ -0,0 +1,87 @@
+"""缓存值编解码测试"""
+import json
+import zlib
+
+import pytest
+
+from app.services import cache_codec
+from app.services.cache_codec import FORMAT_FLAG, CacheCodec, CodecError
+from app.services.cache_service import CacheService
+
+PROPOSALS = {
+    "items": [{"id": i, "title": f"核心系统建设方案{i}", "status": "draft", "score": i / 3} for i in range(50)],
+    "total": 50,
+}
+
+
+def test_round_trip_and_compression_threshold():
+    """小值只序列化，达到阈值的值压缩；解码结果与原值一致"""
+    codec = CacheCodec("json", "zlib", min_bytes=256)
+    assert codec.name == "json+zlib"
+
+    small = codec.encode({"id": 1})
+    assert small[0] == FORMAT_FLAG | 1 << 3 and small[1:] == b'{"id": 1}'
+    assert codec.decode(small) == {"id": 1}
+
+    large = codec.encode(PROPOSALS)
+    plain = json.dumps(PROPOSALS, ensure_ascii=False).encode()
+    assert large[0] == FORMAT_FLAG | 1 << 3 | 1 and len(large) < len(plain) / 3
+    assert codec.decode(large) == PROPOSALS
+
+    # 压缩后没有变小的按不压缩存储
+    codec._compress = lambda data: zlib.compress(data) + bytes(len(data))
+    assert codec.encode(PROPOSALS) == bytes([FORMAT_FLAG | 1 << 3]) + plain
+
+
+def test_legacy_json_and_unsupported_formats():
+    """无格式头的旧 JSON 文本照常解码，未安装的序列化或压缩方式抛出 CodecError"""
+    legacy = json.dumps(PROPOSALS, ensure_ascii=False)
+    assert CacheCodec.decode(legacy) == PROPOSALS
+    assert CacheCodec.decode(legacy.encode()) == PROPOSALS
+    assert CacheCodec.decode(b"[]") == [] and CacheCodec.decode(b"0") == 0
+
+    with pytest.raises(CodecError):
+        CacheCodec.decode(bytes([FORMAT_FLAG | 15 << 3]) + b"...")
+    if not cache_codec.ZSTD_AVAILABLE:
+        with pytest.raises(CodecError):
+            CacheCodec.decode(bytes([FORMAT_FLAG | 1 << 3 | 2]) + b"...")
+
+    # 配置了未安装的实现时回退到可用的
+    codec = CacheCodec("no-such-serializer", "no-such-compressor")
+    assert codec.serializer in cache_codec.SERIALIZERS and codec.compression in ("zstd", "lz4", "zlib")
+
+
+class _DictRedis:
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def setex(self, key, ttl, value):
+        self.data[key] = value
+
+    async def publish(self, channel, message):
+        return 0
+
+
+@pytest.mark.asyncio
+async def test_cache_service_stores_encoded_values_and_reads_old_entries(monkeypatch):
+    """Redis 中写入带格式头的编码值，升级前写入的 JSON 文本和无法解码的值按原样读取或按未命中处理"""
+    monkeypatch.setattr("app.core.config.settings.CACHE_COMPRESS_MIN_BYTES", 512)
+    service = CacheService()
+    service._cache_type = "redis"
+    service._redis_client = _DictRedis()
+
+    await service.set("proposal_list:1", PROPOSALS)
+    stored = service._redis_client.data["proposal_list:1"]
+    assert isinstance(stored, bytes) and stored[0] & FORMAT_FLAG
+    assert len(stored) < len(json.dumps(PROPOSALS, ensure_ascii=False).encode()) / 3
+    assert await service.get("proposal_list:1") == PROPOSALS
+
+    service._redis_client.data["ai_response:old"] = json.dumps("旧版本缓存的回答", ensure_ascii=False).encode()
+    assert await service.get("ai_response:old") == "旧版本缓存的回答"
+
+    service._redis_client.data["ai_response:unknown"] = bytes([FORMAT_FLAG | 15 << 3]) + b"..."
+    assert await service.get("ai_response:unknown") is None
+    assert (await service.get_stats())["codec"] == service._codec.name
@@ -1,4 +1,6 @@
 """缓存与向量搜索失效测试"""
+import fnmatch
+
 import pytest
 
 from app.services.cache_service import CacheService
@@ -55,6 +57,19 @@ async def test_vector_cache_invalidation(memory_cache):
     assert cached_after is None
 
 
+@pytest.mark.asyncio
+async def test_vector_cache_version_keys(memory_cache):
+    """按检索前读到的版本号写入，期间发生写入时结果不会在新版本下命中"""
+    version = await memory_cache.get_collection_version("knowledge")
+    await memory_cache.bump_collection_version("knowledge")
+    await memory_cache.cache_vector_search("数字化", "knowledge", [{"id": "old"}], version=version)
+
+    assert await memory_cache.get_vector_search("数字化", "knowledge") is None
+    assert await memory_cache.get_vector_search("数字化", "knowledge", version=version) == [{"id": "old"}]
+    assert await memory_cache.get_collection_version("knowledge") == version + 1
+    assert await memory_cache.get_collection_version("documents") == 0
+
+
 @pytest.mark.asyncio
 async def test_clear_pattern_on_memory_cache(memory_cache):
     memory_cache._memory_cache["proposal_list:demo"] = {"items": []}
@@ -75,3 +90,69 @@ async def test_cache_stats(memory_cache):
     assert stats["type"] == "memory"
     assert stats["hits"] >= 1
     assert "hit_rate" in stats
+
+
+class _CommandRedis:
+    """记录命令的 Redis 替身"""
+
+    def __init__(self):
+        self.data = {}
+        self.commands = []
+
+    async def get(self, key):
+        self.commands.append("get")
+        return self.data.get(key)
+
+    async def setex(self, key, ttl, value):
+        self.commands.append("setex")
+        self.data[key] = value
+
+    async def incr(self, key):
+        self.commands.append("incr")
+        self.data[key] = str(int(self.data.get(key) or 0) + 1).encode()
+        return int(self.data[key])
+
+    async def publish(self, channel, message):
+        self.commands.append("publish")
+
+    async def scan(self, cursor=0, match=None, count=None):
+        self.commands.append("scan")
+        return 0, [key for key in self.data if fnmatch.fnmatchcase(key, match or "*")]
+
+    async def delete(self, *keys):
+        self.commands.append("delete")
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("cache_type", ["memory", "redis"])
+async def test_user_proposal_invalidation_covers_hashed_keys(cache_type):
+    """过滤条件很长、缓存键被哈希时，失效用户方案列表同样生效，且不影响其他用户，Redis 上不做 SCAN"""
+    service = CacheService()
+    service._cache_type = cache_type
+    service._redis_client = _CommandRedis() if cache_type == "redis" else None
+    long_filters = {"status": "draft", "keyword": "核心系统建设" * 40}
+    short_filters = {"status": None}
+
+    for user_id in (7, 8):
+        await service.cache_proposal_list(user_id, long_filters, {"items": [{"id": user_id}]})
+        await service.cache_proposal_list(user_id, short_filters, {"items": [], "total": 0})
+    key = await service._proposal_list_key(7, long_filters)
+    assert key.startswith("proposal_list:u7:v0:hash_")
+    assert await service.get_proposal_list(7, long_filters) == {"items": [{"id": 7}]}
+
+    assert await service.invalidate_user_proposals(7) == 1
+    assert await service.get_proposal_list(7, long_filters) is None
+    assert await service.get_proposal_list(7, short_filters) is None
+    assert await service.get_proposal_list(8, long_filters) == {"items": [{"id": 8}]}
+    assert await service.get_proposal_list(8, short_filters) == {"items": [], "total": 0}
+
+    await service.cache_proposal_list(7, long_filters, {"items": [{"id": 70}]})
+    assert await service.get_proposal_list(7, long_filters) == {"items": [{"id": 70}]}
+
+    if cache_type == "memory":
+        # 旧版本的键已直接删除
+        assert key not in service._memory_cache and len(service._user_proposal_index[7]) == 1
+    else:
+        assert "scan" not in service._redis_client.commands
+        assert service._redis_client.commands.count("incr") == 1
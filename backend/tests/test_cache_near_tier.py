@@ -0,0 +1,152 @@
+"""Redis 前的进程内近缓存（L1）与跨进程失效广播测试"""
+import asyncio
+
+import pytest
+
+from app.services import memory_cache as memory_cache_module
+from app.services.cache_service import CacheService
+
+
+class _FakePubSub:
+    def __init__(self, server):
+        self._server = server
+        self._queue: asyncio.Queue = asyncio.Queue()
+
+    async def subscribe(self, channel):
+        self._server.subscribers.setdefault(channel, []).append(self._queue)
+
+    async def get_message(self, ignore_subscribe_messages=True, timeout=1.0):
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def aclose(self):
+        for queues in self._server.subscribers.values():
+            if self._queue in queues:
+                queues.remove(self._queue)
+
+
+class _FakeRedis:
+    """多个 CacheService 共享的 Redis 替身：键值、INCR 和 pub/sub，记录 GET 次数"""
+
+    def __init__(self):
+        self.data = {}
+        self.subscribers = {}
+        self.gets = 0
+        self.down = False
+
+    async def get(self, key):
+        if self.down:
+            raise ConnectionError("redis down")
+        self.gets += 1
+        return self.data.get(key)
+
+    async def setex(self, key, ttl, value):
+        self.data[key] = value
+
+    async def delete(self, *keys):
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    async def incr(self, key):
+        self.data[key] = str(int(self.data.get(key) or 0) + 1)
+        return int(self.data[key])
+
+    async def publish(self, channel, message):
+        for queue in self.subscribers.get(channel, []):
+            queue.put_nowait({"type": "message", "data": message})
+
+    def pubsub(self):
+        return _FakePubSub(self)
+
+
+def _worker(server):
+    service = CacheService()
+    service._cache_type = "redis"
+    service._redis_client = server
+    return service
+
+
+async def _wait_for(condition):
+    for _ in range(100):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("condition not reached")
+
+
+@pytest.mark.asyncio
+async def test_hot_keys_served_from_l1_and_invalidated_across_workers():
+    """热点键第二次读取不访问 Redis；另一进程写入后广播失效，本进程随后读到新值"""
+    server = _FakeRedis()
+    a, b = _worker(server), _worker(server)
+    await a.start_invalidation_listener()
+    await b.start_invalidation_listener()
+    await _wait_for(lambda: a._near_cache_active and b._near_cache_active)
+
+    await a.set("ai_models:enabled", [{"id": 1}])
+    gets = server.gets
+    for _ in range(5):
+        assert await a.get("ai_models:enabled") == [{"id": 1}]
+        assert await b.get("ai_models:enabled") == [{"id": 1}]
+    assert server.gets == gets + 1  # 只有 b 的首次读取访问了 Redis
+
+    # 命中 L1 时每次返回新对象，调用方修改不影响缓存
+    (await b.get("ai_models:enabled")).append({"id": 99})
+    assert await b.get("ai_models:enabled") == [{"id": 1}]
+
+    await a.set("ai_models:enabled", [{"id": 2}])
+    await _wait_for(lambda: "ai_models:enabled" not in b._near_cache)
+    assert await b.get("ai_models:enabled") == [{"id": 2}]
+
+    version = await a.get_collection_version("documents")
+    assert await b.get_collection_version("documents") == version
+    await b.bump_collection_version("documents")
+    await _wait_for(lambda: "collection_version:documents" not in a._near_cache)
+    assert await a.get_collection_version("documents") == version + 1
+
+    await a.delete("ai_models:enabled")
+    await _wait_for(lambda: "ai_models:enabled" not in b._near_cache)
+    assert await b.get("ai_models:enabled") is None
+
+    await a.stop_invalidation_listener()
+    await b.stop_invalidation_listener()
+    assert not a._near_cache_active and server.subscribers["cache:invalidate"] == []
+
+
+@pytest.mark.asyncio
+async def test_l1_disabled_until_subscribed_and_pattern_messages():
+    """未订阅失效频道时不读 L1；按模式和全部失效的消息删除匹配的键，忽略本进程发出的消息"""
+    server = _FakeRedis()
+    service = _worker(server)
+    await service.set("proposal_list:1", {"items": []})
+    await service.get("proposal_list:1")
+    await service.get("proposal_list:1")
+    assert server.gets == 2 and len(service._near_cache) == 0
+
+    service._near_cache_active = True
+    for key in ("proposal_list:1", "proposal_list:2", "vector_search:q"):
+        service._near_cache_store(key, "{}")
+    service._apply_invalidation('{"origin": "other", "keys": [], "pattern": "proposal_list:*", "all": false}')
+    assert service._near_cache.keys() == ["vector_search:q"]
+    service._apply_invalidation(f'{{"origin": "{service._instance_id}", "keys": [], "pattern": null, "all": true}}')
+    assert len(service._near_cache) == 1
+    service._apply_invalidation('{"origin": "other", "keys": [], "pattern": null, "all": true}')
+    assert len(service._near_cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_redis_outage_serves_stale_l1_values(monkeypatch):
+    """Redis 不可用时返回 L1 中的值，即使已超过近缓存有效期"""
+    now = [1000.0]
+    monkeypatch.setattr(memory_cache_module.time, "monotonic", lambda: now[0])
+    server = _FakeRedis()
+    service = _worker(server)
+    service._near_cache_active = True
+    await service.set("proposal_list:7", {"items": [7]})
+
+    now[0] += 60
+    server.down = True
+
+    assert await service.get("proposal_list:7") == {"items": [7]}
+    assert await service.get("proposal_list:8") is None
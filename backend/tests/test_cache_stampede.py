@@ -0,0 +1,195 @@
+"""缓存防击穿测试：合并计算、过期后返回旧值、提前过期和跨进程计算锁"""
+import asyncio
+
+import pytest
+
+from app.models import Proposal
+from app.services import cache_service as cache_module
+from app.services.cache_service import CacheService
+
+
+def _memory_service() -> CacheService:
+    service = CacheService()
+    service._cache_type = "memory"
+    return service
+
+
+def _counting(values):
+    """依次返回 values 的慢计算函数，calls 记录调用次数"""
+
+    async def compute():
+        compute.calls += 1
+        await asyncio.sleep(0.05)
+        return values[compute.calls - 1]
+
+    compute.calls = 0
+    return compute
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(cache_module.time, "time", lambda: now[0])
+    return now
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_compute_once():
+    """同一个键并发未命中时只计算一次，其余调用方等待后读取同一结果；不同的键互不阻塞"""
+    service = _memory_service()
+    compute = _counting([{"items": [1]}, {"items": [2]}])
+
+    results = await asyncio.gather(*(service.get_or_compute("proposal_list:hot", compute, ttl=60) for _ in range(20)))
+
+    assert compute.calls == 1 and all(result == {"items": [1]} for result in results)
+    other = _counting(["other"])
+    assert await service.get_or_compute("proposal_list:other", other, ttl=60) == "other"
+    assert service._compute_locks == {}
+
+    # 计算失败时异常原样抛出，不写入缓存
+    async def failing():
+        raise asyncio.TimeoutError
+
+    with pytest.raises(asyncio.TimeoutError):
+        await service.get_or_compute("vector_search:slow", failing, ttl=60)
+    assert await service.get("vector_search:slow") is None
+
+
+@pytest.mark.asyncio
+async def test_stale_value_served_while_one_caller_refreshes(clock):
+    """过期后在 stale_ttl 内：一个调用方刷新，其余立即返回旧值；只读未过期值的接口看不到旧值"""
+    service = _memory_service()
+    compute = _counting(["old", "new", "newest"])
+    assert await service.get_or_compute("k", compute, ttl=10, stale_ttl=60, beta=0) == "old"
+
+    clock[0] += 5
+    assert await service.get_or_compute("k", compute, ttl=10, stale_ttl=60, beta=0) == "old"
+    assert compute.calls == 1
+
+    clock[0] += 10
+    results = await asyncio.gather(
+        *(service.get_or_compute("k", compute, ttl=10, stale_ttl=60, beta=0) for _ in range(5))
+    )
+    assert sorted(results) == ["new", "old", "old", "old", "old"] and compute.calls == 2
+    assert await service.get_or_compute("k", compute, ttl=10, stale_ttl=60, beta=0) == "new"
+
+    # 过期的值对只读未过期值的接口不可见
+    await service._set_entry("vector_search:q", [1], ttl=10, stale_ttl=60)
+    clock[0] += 11
+    assert await service._get_fresh("vector_search:q") is None
+    assert (await service._get_entry("vector_search:q"))["value"] == [1]
+
+
+@pytest.mark.asyncio
+async def test_refresh_reuses_value_written_while_waiting_for_lock(clock, monkeypatch):
+    """读到旧值后、拿到锁之前其他调用方已经刷新时，直接返回新值，不再重复计算"""
+    service = _memory_service()
+    await service._set_entry("k", "old", ttl=10, stale_ttl=60)
+    clock[0] += 11
+    compute = _counting(["new"])
+    get_entry = service._get_entry
+    reads = []
+
+    async def racing_get_entry(key):
+        entry = await get_entry(key)
+        if not reads:
+            # 另一个进程在这次读取之后完成了刷新
+            await service._set_entry(key, "refreshed", ttl=10, stale_ttl=60)
+        reads.append(entry)
+        return entry
+
+    monkeypatch.setattr(service, "_get_entry", racing_get_entry)
+
+    assert await service.get_or_compute("k", compute, ttl=10, stale_ttl=60, beta=0) == "refreshed"
+    assert compute.calls == 0
+
+
+@pytest.mark.asyncio
+async def test_probabilistic_early_expiration(clock, monkeypatch):
+    """临近过期时按上次计算耗时随机提前刷新，beta 为 0 时只在过期后刷新"""
+    service = _memory_service()
+    await service._set_entry("k", "old", ttl=10, delta=2.0)
+    clock[0] += 9
+    compute = _counting(["new", "newer"])
+
+    monkeypatch.setattr(cache_module.random, "random", lambda: 0.0)  # ln(1) = 0，不提前
+    assert await service.get_or_compute("k", compute, ttl=10) == "old"
+    monkeypatch.setattr(cache_module.random, "random", lambda: 0.9)  # 提前 2 * ln(10) ≈ 4.6 秒
+    assert await service.get_or_compute("k", compute, ttl=10, beta=0) == "old"
+    assert await service.get_or_compute("k", compute, ttl=10) == "new"
+    assert compute.calls == 1
+
+    # 刷新后记录新的过期时间和计算耗时
+    entry = await service._get_entry("k")
+    assert entry["expires_at"] == clock[0] + 10 and entry["delta"] > 0
+
+
+class _LockRedis:
+    """两个 CacheService 共享的 Redis 替身，支持 SET NX PX 和释放锁的脚本"""
+
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def setex(self, key, ttl, value):
+        self.data[key] = value
+
+    async def set(self, key, value, nx=False, px=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    async def eval(self, script, numkeys, key, token):
+        if self.data.get(key) == token:
+            del self.data[key]
+            return 1
+        return 0
+
+    async def publish(self, channel, message):
+        return 0
+
+
+@pytest.mark.asyncio
+async def test_redis_lock_coalesces_across_workers():
+    """不同进程同时未命中时，只有拿到 Redis 锁的进程计算，另一个等待后读取结果，锁随后释放"""
+    server = _LockRedis()
+    workers = []
+    for _ in range(2):
+        worker = CacheService()
+        worker._cache_type = "redis"
+        worker._redis_client = server
+        workers.append(worker)
+    first, second = _counting(["from a"]), _counting(["from b"])
+
+    results = await asyncio.gather(
+        workers[0].get_or_compute("vector_search:hot", first, ttl=60),
+        workers[1].get_or_compute("vector_search:hot", second, ttl=60),
+    )
+
+    assert results == ["from a", "from a"]
+    assert first.calls + second.calls == 1
+    assert not any(key.startswith("lock:") for key in server.data)
+
+
+def test_list_proposals_served_through_get_or_compute(test_client, auth_headers, test_user, test_db, monkeypatch):
+    """方案列表经缓存读取，直接写入数据库的方案在失效前不可见，失效后重新查询"""
+    service = _memory_service()
+    monkeypatch.setattr("app.api.proposals.cache_service", service)
+    test_db.add(Proposal(title="方案一", customer_name="客户", requirements="需求", user_id=test_user.id))
+    test_db.commit()
+
+    first = test_client.get("/api/v1/proposals/", headers=auth_headers)
+    assert first.status_code == 200 and first.json()["total"] == 1
+
+    test_db.add(Proposal(title="方案二", customer_name="客户", requirements="需求", user_id=test_user.id))
+    test_db.commit()
+    cached = test_client.get("/api/v1/proposals/", headers=auth_headers)
+    assert cached.json() == first.json()
+
+    asyncio.run(service.invalidate_user_proposals(test_user.id))
+    refreshed = test_client.get("/api/v1/proposals/", headers=auth_headers)
+    assert refreshed.json()["total"] == 2
+    assert {item["title"] for item in refreshed.json()["items"]} == {"方案一", "方案二"}
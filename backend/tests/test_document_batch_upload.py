@@ -0,0 +1,161 @@
+"""批量/zip上传测试"""
+import hashlib
+import io
+import os
+import zipfile
+
+import pytest
+
+from app.core.config import settings
+from app.models import Document
+from app.services import document_ingestion
+from app.services.document_ingestion import UploadTooLargeError, save_stream, sniff_mime_type
+
+
+@pytest.fixture
+def fake_vectorize(monkeypatch):
+    """替换向量化，避免依赖Chroma的默认嵌入模型"""
+    calls = []
+
+    def add_document(doc_id, title, content, metadata=None, embedding=None):
+        calls.append({"doc_id": doc_id, "title": title, "content": content, "metadata": metadata})
+        return f"doc_{doc_id}_fake"
+
+    monkeypatch.setattr(document_ingestion.vector_service, "add_document", add_document)
+    return calls
+
+
+def _zip_bytes(entries):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, content in entries.items():
+            archive.writestr(name, content)
+    return buffer.getvalue()
+
+
+def test_batch_upload_zip_and_files(test_client, test_db, auth_headers, fake_vectorize):
+    """zip条目与普通文件混合上传，逐个入库并向量化"""
+    archive = _zip_bytes(
+        {
+            "proposals/a.txt": "核心系统方案A".encode("utf-8"),
+            "proposals/b.txt": "核心系统方案B".encode("gbk"),
+            "proposals/readme.md": b"ignored",
+            "__MACOSX/proposals/._a.txt": b"ignored",
+        }
+    )
+    response = test_client.post(
+        "/api/v1/documents/upload/batch",
+        files=[
+            ("files", ("archive.zip", io.BytesIO(archive), "application/zip")),
+            ("files", ("c.txt", io.BytesIO("单独上传的文档".encode("utf-8")), "text/plain")),
+            ("files", ("d.exe", io.BytesIO(b"MZ"), "application/octet-stream")),
+        ],
+        data={"doc_type": "technical_proposal", "industry": "金融"},
+        headers=auth_headers,
+    )
+
+    assert response.status_code == 201
+    body = response.json()
+    assert body["total"] == 4
+    assert body["succeeded"] == 3
+    assert body["failed"] == 1
+    assert body["files_per_minute"] > 0
+    statuses = {item["file_name"]: item["status"] for item in body["items"]}
+    assert statuses == {"a.txt": "completed", "b.txt": "completed", "c.txt": "completed", "d.exe": "failed"}
+
+    assert sorted(call["content"] for call in fake_vectorize) == ["单独上传的文档", "核心系统方案A", "核心系统方案B"]
+    documents = test_db.query(Document).all()
+    assert len(documents) == 3
+    assert all(doc.is_vectorized == 1 for doc in documents)
+    for doc in documents:
+        os.remove(doc.file_path)
+
+
+def test_save_stream_enforces_size(tmp_path):
+    """超过大小限制时中止写入并删除半成品"""
+    target = tmp_path / "big.txt"
+    with pytest.raises(UploadTooLargeError):
+        save_stream(io.BytesIO(b"x" * 100), "big.txt", max_size=10, chunk_size=8, file_path=str(target))
+    assert list(tmp_path.iterdir()) == []
+
+    stored = save_stream(io.BytesIO(b"x" * 10), "big.txt", max_size=10, chunk_size=8, file_path=str(target))
+    assert stored["file_size"] == 10
+    assert stored["sha256"] == hashlib.sha256(b"x" * 10).hexdigest()
+    assert stored["mime_type"] == "text/plain"
+    assert target.read_bytes() == b"x" * 10
+
+
+def test_sniff_mime_type():
+    """按文件头识别类型"""
+    assert sniff_mime_type(b"%PDF-1.7\n", ".pdf") == "application/pdf"
+    assert sniff_mime_type(b"PK\x03\x04rest", ".docx").endswith("wordprocessingml.document")
+    assert sniff_mime_type(b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", ".xls") == "application/vnd.ms-excel"
+    assert sniff_mime_type(b"\x00\x01\x02", ".txt") == "application/octet-stream"
+
+
+def test_upload_document_streams_to_disk(test_client, test_db, auth_headers, fake_vectorize, monkeypatch):
+    """单文件上传：流式落盘、记录哈希与嗅探出的类型、超限返回413"""
+    content = "流式上传的文档内容".encode("utf-8")
+    response = test_client.post(
+        "/api/v1/documents/upload",
+        files={"file": ("report.txt", io.BytesIO(content), "application/octet-stream")},
+        data={"title": "流式上传", "doc_type": "other"},
+        headers=auth_headers,
+    )
+    assert response.status_code == 201
+    document = test_db.query(Document).filter(Document.id == response.json()["id"]).one()
+    assert document.mime_type == "text/plain"
+    assert document.doc_metadata == {"sha256": hashlib.sha256(content).hexdigest()}
+    assert document.is_vectorized == 1
+    assert open(document.file_path, "rb").read() == content
+    os.remove(document.file_path)
+
+    monkeypatch.setattr(settings, "MAX_UPLOAD_SIZE", 4)
+    response = test_client.post(
+        "/api/v1/documents/upload",
+        files={"file": ("big.txt", io.BytesIO(content), "text/plain")},
+        data={"title": "超限", "doc_type": "other"},
+        headers=auth_headers,
+    )
+    assert response.status_code == 413
+
+
+def test_replace_document_file_reindexes_incrementally(test_client, test_db, auth_headers, fake_vectorize, monkeypatch):
+    """上传新版本时增量重建索引，内容未变则跳过"""
+    updates = []
+
+    def update_document(doc_id, title, content, metadata=None):
+        updates.append({"doc_id": doc_id, "content": content, "metadata": metadata})
+        return {"vector_id": f"doc_{doc_id}_v2", "added": 1, "kept": 0, "deleted": 1}
+
+    monkeypatch.setattr(document_ingestion.vector_service, "update_document", update_document)
+    response = test_client.post(
+        "/api/v1/documents/upload",
+        files={"file": ("plan.txt", io.BytesIO("第一版方案".encode("utf-8")), "text/plain")},
+        data={"title": "方案", "doc_type": "other"},
+        headers=auth_headers,
+    )
+    document_id = response.json()["id"]
+
+    response = test_client.put(
+        f"/api/v1/documents/{document_id}/file",
+        files={"file": ("plan.txt", io.BytesIO("第一版方案".encode("utf-8")), "text/plain")},
+        headers=auth_headers,
+    )
+    assert response.status_code == 200
+    assert updates == []
+
+    response = test_client.put(
+        f"/api/v1/documents/{document_id}/file",
+        files={"file": ("plan_v2.txt", io.BytesIO("第二版方案".encode("utf-8")), "text/plain")},
+        headers=auth_headers,
+    )
+    assert response.status_code == 200
+    assert response.json()["file_name"] == "plan_v2.txt"
+    document = test_db.query(Document).filter(Document.id == document_id).one()
+    metadata = {"type": "other", "industry": None, "customer_name": None, "user_id": document.user_id}
+    assert updates == [{"doc_id": document_id, "content": "第二版方案", "metadata": metadata}]
+    test_db.refresh(document)
+    assert document.vector_id == f"doc_{document_id}_v2"
+    assert document.content_text == "第二版方案"
+    os.remove(document.file_path)
@@ -20,6 +20,35 @@ class TestDocumentProcessor:
         result = DocumentProcessor.extract_text_from_txt(str(test_file))
         assert result == test_content
 
+    def test_extract_text_from_txt_gbk(self, tmp_path):
+        """测试GBK编码文本通过GB18030回退正确解码"""
+        test_file = tmp_path / "gbk.txt"
+        test_content = "金融售前方案：核心系统改造"
+        test_file.write_bytes(test_content.encode("gbk"))
+
+        result = DocumentProcessor.extract_text_from_txt(str(test_file))
+        assert result == test_content
+
+    def test_extract_text_from_txt_bom(self, tmp_path):
+        """测试带BOM的文本去除BOM"""
+        test_file = tmp_path / "bom.txt"
+        test_file.write_bytes("\ufeff带BOM的内容".encode("utf-8"))
+        assert DocumentProcessor.extract_text_from_txt(str(test_file)) == "带BOM的内容"
+
+        test_file.write_bytes("UTF-16内容".encode("utf-16"))
+        assert DocumentProcessor.extract_text_from_txt(str(test_file)) == "UTF-16内容"
+
+    def test_extract_text_from_txt_streaming(self, tmp_path):
+        """测试流式解码与整体解码结果一致（多字节字符跨块）"""
+        test_file = tmp_path / "stream.txt"
+        test_content = "银行核心系统。" * 1000
+        test_file.write_bytes(test_content.encode("gbk"))
+
+        chunks = list(DocumentProcessor.iter_text_from_txt(str(test_file), chunk_size=1001))
+        assert len(chunks) > 1
+        assert "".join(chunks) == test_content
+        assert DocumentProcessor.extract_text_from_txt(str(test_file), stream_threshold=0) == test_content
+
     def test_extract_text_from_docx(self, tmp_path):
         """测试从Word文档提取文本"""
         # 创建测试Word文档
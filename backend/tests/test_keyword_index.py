@@ -0,0 +1,133 @@
+"""关键词倒排索引测试"""
+import pytest
+
+from app.services.keyword_index import KeywordIndex, tokenize
+
+
+@pytest.fixture
+def index(tmp_path):
+    keyword_index = KeywordIndex(str(tmp_path / "keyword.sqlite3"))
+    yield keyword_index
+    keyword_index.close()
+
+
+def test_tokenize_chinese_and_codes():
+    """中文切成二元组，编号整体保留并拆出各段"""
+    assert tokenize("核心系统") == ["核心", "心系", "系统"]
+    assert tokenize("云") == ["云"]
+    tokens = tokenize("符合 JR/T 0171-2020 规范")
+    assert {"jr/t", "jr", "t", "0171-2020", "0171", "2020", "符合", "规范"} <= set(tokens)
+
+
+def test_search_ranks_exact_terms(index):
+    """精确术语命中的条目排在前面，且结果按BM25分数降序"""
+    index.add(
+        "knowledge",
+        [
+            ("a", "分布式核心系统改造，满足 JR/T 0171-2020 个人金融信息保护要求", {"category": "规范"}),
+            ("b", "核心系统改造方案，覆盖存款贷款业务", {"category": "方案"}),
+            ("c", "移动银行渠道建设", {"category": "方案"}),
+        ],
+    )
+
+    results = index.search("knowledge", "JR/T 0171-2020", limit=5)
+    assert [item["id"] for item in results] == ["a"]
+
+    results = index.search("knowledge", "核心系统改造", limit=5)
+    assert [item["id"] for item in results] == ["b", "a"]
+    assert results[0]["score"] >= results[1]["score"]
+
+
+def test_search_filters_and_updates(index):
+    """按元数据过滤，覆盖写入、更新元数据与删除都是增量的"""
+    index.add(
+        "documents",
+        [
+            ("doc_1_a", "银行核心系统", {"doc_id": 1, "industry": "金融"}),
+            ("doc_2_a", "医院核心系统", {"doc_id": 2, "industry": "医疗"}),
+        ],
+    )
+    assert [r["id"] for r in index.search("documents", "核心系统", where={"industry": "医疗"})] == ["doc_2_a"]
+    assert len(index.search("documents", "核心系统", where={"doc_id": {"$in": [1, 2]}})) == 2
+    where = {"$and": [{"industry": "金融"}, {"doc_id": {"$in": [1, 2]}}]}
+    assert [r["id"] for r in index.search("documents", "核心系统", where=where)] == ["doc_1_a"]
+    assert [r["id"] for r in index.search("documents", "核心系统", where={"industry": {"$eq": "医疗"}})] == ["doc_2_a"]
+    # 不支持的运算符报错，而不是忽略条件返回范围更大的结果
+    for unsupported in (
+        {"industry": {"$ne": "医疗"}},
+        {"doc_id": {"$gt": 1}},
+        {"$or": [{"industry": "金融"}, {"industry": "医疗"}]},
+        {"$and": [{"industry": "金融"}, {"doc_id": {"$nin": [1]}}]},
+    ):
+        with pytest.raises(ValueError):
+            index.search("documents", "核心系统", where=unsupported)
+
+    index.update_metadata("documents", [("doc_2_a", {"doc_id": 2, "industry": "金融"})])
+    assert index.search("documents", "核心系统", where={"industry": "医疗"}) == []
+
+    index.add("documents", [("doc_1_a", "客户关系管理", {"doc_id": 1})])
+    assert [r["id"] for r in index.search("documents", "核心系统")] == ["doc_2_a"]
+
+    assert index.remove_where("documents", "doc_id", 2) == 1
+    assert index.search("documents", "核心系统") == []
+    assert index.count("documents") == 1
+    assert index.count("knowledge") == 0
+
+
+def test_knowledge_search_endpoint_uses_keyword_index(test_client, test_db, index, monkeypatch):
+    """知识库搜索按BM25排序回表，过滤分类并跳过已停用的条目"""
+    from app.models import KnowledgeBase
+    from app.services.vector_service import vector_service
+
+    monkeypatch.setattr(vector_service, "keyword_index", index)
+    entries = [
+        KnowledgeBase(category="规范", title="个人金融信息保护", content="依据 JR/T 0171-2020 分级保护"),
+        KnowledgeBase(category="方案", title="核心系统", content="分布式核心系统改造，参照 JR/T 0171-2020"),
+        KnowledgeBase(category="规范", title="停用条目", content="JR/T 0171-2020", is_active=0),
+    ]
+    test_db.add_all(entries)
+    test_db.commit()
+    index.add(
+        "knowledge",
+        [
+            (
+                f"kb_{entry.id}",
+                f"{entry.title}\n{entry.content}",
+                {"knowledge_id": entry.id, "category": entry.category},
+            )
+            for entry in entries
+        ],
+    )
+
+    response = test_client.post("/api/v1/knowledge/search", params={"query": "JR/T 0171-2020", "category": "规范"})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["total"] == 1
+    assert body["results"][0]["id"] == entries[0].id
+
+    response = test_client.post("/api/v1/knowledge/search", params={"query": "核心系统改造"})
+    assert [item["id"] for item in response.json()["results"]] == [entries[1].id]
+
+
+def test_knowledge_search_includes_entries_not_vectorized(test_client, test_db, index, monkeypatch):
+    """向量化失败（不在关键词索引中）的条目按包含查询词补充在BM25结果之后，索引不可用时仍能搜到"""
+    from app.models import KnowledgeBase
+    from app.services.vector_service import async_vector_service, vector_service
+
+    monkeypatch.setattr(vector_service, "keyword_index", index)
+    indexed = KnowledgeBase(category="方案", title="核心系统", content="分布式核心系统改造", is_vectorized=1)
+    pending = KnowledgeBase(category="方案", title="待向量化", content="核心系统改造的实施计划", weight=5)
+    other = KnowledgeBase(category="规范", title="待向量化", content="核心系统改造规范")
+    test_db.add_all([indexed, pending, other])
+    test_db.commit()
+    index.add("knowledge", [(f"kb_{indexed.id}", "核心系统\n分布式核心系统改造", {"knowledge_id": indexed.id, "category": "方案"})])
+
+    response = test_client.post("/api/v1/knowledge/search", params={"query": "核心系统改造", "category": "方案"})
+    assert [item["id"] for item in response.json()["results"]] == [indexed.id, pending.id]
+
+    async def unavailable(*args, **kwargs):
+        raise RuntimeError("向量库不可用")
+
+    monkeypatch.setattr(async_vector_service, "keyword_search", unavailable)
+    response = test_client.post("/api/v1/knowledge/search", params={"query": "核心系统改造", "limit": 1})
+    assert [item["id"] for item in response.json()["results"]] == [pending.id]
@@ -0,0 +1,153 @@
+"""延迟初始化的服务单例、启动预热与就绪检查测试"""
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services import warmup
+from app.services.cache_service import CacheService
+from app.services.vector_service import AsyncVectorService
+from app.utils.lazy import LazyService
+
+
+class _Service:
+    created = 0
+
+    def __init__(self):
+        type(self).created += 1
+        self.value = 1
+
+    def double(self):
+        return self.value * 2
+
+
+def test_import_app_does_not_initialize_heavy_services():
+    """导入 app.main 不创建向量库和 AI 客户端，也不加载只在检索、导出、解析文档时使用的依赖"""
+    code = (
+        "import sys, app.main\n"
+        "from app.services.vector_service import vector_service\n"
+        "from app.services.ai_service import ai_service\n"
+        "heavy = [m for m in ('chromadb', 'numpy', 'reportlab', 'openpyxl', 'docx', 'pypdf') if m in sys.modules]\n"
+        "print(heavy, vector_service.initialized, ai_service.initialized)\n"
+    )
+    completed = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=Path(__file__).resolve().parents[1],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert completed.stdout.strip().splitlines()[-1] == "[] False False"
+
+
+def test_lazy_service_creates_instance_once_and_forwards_attributes(monkeypatch):
+    """首次访问属性时创建实例，并发访问只创建一次；属性读写与 monkeypatch 转发给真实实例"""
+    _Service.created = 0
+    service = LazyService(_Service)
+    assert not service.initialized and _Service.created == 0
+
+    threads = [threading.Thread(target=service.double) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert _Service.created == 1 and service.instance() is service.instance()
+
+    service.value = 5
+    assert service.instance().value == 5 and service.double() == 10
+    with monkeypatch.context() as patch:
+        patch.setattr(service, "double", lambda: -1)
+        assert service.double() == -1
+    assert service.double() == 10
+
+
+@pytest.mark.asyncio
+async def test_run_warmup_runs_steps_in_order_and_skips_failures(monkeypatch):
+    """预热按配置顺序执行同步和异步步骤，单个失败只记录在报告中，不影响其余步骤"""
+    service = LazyService(_Service)
+
+    def broken():
+        raise RuntimeError("数据库不可用")
+
+    async def replay():
+        return 3
+
+    monkeypatch.setattr(
+        warmup, "WARMUP_STEPS", {"database": broken, "vector_index": service.instance, "recent_queries": replay}
+    )
+
+    report = await warmup.run_warmup(["database", "vector_index", "recent_queries", "unknown"])
+
+    assert list(report) == ["database", "vector_index", "recent_queries"]
+    assert report["database"]["status"] == "failed" and "数据库不可用" in report["database"]["error"]
+    assert report["recent_queries"] == {"status": "ok", "seconds": report["recent_queries"]["seconds"], "result": 3}
+    assert service.initialized
+
+
+@pytest.mark.asyncio
+async def test_recent_searches_are_recorded_and_replayed(monkeypatch):
+    """检索请求缓冲后批量记录，按最新在前（去重），回放时按原参数重新检索"""
+    monkeypatch.setattr("app.core.config.settings.WARMUP_RECORD_INTERVAL", 60)
+    cache = CacheService()
+    cache._cache_type = "memory"
+    service = MagicMock()
+    service.search_documents.return_value = [{"id": "chunk", "distance": 0.1}]
+    service.search_knowledge.return_value = [{"id": "kb", "distance": 0.2}]
+    facade = AsyncVectorService(service, max_workers=2, cache=cache)
+
+    await facade.search_documents("核心系统", n_results=3, filter_metadata={"industry": "金融"})
+    await facade.search_knowledge("支付清算", category="产品")
+    await facade.search_documents("核心系统", n_results=3, filter_metadata={"industry": "金融"})
+
+    assert await cache.get_recent_queries(10) == []
+    assert await facade.flush_recent_queries() == 3
+    entries = await cache.get_recent_queries(10)
+    assert entries == [
+        {
+            "collection": "documents",
+            "query": "核心系统",
+            "n_results": 3,
+            "params": {"filter_metadata": {"industry": "金融"}},
+        },
+        {"collection": "knowledge", "query": "支付清算", "n_results": 5, "params": {"category": "产品"}},
+    ]
+    assert await facade.replay(entries[1]) == [{"id": "kb", "distance": 0.2}]
+
+    # 距上次写入超过 WARMUP_RECORD_INTERVAL 秒时随检索一起写入
+    monkeypatch.setattr("app.core.config.settings.WARMUP_RECORD_INTERVAL", 0)
+    await facade.search_knowledge("数据中台")
+    assert (await cache.get_recent_queries(1))[0]["query"] == "数据中台"
+
+
+def test_ready_reports_warming_up_until_warmup_finishes(monkeypatch):
+    """/health 立即可用，/ready 在预热完成前返回 503，完成后返回 200 和各步骤结果"""
+    started, release = threading.Event(), threading.Event()
+
+    def slow_step():
+        started.set()
+        release.wait(5)
+        return "done"
+
+    monkeypatch.setattr("app.core.config.settings.SERVICE_WARMUP", True)
+    monkeypatch.setattr("app.core.config.settings.WARMUP_STEPS", ["vector_index"])
+    monkeypatch.setattr(warmup, "WARMUP_STEPS", {"vector_index": slow_step})
+
+    with TestClient(app) as client:
+        assert started.wait(5)
+        assert client.get("/health").status_code == 200
+        response = client.get("/ready")
+        assert response.status_code == 503 and response.json()["status"] == "warming_up"
+        release.set()
+        for _ in range(50):
+            response = client.get("/ready")
+            if response.status_code == 200:
+                break
+            time.sleep(0.05)
+        assert response.status_code == 200
+        assert response.json()["warmup"]["vector_index"]["result"] == "done"
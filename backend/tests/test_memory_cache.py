@@ -0,0 +1,87 @@
+"""进程内 LRU + TTL 缓存测试"""
+import pytest
+
+from app.core.metrics import memory_cache_evictions_total
+from app.services import memory_cache as memory_cache_module
+from app.services.cache_service import CacheService
+from app.services.memory_cache import MemoryCache
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(memory_cache_module.time, "monotonic", clock)
+    return clock
+
+
+def _evictions(name: str, reason: str) -> float:
+    return memory_cache_evictions_total.labels(cache=name, reason=reason)._value.get()
+
+
+def test_ttl_expiry_and_lazy_purge(clock):
+    """过期条目读取时删除，写入时顺带清理最久未访问的过期条目，purge_expired 清理全部"""
+    cache = MemoryCache(max_entries=100, name="test_ttl")
+    cache.set("a", 1, ttl=10)
+    cache.set("b", 2, ttl=100)
+    cache.set("c", 3)
+    clock.now += 50
+
+    assert cache.get("a") is None and "a" not in cache
+    assert cache.get("b") == 2 and cache["c"] == 3
+    assert cache.stats()["expirations"] == 1
+
+    clock.now += 100
+    cache.set("d", 4, ttl=0)
+    assert "b" not in cache
+    assert cache.purge_expired() == 0
+    assert cache.keys() == ["c", "d"]
+    assert _evictions("test_ttl", "expired") == 2
+
+
+def test_lru_eviction_by_entries_and_bytes(clock):
+    """超出条目数或近似字节数时淘汰最久未访问的条目，读取会刷新访问顺序"""
+    cache = MemoryCache(max_entries=3, max_bytes=1000, name="test_lru")
+    for key in ("a", "b", "c"):
+        cache.set(key, key * 10)
+    cache.get("a")
+    cache.set("d", "d" * 10)
+
+    assert cache.keys() == ["c", "a", "d"]
+    assert _evictions("test_lru", "lru") == 1
+
+    cache.set("big", "x" * 980)
+    assert cache.keys() == ["d", "big"]
+    assert cache.size_bytes == len("d") + 10 + len("big") + 980 <= 1000
+
+    assert cache.set("huge", "x" * 2000) is False and "huge" not in cache
+    del cache["d"]
+    assert len(cache) == 1 and cache.size_bytes == len("big") + 980
+
+
+@pytest.mark.asyncio
+async def test_cache_service_memory_tier_honours_ttl_and_bounds(clock, monkeypatch):
+    """Redis 不可用时 set 的 ttl 生效，进程内缓存按上限淘汰"""
+    monkeypatch.setattr("app.core.config.settings.MEMORY_CACHE_MAX_ENTRIES", 50)
+    service = CacheService()
+    service._cache_type = "memory"
+
+    await service.set("short", {"items": [1]}, ttl=5)
+    for i in range(200):
+        await service.set(f"key:{i}", {"value": i}, ttl=3600)
+    assert len(service._memory_cache) == 50
+    assert await service.get("key:199") == {"value": 199}
+    assert await service.get("key:0") is None
+
+    await service.set("short", {"items": [1]}, ttl=5)
+    clock.now += 10
+    assert await service.get("short") is None
+    stats = await service.get_stats()
+    assert stats["memory_cache"]["entries"] == 49 and stats["memory_cache"]["evictions"] >= 151
@@ -0,0 +1,83 @@
+"""检索结果多样化（折叠与MMR）测试"""
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+
+from app.services.vector_service import AsyncVectorService, VectorService
+from app.utils.mmr import collapse_results, mmr_select
+
+
+def _result(result_id, distance, **metadata):
+    return {"id": result_id, "document": result_id, "metadata": metadata, "distance": distance}
+
+
+def test_mmr_prefers_diverse_candidate_over_near_duplicate():
+    """第二条选与已选结果不相似的候选，λ=1 时退化为按相关度排序"""
+    embeddings = np.array([[1.0, 0.0], [0.99, 0.05], [0.0, 1.0]])
+    relevance = np.array([0.9, 0.89, 0.7])
+
+    assert mmr_select(relevance, embeddings, k=2) == [0, 2]
+    assert mmr_select(relevance, embeddings, k=3, lambda_mult=1.0) == [0, 1, 2]
+    assert mmr_select(relevance, embeddings, k=10) == [0, 2, 1]
+
+
+def test_collapse_keeps_best_result_per_source():
+    """同一文档只保留排名最靠前的分块，没有来源字段的结果全部保留"""
+    results = [
+        _result("a1", 0.1, doc_id=1, vector_group_id="g1"),
+        _result("a2", 0.2, doc_id=1, vector_group_id="g1"),
+        _result("k1", 0.3, knowledge_id=7),
+        _result("b1", 0.4, doc_id=2, vector_group_id="g2"),
+        _result("k2", 0.5, knowledge_id=8),
+    ]
+
+    assert [item["id"] for item in collapse_results(results)] == ["a1", "k1", "b1", "k2"]
+
+
+def test_vector_service_diversify_uses_stored_embeddings():
+    """折叠后候选仍多于 n_results 时取出候选向量做 MMR，近似重复的版本被挤出"""
+    service = VectorService.__new__(VectorService)
+    collection = MagicMock()
+    collection.get.return_value = {
+        "ids": ["v1", "v2", "v3", "v4"],
+        "embeddings": [[1.0, 0.0], [0.99, 0.02], [0.98, 0.03], [0.1, 1.0]],
+    }
+    service.documents_collection = service.knowledge_collection = service.proposals_collection = collection
+    results = [
+        _result("v1", 0.10, doc_id=1),
+        _result("v1b", 0.11, doc_id=1),
+        _result("v2", 0.12, doc_id=2),
+        _result("v3", 0.13, doc_id=3),
+        _result("v4", 0.30, doc_id=4),
+    ]
+
+    selected = service.diversify("documents", results, n_results=2, lambda_mult=0.5)
+
+    assert [item["id"] for item in selected] == ["v1", "v4"]
+    assert collection.get.call_args.kwargs["ids"] == ["v1", "v2", "v3", "v4"]
+    # 折叠后不超过 n_results 时不读取向量
+    collection.get.reset_mock()
+    assert [item["id"] for item in service.diversify("documents", results[:2], n_results=2)] == ["v1"]
+    collection.get.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_search_overfetches_for_diversify(monkeypatch):
+    """diversify=True 时按 MMR_CANDIDATES 多取候选，交给 VectorService.diversify 选择"""
+    monkeypatch.setattr("app.core.config.settings.MMR_CANDIDATES", 4)
+    monkeypatch.setattr("app.core.config.settings.VECTOR_EMBEDDING_SOURCE", "chroma")
+    service = MagicMock()
+    service.search_documents.return_value = [_result(f"v{i}", 0.1 * i, doc_id=i) for i in range(8)]
+    service.diversify.side_effect = lambda collection, results, n_results: results[::2][:n_results]
+    facade = AsyncVectorService(service, max_workers=1)
+
+    results = await facade.search_documents("核心系统", n_results=2, diversify=True)
+
+    assert service.search_documents.call_args.kwargs["n_results"] == 8
+    assert service.diversify.call_args.args[0] == "documents"
+    assert [item["id"] for item in results] == ["v0", "v2"]
+
+    await facade.search_documents("核心系统", n_results=2, diversify=False)
+    assert service.search_documents.call_args.kwargs["n_results"] == 2
+    assert service.diversify.call_count == 1
@@ -0,0 +1,140 @@
+"""方案集合向量化与相似方案检索测试"""
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+from app.models import Proposal
+from app.services import proposal_generator
+from app.services.proposal_generator import ProposalGenerator, index_proposal
+from app.services.vector_service import PROPOSAL_SECTION_FANOUT, VectorService
+
+
+def _service():
+    service = VectorService.__new__(VectorService)
+    service.proposals_collection = MagicMock()
+    return service
+
+
+def test_vectorize_proposal_writes_one_record_per_section():
+    """每个非空章节一条记录，共享方案的向量组ID；重新向量化前删除旧记录"""
+    service = _service()
+
+    group_id = service.vectorize_proposal(
+        7,
+        "核心系统改造",
+        metadata={"industry": "金融", "customer_name": None},
+        sections={"executive_summary": "摘要", "technical_details": "技术细节", "pricing": None},
+    )
+
+    assert group_id == "proposal_7"
+    service.proposals_collection.delete.assert_called_once_with(where={"proposal_id": 7})
+    upsert = service.proposals_collection.upsert.call_args.kwargs
+    assert upsert["ids"] == ["proposal_7_executive_summary", "proposal_7_technical_details"]
+    assert upsert["documents"] == ["摘要", "技术细节"]
+    assert upsert["metadatas"][1] == {
+        "proposal_id": 7,
+        "requirements": "核心系统改造",
+        "section": "technical_details",
+        "vector_group_id": "proposal_7",
+        "industry": "金融",
+    }
+
+
+def test_similar_proposals_search_proposals_collection_once_per_proposal():
+    """相似方案只检索方案集合，同一方案的多个章节只保留最相关的一条"""
+    service = _service()
+    sections = [
+        ("p1", "technical_details"),
+        ("p1", "executive_summary"),
+        ("p2", "pricing"),
+        ("p3", "executive_summary"),
+    ]
+    service.search_batch = MagicMock(
+        return_value=[
+            [
+                {"id": f"{group}_{section}", "document": "", "metadata": {"vector_group_id": group}, "distance": 0.1}
+                for group, section in sections
+            ]
+        ]
+    )
+
+    results = service.search_similar_proposals("核心系统改造", n_results=2)
+
+    assert [item["id"] for item in results] == ["p1_technical_details", "p2_pricing"]
+    assert service.search_batch.call_args.args[:2] == ("proposals", ["核心系统改造"])
+    assert service.search_batch.call_args.kwargs["n_results"] == 2 * PROPOSAL_SECTION_FANOUT
+
+
+def test_generate_indexes_completed_proposal_in_background(test_client, auth_headers, monkeypatch):
+    """生成完成后在后台按章节向量化，跳过生成失败的章节"""
+    calls = []
+
+    async def generate(self, proposal):
+        return {
+            "executive_summary": "执行摘要",
+            "solution_overview": "生成失败，请重试",
+            "technical_details": "技术细节",
+            "implementation_plan": "实施计划",
+            "pricing": None,
+            "full_content": "完整内容",
+        }
+
+    async def vectorize_proposal(proposal_id, requirements, content=None, metadata=None, sections=None, timeout=None):
+        calls.append({"proposal_id": proposal_id, "metadata": metadata, "sections": sections})
+        return f"proposal_{proposal_id}"
+
+    monkeypatch.setattr(ProposalGenerator, "generate", generate)
+    monkeypatch.setattr(proposal_generator.async_vector_service, "vectorize_proposal", vectorize_proposal)
+    response = test_client.post(
+        "/api/v1/proposals/",
+        json={"title": "核心系统方案", "customer_name": "某银行", "customer_industry": "金融", "requirements": "核心系统改造"},
+        headers=auth_headers,
+    )
+    proposal_id = response.json()["id"]
+
+    response = test_client.post(f"/api/v1/proposals/{proposal_id}/generate", headers=auth_headers)
+
+    assert response.status_code == 200
+    assert len(calls) == 1
+    assert calls[0]["proposal_id"] == proposal_id
+    assert calls[0]["metadata"]["industry"] == "金融"
+    assert calls[0]["sections"] == {
+        "executive_summary": "执行摘要",
+        "technical_details": "技术细节",
+        "implementation_plan": "实施计划",
+        "pricing": None,
+    }
+
+
+def test_index_proposal_converts_pricing_to_text(monkeypatch):
+    """报价为 JSON 列中的字典，按模型原始回复（没有时按解析结果）向量化"""
+    service = _service()
+
+    async def vectorize_proposal(proposal_id, requirements, content=None, metadata=None, sections=None, timeout=None):
+        return service.vectorize_proposal(proposal_id, requirements, content, metadata, sections=sections)
+
+    monkeypatch.setattr(proposal_generator.async_vector_service, "vectorize_proposal", vectorize_proposal)
+    pricing = {"data": {"total": "120万元"}, "raw": '{"total": "120万元"}'}
+    asyncio.run(index_proposal(7, "核心系统改造", {"executive_summary": "摘要", "pricing": pricing}, {}))
+
+    upsert = service.proposals_collection.upsert.call_args.kwargs
+    assert upsert["ids"] == ["proposal_7_executive_summary", "proposal_7_pricing"]
+    assert upsert["documents"] == ["摘要", '{"total": "120万元"}']
+
+    asyncio.run(index_proposal(8, "核心系统改造", {"pricing": {"data": {"total": "80万元"}, "raw": ""}}, {}))
+    assert service.proposals_collection.upsert.call_args.kwargs["documents"] == ['{"total": "80万元"}']
+
+
+def test_delete_proposal_removes_section_vectors(test_client, auth_headers, test_user, test_db, monkeypatch):
+    """删除方案时删除其全部章节向量"""
+    service = _service()
+    monkeypatch.setattr(proposal_generator.async_vector_service, "service", service)
+    monkeypatch.setattr(proposal_generator.async_vector_service, "invalidate", AsyncMock())
+    proposal = Proposal(title="方案", customer_name="客户", requirements="需求", user_id=test_user.id)
+    test_db.add(proposal)
+    test_db.commit()
+
+    response = test_client.delete(f"/api/v1/proposals/{proposal.id}", headers=auth_headers)
+
+    assert response.status_code == 204
+    service.proposals_collection.delete.assert_called_once_with(where={"proposal_id": proposal.id})
+    proposal_generator.async_vector_service.invalidate.assert_awaited_once_with("proposals")
@@ -0,0 +1,107 @@
+"""检索重排测试"""
+import asyncio
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.core.metrics import counter_total, rerank_requests_total
+from app.services.cache_service import CacheService
+from app.services.reranker import LexicalReranker, LLMReranker, Reranker, RerankService
+from app.services.vector_service import AsyncVectorService
+
+
+def _candidates(*documents):
+    return [
+        {"id": f"c{i}", "document": document, "metadata": {"title": ""}, "distance": 0.1 * i}
+        for i, document in enumerate(documents)
+    ]
+
+
+class SlowReranker(Reranker):
+    """模拟耗时的外部打分"""
+
+    name = "slow"
+    cache_scores = True
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.calls = 0
+
+    async def score(self, query, candidates):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return [1.0 if "反洗钱" in candidate["document"] else 0.0 for candidate in candidates]
+
+
+@pytest.mark.asyncio
+async def test_lexical_rerank_promotes_term_matches():
+    """词项覆盖率高的候选上移，编号整串命中权重更高"""
+    service = RerankService(LexicalReranker())
+    candidates = _candidates("移动银行渠道体验升级", "核心系统改造", "核心系统分布式改造，参照 JR/T 0255-2022")
+
+    results = await service.rerank("核心系统 JR/T 0255-2022", candidates, top_k=2)
+
+    assert [item["id"] for item in results] == ["c2", "c1"]
+    assert results[0]["rerank_score"] > results[1]["rerank_score"]
+    # 没有词项信号时保持检索顺序
+    results = await service.rerank("无关查询", candidates, top_k=3)
+    assert [item["id"] for item in results] == ["c0", "c1", "c2"]
+
+
+@pytest.mark.asyncio
+async def test_rerank_budget_falls_back_and_caches_in_background():
+    """超出预算时按词项打分返回，后台打分完成后写入缓存，下次直接命中"""
+    cache = CacheService()
+    cache._cache_type = "memory"
+    reranker = SlowReranker(delay=0.2)
+    service = RerankService(reranker, cache=cache, budget_ms=50)
+    candidates = _candidates("核心系统改造", "支付清算平台", "反洗钱监测系统")
+    timeouts = counter_total(rerank_requests_total, reranker="slow", result="timeout")
+
+    start = time.perf_counter()
+    results = await service.rerank("反洗钱系统", candidates, top_k=2)
+    assert time.perf_counter() - start < 0.15
+    assert counter_total(rerank_requests_total, reranker="slow", result="timeout") == timeouts + 1
+    assert results[0]["id"] == "c2"
+
+    await asyncio.sleep(0.3)
+    assert not service._background
+    start = time.perf_counter()
+    results = await service.rerank("反洗钱系统", candidates, top_k=1)
+    assert time.perf_counter() - start < 0.05
+    assert [item["id"] for item in results] == ["c2"]
+    assert reranker.calls == 1
+    assert counter_total(rerank_requests_total, reranker="slow", result="cached") >= 1
+
+
+@pytest.mark.asyncio
+async def test_llm_reranker_parses_scores():
+    """LLM 打分解析JSON数组并归一化到0-1，数量不符时报错"""
+    ai = MagicMock()
+
+    async def generate_text(prompt, temperature=None):
+        return "打分结果：[2, 10, 7]"
+
+    ai.generate_text = generate_text
+    assert await LLMReranker(ai).score("查询", _candidates("a", "b", "c")) == [0.2, 1.0, 0.7]
+    with pytest.raises(ValueError):
+        await LLMReranker(ai).score("查询", _candidates("a", "b"))
+
+
+@pytest.mark.asyncio
+async def test_search_overfetches_and_reranks(monkeypatch):
+    """启用重排时检索多取候选，重排后截取 n_results 条"""
+    monkeypatch.setattr("app.core.config.settings.RERANK_OVERFETCH", 3)
+    service = MagicMock()
+    service.search_knowledge.return_value = _candidates("支付清算", "核心系统", "反洗钱监测", "信贷管理", "数据中台", "风险控制")
+    facade = AsyncVectorService(service, max_workers=1, reranker=RerankService(LexicalReranker()))
+
+    results = await facade.search_knowledge("反洗钱", n_results=2, rerank=True)
+
+    assert service.search_knowledge.call_args.kwargs["n_results"] == 6
+    assert len(results) == 2 and results[0]["id"] == "c2"
+
+    results = await facade.search_knowledge("反洗钱", n_results=2, rerank=False)
+    assert service.search_knowledge.call_args.kwargs["n_results"] == 2
+    assert "rerank_score" not in results[0]
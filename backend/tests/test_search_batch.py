@@ -0,0 +1,140 @@
+"""批量检索测试"""
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.services.cache_service import CacheService
+from app.services.vector_service import AsyncVectorService, VectorService, vector_service
+
+
+def _query_result(ids_per_query):
+    return {
+        "ids": ids_per_query,
+        "documents": [[f"内容{item}" for item in ids] for ids in ids_per_query],
+        "metadatas": [[{"doc_id": 1} for _ in ids] for ids in ids_per_query],
+        "distances": [[0.1 * (i + 1) for i in range(len(ids))] for ids in ids_per_query],
+    }
+
+
+def test_search_batch_issues_single_query(monkeypatch):
+    """多条查询合并为一次 collection.query，按查询顺序拆分结果"""
+    monkeypatch.setattr("app.core.config.settings.HYBRID_SEARCH_ENABLED", False)
+    service = VectorService()
+    service.documents_collection = MagicMock()
+    service.documents_collection.query.return_value = _query_result([["a1", "a2"], ["b1"], []])
+
+    results = service.search_batch("documents", ["核心系统", "支付清算", "无结果"], n_results=2, where={"type": "x"})
+
+    service.documents_collection.query.assert_called_once_with(
+        query_texts=["核心系统", "支付清算", "无结果"], n_results=2, where={"type": "x"}
+    )
+    assert [[item["id"] for item in items] for items in results] == [["a1", "a2"], ["b1"], []]
+    with pytest.raises(ValueError):
+        service.search_batch("documents", ["a", "b"], query_embeddings=[[0.1]])
+
+
+@pytest.mark.asyncio
+async def test_async_search_batch_groups_and_caches():
+    """按集合与过滤条件分组，每组一次检索；已缓存的查询不再检索"""
+    service = MagicMock()
+    service.search_batch.side_effect = lambda collection, queries, **kwargs: [
+        [{"id": f"{collection}:{query}"}] for query in queries
+    ]
+    cache = CacheService()
+    cache._cache_type = "memory"
+    facade = AsyncVectorService(service, max_workers=2, cache=cache)
+    requests = [
+        {"query": "核心系统"},
+        {"query": "支付清算"},
+        {"id": "kb", "query": "核心系统", "collection": "knowledge", "category": "产品"},
+        {"query": "信贷", "filter_metadata": {"industry": "金融"}},
+    ]
+
+    results = await facade.search_batch(requests)
+
+    assert results == {
+        "核心系统": [{"id": "documents:核心系统"}],
+        "支付清算": [{"id": "documents:支付清算"}],
+        "kb": [{"id": "knowledge:核心系统"}],
+        "信贷": [{"id": "documents:信贷"}],
+    }
+    assert service.search_batch.call_count == 3
+    grouped = {
+        (call.args[0], tuple(call.args[1]), str(call.kwargs["where"])) for call in service.search_batch.call_args_list
+    }
+    assert ("documents", ("核心系统", "支付清算"), "None") in grouped
+    assert ("knowledge", ("核心系统",), "{'category': '产品'}") in grouped
+
+    # 与单条检索共用缓存
+    service.search_documents.return_value = []
+    assert await facade.search_documents("支付清算") == [{"id": "documents:支付清算"}]
+    await facade.search_batch(requests)
+    assert service.search_batch.call_count == 3
+    service.search_documents.assert_not_called()
+
+    with pytest.raises(ValueError):
+        await facade.search_batch([{"query": "重复"}, {"query": "重复"}])
+
+
+def test_search_batch_endpoint(test_client, auth_headers, test_user, monkeypatch):
+    """批量搜索接口按查询键返回结果，重复键返回422"""
+    calls = []
+
+    def search_batch(collection, queries, n_results=5, where=None, query_embeddings=None):
+        calls.append((collection, list(queries), n_results, where))
+        return [
+            [{"id": f"{collection}-{i}", "document": query, "metadata": {}, "distance": 0.25}]
+            for i, query in enumerate(queries)
+        ]
+
+    monkeypatch.setattr(vector_service, "search_batch", search_batch)
+    response = test_client.post(
+        "/api/v1/search/batch",
+        json={
+            "queries": [
+                {"query": "批量接口查询一", "industry": "金融", "limit": 3},
+                {"query": "批量接口查询二", "industry": "金融", "limit": 3},
+                {"id": "kb", "query": "批量接口查询一", "collection": "knowledge"},
+                {"id": "mine", "query": "批量接口查询一", "industry": "金融", "mine": True},
+            ]
+        },
+        headers=auth_headers,
+    )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["total"] == 4
+    assert body["results"]["批量接口查询二"][0]["content"] == "批量接口查询二"
+    assert body["results"]["kb"][0]["relevance_score"] == 0.75
+    assert ("documents", ["批量接口查询一", "批量接口查询二"], 3, {"industry": "金融"}) in calls
+    # 多个过滤条件用 $and 组合，mine 只检索当前用户上传的文档
+    mine_where = {"$and": [{"industry": "金融"}, {"user_id": test_user.id}]}
+    assert ("documents", ["批量接口查询一"], 5, mine_where) in calls
+
+    response = test_client.post(
+        "/api/v1/search/batch",
+        json={"queries": [{"query": "重复"}, {"query": "重复", "collection": "knowledge"}]},
+        headers=auth_headers,
+    )
+    assert response.status_code == 422
+
+
+def test_search_endpoints_format_hits_without_document(test_client, auth_headers, monkeypatch):
+    """单条搜索接口与批量接口使用相同的结果格式，没有文本的命中返回空内容，长文本截断"""
+    hits = [
+        {"id": "a", "document": None, "metadata": None, "distance": 0.25},
+        {"id": "b", "document": "长" * 400, "metadata": {"doc_id": 1}, "distance": 0.5},
+    ]
+    for method in ("search_documents", "search_knowledge", "search_similar_proposals"):
+        monkeypatch.setattr(f"app.api.search.async_vector_service.{method}", AsyncMock(return_value=hits))
+
+    for url, preview in (
+        ("/api/v1/search/documents?query=核心系统", 200),
+        ("/api/v1/search/knowledge?query=核心系统", 200),
+        ("/api/v1/search/proposals/similar?requirements=核心系统", 300),
+    ):
+        response = test_client.post(url, headers=auth_headers)
+        assert response.status_code == 200
+        first, second = response.json()["results"]
+        assert first == {"id": "a", "content": "", "metadata": {}, "relevance_score": 0.75}
+        assert second["content"] == "长" * preview + "..."
@@ -0,0 +1,105 @@
+"""文本分块测试"""
+import pytest
+
+from app.utils.text_chunker import TextChunker, estimate_tokens
+
+
+def test_estimate_tokens():
+    """中文按字、英文每4个字母数字、标点按符号计数"""
+    assert estimate_tokens("银行核心系统") == 6
+    assert estimate_tokens("Core banking system") == 5
+    assert estimate_tokens("Hello, 世界!") == 6
+    assert estimate_tokens("") == 0
+
+
+def test_english_text_is_split_within_budget():
+    """英文长段落按句切分，不再整体成为一个分块"""
+    text = " ".join(f"Sentence number {i} describes the core banking migration plan." for i in range(200))
+    chunks = TextChunker(max_tokens=100, overlap_tokens=0).split(text)
+    assert len(chunks) > 10
+    assert all(estimate_tokens(chunk) <= 100 for chunk in chunks)
+
+
+def test_long_sentence_is_hard_split():
+    """没有标点的超长句子按token窗口硬切"""
+    chunks = TextChunker(max_tokens=50, overlap_tokens=0).split("无标点长句" * 100)
+    assert "".join(chunks) == "无标点长句" * 100
+    assert all(estimate_tokens(chunk) <= 50 for chunk in chunks)
+
+
+def test_long_token_run_is_hard_split():
+    """没有空格的长 URL / base64 / 十六进制串按长度计数并硬切，不会成为单个超大分块"""
+    assert estimate_tokens("a" * 5000) == 1250
+    chunks = TextChunker(max_tokens=500, overlap_tokens=0).split("a" * 5000)
+    assert "".join(chunks) == "a" * 5000
+    assert len(chunks) == 3 and all(estimate_tokens(chunk) <= 500 for chunk in chunks)
+
+    url = "见 https://example.com/files/" + "9f86d081884c7d65" * 100 + " 下载。"
+    chunks = TextChunker(max_tokens=100, overlap_tokens=0).split(url)
+    assert len(chunks) > 4 and all(estimate_tokens(chunk) <= 100 for chunk in chunks)
+
+
+def test_overlap_between_adjacent_chunks():
+    """相邻分块共享末尾的句子"""
+    text = "".join(f"第{i}句内容说明。" for i in range(60))
+    chunks = TextChunker(max_tokens=40, overlap_tokens=10).split(text)
+    assert len(chunks) > 1
+    for previous, current in zip(chunks, chunks[1:]):
+        last_sentence = previous.split("。")[-2] + "。"
+        assert current.startswith(last_sentence)
+
+
+def test_headings_start_new_chunks_and_prefix_sections():
+    """标题结束上一节，并作为本节每个分块的前缀"""
+    text = "# 总体方案\n概述内容。\n## 技术架构\n" + "微服务拆分说明。" * 30
+    chunks = TextChunker(max_tokens=60, overlap_tokens=0).split(text)
+    assert chunks[0] == "# 总体方案\n概述内容。"
+    assert len(chunks) > 2
+    assert all(chunk.startswith("## 技术架构\n") for chunk in chunks[1:])
+
+
+def test_table_kept_whole_or_split_with_header():
+    """表格能放下时整体保留，放不下时按行拆分并重复表头"""
+    header = "| 模块 | 负责人 | 工期 |"
+    rows = [f"| 模块{i} | 负责人{i} | {i}个月 |" for i in range(40)]
+    small = TextChunker(max_tokens=200, overlap_tokens=0).split("说明。\n" + "\n".join([header] + rows[:3]))
+    assert small == ["说明。\n" + "\n".join([header] + rows[:3])]
+
+    chunks = TextChunker(max_tokens=80, overlap_tokens=0).split("\n".join([header] + rows))
+    assert len(chunks) > 1
+    assert all(chunk.startswith(header) for chunk in chunks)
+    assert sum(chunk.count("\n") for chunk in chunks) == len(rows)
+
+
+def test_markdown_separator_repeated_with_header():
+    """拆分 markdown 表格时表头和分隔行一起重复"""
+    header = "| 模块 | 负责人 | 工期 |\n| --- | :---: | ---: |"
+    rows = [f"| 模块{i} | 负责人{i} | {i}个月 |" for i in range(40)]
+    chunks = TextChunker(max_tokens=80, overlap_tokens=0).split("\n".join([header] + rows))
+    assert len(chunks) > 1
+    assert all(chunk.startswith(header + "\n| 模块") for chunk in chunks)
+    assert sum(chunk.count("\n") - 1 for chunk in chunks) == len(rows)
+
+
+def test_tabs_amounts_and_dates_are_plain_text():
+    """单独一行含制表符的文本不是表格，金额、日期开头的行不是标题"""
+    text = "# 预算\n2.5亿元用于核心系统改造\n2024.01.15 签署合同\n负责人：\t张三\n1.2 项目背景\n背景说明"
+    chunks = TextChunker(max_tokens=200, overlap_tokens=0).split(text)
+    assert chunks == ["# 预算\n2.5亿元用于核心系统改造\n2024.01.15 签署合同\n负责人：\t张三", "1.2 项目背景\n背景说明"]
+
+    tsv = "模块\t负责人\n核心\t张三\n渠道\t李四"
+    assert TextChunker(max_tokens=200, overlap_tokens=0).split("说明。\n" + tsv) == ["说明。\n" + tsv]
+
+
+def test_streaming_input_matches_string_input():
+    """按任意位置切断的文本片段流与整串输入结果一致"""
+    text = "# 标题\n" + "\n\n".join("段落内容，" * 20 + "结束。" for _ in range(20))
+    chunker = TextChunker(max_tokens=120, overlap_tokens=20)
+    pieces = (text[i : i + 37] for i in range(0, len(text), 37))
+    assert list(chunker.iter_chunks(pieces)) == chunker.split(text)
+
+
+def test_invalid_budget():
+    """token上限必须为正数"""
+    with pytest.raises(ValueError):
+        TextChunker(max_tokens=0)
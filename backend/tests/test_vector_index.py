@@ -0,0 +1,249 @@
+"""内置NumPy向量索引测试"""
+import numpy as np
+import pytest
+
+from app.services.vector_index import NumpyCollection, NumpyVectorStore, where_mask
+
+
+def _brute_force(vectors, query, k):
+    vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    query = query / np.linalg.norm(query)
+    distances = 1 - vectors @ query
+    order = np.argsort(distances, kind="stable")[:k]
+    return order, distances[order]
+
+
+@pytest.fixture
+def vectors():
+    return np.random.default_rng(0).standard_normal((500, 16)).astype(np.float32)
+
+
+def _collection(tmp_path, vectors, **kwargs):
+    collection = NumpyCollection("documents", str(tmp_path / "documents"), metadata={"hnsw:space": "cosine"}, **kwargs)
+    collection.add(
+        ids=[f"v{i}" for i in range(len(vectors))],
+        embeddings=vectors.tolist(),
+        documents=[f"文本{i}" for i in range(len(vectors))],
+        metadatas=[{"doc_id": i, "type": "even" if i % 2 == 0 else "odd"} for i in range(len(vectors))],
+    )
+    return collection
+
+
+def test_exact_query_matches_brute_force(tmp_path, vectors, monkeypatch):
+    """分块精确检索的结果与暴力计算一致，返回结构与 Chroma 相同"""
+    monkeypatch.setattr("app.services.vector_index.SEARCH_BLOCK_ROWS", 64)
+    collection = _collection(tmp_path, vectors)
+    queries = np.random.default_rng(1).standard_normal((3, 16)).astype(np.float32)
+
+    result = collection.query(query_embeddings=queries.tolist(), n_results=5)
+
+    assert collection.count() == 500
+    for i, query in enumerate(queries):
+        order, distances = _brute_force(vectors, query, 5)
+        assert result["ids"][i] == [f"v{row}" for row in order]
+        assert np.allclose(result["distances"][i], distances, atol=1e-5)
+        assert result["documents"][i][0] == f"文本{order[0]}"
+        assert result["metadatas"][i][0]["doc_id"] == order[0]
+
+
+def test_where_filters_and_writes(tmp_path, vectors):
+    """where 过滤、更新合并元数据、覆盖写入和删除"""
+    collection = _collection(tmp_path, vectors)
+    query = vectors[3].tolist()
+
+    result = collection.query(query_embeddings=[query], n_results=3, where={"type": "even"})
+    assert all(metadata["type"] == "even" for metadata in result["metadatas"][0])
+    assert "v3" not in result["ids"][0]
+    result = collection.query(
+        query_embeddings=[query], n_results=10, where={"$and": [{"type": "odd"}, {"doc_id": {"$lte": 9}}]}
+    )
+    assert result["ids"][0][0] == "v3" and len(result["ids"][0]) == 5
+
+    collection.update(ids=["v3"], metadatas=[{"type": "even", "tag": "x"}])
+    assert collection.get(ids=["v3"])["metadatas"] == [{"doc_id": 3, "type": "even", "tag": "x"}]
+    assert collection.get(where={"tag": "x"}, include=[])["ids"] == ["v3"]
+
+    collection.upsert(ids=["v3"], embeddings=[vectors[4].tolist()], documents=["新文本"], metadatas=[{"doc_id": 3}])
+    assert collection.get(ids=["v3"])["documents"] == ["新文本"]
+    assert collection.get(where={"tag": "x"}, include=[])["ids"] == []
+
+    collection.delete(where={"doc_id": {"$in": [3, 4]}})
+    collection.delete(ids=["v5"])
+    assert collection.count() == 497
+    result = collection.query(query_embeddings=[vectors[4].tolist()], n_results=3)
+    assert not {"v3", "v4", "v5"} & set(result["ids"][0])
+    assert collection.get(ids=["v7", "v6"], include=[])["ids"] == ["v7", "v6"]
+    assert len(collection.get(limit=10, offset=490, include=[])["ids"]) == 7
+
+
+def test_repeated_id_in_one_write(tmp_path, vectors):
+    """同一批写入中id重复时抛出 ValueError，集合不变"""
+    collection = NumpyCollection("documents", str(tmp_path / "index"), {"hnsw:space": "cosine"})
+    collection.add(ids=[f"v{i}" for i in range(10)], embeddings=vectors[:10].tolist())
+
+    for method in ("add", "upsert"):
+        with pytest.raises(ValueError):
+            getattr(collection, method)(ids=["v10", "v11", "v10"], embeddings=vectors[10:13].tolist())
+    with pytest.raises(ValueError):
+        collection.update(ids=["v1", "v1"], metadatas=[{"doc_id": 1}, {"doc_id": 2}])
+
+    assert collection.count() == 10
+    assert collection.get(ids=["v10", "v11"], include=[])["ids"] == []
+    result = collection.query(query_embeddings=vectors[:1].tolist(), n_results=20)
+    assert sorted(result["ids"][0]) == sorted(f"v{i}" for i in range(10))
+
+
+def test_where_mask_operators():
+    """过滤运算符与 Chroma 语义一致：缺失字段不匹配"""
+    columns = {
+        "n": np.array([1, 2, 3, None], dtype=object),
+        "s": np.array(["a", "b", None, "a"], dtype=object),
+    }
+    assert where_mask(columns, {"s": "a"}, 4).tolist() == [True, False, False, True]
+    assert where_mask(columns, {"s": {"$ne": "a"}}, 4).tolist() == [False, True, False, False]
+    assert where_mask(columns, {"n": {"$gt": 1}}, 4).tolist() == [False, True, True, False]
+    assert where_mask(columns, {"$or": [{"n": 1}, {"s": "b"}]}, 4).tolist() == [True, True, False, False]
+    assert where_mask(columns, {"missing": 1}, 4).tolist() == [False] * 4
+
+
+def test_persistence_and_float16(tmp_path, vectors):
+    """重新打开后数据与IVF状态保留；float16 存储结果接近 float32"""
+    store = NumpyVectorStore(str(tmp_path), dtype="float16", ivf_min_rows=0)
+    collection = store.get_or_create_collection("documents", metadata={"hnsw:space": "cosine"})
+    collection.add(ids=[f"v{i}" for i in range(len(vectors))], embeddings=vectors.tolist())
+    collection.delete(ids=["v0"])
+    collection.close()
+
+    reopened = NumpyVectorStore(str(tmp_path), ivf_min_rows=0).get_or_create_collection("documents")
+    assert reopened.count() == 499
+    assert reopened.get(ids=["v0"])["ids"] == []
+    result = reopened.query(query_embeddings=[vectors[1].tolist()], n_results=5)
+    order, _ = _brute_force(vectors[1:], vectors[1], 5)
+    assert result["ids"][0] == [f"v{row + 1}" for row in order]
+    assert result["distances"][0][0] == pytest.approx(0, abs=1e-3)
+    assert (tmp_path / "documents" / "vectors.bin").stat().st_size == 1024 * 16 * 2
+
+
+def test_ivf_recall(tmp_path, monkeypatch):
+    """IVF 只探查部分倒排表，聚类数据上召回率接近精确检索"""
+    monkeypatch.setattr("app.services.vector_index.FILTERED_EXACT_MAX_ROWS", 100)
+    rng = np.random.default_rng(2)
+    centers = rng.standard_normal((20, 32)).astype(np.float32)
+    data = centers[rng.integers(0, 20, 4000)] + 0.3 * rng.standard_normal((4000, 32)).astype(np.float32)
+    collection = NumpyCollection(
+        "documents", str(tmp_path / "documents"), {"hnsw:space": "cosine"}, ivf_min_rows=2000, ivf_nprobe=8
+    )
+    collection.add(ids=[f"v{i}" for i in range(1000)], embeddings=data[:1000].tolist())
+    assert collection._centroids is None
+    collection.add(ids=[f"v{i}" for i in range(1000, 4000)], embeddings=data[1000:].tolist())
+    assert collection._centroids is not None and len(collection._centroids) == 63
+    # 训练后写入的行也能检索到
+    collection.add(ids=["new"], embeddings=[data[0].tolist()])
+
+    queries = data[rng.choice(4000, 50, replace=False)] + 0.05 * rng.standard_normal((50, 32)).astype(np.float32)
+    recalls = []
+    for query in queries:
+        expected, _ = _brute_force(data, query, 10)
+        found = collection.query(query_embeddings=[query.tolist()], n_results=10, include=[])["ids"][0]
+        recalls.append(len({f"v{row}" for row in expected} & set(found)) / 10)
+    assert np.mean(recalls) >= 0.9
+    assert collection.query(query_embeddings=[data[0].tolist()], n_results=2, include=[])["ids"][0][0] in ("v0", "new")
+
+
+def test_vector_service_on_numpy_backend(tmp_path, monkeypatch):
+    """VECTOR_BACKEND=numpy 时 VectorService 的写入、检索与删除走内置索引"""
+    monkeypatch.setattr("app.core.config.settings.VECTOR_BACKEND", "numpy")
+    monkeypatch.setattr("app.core.config.settings.VECTOR_INDEX_DIR", str(tmp_path / "index"))
+    monkeypatch.setattr("app.core.config.settings.KEYWORD_INDEX_PATH", str(tmp_path / "keyword.sqlite3"))
+    from app.services.vector_service import VectorService
+
+    service = VectorService()
+    assert isinstance(service.client, NumpyVectorStore)
+    rng = np.random.default_rng(3)
+    texts = {1: "核心系统分布式改造方案", 2: "移动银行渠道体验升级"}
+    embeddings = {doc_id: rng.standard_normal(8).tolist() for doc_id in texts}
+    for doc_id, text in texts.items():
+        service.add_document(doc_id, f"文档{doc_id}", text, embeddings=[embeddings[doc_id]])
+
+    results = service.search_documents("核心系统", n_results=2, query_embedding=embeddings[1])
+    assert results[0]["metadata"]["doc_id"] == 1
+    assert results[0]["distance"] == pytest.approx(0, abs=1e-5)
+
+    service.delete_document(None, doc_id=1)
+    results = service.search_documents("核心系统", n_results=2, query_embedding=embeddings[1])
+    assert [item["metadata"]["doc_id"] for item in results] == [2]
+
+
+@pytest.mark.parametrize("precision", ["int8", "pq"])
+def test_quantized_precision_reranks_with_full_vectors(tmp_path, monkeypatch, precision):
+    """int8 / pq 集合扫描紧凑编码粗排，返回的距离来自原始向量重排"""
+    monkeypatch.setattr("app.services.vector_index.PQ_TRAIN_MIN_ROWS", 1000)
+    rng = np.random.default_rng(4)
+    centers = rng.standard_normal((20, 32)).astype(np.float32)
+    data = centers[rng.integers(0, 20, 3000)] + 0.3 * rng.standard_normal((3000, 32)).astype(np.float32)
+    store = NumpyVectorStore(str(tmp_path), precision={"documents": precision})
+    collection = store.get_or_create_collection("documents", metadata={"hnsw:space": "cosine"})
+    collection.add(ids=[f"v{i}" for i in range(3000)], embeddings=data.tolist())
+
+    assert collection.precision == precision
+    assert collection._quantizer.trained
+    usage = collection.memory_usage()
+    assert usage["scan"] <= usage["vectors"] // 4 + 3000 * 4
+
+    queries = data[:30] + 0.05 * rng.standard_normal((30, 32)).astype(np.float32)
+    recalls = []
+    for query in queries:
+        expected, distances = _brute_force(data, query, 10)
+        result = collection.query(query_embeddings=[query.tolist()], n_results=10, include=["distances"])
+        found = result["ids"][0]
+        recalls.append(len({f"v{row}" for row in expected} & set(found)) / 10)
+        if found[0] == f"v{expected[0]}":
+            assert result["distances"][0][0] == pytest.approx(distances[0], abs=1e-5)
+    assert np.mean(recalls) >= 0.9
+
+
+def test_precision_switch_rebuilds_codes(tmp_path, vectors):
+    """float32 集合切换为 int8 时用原始向量重建编码，无需重新写入"""
+    store = NumpyVectorStore(str(tmp_path))
+    store.get_or_create_collection("knowledge", metadata={"hnsw:space": "cosine"}).add(
+        ids=[f"v{i}" for i in range(len(vectors))], embeddings=vectors.tolist()
+    )
+    store.get_or_create_collection("knowledge").close()
+
+    reopened = NumpyVectorStore(str(tmp_path), precision={"knowledge": "int8"}).get_or_create_collection("knowledge")
+    assert reopened.precision == "int8"
+    assert (tmp_path / "knowledge" / "sq_codes.bin").exists()
+    result = reopened.query(query_embeddings=[vectors[7].tolist()], n_results=1)
+    assert result["ids"][0] == ["v7"]
+    assert result["distances"][0][0] == pytest.approx(0, abs=1e-5)
+
+
+def test_posting_index_prefilter_matches_full_scan(tmp_path, vectors):
+    """倒排表预过滤与整列求值结果一致，写入、更新、删除后倒排表同步"""
+    indexed = _collection(tmp_path / "indexed", vectors, indexed_fields=("type", "industry"))
+    plain = _collection(tmp_path / "plain", vectors)
+    for collection in (indexed, plain):
+        collection.update(
+            ids=[f"v{i}" for i in range(0, 500, 5)], metadatas=[{"industry": "金融"} for _ in range(0, 500, 5)]
+        )
+        collection.delete(ids=["v10", "v15"])
+        collection.update(ids=["v20"], metadatas=[{"type": "odd"}])
+    query = vectors[:1].tolist()
+
+    for where in (
+        {"type": "even"},
+        {"industry": "金融"},
+        {"$and": [{"type": "even"}, {"industry": "金融"}]},
+        {"$and": [{"type": {"$in": ["odd"]}}, {"doc_id": {"$lt": 100}}]},
+        {"$or": [{"industry": "金融"}, {"type": "odd"}]},
+        {"$or": [{"industry": "金融"}, {"doc_id": 3}]},
+        {"industry": "保险"},
+    ):
+        expected = plain.query(query_embeddings=query, n_results=400, where=where)
+        result = indexed.query(query_embeddings=query, n_results=400, where=where)
+        assert result["ids"] == expected["ids"], where
+        assert indexed.get(where=where)["ids"] == plain.get(where=where)["ids"], where
+
+    rows, exact = indexed._postings.candidates({"$and": [{"type": "even"}, {"industry": "金融"}]})
+    assert exact and [indexed._ids[row] for row in rows] == [f"v{i}" for i in range(0, 500, 10) if i not in (10, 20)]
+    assert indexed._postings.candidates({"doc_id": 1}) == (None, False)
@@ -1,8 +1,16 @@
 """向量服务测试"""
+import asyncio
+import gc
+import threading
+import time
+
 import pytest
 from unittest.mock import MagicMock, patch
 
-from app.services.vector_service import VectorService
+from app.core.metrics import counter_total, vector_cache_requests_total, vector_search_total
+from app.services.cache_service import CacheService
+from app.services.keyword_index import KeywordIndex
+from app.services.vector_service import AsyncVectorService, VectorService
 
 
 class TestVectorService:
@@ -108,20 +116,232 @@ class TestVectorService:
         assert deleted is True
         service.documents_collection.delete.assert_called_once_with(where={"doc_id": 99})
 
-    def test_search_similar_proposals_filters_types(self, vector_service):
-        """测试相似方案搜索的过滤条件"""
+    def test_search_similar_proposals_uses_proposals_collection(self, vector_service):
+        """测试相似方案搜索只检索方案集合，不再过滤文档集合"""
         with patch.object(
             vector_service,
-            "search_documents",
-            return_value=[{"id": "chunk"}]
-        ) as mock_search:
+            "search_batch",
+            return_value=[[{"id": "proposal_1_pricing", "metadata": {"vector_group_id": "proposal_1"}}]]
+        ) as mock_search, patch.object(vector_service, "search_documents") as mock_documents:
             results = vector_service.search_similar_proposals("测试需求", n_results=2)
 
-        assert results == [{"id": "chunk"}]
-        called_kwargs = mock_search.call_args.kwargs
-        assert "filter_metadata" in called_kwargs
-        assert set(called_kwargs["filter_metadata"]["type"]["$in"]) >= {
-            "technical_proposal",
-            "business_proposal",
-            "bid_document",
+        assert results == [{"id": "proposal_1_pricing", "metadata": {"vector_group_id": "proposal_1"}}]
+        assert mock_search.call_args.args[0] == "proposals"
+        mock_documents.assert_not_called()
+
+
+    def test_add_document_rejects_shared_embedding_for_chunks(self):
+        """多块文档不能复用同一个embedding，按分块提供时逐块写入"""
+        service = VectorService()
+        service.documents_collection = MagicMock()
+        content = "这是一段很长的文本。" * 200
+
+        with pytest.raises(ValueError):
+            service.add_document(doc_id=7, title="长文档", content=content, embedding=[0.1, 0.2])
+
+        chunk_count = len(service._split_text(content))
+        embeddings = [[float(i), 1.0] for i in range(chunk_count)]
+        service.add_document(doc_id=7, title="长文档", content=content, embeddings=embeddings)
+        assert service.documents_collection.add.call_args.kwargs["embeddings"] == embeddings
+
+
+    def test_update_document_only_touches_changed_chunks(self):
+        """增量更新只写入新分块、删除消失的分块，保留分块仅刷新元数据"""
+        service = VectorService()
+        service.documents_collection = MagicMock()
+        paragraphs = [f"第{i}段内容。" * 150 for i in range(6)]
+        _, old_ids, _, _ = service._build_chunk_records(3, "方案", "".join(paragraphs))
+        service.documents_collection.get.return_value = {"ids": old_ids}
+
+        paragraphs[4] = "修改第4段。" * 150
+        new_content = "".join(paragraphs)
+        _, new_ids, new_chunks, _ = service._build_chunk_records(3, "方案", new_content)
+        result = service.update_document(3, "方案", new_content, {"industry": "金融", "customer_name": None})
+
+        changed = [chunk_id for chunk_id in new_ids if chunk_id not in old_ids]
+        assert 0 < result["added"] == len(changed) < len(new_ids)
+        assert result["kept"] == len(new_ids) - len(changed)
+        upserted = service.documents_collection.upsert.call_args.kwargs
+        assert upserted["ids"] == changed
+        assert upserted["documents"] == [new_chunks[new_ids.index(chunk_id)] for chunk_id in changed]
+        assert "customer_name" not in upserted["metadatas"][0]
+        assert service.documents_collection.delete.call_args.kwargs["ids"] == sorted(set(old_ids) - set(new_ids))
+        assert service.documents_collection.update.call_args.kwargs["ids"] == [i for i in new_ids if i in old_ids]
+
+    def test_update_knowledge_skips_embedding_when_content_unchanged(self):
+        """知识库内容未变时只更新元数据，内容变化时写入新向量并删除旧向量"""
+        service = VectorService()
+        service.knowledge_collection = MagicMock()
+        vector_id = service._generate_id("知识内容", "kb_5")
+        service.knowledge_collection.get.return_value = {"ids": [vector_id]}
+
+        assert service.update_knowledge(5, "新标题", "知识内容", "产品", vector_id=vector_id) == vector_id
+        service.knowledge_collection.update.assert_called_once()
+        service.knowledge_collection.upsert.assert_not_called()
+
+        new_vector_id = service.update_knowledge(5, "新标题", "新的知识内容", "产品", vector_id=vector_id)
+        assert new_vector_id != vector_id
+        service.knowledge_collection.upsert.assert_called_once()
+        service.knowledge_collection.delete.assert_called_once_with(ids=[vector_id])
+
+    def test_search_documents_fuses_keyword_hits(self, tmp_path):
+        """向量结果与BM25结果按RRF融合，只被关键词命中的分块从集合补取"""
+        service = VectorService()
+        service.keyword_index = KeywordIndex(str(tmp_path / "keyword.sqlite3"))
+        service.documents_collection = MagicMock()
+        service.documents_collection.query.return_value = {
+            "ids": [["v1", "exact"]],
+            "documents": [["相近的描述", "遵循 JR/T 0171-2020"]],
+            "metadatas": [[{"doc_id": 1}, {"doc_id": 2}]],
+            "distances": [[0.1, 0.4]],
         }
+        service.documents_collection.get.return_value = {
+            "ids": ["only_kw"],
+            "documents": ["JR/T 0171-2020 条款说明"],
+            "metadatas": [{"doc_id": 3}],
+        }
+        service.keyword_index.add(
+            "documents",
+            [("exact", "遵循 JR/T 0171-2020", {"doc_id": 2}), ("only_kw", "JR/T 0171-2020 条款说明", {"doc_id": 3})],
+        )
+
+        results = service.search_documents("JR/T 0171-2020", n_results=3)
+
+        assert [item["id"] for item in results][0] == "exact"
+        assert {item["id"] for item in results} == {"v1", "exact", "only_kw"}
+        assert next(item for item in results if item["id"] == "only_kw")["distance"] is None
+        assert results[0]["score"] > results[-1]["score"]
+        service.documents_collection.get.assert_called_once_with(ids=["only_kw"], include=["documents", "metadatas"])
+        assert service.documents_collection.query.call_args.kwargs["n_results"] >= 3
+
+
+class TestAsyncVectorService:
+    """测试向量服务异步门面"""
+
+    @pytest.mark.asyncio
+    async def test_search_runs_in_executor_and_records_metrics(self):
+        """检索在线程池中执行并上报指标"""
+        service = MagicMock()
+        service.search_documents.return_value = [{"id": "chunk"}]
+        facade = AsyncVectorService(service, max_workers=2)
+        before = counter_total(vector_search_total)
+
+        results = await facade.search_documents("银行核心系统", n_results=3, filter_metadata={"industry": "金融"})
+
+        assert results == [{"id": "chunk"}]
+        service.search_documents.assert_called_once_with(
+            "银行核心系统", n_results=3, filter_metadata={"industry": "金融"}
+        )
+        assert counter_total(vector_search_total) == before + 1
+
+    @pytest.mark.asyncio
+    async def test_search_timeout(self):
+        """超过检索超时抛出 TimeoutError"""
+        service = MagicMock()
+        service.search_knowledge.side_effect = lambda *args, **kwargs: time.sleep(0.5)
+        facade = AsyncVectorService(service, max_workers=1)
+
+        with pytest.raises(asyncio.TimeoutError):
+            await facade.search_knowledge("数字化", timeout=0.05)
+
+    @pytest.mark.asyncio
+    async def test_concurrent_searches_do_not_serialise(self):
+        """并发检索在线程池中并行执行，不阻塞事件循环"""
+        service = MagicMock()
+        service.search_documents.side_effect = lambda *args, **kwargs: time.sleep(0.2) or []
+        facade = AsyncVectorService(service, max_workers=4)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(facade.search_documents(f"query {i}") for i in range(4)))
+        assert time.perf_counter() - start < 0.6
+
+    @pytest.mark.asyncio
+    async def test_search_cache_read_through_and_version_invalidation(self):
+        """重复检索命中缓存，写入集合后版本号递增使旧结果失效，其他集合的缓存不受影响"""
+        cache = CacheService()
+        cache._cache_type = "memory"
+        service = MagicMock()
+        service.search_documents.return_value = [{"id": "chunk", "distance": 0.1}]
+        service.search_knowledge.return_value = [{"id": "kb"}]
+        facade = AsyncVectorService(service, max_workers=2, cache=cache)
+        hits_before = counter_total(vector_cache_requests_total, collection="documents", result="hit")
+
+        for _ in range(3):
+            assert await facade.search_documents("核心系统", n_results=3) == [{"id": "chunk", "distance": 0.1}]
+        await facade.search_knowledge("核心系统")
+        assert service.search_documents.call_count == 1
+        assert counter_total(vector_cache_requests_total, collection="documents", result="hit") == hits_before + 2
+
+        # 过滤条件不同视为不同的检索
+        await facade.search_documents("核心系统", n_results=3, filter_metadata={"industry": "金融"})
+        assert service.search_documents.call_count == 2
+
+        await facade.add_document(doc_id=1, title="新文档", content="内容")
+        await facade.search_documents("核心系统", n_results=3)
+        await facade.search_knowledge("核心系统")
+        assert service.search_documents.call_count == 3
+        assert service.search_knowledge.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_ingest_documents_batches_and_pipelines(self):
+        """分块按批嵌入、每批一次upsert，下一批嵌入与当前批写入重叠"""
+        events = []
+
+        async def fake_embed(texts):
+            events.append(("embed_start", texts[0]))
+            await asyncio.sleep(0.05)
+            return [[float(len(text)), float(i)] for i, text in enumerate(texts)]
+
+        def slow_upsert(ids, documents, metadatas, embeddings):
+            events.append(("write_start", documents[0]))
+            time.sleep(0.1)
+            events.append(("write_end", documents[0]))
+
+        service = VectorService()
+        service.documents_collection = MagicMock()
+        service.documents_collection.upsert.side_effect = slow_upsert
+        facade = AsyncVectorService(service, max_workers=2, embed_func=fake_embed)
+        documents = [{"doc_id": i, "title": f"文档{i}", "content": f"第{i}号文档内容"} for i in range(10)]
+
+        vector_ids = await facade.ingest_documents(documents, batch_size=4)
+
+        assert sorted(vector_ids) == list(range(10))
+        assert service.documents_collection.upsert.call_count == 3
+        written = [call.kwargs["ids"] for call in service.documents_collection.upsert.call_args_list]
+        assert sum(len(ids) for ids in written) == 10
+        # 第二批的嵌入请求在第一批写入结束之前就已发出
+        assert events.index(("embed_start", "第4号文档内容")) < events.index(("write_end", "第0号文档内容"))
+
+    @pytest.mark.asyncio
+    async def test_ingest_documents_retrieves_failed_write_on_embed_error(self):
+        """嵌入失败时抛出嵌入的异常，已失败的上一批写入被取回，不产生未取回异常的警告"""
+        calls, written = [], threading.Event()
+
+        async def failing_embed(texts):
+            calls.append(texts)
+            if len(calls) > 1:
+                # 上一批的写入先失败，再让嵌入失败
+                await asyncio.to_thread(written.wait, 5)
+                await asyncio.sleep(0.05)
+                raise RuntimeError("嵌入服务不可用")
+            return [[1.0, 0.0] for _ in texts]
+
+        def failing_upsert(**kwargs):
+            written.set()
+            raise RuntimeError("写入失败")
+
+        service = VectorService()
+        service.documents_collection = MagicMock()
+        service.documents_collection.upsert.side_effect = failing_upsert
+        facade = AsyncVectorService(service, max_workers=2, embed_func=failing_embed)
+        documents = [{"doc_id": i, "title": f"文档{i}", "content": f"第{i}号文档内容"} for i in range(8)]
+        unhandled = []
+        asyncio.get_running_loop().set_exception_handler(lambda loop, context: unhandled.append(context))
+
+        with pytest.raises(RuntimeError, match="嵌入服务不可用"):
+            await facade.ingest_documents(documents, batch_size=4)
+        await asyncio.sleep(0.2)
+        gc.collect()
+
+        assert service.documents_collection.upsert.call_count == 1
+        assert unhandled == []
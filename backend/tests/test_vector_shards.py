@@ -0,0 +1,158 @@
+"""向量集合分片测试"""
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+
+from app.services.vector_index import NumpyCollection, NumpyVectorStore
+from app.services.vector_service import VectorService
+from app.services.vector_shards import ShardedCollection, pinned_values, shard_token
+
+
+@pytest.fixture
+def vectors():
+    return np.random.default_rng(0).standard_normal((300, 16)).astype(np.float32)
+
+
+def _records(vectors):
+    return {
+        "ids": [f"v{i}" for i in range(len(vectors))],
+        "embeddings": vectors.tolist(),
+        "documents": [f"文本{i}" for i in range(len(vectors))],
+        # 每10条中有一条没有 user_id，留在默认分片
+        "metadatas": [{"doc_id": i, **({"user_id": i % 3} if i % 10 else {})} for i in range(len(vectors))],
+    }
+
+
+def _sharded(tmp_path, vectors, **kwargs):
+    client = NumpyVectorStore(str(tmp_path / "sharded"))
+    base = client.get_or_create_collection("documents", {"hnsw:space": "cosine"})
+    sharded = ShardedCollection(client, base, "user_id", executor=ThreadPoolExecutor(max_workers=2), **kwargs)
+    sharded.add(**_records(vectors))
+    return client, sharded
+
+
+def test_routing_helpers():
+    """where 中的等值、$eq、$in 和 $and 子条件固定分片字段；集合名标记只含字母数字"""
+    assert pinned_values({"user_id": 3}, "user_id") == [3]
+    assert pinned_values({"user_id": {"$in": [1, 2]}}, "user_id") == [1, 2]
+    assert pinned_values({"$and": [{"type": "pdf"}, {"user_id": {"$eq": 5}}]}, "user_id") == [5]
+    assert pinned_values({"user_id": {"$ne": 5}}, "user_id") is None
+    assert pinned_values({"$or": [{"user_id": 1}, {"user_id": 2}]}, "user_id") is None
+    assert shard_token(12) == "12"
+    assert shard_token("金融").isalnum() and shard_token("金融") == shard_token("金融")
+    assert shard_token(12, "hash", 4) in {"h0", "h1", "h2", "h3"}
+
+
+def test_sharded_query_matches_single_collection(tmp_path, vectors):
+    """写入按 user_id 分到各分片，全分片并发检索合并后与单一集合结果一致，固定租户只查其分片"""
+    client, sharded = _sharded(tmp_path, vectors)
+    single = NumpyCollection("documents", str(tmp_path / "single"), {"hnsw:space": "cosine"})
+    single.add(**_records(vectors))
+    queries = vectors[:4].tolist()
+
+    assert sorted(collection.name for collection in client.list_collections()) == [
+        "documents",
+        "documents_user_id_0",
+        "documents_user_id_1",
+        "documents_user_id_2",
+    ]
+    assert client.get_collection("documents").count() == 30
+    assert sharded.count() == 300
+    expected = single.query(query_embeddings=queries, n_results=7)
+    result = sharded.query(query_embeddings=queries, n_results=7)
+    assert result["ids"] == expected["ids"]
+    assert np.allclose(result["distances"], expected["distances"], atol=1e-5)
+    assert result["documents"][0][0] == "文本0"
+
+    where = {"$and": [{"user_id": 1}, {"doc_id": {"$lt": 200}}]}
+    expected = single.query(query_embeddings=queries, n_results=5, where=where)
+    assert sharded.query(query_embeddings=queries, n_results=5, where=where)["ids"] == expected["ids"]
+    assert [shard.name for shard in sharded._targets(where)] == ["documents", "documents_user_id_1"]
+    assert sharded.query(query_embeddings=queries, n_results=5, where={"user_id": 9})["ids"] == [[]] * 4
+
+
+def test_sharded_query_texts_embedded_once(tmp_path, vectors):
+    """按文本检索多个分片时查询向量只计算一次"""
+    embedding_function = MagicMock(return_value=vectors[:1].tolist())
+    _, sharded = _sharded(tmp_path, vectors, embedding_function=embedding_function)
+
+    result = sharded.query(query_texts=["核心系统"], n_results=3)
+
+    embedding_function.assert_called_once_with(["核心系统"])
+    assert result["ids"][0][0] == "v0"
+
+
+def test_sharded_reads_and_writes_by_id(tmp_path, vectors):
+    """按 id 读取、更新、删除定位到记录所在分片，分页读取与逐个分片拼接一致"""
+    _, sharded = _sharded(tmp_path, vectors)
+
+    assert sharded.get(ids=["v5", "v10", "v4"])["ids"] == ["v5", "v10", "v4"]
+    sharded.update(ids=["v4", "v10"], metadatas=[{"title": "甲"}, {"title": "乙"}])
+    assert sharded.get(ids=["v4", "v10"])["metadatas"] == [
+        {"doc_id": 4, "user_id": 1, "title": "甲"},
+        {"doc_id": 10, "title": "乙"},
+    ]
+    sharded.delete(ids=["v4", "v10"])
+    sharded.delete(where={"doc_id": 7})
+    assert sharded.count() == 297
+    assert not sharded.get(ids=["v4", "v7", "v10"])["ids"]
+
+    everything = sharded.get(include=[])["ids"]
+    pages = [sharded.get(limit=40, offset=offset, include=[])["ids"] for offset in range(0, 320, 40)]
+    assert len(everything) == 297 and sum(pages, []) == everything
+    assert sharded.get(where={"user_id": 2}, limit=5, offset=3)["ids"] == [f"v{i}" for i in (11, 14, 17, 23, 26)]
+
+
+def test_records_written_before_sharding(tmp_path, vectors):
+    """启用分片前写入原集合的记录在固定租户的检索、删除中可见，upsert 后移到分片且不留旧的一份"""
+    client = NumpyVectorStore(str(tmp_path / "legacy"))
+    base = client.get_or_create_collection("documents", {"hnsw:space": "cosine"})
+    base.add(**_records(vectors[:30]))
+    sharded = ShardedCollection(client, base, "user_id")
+    sharded.add(**{key: values[30:] for key, values in _records(vectors[:60]).items()})
+    queries = vectors[:2].tolist()
+
+    result = sharded.query(query_embeddings=queries, n_results=3, where={"user_id": 1})
+    assert result["ids"][1][0] == "v1" and all(sharded.get(ids=ids)["ids"] == ids for ids in result["ids"])
+    expected = sorted(f"v{i}" for i in range(60) if i % 10 and i % 3 == 1)
+    assert sorted(sharded.get(where={"user_id": 1}, include=[])["ids"]) == expected
+
+    metadatas = [{"doc_id": 2, "user_id": 2}, {"doc_id": 5, "user_id": 2}]
+    sharded.upsert(ids=["v2", "v5"], embeddings=vectors[[2, 5]].tolist(), metadatas=metadatas)
+    assert base.get(ids=["v2", "v5"], include=[])["ids"] == []
+    assert client.get_collection("documents_user_id_2").get(ids=["v2", "v5"], include=[])["ids"] == ["v2", "v5"]
+    assert sharded.count() == 60
+
+    sharded.delete(where={"user_id": 2})
+    assert sharded.get(where={"user_id": 2}, include=[])["ids"] == []
+    assert sharded.count() == 60 - len([i for i in range(60) if i % 10 and i % 3 == 2])
+
+
+def test_hash_sharding_and_reset(tmp_path, vectors, monkeypatch):
+    """hash 分片数固定；VectorService 启用分片后重置集合会一并删除分片"""
+    monkeypatch.setattr("app.core.config.settings.VECTOR_SHARD_KEY", "user_id")
+    monkeypatch.setattr("app.core.config.settings.VECTOR_SHARD_MODE", "hash")
+    monkeypatch.setattr("app.core.config.settings.VECTOR_SHARD_COUNT", 2)
+    service = VectorService.__new__(VectorService)
+    service.client = NumpyVectorStore(str(tmp_path / "index"))
+    service._shard_executor = None
+    service._keyword_index_checked = set()
+    for name in ("documents", "knowledge", "proposals"):
+        setattr(service, f"{name}_collection", service._get_or_create_collection(name))
+    service.documents_collection.add(**_records(vectors))
+
+    assert isinstance(service.documents_collection, ShardedCollection)
+    shards = [shard.name for shard in service.documents_collection.shards()]
+    assert shards[0] == "documents" and set(shards[1:]) <= {"documents_user_id_h0", "documents_user_id_h1"}
+    assert service.documents_collection.query(query_embeddings=vectors[:1].tolist(), n_results=1)["ids"] == [["v0"]]
+
+    service.reset_collection("documents")
+
+    assert [collection.name for collection in service.client.list_collections()] == [
+        "documents",
+        "knowledge",
+        "proposals",
+    ]
+    assert service.documents_collection.count() == 0
@@ -0,0 +1,161 @@
+"""向量库快照、恢复与压缩测试"""
+import os
+
+import numpy as np
+import pytest
+
+from app.services.keyword_index import KeywordIndex
+from app.services.vector_index import NumpyCollection, NumpyVectorStore
+from app.services.vector_service import VectorService
+from app.services.vector_snapshot import compact_collection, create_snapshot, load_manifest, restore_snapshot
+
+
+@pytest.fixture
+def vectors():
+    return np.random.default_rng(0).standard_normal((600, 16)).astype(np.float32)
+
+
+def _service(tmp_path):
+    service = VectorService.__new__(VectorService)
+    service.client = NumpyVectorStore(str(tmp_path / "index"), indexed_fields=("type",))
+    for name in ("documents", "knowledge", "proposals"):
+        setattr(service, f"{name}_collection", service.client.get_or_create_collection(name, {"hnsw:space": "cosine"}))
+    service.keyword_index = KeywordIndex(":memory:")
+    service._keyword_index_checked = set()
+    return service
+
+
+def _fill(collection, vectors):
+    collection.add(
+        ids=[f"v{i}" for i in range(len(vectors))],
+        embeddings=vectors,
+        documents=[f"核心系统 文本{i}" for i in range(len(vectors))],
+        metadatas=[{"doc_id": i, "type": "even" if i % 2 == 0 else "odd"} for i in range(len(vectors))],
+    )
+
+
+def test_snapshot_restore_round_trip(tmp_path, vectors):
+    """快照恢复后记录、检索结果和关键词索引与快照时一致，快照之后的写入被丢弃"""
+    service = _service(tmp_path)
+    _fill(service.documents_collection, vectors)
+    service.rebuild_keyword_index("documents")
+    queries = vectors[:3].tolist()
+    expected = service.documents_collection.query(query_embeddings=queries, n_results=5, where={"type": "odd"})
+
+    manifest = create_snapshot(service, str(tmp_path / "snapshot"), ["documents", "proposals"])
+    assert manifest["collections"]["documents"]["count"] == 600
+    assert manifest["collections"]["proposals"]["count"] == 0
+    with pytest.raises(FileExistsError):
+        create_snapshot(service, str(tmp_path / "snapshot"), ["documents"])
+
+    service.documents_collection.delete(ids=[f"v{i}" for i in range(100)])
+    service.documents_collection.add(ids=["extra"], embeddings=vectors[:1], documents=["临时"])
+    service.keyword_index.add("documents", [("extra", "临时", {})])
+
+    restored = restore_snapshot(service, str(tmp_path / "snapshot"))
+
+    assert restored == {"documents": 600, "proposals": 0}
+    collection = service.documents_collection
+    assert collection.count() == 600
+    result = collection.query(query_embeddings=queries, n_results=5, where={"type": "odd"})
+    assert result["ids"] == expected["ids"]
+    assert np.allclose(result["distances"], expected["distances"], atol=1e-5)
+    assert collection.get(ids=["v7"])["metadatas"] == [{"doc_id": 7, "type": "odd"}]
+    assert service.keyword_index.count("documents") == 600
+    assert not collection.get(ids=["extra"])["ids"]
+    assert load_manifest(str(tmp_path / "snapshot"))["backend"]
+
+
+def test_compact_reclaims_deleted_rows(tmp_path):
+    """压缩后文件只保留存活行，检索结果与压缩前一致，IVF 和 int8 编码随之重写，可继续写入"""
+    vectors = np.random.default_rng(0).standard_normal((2400, 16)).astype(np.float32)
+    path = tmp_path / "documents"
+    collection = NumpyCollection(
+        "documents", str(path), metadata={"hnsw:space": "cosine"}, dtype="int8", ivf_min_rows=200, ivf_nprobe=64
+    )
+    _fill(collection, vectors)
+    collection.delete(ids=[f"v{i}" for i in range(0, 2400, 3)])
+    collection.delete(where={"doc_id": {"$gte": 500}})
+    queries = vectors[1:4].tolist()
+    expected = collection.query(query_embeddings=queries, n_results=8, where={"type": "even"})
+    size_before = os.path.getsize(path / "vectors.bin")
+
+    assert collection.compact() == {"rows": collection.count(), "removed": 2400 - collection.count()}
+
+    assert os.path.getsize(path / "vectors.bin") < size_before
+    result = collection.query(query_embeddings=queries, n_results=8, where={"type": "even"})
+    assert result["ids"] == expected["ids"]
+    assert np.allclose(result["distances"], expected["distances"], atol=1e-5)
+    assert collection.get(ids=["v4"])["metadatas"] == [{"doc_id": 4, "type": "even"}]
+    assert collection.compact()["removed"] == 0
+
+    collection.add(ids=["new"], embeddings=vectors[:1], metadatas=[{"type": "even"}])
+    collection.close()
+    reopened = NumpyCollection("documents", str(path), ivf_min_rows=200, ivf_nprobe=64)
+    assert reopened.count() == 333 + 1
+    assert reopened.query(query_embeddings=vectors[:1].tolist(), n_results=1)["ids"] == [["new"]]
+
+
+def test_query_retries_when_compacted_during_search(tmp_path, vectors, monkeypatch):
+    """计算距离期间发生压缩时，检索按新行号重新执行，不会把旧行号映射到其他记录"""
+    collection = NumpyCollection("documents", str(tmp_path / "documents"), metadata={"hnsw:space": "cosine"})
+    _fill(collection, vectors[:50])
+    collection.delete(ids=[f"v{i}" for i in range(10)])
+    expected = collection.query(query_embeddings=vectors[20:21].tolist(), n_results=3)
+    search_rows = collection._search_rows
+    calls = []
+
+    def compact_once(*args, **kwargs):
+        found = search_rows(*args, **kwargs)
+        if not calls:
+            calls.append(collection.compact())
+        return found
+
+    monkeypatch.setattr(collection, "_search_rows", compact_once)
+    result = collection.query(query_embeddings=vectors[20:21].tolist(), n_results=3)
+
+    assert calls == [{"rows": 40, "removed": 10}]
+    assert result["ids"] == expected["ids"] and expected["ids"][0][0] == "v20"
+    assert result["documents"] == expected["documents"]
+
+
+def test_compact_collection_uses_backend_compaction(tmp_path, vectors):
+    """内置索引的集合原地压缩"""
+    service = _service(tmp_path)
+    _fill(service.knowledge_collection, vectors[:50])
+    service.knowledge_collection.delete(ids=["v1", "v2"])
+
+    assert compact_collection(service, "knowledge") == {"rows": 48, "removed": 2}
+
+
+def test_compact_keeps_snapshot_when_restore_fails(tmp_path, vectors, monkeypatch):
+    """Chroma 集合压缩时恢复失败，快照保留在向量库目录旁，原有记录可从中完整恢复"""
+    import chromadb
+
+    from app.services import vector_snapshot
+
+    monkeypatch.setattr("app.core.config.settings.CHROMA_PERSIST_DIRECTORY", str(tmp_path / "chroma"))
+    service = _service(tmp_path)
+    service.client = chromadb.PersistentClient(path=str(tmp_path / "chroma"))
+    for name in ("documents", "knowledge", "proposals"):
+        setattr(service, f"{name}_collection", service.client.get_or_create_collection(name))
+    _fill(service.knowledge_collection, vectors[:40].tolist())
+    restore_collection = vector_snapshot.restore_collection
+
+    def interrupted(collection, path, entry, batch_size):
+        collection.add(ids=["partial"], embeddings=vectors[:1].tolist())
+        raise RuntimeError("写入中断")
+
+    monkeypatch.setattr(vector_snapshot, "restore_collection", interrupted)
+    with pytest.raises(RuntimeError):
+        compact_collection(service, "knowledge")
+
+    snapshots = [entry for entry in os.listdir(tmp_path) if entry.startswith("compact_knowledge_")]
+    assert len(snapshots) == 1
+    monkeypatch.setattr(vector_snapshot, "restore_collection", restore_collection)
+    assert restore_snapshot(service, str(tmp_path / snapshots[0])) == {"knowledge": 40}
+    assert sorted(service.knowledge_collection.get(include=[])["ids"]) == sorted(f"v{i}" for i in range(40))
+
+    # 恢复成功后删除本次压缩的快照
+    assert compact_collection(service, "knowledge") == {"rows": 40, "removed": None}
+    assert [entry for entry in os.listdir(tmp_path) if entry.startswith("compact_")] == snapshots